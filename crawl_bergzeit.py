@@ -12,9 +12,18 @@ Usage:
     python3 crawl_bergzeit.py shoes ropes  # crawl multiple
 """
 
-import sys, re, json, time, urllib.request, urllib.parse, html as htmlmod
+import sys, re, os, json, time, urllib.request, urllib.parse, html as htmlmod
 from datetime import datetime, timezone
-from playwright.sync_api import sync_playwright
+
+# Shared crawler modules live in crawlers/ (same dir once deployed)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawlers"))
+from price_sync import sync_prices
+from browser_pool import BrowserPool
+from checkpoint import for_crawler
+from detail_cache import DetailCache
+
+# Progress checkpoint for resumable scheduler runs (no-op when run standalone)
+CHECKPOINT = for_crawler(__file__)
 
 # ── Config ──────────────────────────────────────────────────────────────────
 SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
@@ -133,54 +142,18 @@ def extract_rope_specs(text):
     return diameter, length
 
 
-def _create_browser():
-    """Create a stealth Playwright browser for bergzeit (Python 3.9 SSL can't connect)."""
-    pw = sync_playwright().start()
-    browser = pw.chromium.launch(
-        headless=True,
-        args=['--disable-blink-features=AutomationControlled'],
-    )
-    ctx = browser.new_context(
-        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-        locale="de-DE", timezone_id="Europe/Berlin",
-    )
-    ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined})")
-    return pw, browser, ctx
-
-
-# Global browser instance (initialized on first use, shared across all fetches)
-_pw_instance = None
-_browser_instance = None
-_browser_ctx = None
-_browser_page = None
-
-
-def _get_browser_page():
-    """Get or create a shared Playwright page for fetching."""
-    global _pw_instance, _browser_instance, _browser_ctx, _browser_page
-    if _browser_page is None:
-        _pw_instance, _browser_instance, _browser_ctx = _create_browser()
-        _browser_page = _browser_ctx.new_page()
-        _browser_page.set_default_timeout(20000)
-    return _browser_page
-
-
-def _close_browser():
-    """Close the shared browser."""
-    global _pw_instance, _browser_instance, _browser_ctx, _browser_page
-    if _browser_instance:
-        _browser_instance.close()
-    if _pw_instance:
-        _pw_instance.stop()
-    _pw_instance = _browser_instance = _browser_ctx = _browser_page = None
+# Shared page pool (started on first use, closed at the end of the run).
+# Listing pages go through one page; per-size detail pages are fanned out
+# over all PAGE_POOL_SIZE pages.
+PAGE_POOL_SIZE = 4
+_pool = BrowserPool(size=PAGE_POOL_SIZE, delay=0.3, timeout_ms=20000,
+                    locale="de-DE", timezone_id="Europe/Berlin")
 
 
 def fetch_html(url):
     """Fetch a URL via Playwright and return HTML string."""
-    page = _get_browser_page()
-    page.goto(url, wait_until='domcontentloaded', timeout=20000)
-    return page.content()
+    CHECKPOINT.page()
+    return _pool.fetch(url)
 
 
 def supabase_get(table, params=""):
@@ -194,44 +167,6 @@ def supabase_get(table, params=""):
     return json.loads(resp.read().decode())
 
 
-def supabase_upsert(table, rows):
-    """POST upsert to Supabase REST API (service_role write)."""
-    if not rows:
-        return 0
-    url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict=retailer,product_url"
-    data = json.dumps(rows).encode()
-    req = urllib.request.Request(url, data=data, method="POST", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates,return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return len(rows)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Upsert error ({e.code}): {body[:300]}")
-        return 0
-
-
-def supabase_delete(table, retailer):
-    """DELETE all rows for a given retailer from a Supabase table."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}?retailer=eq.{urllib.parse.quote(retailer)}"
-    req = urllib.request.Request(url, method="DELETE", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Delete error ({e.code}): {body[:300]}")
-        return False
-
-
 # ── Reference table loader ──────────────────────────────────────────────────
 def load_reference_slugs(ref_table):
     """Load all slugs + brand + model from a reference table for matching."""
@@ -701,8 +636,8 @@ def _extract_variations_from_html(html):
     return json.loads(state_str[start:end])
 
 
-def fetch_persize_prices(url, page):
-    """Fetch bergzeit product page and extract per-size prices.
+def parse_persize_prices(html):
+    """Extract per-size prices from a bergzeit product page.
 
     bergzeit embeds __initialAppState with variations data. Each size option
     has 'price' (original/list), 'confPrice' (configured/sale price),
@@ -710,52 +645,47 @@ def fetch_persize_prices(url, page):
 
     Returns list of dicts: [{size, price, old_price, in_stock}, ...]
     """
-    try:
-        page.goto(url, wait_until='domcontentloaded', timeout=15000)
-        html = page.content()
-        variations = _extract_variations_from_html(html)
-        if not variations:
-            return None
-
-        results = []
-        for v in variations:
-            if v.get("colorVariation"):
-                continue  # Skip color variations, only process size variations
-            for opt in v.get("options", []):
-                label = opt.get("label", "")
-                if not label or not re.match(r'^\d', label):
-                    continue
-                conf_price = _parse_bergzeit_price(opt.get("confPrice"))
-                list_price = _parse_bergzeit_price(opt.get("price"))
-                in_stock = opt.get("isAvailable", False) or (opt.get("stock", 0) > 0)
-                if not conf_price and not list_price:
-                    continue
-                # confPrice is the actual selling price; price is the original/list price
-                # If confPrice < price, it's on sale; otherwise they may be the same
-                actual_price = conf_price or list_price
-                original_price = list_price if list_price and list_price > actual_price else None
-                results.append({
-                    "size": label,
-                    "price": actual_price,
-                    "old_price": original_price,
-                    "in_stock": in_stock,
-                })
-
-        if not results:
-            return None
-        results.sort(key=lambda x: float(x["size"]) if x["size"].replace('.', '').isdigit() else 999)
-        return results
-    except Exception as e:
-        print(f"    ⚠ Could not fetch per-size prices from {url}: {e}")
+    variations = _extract_variations_from_html(html)
+    if not variations:
         return None
 
+    results = []
+    for v in variations:
+        if v.get("colorVariation"):
+            continue  # Skip color variations, only process size variations
+        for opt in v.get("options", []):
+            label = opt.get("label", "")
+            if not label or not re.match(r'^\d', label):
+                continue
+            conf_price = _parse_bergzeit_price(opt.get("confPrice"))
+            list_price = _parse_bergzeit_price(opt.get("price"))
+            in_stock = opt.get("isAvailable", False) or (opt.get("stock", 0) > 0)
+            if not conf_price and not list_price:
+                continue
+            # confPrice is the actual selling price; price is the original/list price
+            # If confPrice < price, it's on sale; otherwise they may be the same
+            actual_price = conf_price or list_price
+            original_price = list_price if list_price and list_price > actual_price else None
+            results.append({
+                "size": label,
+                "price": actual_price,
+                "old_price": original_price,
+                "in_stock": in_stock,
+            })
 
-def fetch_product_sizes(url, page=None):
-    """Backward-compatible: extract just the size labels (for non-shoe categories if needed)."""
-    persize = fetch_persize_prices(url, page) if page else None
-    if persize:
-        return [s["size"] for s in persize]
-    return None
+    if not results:
+        return None
+    results.sort(key=lambda x: float(x["size"]) if x["size"].replace('.', '').isdigit() else 999)
+    return results
+
+
+def fetch_persize_prices(urls):
+    """Fetch many bergzeit product pages in parallel over the page pool.
+
+    Returns dict: url → per-size list (see parse_persize_prices) or None.
+    """
+    CHECKPOINT.page(len(urls))
+    return _pool.fetch_all(urls, parse=parse_persize_prices, progress_every=10)
 
 
 def should_exclude(product, exclude_keywords):
@@ -849,16 +779,22 @@ def crawl_category(cat_name, cat_config):
     if not products:
         return 0, 0
 
-    # Fetch per-size prices from product detail pages (shoes only)
+    # Fetch per-size prices from product detail pages (shoes only), skipping
+    # products whose listing card is unchanged since the last fetch
     if cat_name == "shoes":
-        print(f"  Fetching per-size prices from {len(products)} product pages...")
-        page = _get_browser_page()
-        for i, p in enumerate(products):
-            p["_persize"] = fetch_persize_prices(p["product_url"], page)
-            if (i + 1) % 10 == 0 or (i + 1) == len(products):
-                with_sizes = sum(1 for pp in products[:i+1] if pp.get("_persize"))
-                print(f"    {i+1}/{len(products)} products done ({with_sizes} with per-size prices)")
-            time.sleep(0.3)
+        cache = DetailCache(f"{RETAILER}_{cat_name}",
+                            fields=("price_eur", "original_price_eur", "product_name", "image_url"))
+        todo = cache.stale(products)
+        print(f"  Fetching per-size prices from {len(todo)}/{len(products)} product pages "
+              f"({PAGE_POOL_SIZE} pages in parallel, rest unchanged since last fetch)...")
+        persize = fetch_persize_prices([p["product_url"] for p in todo])
+        for p in todo:
+            cache.put(p, persize.get(p["product_url"]))
+        for p in products:
+            p["_persize"] = cache.get(p)
+        cache.save()
+        with_sizes = sum(1 for p in products if p.get("_persize"))
+        print(f"    {len(products)} products done ({with_sizes} with per-size prices)")
 
     now = datetime.now(timezone.utc).isoformat()
     matched = 0
@@ -930,11 +866,6 @@ def crawl_category(cat_name, cat_config):
                     _diam = _diam2
             row["diameter_mm"] = _diam
             row["length_m"] = _len
-    # For shoes and ropes: delete old rows first (per-size rows / length variants change)
-    if price_table in ("shoe_prices", "rope_prices"):
-        print(f"  Deleting old {RETAILER} rows from {price_table}...")
-        supabase_delete(price_table, RETAILER)
-
     # Deduplicate rows by product_url (same size can appear in multiple variation groups)
     seen_urls = set()
     deduped_rows = []
@@ -946,17 +877,12 @@ def crawl_category(cat_name, cat_config):
         print(f"  Deduplicated: {len(rows)} → {len(deduped_rows)} rows ({len(rows) - len(deduped_rows)} duplicates removed)")
     rows = deduped_rows
 
-    print(f"  Upserting to '{price_table}'...")
-    total_upserted = 0
-    batch_size = 50
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i:i+batch_size]
-        n = supabase_upsert(price_table, batch)
-        total_upserted += n
-        if n:
-            print(f"    ✓ Batch {i//batch_size + 1}: {n} rows")
-
-    print(f"  ✓ Done: {total_upserted} rows upserted to {price_table}")
+    # Diff against the live table and write only what changed. Per-size
+    # rows (#size= URLs) and ropes: vanished rows are deleted rather than
+    # kept (see price_sync / categories.py).
+    print(f"  Syncing '{price_table}'...")
+    sync_prices(price_table, RETAILER, rows)
+
     print(f"    Matched to reference: {matched}, Unmatched: {len(products) - matched}")
 
     return len(products), matched
@@ -977,11 +903,16 @@ if __name__ == "__main__":
             print(f"\n✗ Unknown category: {cat}")
             print(f"  Available: {', '.join(CATEGORIES.keys())}")
             continue
+        if CHECKPOINT.is_done(cat):
+            print(f"\n  ↷ {cat} already synced in this run, skipping")
+            continue
         total, matched = crawl_category(cat, CATEGORIES[cat])
+        CHECKPOINT.complete(cat, products=total, matched=matched)
         grand_total += total
         grand_matched += matched
 
-    _close_browser()
+    CHECKPOINT.finish()
+    _pool.close()
 
     print(f"\n{'='*60}")
     print(f"  All done! {grand_matched}/{grand_total} matched overall")
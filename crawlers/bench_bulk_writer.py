@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+bench_bulk_writer.py - Offline rows/sec benchmark for bulk_writer.BulkWriter.
+
+Starts a local PostgREST-like stand-in (table upsert endpoint + the
+bulk_upsert_rows RPC, gzip-aware, HTTP/1.1 keep-alive) with a simulated
+network round-trip, then pushes the same synthetic shoe_prices rows through:
+
+  legacy      50 rows per urllib request, new connection each time (old crawlers)
+  bulk-1      BulkWriter, 1 connection, no gzip
+  bulk-4-gz   BulkWriter, 4 keep-alive connections, gzip
+  rpc-4-gz    same, through the bulk_upsert_rows RPC
+
+No network or credentials needed.
+
+Usage:
+    python3 bench_bulk_writer.py                    # 20000 rows, 25 ms RTT
+    python3 bench_bulk_writer.py --rows 5000 --rtt-ms 40
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("SUPABASE_SECRET_KEY", "offline-bench")
+from bulk_writer import BulkWriter, RPC_NAME  # noqa: E402
+
+
+# ── PostgREST stand-in ──────────────────────────────────────────────────────
+
+class StandInStore:
+    """Tables as dicts keyed on the conflict columns (or a counter for inserts)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.requests = 0
+        self.bytes_in = 0
+
+    def write(self, table, rows, conflict):
+        with self.lock:
+            t = self.tables.setdefault(table, {})
+            for row in rows:
+                key = tuple(row.get(c) for c in conflict) if conflict else len(t)
+                if key in t:
+                    t[key].update(row)
+                else:
+                    t[key] = dict(row)
+            return len(rows)
+
+
+def make_handler(store, rtt_s, per_row_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, payload=b""):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with store.lock:
+                store.requests += 1
+                store.bytes_in += len(raw)
+            if self.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            body = json.loads(raw)
+
+            parsed = urllib.parse.urlsplit(self.path)
+            parts = parsed.path.split("/")  # ['', 'rest', 'v1', table] or [..., 'rpc', fn]
+            if parts[3] == "rpc":
+                if parts[4] != RPC_NAME:
+                    return self._reply(404, b'{"message":"unknown function"}')
+                rows, table, conflict = body["p_rows"], body["p_table"], body["p_conflict"]
+            else:
+                rows, table = body, parts[3]
+                qs = urllib.parse.parse_qs(parsed.query)
+                conflict = qs["on_conflict"][0].split(",") if "on_conflict" in qs else []
+
+            time.sleep(rtt_s + per_row_s * len(rows))
+            n = store.write(table, rows, conflict)
+            self._reply(200 if parts[3] == "rpc" else 201, str(n).encode() if parts[3] == "rpc" else b"")
+
+    return Handler
+
+
+# ── Synthetic data ──────────────────────────────────────────────────────────
+
+def synthetic_rows(n, seed=7):
+    """Per-size shoe_prices rows shaped like the crawler output."""
+    rng = random.Random(seed)
+    now = "2026-10-19T06:00:00+00:00"
+    rows = []
+    for i in range(n):
+        product = i // 12
+        size = 36 + (i % 12) * 0.5
+        rows.append({
+            "product_slug": f"brand-model-{product}" if rng.random() < 0.8 else None,
+            "retailer": f"shop{product % 25}.example",
+            "country": "DE",
+            "product_url": f"https://shop{product % 25}.example/p/{product}#size={size}",
+            "product_name": f"Brand Model {product}",
+            "brand": "Brand",
+            "model": f"Model {product}",
+            "image_url": f"https://cdn.example/img/{product}.jpg",
+            "match_confidence": 1.0,
+            "price_eur": round(rng.uniform(60, 220), 2),
+            "original_price_eur": None,
+            "currency": "EUR",
+            "eur_size": size,
+            "in_stock": rng.random() < 0.85,
+            "last_crawled_at": now,
+            "updated_at": now,
+        })
+    return rows
+
+
+# ── Writers under test ──────────────────────────────────────────────────────
+
+def legacy_upsert(base_url, table, rows, batch_size=50):
+    """Old crawler loop: one urllib request (new connection) per 50 rows."""
+    written = 0
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        req = urllib.request.Request(
+            f"{base_url}/rest/v1/{table}?on_conflict=retailer,product_url",
+            data=json.dumps(batch).encode(), method="POST",
+            headers={"Content-Type": "application/json",
+                     "Prefer": "resolution=merge-duplicates,return=minimal"},
+        )
+        urllib.request.urlopen(req, timeout=30).read()
+        written += len(batch)
+    return written
+
+
+def run_case(name, store, fn, rows):
+    store.tables.clear()
+    store.requests = store.bytes_in = 0
+    t0 = time.perf_counter()
+    written = fn(rows)
+    elapsed = time.perf_counter() - t0
+    stored = sum(len(t) for t in store.tables.values())
+    return {
+        "case": name,
+        "rows": written,
+        "stored": stored,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(written / elapsed) if elapsed else 0,
+        "requests": store.requests,
+        "kb_sent": round(store.bytes_in / 1024),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--rtt-ms", type=float, default=25.0, help="simulated round trip per request")
+    ap.add_argument("--row-us", type=float, default=15.0, help="simulated server cost per row")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    store = StandInStore()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(store, args.rtt_ms / 1000, args.row_us / 1e6))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    table = "shoe_prices"
+    rows = synthetic_rows(args.rows)
+
+    def bulk(workers, compress, rpc=False):
+        def fn(r):
+            with BulkWriter(table, on_conflict="retailer,product_url", rpc=rpc,
+                            base_url=base_url, workers=workers, compress=compress) as w:
+                return w.write(r)
+        return fn
+
+    cases = [
+        ("legacy", lambda r: legacy_upsert(base_url, table, r)),
+        ("bulk-1", bulk(1, False)),
+        ("bulk-4-gz", bulk(4, True)),
+        ("rpc-4-gz", bulk(4, True, rpc=True)),
+    ]
+    results = [run_case(name, store, fn, rows) for name, fn in cases]
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n  {args.rows} rows, {args.rtt_ms:.0f} ms RTT, {args.row_us:.0f} µs/row server cost\n")
+    print(f"  {'case':12s} {'rows/s':>9s} {'seconds':>8s} {'requests':>9s} {'KB sent':>8s}")
+    for r in results:
+        print(f"  {r['case']:12s} {r['rows_per_sec']:>9d} {r['seconds']:>8.2f} "
+              f"{r['requests']:>9d} {r['kb_sent']:>8d}")
+        assert r["stored"] == r["rows"], f"{r['case']}: stored {r['stored']} != written {r['rows']}"
+    base = results[0]["rows_per_sec"] or 1
+    print(f"\n  Speed-up vs legacy: "
+          + ", ".join(f"{r['case']} {r['rows_per_sec'] / base:.1f}x" for r in results[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+browser_pool.py - Shared Playwright page pool for JavaScript-rendered shops.
+
+One headless Chromium, one stealth context, N pages. A work queue feeds
+URLs (or any work item) to whichever page is idle, so detail pages are
+fetched N at a time instead of strictly one after another. Every request
+in the context goes through a route filter that aborts images, fonts,
+media and known analytics/ad hosts - none of them are needed to read the
+server-rendered state, and they are most of the bytes on a product page.
+
+Two ways to use it:
+
+    with BrowserPool(size=4, locale="de-DE") as pool:
+        html = pool.fetch(listing_url)                          # one page
+        results = pool.fetch_all(urls, parse=parse_html)        # {url: parse(html)}
+        results = pool.map(items, visit)                        # {item: await visit(page, item)}
+
+`parse` is a plain function run on the page HTML (e.g. bergzeit's
+__initialAppState extractor). `visit` is an async function for shops that
+need interaction (clicking size radios, waiting for navigation).
+A failed item maps to None and is logged; it never stops the queue.
+
+Self-check against local static HTML fixtures (no network):
+    python3 browser_pool.py --selftest
+
+Requires: pip3 install playwright && playwright install chromium
+"""
+
+import asyncio
+import os
+import sys
+import time
+from playwright.async_api import async_playwright
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+# Playwright resource types that are never needed for price extraction
+BLOCK_RESOURCE_TYPES = {"image", "font", "media"}
+
+# Tracking / analytics / ad hosts (substring match on the request URL)
+BLOCK_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googleadservices.com", "googlesyndication.com", "facebook.net",
+    "connect.facebook", "hotjar.com", "clarity.ms", "criteo.", "bing.com/bat",
+    "tiktok.com", "pinterest.com", "trustpilot.com", "usercentrics.eu",
+    "cookiebot.com", "sentry.io", "newrelic.com", "nr-data.net", "awin1.com",
+)
+
+STEALTH_SCRIPT = (
+    "Object.defineProperty(navigator,'webdriver',{get:()=>undefined});"
+    "window.chrome={runtime:{}};"
+)
+
+
+class BrowserPool:
+    """Pool of N Playwright pages sharing one browser context.
+
+    size:          number of pages working in parallel
+    delay:         seconds each page waits after a request (politeness)
+    timeout_ms:    per-navigation timeout
+    block_types:   resource types to abort (None = keep everything)
+    block_hosts:   URL substrings to abort
+    """
+
+    def __init__(self, size=4, delay=0.3, timeout_ms=20000, wait_until="domcontentloaded",
+                 user_agent=DEFAULT_USER_AGENT, locale="de-DE", timezone_id="Europe/Berlin",
+                 block_types=BLOCK_RESOURCE_TYPES, block_hosts=BLOCK_HOSTS, headless=True):
+        self.size = max(1, size)
+        self.delay = delay
+        self.timeout_ms = timeout_ms
+        self.wait_until = wait_until
+        self.user_agent = user_agent
+        self.locale = locale
+        self.timezone_id = timezone_id
+        self.block_types = set(block_types or ())
+        self.block_hosts = tuple(block_hosts or ())
+        self.headless = headless
+
+        self.blocked = 0
+        self.requests = 0
+        self._loop = None
+        self._pw = self._browser = self._context = None
+        self._pages = []
+
+    # ── Lifecycle ──
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._start())
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run_until_complete(self._close())
+            self._loop.close()
+            self._loop = None
+
+    async def _start(self):
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(
+            headless=self.headless,
+            args=["--disable-blink-features=AutomationControlled"],
+        )
+        self._context = await self._browser.new_context(
+            user_agent=self.user_agent,
+            viewport={"width": 1440, "height": 900},
+            locale=self.locale,
+            timezone_id=self.timezone_id,
+        )
+        await self._context.add_init_script(STEALTH_SCRIPT)
+        await self._context.route("**/*", self._route)
+        for _ in range(self.size):
+            page = await self._context.new_page()
+            page.set_default_timeout(self.timeout_ms)
+            self._pages.append(page)
+
+    async def _close(self):
+        if self._browser:
+            await self._browser.close()
+        if self._pw:
+            await self._pw.stop()
+        self._pw = self._browser = self._context = None
+        self._pages = []
+
+    async def _route(self, route):
+        req = route.request
+        self.requests += 1
+        if req.resource_type in self.block_types or any(h in req.url for h in self.block_hosts):
+            self.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    # ── Work queue ──
+
+    async def _run(self, items, visit):
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        results = {}
+
+        async def worker(page):
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results[item] = await visit(page, item)
+                except Exception as e:
+                    print(f"    ⚠ {item}: {e}")
+                    results[item] = None
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+        await asyncio.gather(*(worker(p) for p in self._pages))
+        return results
+
+    def map(self, items, visit):
+        """Run `await visit(page, item)` for every item on the idle pages.
+
+        Returns {item: result}; items must be hashable (URLs usually).
+        """
+        self.start()
+        return self._loop.run_until_complete(self._run(list(dict.fromkeys(items)), visit))
+
+    def fetch_all(self, urls, parse=None, progress_every=0):
+        """Load every URL and return {url: parse(html)} (or raw html if parse is None)."""
+        done = [0]
+        total = len(set(urls))
+        t0 = time.time()
+
+        async def visit(page, url):
+            await page.goto(url, wait_until=self.wait_until, timeout=self.timeout_ms)
+            html = await page.content()
+            done[0] += 1
+            if progress_every and (done[0] % progress_every == 0 or done[0] == total):
+                print(f"    {done[0]}/{total} pages fetched ({time.time() - t0:.0f}s)")
+            return parse(html) if parse else html
+
+        return self.map(urls, visit)
+
+    def fetch(self, url):
+        """Load one URL and return its HTML. Raises on navigation errors."""
+        self.start()
+
+        async def one():
+            page = self._pages[0]
+            await page.goto(url, wait_until=self.wait_until, timeout=self.timeout_ms)
+            return await page.content()
+
+        return self._loop.run_until_complete(one())
+
+
+# ── Self-check against local static fixtures ───────────────────────────────
+
+def _selftest(n_products=12, size=3):
+    """Serve generated product pages from a temp dir and crawl them through the pool.
+
+    Checks that every page is parsed and that no image/font/analytics request
+    reaches the server (or leaves the machine).
+    """
+    import re
+    import tempfile
+    import threading
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits.append(self.path)
+            super().do_GET()
+
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(n_products):
+            with open(os.path.join(root, f"p{i}.html"), "w") as f:
+                f.write(
+                    "<html><head>"
+                    '<link rel="preload" href="/font.woff2" as="font" crossorigin>'
+                    '<script src="https://www.googletagmanager.com/gtag/js?id=X"></script>'
+                    "</head><body>"
+                    f'<img src="/img{i}.jpg"><script>window.__state={{"price":{100 + i}}}</script>'
+                    "</body></html>"
+                )
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=root))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/p{i}.html" for i in range(n_products)]
+
+        def parse(html):
+            m = re.search(r'"price":(\d+)', html)
+            return int(m.group(1)) if m else None
+
+        t0 = time.time()
+        with BrowserPool(size=size, delay=0) as pool:
+            results = pool.fetch_all(urls, parse=parse)
+            blocked = pool.blocked
+        elapsed = time.time() - t0
+        server.shutdown()
+
+    assert [results[u] for u in urls] == [100 + i for i in range(n_products)], results
+    leaked = [h for h in hits if not h.endswith(".html")]
+    assert not leaked, f"blocked resources reached the server: {leaked}"
+    print(f"  ✓ {n_products} fixture pages parsed with {size} pages in {elapsed:.1f}s, "
+          f"{blocked} requests blocked")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        print(__doc__)
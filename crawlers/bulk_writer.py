@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+bulk_writer.py - High-throughput bulk upsert/insert into Supabase tables.
+
+Used by price_sync.py (crawler upserts) and snapshot_prices.py (history
+inserts). Replaces the fixed "50 rows per urllib request" loops:
+
+  - Adaptive batches: rows are packed into a request until the encoded JSON
+    reaches MAX_BATCH_BYTES (or MAX_BATCH_ROWS), so small gear rows go out in
+    big batches and wide per-size shoe rows in smaller ones.
+  - gzip request bodies (Content-Encoding: gzip). If the server rejects
+    compressed bodies the writer falls back to plain JSON for the rest of
+    the run.
+  - Pipelining: WORKERS threads each hold one keep-alive HTTP connection and
+    send batches concurrently.
+  - Optional RPC mode: POST /rest/v1/rpc/bulk_upsert_rows with the whole batch
+    as one jsonb array; the function does INSERT ... ON CONFLICT in a single
+    statement (see supabase/migrations/20261019010000_bulk_upsert_rows.sql).
+
+Usage:
+    from bulk_writer import BulkWriter
+    with BulkWriter("shoe_prices", on_conflict="retailer,product_url") as w:
+        w.write(rows)
+    with BulkWriter("price_history") as w:          # plain insert
+        w.write(rows)
+
+Offline benchmark: python3 bench_bulk_writer.py
+"""
+
+import gzip
+import http.client
+import json
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
+
+# Target request body size before compression. PostgREST parses the whole
+# body in one go; ~512 KB keeps a batch well under a second server-side.
+MAX_BATCH_BYTES = 512 * 1024
+MAX_BATCH_ROWS = 2000
+
+# Concurrent connections (one batch in flight per connection).
+WORKERS = 4
+
+# Server-side upsert function (created by the bulk_upsert_rows migration).
+RPC_NAME = "bulk_upsert_rows"
+
+
+def pack_batches(rows, max_bytes=MAX_BATCH_BYTES, max_rows=MAX_BATCH_ROWS):
+    """Group rows by key set and pack them into size-bounded batches.
+
+    PostgREST bulk requests (and the RPC) need identical keys in every object,
+    so e.g. shoe rows with and without eur_size are sent separately.
+
+    Yields (rows, encoded_items) where encoded_items are the per-row JSON
+    strings (encoded once, joined into the request body later).
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for group in groups.values():
+        batch, encoded, size = [], [], 2
+        for row in group:
+            item = json.dumps(row, separators=(",", ":"), default=str)
+            if batch and (size + len(item) + 1 > max_bytes or len(batch) >= max_rows):
+                yield batch, encoded
+                batch, encoded, size = [], [], 2
+            batch.append(row)
+            encoded.append(item)
+            size += len(item) + 1
+        if batch:
+            yield batch, encoded
+
+
+class BulkWriter:
+    """Write rows to one table in adaptive, compressed, concurrent batches.
+
+    on_conflict: comma-separated conflict columns for an upsert
+                 (None = plain insert, e.g. history tables).
+    rpc:         True to send batches through RPC_NAME instead of the table
+                 endpoint.
+    """
+
+    def __init__(self, table, on_conflict=None, rpc=False, base_url=SUPABASE_URL,
+                 key=SERVICE_KEY, workers=WORKERS, compress=True,
+                 max_bytes=MAX_BATCH_BYTES, max_rows=MAX_BATCH_ROWS, timeout=60):
+        self.table = table
+        self.on_conflict = on_conflict
+        self.rpc = rpc
+        self.key = key
+        self.workers = max(1, workers)
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.timeout = timeout
+
+        parsed = urllib.parse.urlsplit(base_url)
+        self._https = parsed.scheme == "https"
+        self._host = parsed.netloc
+        self._prefix = parsed.path.rstrip("/")
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+        self._pool = None
+
+        self.rows_written = 0
+        self.batches_sent = 0
+        self.bytes_sent = 0
+        self.errors = 0
+
+    # ── Connection handling ──
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            conn = cls(self._host, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drop_conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── Request building ──
+
+    def _path_and_body(self, encoded):
+        rows_json = "[" + ",".join(encoded) + "]"
+        if self.rpc:
+            conflict = self.on_conflict.split(",") if self.on_conflict else []
+            body = (
+                '{"p_table":' + json.dumps(self.table)
+                + ',"p_conflict":' + json.dumps(conflict)
+                + ',"p_rows":' + rows_json + "}"
+            )
+            return f"{self._prefix}/rest/v1/rpc/{RPC_NAME}", body.encode()
+        path = f"{self._prefix}/rest/v1/{self.table}"
+        if self.on_conflict:
+            path += f"?on_conflict={self.on_conflict}"
+        return path, rows_json.encode()
+
+    def _headers(self, compressed):
+        h = {
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        }
+        if not self.rpc:
+            h["Prefer"] = ("resolution=merge-duplicates,return=minimal"
+                           if self.on_conflict else "return=minimal")
+        if compressed:
+            h["Content-Encoding"] = "gzip"
+        return h
+
+    def _post(self, path, payload, compressed):
+        """POST one body, reconnecting once if a keep-alive socket went stale."""
+        for attempt in (1, 2):
+            conn = self._conn()
+            try:
+                conn.request("POST", path, body=payload, headers=self._headers(compressed))
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, OSError):
+                self._drop_conn()
+                if attempt == 2:
+                    raise
+
+    def _send(self, batch, encoded):
+        path, raw = self._path_and_body(encoded)
+        compressed = self.compress
+        payload = gzip.compress(raw, compresslevel=5) if compressed else raw
+        try:
+            status, body = self._post(path, payload, compressed)
+            if compressed and status in (400, 415):
+                # Gateway/PostgREST without gzip support: retry plain, stop compressing
+                self.compress = False
+                payload = raw
+                status, body = self._post(path, payload, False)
+        except (http.client.HTTPException, OSError) as e:
+            print(f"  ✗ Bulk write error ({self.table}): {e}")
+            with self._lock:
+                self.errors += 1
+            return 0
+
+        with self._lock:
+            self.batches_sent += 1
+            self.bytes_sent += len(payload)
+            if status >= 300:
+                self.errors += 1
+                print(f"  ✗ Bulk write error ({status}) on {self.table}: "
+                      f"{body.decode(errors='replace')[:300]}")
+                return 0
+            self.rows_written += len(batch)
+        return len(batch)
+
+    # ── Public API ──
+
+    def write(self, rows):
+        """Write all rows. Returns number of rows the server acknowledged."""
+        if not rows:
+            return 0
+        batches = pack_batches(rows, self.max_bytes, self.max_rows)
+        if self.workers == 1:
+            return sum(self._send(b, e) for b, e in batches)
+        # One long-lived pool per writer, so each worker thread keeps its
+        # keep-alive connection across write() calls
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        futures = [self._pool.submit(self._send, b, e) for b, e in batches]
+        return sum(f.result() for f in futures)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+categories.py - Registry of gear categories and their table conventions.
+
+Every part of the price pipeline that used to spell out per-category
+details (run_all_crawlers.PRICE_TABLES, snapshot_prices, drop detection,
+price_sync's vanished policy, the "remove shoe-only field" blocks in the
+crawlers) reads them from here instead:
+
+    live table       {name}_prices, upserted by price_sync on (retailer, product_url)
+    history table    change-only log written by snapshot_prices.py
+    history grain    "row":     one history row per live row, keyed by
+                                {name}_price_id, tracks price / original price / stock
+                     "product": one history row per (product_slug, retailer) with the
+                                cheapest price (shoes: one live row per size,
+                                legacy price_history schema)
+    extra columns    category-only live columns, stripped from rows synced to
+                     other tables
+    vanished         "out_of_stock" or "delete" (variant rows regenerated
+                     every crawl, e.g. rope lengths)
+
+Adding a category = one CATEGORIES entry (plus its tables). Snapshot, drop
+detection, trends, compaction and sync pick it up from the registry.
+
+    from categories import CATEGORIES, by_table, with_history
+    by_table("rope_prices").vanished        # "delete"
+    [c.name for c in with_history()]        # snapshot / drop detection order
+"""
+
+
+class Category:
+    """Table conventions of one gear category."""
+
+    def __init__(self, name, live_table=None, history_table=None, history_grain="row",
+                 history_key=None, extra_columns=(), vanished="out_of_stock"):
+        self.name = name
+        self.live_table = live_table or f"{name}_prices"
+        self.history_table = history_table
+        self.history_grain = history_grain
+        if history_key is None:
+            history_key = ("shoe_slug", "retailer") if history_grain == "product" \
+                else (f"{name}_price_id",)
+        self.history_key = tuple(history_key)
+        self.extra_columns = frozenset(extra_columns)
+        self.vanished = vanished
+
+    @property
+    def history_fields(self):
+        """Fields whose change writes a history row."""
+        if self.history_grain == "product":
+            return ("price_eur",)
+        return ("price_eur", "original_price_eur", "in_stock")
+
+    def drop_spec(self):
+        """Parameters of this category for the detect_price_drops RPC."""
+        return {"category": self.name, "live_table": self.live_table,
+                "history_table": self.history_table, "grain": self.history_grain,
+                "history_key": list(self.history_key)}
+
+    def __repr__(self):
+        return f"Category({self.name!r})"
+
+
+CATEGORIES = [
+    Category("shoes", live_table="shoe_prices", history_table="price_history",
+             history_grain="product", extra_columns=("sizes_available", "eur_size")),
+    Category("rope", history_table="rope_price_history",
+             extra_columns=("length_m", "diameter_mm"), vanished="delete"),
+    Category("crashpad", history_table="crashpad_price_history"),
+    Category("harness", history_table="harness_price_history"),
+    Category("helmet", history_table="helmet_price_history"),
+    Category("belay", history_table="belay_price_history"),
+    Category("quickdraw", history_table="quickdraw_price_history",
+             extra_columns=("pack_size", "length_cm")),
+    # Live prices only: jacket_price_history exists but is not snapshotted yet
+    Category("jacket"),
+]
+
+_BY_NAME = {c.name: c for c in CATEGORIES}
+_BY_TABLE = {c.live_table: c for c in CATEGORIES}
+_ALL_EXTRA = frozenset().union(*(c.extra_columns for c in CATEGORIES))
+
+
+def get(name):
+    """Category by name ("shoes", "rope", ...). KeyError if unknown."""
+    return _BY_NAME[name]
+
+
+def by_table(live_table):
+    """Category of a live price table, or None for tables outside the registry."""
+    return _BY_TABLE.get(live_table)
+
+
+def with_history():
+    """Categories that have a history table (snapshot / drops / trends order)."""
+    return [c for c in CATEGORIES if c.history_table]
+
+
+def foreign_columns(category):
+    """Category-only columns of other categories (not valid in this live table)."""
+    return _ALL_EXTRA - category.extra_columns
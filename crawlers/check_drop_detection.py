@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+check_drop_detection.py - Check the detect_price_drops RPC on a local Postgres.
+
+Starts a throwaway cluster (pg_fixture.LocalPostgres), creates minimal
+versions of the price / history tables, applies the history and drop
+detection migrations, seeds a synthetic catalog with a change-only
+history, and compares (with the category specs from categories.py) the function's result with the old Python
+dict-join (last history price per key vs in-stock live price) for:
+
+  - p_before = NULL (last recorded price)
+  - p_before = start of the latest snapshot (what the scheduler passes)
+
+Usage:
+    python3 check_drop_detection.py                  # throwaway cluster
+    python3 check_drop_detection.py --dsn postgresql://...   # existing scratch DB
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+from categories import with_history
+from pg_fixture import LocalPostgres
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "supabase", "migrations")
+MIGRATIONS = ["20261019020000_price_history_latest.sql",
+              "20261019030000_detect_price_drops.sql",
+              "20261019070000_detect_price_drops_registry.sql",
+              "20261019110000_price_history_tombstones.sql"]
+
+# Per-row categories of the registry (shoes use the legacy product grain)
+CATEGORIES = [c.name for c in with_history() if c.history_grain == "row"]
+THRESHOLD = 0.10
+
+SCHEMA = """
+CREATE TABLE shoe_prices (
+  id bigserial PRIMARY KEY, product_slug text, retailer text, product_name text,
+  product_url text, price_eur numeric(8,2), eur_size text,
+  in_stock boolean DEFAULT true
+);
+CREATE TABLE price_history (
+  id bigserial PRIMARY KEY, shoe_slug text NOT NULL, retailer text NOT NULL,
+  price_eur numeric(8,2) NOT NULL, recorded_at timestamptz DEFAULT now()
+);
+"""
+
+CATEGORY_SCHEMA = """
+CREATE TABLE {cat}_prices (
+  id bigserial PRIMARY KEY, product_slug text, retailer text, product_name text,
+  product_url text, price_eur numeric(8,2), original_price_eur numeric(8,2),
+  in_stock boolean DEFAULT true
+);
+CREATE TABLE {cat}_price_history (
+  id bigserial PRIMARY KEY, {cat}_price_id bigint NOT NULL, price_eur numeric(8,2),
+  original_price_eur numeric(8,2), in_stock boolean, recorded_at timestamptz DEFAULT now()
+);
+"""
+
+
+def _lit(v):
+    if v is None:
+        return "NULL"
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, (int, float)):
+        return repr(v)
+    return "'" + str(v).replace("'", "''") + "'"
+
+
+def _insert(table, rows):
+    cols = list(rows[0])
+    values = ",\n".join("(" + ", ".join(_lit(r[c]) for c in cols) + ")" for r in rows)
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES\n{values};\n"
+
+
+# ── Synthetic data ──────────────────────────────────────────────────────────
+
+def build_dataset(n_per_cat=300, seed=5):
+    """Live rows + change-only history over three snapshots.
+
+    Returns (live, history, snapshot_times); live/history are dicts table → rows.
+    """
+    rng = random.Random(seed)
+    t0 = datetime(2026, 10, 17, 6, tzinfo=timezone.utc)
+    snaps = [t0 + timedelta(days=d) for d in range(3)]
+    retailers = ["bergzeit.de", "naturzeit.com", "sportokay.com", "oliunid.de"]
+    live, history = {}, {}
+
+    shoes, shoe_hist = [], []
+    for i in range(n_per_cat):
+        slug, retailer = f"brand-shoe-{i // 3}", retailers[i % len(retailers)]
+        price = round(rng.uniform(60, 200), 2)
+        for s in snaps:
+            if s == snaps[0] or rng.random() < 0.2:
+                # Some keys were tombstoned (left the live table) in between
+                gone = s != snaps[0] and rng.random() < 0.1
+                shoe_hist.append({"shoe_slug": slug, "retailer": retailer,
+                                  "price_eur": None if gone else price,
+                                  "recorded_at": s.isoformat()})
+            price = round(price * rng.choice([1, 1, 0.95, 0.85, 0.7, 1.1]), 2)
+        # Several per-size rows per key, the cheapest one counts
+        for size in range(rng.randint(1, 3)):
+            shoes.append({"product_slug": slug if rng.random() > 0.05 else None,
+                          "retailer": retailer, "product_name": f"Shoe {i}",
+                          "product_url": f"https://{retailer}/s{i}#size={40 + size}",
+                          "price_eur": round(price + size * rng.choice([0, 5]), 2),
+                          "eur_size": 40 + size,
+                          "in_stock": rng.random() > 0.15})
+    live["shoe_prices"], history["price_history"] = shoes, shoe_hist
+
+    for cat in CATEGORIES:
+        rows, hist = [], []
+        for i in range(n_per_cat):
+            price = round(rng.uniform(20, 400), 2)
+            for s in snaps:
+                if s == snaps[0] or rng.random() < 0.25:
+                    gone = s != snaps[0] and rng.random() < 0.1
+                    hist.append({f"{cat}_price_id": i + 1,
+                                 "price_eur": None if gone else price,
+                                 "original_price_eur": None, "in_stock": not gone,
+                                 "recorded_at": s.isoformat()})
+                price = round(price * rng.choice([1, 1, 0.92, 0.88, 0.6, 1.2]), 2)
+            rows.append({"id": i + 1, "product_slug": f"{cat}-{i}" if i % 7 else None,
+                         "retailer": retailers[i % len(retailers)],
+                         "product_name": None if i % 11 == 0 else f"{cat.title()} {i}",
+                         "product_url": f"https://shop.example/{cat}/{i}",
+                         "price_eur": price if i % 50 else None,
+                         "original_price_eur": None,
+                         "in_stock": rng.random() > 0.1})
+        live[f"{cat}_prices"], history[f"{cat}_price_history"] = rows, hist
+    return live, history, snaps
+
+
+# ── Reference (the old Python join) ─────────────────────────────────────────
+
+def reference_drops(live, history, before=None):
+    def last(rows, key):
+        out = {}
+        for r in sorted(rows, key=lambda r: r["recorded_at"]):
+            if before is None or r["recorded_at"] < before:
+                out[key(r)] = r["price_eur"]
+        return out
+
+    drops = set()
+
+    def check(category, product, slug, retailer, old, new):
+        if old and new and old > 0 and (old - new) / old >= THRESHOLD - 1e-9:
+            drops.add((category, product, slug, retailer, round(old, 2), round(new, 2)))
+
+    prev = last(history["price_history"], lambda r: (r["shoe_slug"], r["retailer"]))
+    current, names = {}, {}
+    for r in live["shoe_prices"]:
+        if r["price_eur"] is None or r["product_slug"] is None or not r["in_stock"]:
+            continue
+        key = (r["product_slug"], r["retailer"])
+        if key not in current or r["price_eur"] < current[key]:
+            current[key] = r["price_eur"]
+            names[key] = r["product_name"] or r["product_slug"]
+    for key, new in current.items():
+        check("shoes", names[key], key[0], key[1], prev.get(key), new)
+
+    for cat in CATEGORIES:
+        prev = last(history[f"{cat}_price_history"], lambda r: r[f"{cat}_price_id"])
+        for r in live[f"{cat}_prices"]:
+            if r["price_eur"] is None or not r["in_stock"]:
+                continue
+            check(cat, r["product_name"] or r["product_slug"] or str(r["id"]), r["product_slug"],
+                  r["retailer"], prev.get(r["id"]), r["price_eur"])
+    return drops
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dsn", help="use an existing (scratch!) database instead of a throwaway cluster")
+    args = ap.parse_args()
+
+    live, history, snaps = build_dataset()
+    try:
+        pg = LocalPostgres(dsn=args.dsn)
+    except RuntimeError as e:
+        print(f"  ✗ {e}")
+        sys.exit(2)
+    with pg:
+        pg.run(SCHEMA + "".join(CATEGORY_SCHEMA.format(cat=c) for c in CATEGORIES))
+        for name in MIGRATIONS:
+            pg.run_file(os.path.join(MIGRATIONS_DIR, name))
+        pg.run("".join(_insert(t, rows) for t, rows in {**live, **history}.items()))
+
+        failures = 0
+        for label, before in [("last recorded", None), ("before latest snapshot", snaps[-1].isoformat())]:
+            specs = json.dumps([c.drop_spec() for c in with_history()])
+            got = pg.query(
+                f"SELECT * FROM detect_price_drops({THRESHOLD}, {_lit(before)}::timestamptz, "
+                f"{_lit(specs)}::jsonb)"
+            )
+            got = {(r["category"], r["product"], r["product_slug"], r["retailer"],
+                    round(float(r["old_price"]), 2), round(float(r["new_price"]), 2)) for r in got}
+            want = reference_drops(live, history, before)
+            ok = got == want
+            failures += not ok
+            print(f"  {'✓' if ok else '✗'} {label}: {len(got)} drops from the RPC, "
+                  f"{len(want)} from the Python join")
+            if not ok:
+                for d in sorted(want - got)[:10]:
+                    print(f"      missing: {d}")
+                for d in sorted(got - want)[:10]:
+                    print(f"      extra:   {d}")
+
+    live_rows = sum(len(r) for r in live.values())
+    hist_rows = sum(len(r) for r in history.values())
+    print(f"  ({live_rows} live rows + {hist_rows} history rows stayed in the database)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+checkpoint.py - Per-crawler progress checkpoints for resumable runs.
+
+run_all_crawlers.py starts every crawler with CRAWL_RUN_ID and
+CRAWL_CHECKPOINT_DIR set. A crawler keeps one JSON file per run:
+
+    ~/crawl_logs/checkpoints/<run_id>/<crawler>.json
+    {
+      "crawler": "crawl_sportokay", "run_id": "20261019-0600",
+      "status": "running" | "done",
+      "pages": 212,
+      "categories": {"shoes": {"products": 180, "matched": 151, "finished_at": ...}},
+      "sync": {"shoe_prices": {"inserted": 3, "updated": 41, "unchanged": 136, ...}},
+      "updated_at": "..."
+    }
+
+If the scheduler restarts a run (crash, reboot), the crawler skips the
+categories already finished under the same run_id, and the scheduler skips
+crawlers whose status is "done". Run standalone (no env), checkpoints are
+disabled and every call is a no-op.
+
+Usage (inside a crawler):
+    from checkpoint import for_crawler
+    CHECKPOINT = for_crawler(__file__)
+    ...
+    CHECKPOINT.page()                       # in fetch_html
+    if CHECKPOINT.is_done(cat): continue
+    CHECKPOINT.complete(cat, products=total, matched=matched)
+    CHECKPOINT.finish()
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+# Flush the page counter to disk every N pages (categories flush immediately)
+PAGE_FLUSH_EVERY = 25
+
+# The checkpoint of the running crawler process (price_sync reports into it)
+ACTIVE = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def checkpoint_path(checkpoint_dir, run_id, crawler):
+    return os.path.join(checkpoint_dir, run_id, f"{crawler}.json")
+
+
+def read_checkpoint(checkpoint_dir, run_id, crawler):
+    """Load a crawler's checkpoint for a run, or None."""
+    try:
+        with open(checkpoint_path(checkpoint_dir, run_id, crawler)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Checkpoint:
+    def __init__(self, crawler, run_id=None, checkpoint_dir=None):
+        self.crawler = crawler
+        self.enabled = bool(run_id and checkpoint_dir)
+        self.path = checkpoint_path(checkpoint_dir, run_id, crawler) if self.enabled else None
+        self.state = {
+            "crawler": crawler, "run_id": run_id, "status": "running",
+            "pages": 0, "categories": {}, "sync": {}, "updated_at": _now(),
+        }
+        if self.enabled:
+            previous = read_checkpoint(checkpoint_dir, run_id, crawler)
+            if previous:
+                self.state.update(previous)
+                self.state["status"] = "running"
+            self._flush()
+        self._unflushed_pages = 0
+
+    def _flush(self):
+        if not self.enabled:
+            return
+        self.state["updated_at"] = _now()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.path)
+        self._unflushed_pages = 0
+
+    def is_done(self, category):
+        return category in self.state["categories"]
+
+    def page(self, n=1):
+        self.state["pages"] += n
+        self._unflushed_pages += n
+        if self._unflushed_pages >= PAGE_FLUSH_EVERY:
+            self._flush()
+
+    def note_sync(self, table, stats):
+        """Accumulate price_sync row counts per table."""
+        agg = self.state["sync"].setdefault(table, {})
+        for key, value in stats.items():
+            agg[key] = agg.get(key, 0) + value
+        self._flush()
+
+    def complete(self, category, products=0, matched=0):
+        self.state["categories"][category] = {
+            "products": products, "matched": matched, "finished_at": _now(),
+        }
+        self._flush()
+
+    def finish(self):
+        self.state["status"] = "done"
+        self._flush()
+
+
+def for_crawler(script_path):
+    """Checkpoint for the calling crawler, configured from the scheduler's env."""
+    global ACTIVE
+    crawler = os.path.splitext(os.path.basename(script_path))[0]
+    ACTIVE = Checkpoint(
+        crawler,
+        run_id=os.environ.get("CRAWL_RUN_ID"),
+        checkpoint_dir=os.environ.get("CRAWL_CHECKPOINT_DIR"),
+    )
+    return ACTIVE
+
+
+def note_sync(table, stats):
+    """Record a price_sync result on the active checkpoint (no-op if none)."""
+    if ACTIVE is not None:
+        ACTIVE.note_sync(table, stats)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+compact_history.py - Retention and weekly downsampling for the history tables.
+
+History rows older than KEEP_DAYS are rarely read at full resolution. For
+every week before the cutoff this keeps, per key, only
+
+  - the row with the lowest price of the week (weekly min)
+  - the last row of the week (weekly close, so "price as of the end of
+    week W" is unchanged)
+
+and deletes the rest after archiving them to
+~/crawl_logs/history_archive/<table>/<year>-W<week>.csv.gz.
+
+Only deletes, no rewrites: compacting an already compacted week keeps the
+same rows, so re-running is a no-op. Work is chunked per week and deletes
+go out DELETE_BATCH ids per request, each its own short transaction, so no
+big locks are held. The archive file of a week is merged and written
+atomically before any of its rows are deleted, so an interrupted run loses
+nothing and does not duplicate archive rows.
+
+The week range query uses the BRIN recorded_at indexes and the storage
+report the history_storage() RPC (migration 20261019060000_history_compaction.sql).
+Deleted space is reused by Postgres after (auto)vacuum; no VACUUM FULL.
+
+Usage:
+    python3 compact_history.py                 # compact every history table
+    python3 compact_history.py --dry-run       # report only, no archive/delete
+    python3 compact_history.py --keep-days 90 rope_price_history
+    python3 compact_history.py --selftest      # synthetic 400-day log
+"""
+
+import argparse
+import csv
+import datetime
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+from categories import get, with_history
+from price_history import _get_all, as_of
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+
+KEEP_DAYS = 180
+DELETE_BATCH = 200
+ARCHIVE_DIR = os.path.expanduser("~/crawl_logs/history_archive")
+STATE_FILE = os.path.join(ARCHIVE_DIR, "compacted.json")
+
+UTC = datetime.timezone.utc
+WEEK = datetime.timedelta(days=7)
+
+
+def history_tables():
+    """(table, key columns) for every history table."""
+    return [(c.history_table, c.history_key) for c in with_history()]
+
+
+def _ts(value):
+    dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
+
+def week_start(dt):
+    """Monday 00:00 UTC of the ISO week containing dt."""
+    day = dt.astimezone(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def week_label(start):
+    year, week, _ = start.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+# ── Planning (pure) ─────────────────────────────────────────────────────────
+
+def plan_week(rows, key):
+    """Split one week of history rows into (keep, drop).
+
+    Per key: the lowest-price row (earliest on ties) and the last row.
+    """
+    by_key = {}
+    for r in rows:
+        by_key.setdefault(tuple(r[k] for k in key), []).append(r)
+    keep, drop = [], []
+    for key_rows in by_key.values():
+        key_rows.sort(key=lambda r: (r["recorded_at"], str(r.get("id"))))
+        priced = [r for r in key_rows if r.get("price_eur") is not None]
+        low = min(priced, key=lambda r: float(r["price_eur"])) if priced else None
+        for r in key_rows:
+            (keep if r is low or r is key_rows[-1] else drop).append(r)
+    return keep, drop
+
+
+# ── Archive ─────────────────────────────────────────────────────────────────
+
+def archive_rows(table, label, rows, archive_dir=ARCHIVE_DIR):
+    """Merge rows into <archive_dir>/<table>/<label>.csv.gz (by id, atomic).
+
+    Returns the archive file size in bytes.
+    """
+    path = os.path.join(archive_dir, table, f"{label}.csv.gz")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    merged = {}
+    if os.path.exists(path):
+        with gzip.open(path, "rt", newline="") as f:
+            for r in csv.DictReader(f):
+                merged[r["id"]] = r
+    for r in rows:
+        merged[str(r["id"])] = r
+    fields = sorted({c for r in merged.values() for c in r})
+    fields.remove("id")
+    fields = ["id"] + fields
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        for r in sorted(merged.values(), key=lambda r: (str(r.get("recorded_at")), str(r["id"]))):
+            w.writerow({c: "" if r.get(c) is None else r[c] for c in fields})
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def _load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+
+# ── Supabase ────────────────────────────────────────────────────────────────
+
+def _request(path, method="GET", body=None):
+    key = os.environ["SUPABASE_SECRET_KEY"]
+    headers = {"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json",
+               "Prefer": "return=minimal"}
+    req = urllib.request.Request(f"{SUPABASE_URL}/rest/v1/{path}", method=method, headers=headers,
+                                 data=json.dumps(body).encode() if body is not None else None)
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        raw = resp.read()
+    return json.loads(raw) if raw else None
+
+
+def storage(tables):
+    """{table: {total_bytes, live_rows, dead_rows}} via the history_storage RPC."""
+    rows = _request("rpc/history_storage", "POST", {"p_tables": tables}) or []
+    return {r["table_name"]: r for r in rows}
+
+
+def _first_recorded(table):
+    rows = _request(f"{table}?select=recorded_at&order=recorded_at.asc&limit=1")
+    return _ts(rows[0]["recorded_at"]) if rows else None
+
+
+def _week_rows(table, start):
+    lo = urllib.parse.quote(start.isoformat(), safe="")
+    hi = urllib.parse.quote((start + WEEK).isoformat(), safe="")
+    return _get_all(f"{table}?select=*&recorded_at=gte.{lo}&recorded_at=lt.{hi}&order=id.asc")
+
+
+def _delete(table, ids):
+    for i in range(0, len(ids), DELETE_BATCH):
+        chunk = ",".join(str(x) for x in ids[i:i + DELETE_BATCH])
+        _request(f"{table}?id=in.({urllib.parse.quote(chunk, safe=',')})", "DELETE")
+
+
+def compact_table(table, key, cutoff, state, dry_run=False):
+    """Compact every unprocessed week of `table` before `cutoff`. Returns stats."""
+    stats = {"weeks": 0, "rows_read": 0, "rows_removed": 0, "archive_bytes": 0}
+    done = state.get(table)
+    start = _ts(done) if done else _first_recorded(table)
+    if start is None:
+        return stats
+    start = week_start(start)
+    while start + WEEK <= cutoff:
+        rows = _week_rows(table, start)
+        keep, drop = plan_week(rows, key)
+        if drop and not dry_run:
+            stats["archive_bytes"] += archive_rows(table, week_label(start), drop)
+            _delete(table, [r["id"] for r in drop])
+        stats["weeks"] += 1
+        stats["rows_read"] += len(rows)
+        stats["rows_removed"] += len(drop)
+        start += WEEK
+        if not dry_run:
+            state[table] = start.isoformat()
+            _save_state(state)
+    return stats
+
+
+def compact_all(tables=None, keep_days=KEEP_DAYS, dry_run=False, now=None):
+    """Compact the given (or all) history tables. Returns {table: stats}."""
+    now = now or datetime.datetime.now(UTC)
+    cutoff = week_start(now - datetime.timedelta(days=keep_days))
+    selected = [(t, k) for t, k in history_tables() if not tables or t in tables]
+    names = [t for t, _ in selected]
+    state = _load_state()
+
+    print(f"\n  History compaction: full resolution since {cutoff:%Y-%m-%d}, weekly min/close before"
+          f"{' (dry run)' if dry_run else ''}")
+    try:
+        before = storage(names)
+    except Exception as e:
+        print(f"    ⚠ history_storage RPC unavailable ({e}), no size report")
+        before = {}
+
+    results = {}
+    for table, key in selected:
+        t0 = time.time()
+        try:
+            s = compact_table(table, key, cutoff, state, dry_run)
+        except Exception as e:
+            print(f"    ✗ {table}: {e}")
+            continue
+        size = before.get(table) or {}
+        live = size.get("live_rows") or 0
+        s["est_bytes_reclaimed"] = int(size["total_bytes"] * s["rows_removed"] / live) if live else None
+        results[table] = s
+        est = f", ~{s['est_bytes_reclaimed'] / 1e6:.1f} MB reclaimable" if s["est_bytes_reclaimed"] else ""
+        print(f"    {table}: {s['weeks']} weeks, {s['rows_removed']}/{s['rows_read']} rows removed{est}, "
+              f"archive +{s['archive_bytes'] / 1e3:.0f} kB ({time.time() - t0:.1f}s)")
+
+    total = sum(s["rows_removed"] for s in results.values())
+    reclaimed = sum(s["est_bytes_reclaimed"] or 0 for s in results.values())
+    print(f"  → {total} rows removed, ~{reclaimed / 1e6:.1f} MB reclaimable after vacuum")
+    if before and not dry_run and total:
+        after = storage(names)
+        moved = sum(before[t]["total_bytes"] - after[t]["total_bytes"] for t in after if t in before)
+        print(f"    table size now {moved / 1e6:+.1f} MB smaller "
+              f"(dead rows: {sum(r['dead_rows'] for r in after.values())}, freed by autovacuum)")
+    return results
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _selftest(n_keys=300, days=400, keep_days=KEEP_DAYS, seed=9):
+    """Synthetic change-only log, compacted twice.
+
+    Checks: kept + archived == original, the state at every week end before
+    the cutoff and every row after it are unchanged, the weekly min per key
+    survives, and the second pass removes nothing.
+    """
+    import random
+
+    from price_history import delta_rows, latest_per_key
+
+    rng = random.Random(seed)
+    rope = get("rope")
+    table, key, fields = rope.history_table, rope.history_key, rope.history_fields
+    id_col = key[0]
+    t0 = datetime.datetime(2025, 9, 1, 6, tzinfo=UTC)
+    prices = {i: round(rng.uniform(40, 300), 2) for i in range(n_keys)}
+    log, next_id = [], 0
+    for day in range(days):
+        for snap in range(4):
+            ts = (t0 + datetime.timedelta(days=day, hours=6 * snap)).isoformat()
+            for i in prices:
+                if rng.random() < 0.04:
+                    prices[i] = round(prices[i] * rng.uniform(0.8, 1.2), 2)
+            current = [{id_col: i, "price_eur": p, "original_price_eur": None, "in_stock": True,
+                        "recorded_at": ts} for i, p in prices.items()]
+            for r in delta_rows(current, latest_per_key(log, key), key, fields):
+                next_id += 1
+                log.append(dict(r, id=next_id))
+    now = t0 + datetime.timedelta(days=days)
+    cutoff = week_start(now - datetime.timedelta(days=keep_days))
+
+    def compact(rows, archive_dir):
+        weeks = {}
+        kept, removed = [], 0
+        for r in rows:
+            start = week_start(_ts(r["recorded_at"]))
+            (weeks.setdefault(start, []) if start + WEEK <= cutoff else kept).append(r)
+        for start, week in sorted(weeks.items()):
+            keep, drop = plan_week(week, key)
+            kept += keep
+            removed += len(drop)
+            if drop:
+                archive_rows(table, week_label(start), drop, archive_dir)
+        return kept, removed
+
+    with tempfile.TemporaryDirectory() as archive_dir:
+        kept, removed = compact(log, archive_dir)
+        kept2, removed2 = compact(kept, archive_dir)
+
+        archived = {}
+        for root, _, files in os.walk(archive_dir):
+            for name in files:
+                with gzip.open(os.path.join(root, name), "rt", newline="") as f:
+                    for r in csv.DictReader(f):
+                        archived[int(r["id"])] = r
+        archive_bytes = sum(os.path.getsize(os.path.join(r, n))
+                            for r, _, fs in os.walk(archive_dir) for n in fs)
+
+    ids = {r["id"] for r in log}
+    kept_ids = {r["id"] for r in kept}
+    assert removed2 == 0 and {r["id"] for r in kept2} == kept_ids, "second pass changed something"
+    assert kept_ids | set(archived) == ids and not kept_ids & set(archived), "rows lost or duplicated"
+
+    start = week_start(_ts(log[0]["recorded_at"]))
+    while start + WEEK <= cutoff:
+        end = (start + WEEK - datetime.timedelta(microseconds=1)).isoformat()
+        a, b = as_of(log, key, end), as_of(kept, key, end)
+        assert {k: r["price_eur"] for k, r in a.items()} == {k: r["price_eur"] for k, r in b.items()}, \
+            f"week {week_label(start)}: close differs"
+        lo = (start.isoformat(), (start + WEEK).isoformat())
+        mins = {}
+        for rows, tag in ((log, 0), (kept, 1)):
+            for r in rows:
+                if lo[0] <= r["recorded_at"] < lo[1]:
+                    k = (r[id_col], tag)
+                    mins[k] = min(mins.get(k, float("inf")), r["price_eur"])
+        assert all(mins[(i, 0)] == mins[(i, 1)] for i, tag in mins if tag == 0), \
+            f"week {week_label(start)}: weekly min lost"
+        start += WEEK
+    recent = [r["id"] for r in log if _ts(r["recorded_at"]) >= cutoff]
+    assert set(recent) <= kept_ids, "rows inside the retention window were removed"
+
+    print(f"  ✓ {len(log)} rows over {days} days, {keep_days}-day window: {removed} removed "
+          f"({removed / len(log):.0%}), week closes/mins and recent rows intact, second pass no-op")
+    print(f"    archive {archive_bytes / 1e3:.0f} kB csv.gz for {len(archived)} rows")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("tables", nargs="*", help="history tables (default: all)")
+    ap.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--selftest", action="store_true")
+    args = ap.parse_args()
+    if args.selftest:
+        _selftest()
+        return
+    results = compact_all(args.tables, args.keep_days, args.dry_run)
+    sys.exit(0 if len(results) == len(args.tables or history_tables()) else 1)
+
+
+if __name__ == "__main__":
+    main()
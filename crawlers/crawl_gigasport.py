@@ -21,6 +21,12 @@ Usage:
 import sys, re, csv, io, gzip, json, urllib.request, urllib.parse, os
 from datetime import datetime, timezone
 
+from price_sync import sync_prices
+from checkpoint import for_crawler
+
+# Progress checkpoint for resumable scheduler runs (no-op when run standalone)
+CHECKPOINT = for_crawler(__file__)
+
 # -- Config ------------------------------------------------------------------
 SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
@@ -204,72 +210,6 @@ def supabase_get(table, params=""):
     return json.loads(resp.read().decode())
 
 
-def supabase_upsert(table, rows):
-    """POST upsert to Supabase REST API (service_role write)."""
-    if not rows:
-        return 0
-    url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict=retailer,product_url"
-    data = json.dumps(rows).encode()
-    req = urllib.request.Request(url, data=data, method="POST", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates,return=minimal",
-    })
-    try:
-        urllib.request.urlopen(req, timeout=30)
-        return len(rows)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  x Upsert error ({e.code}): {body[:300]}")
-        return 0
-
-
-def supabase_mark_all_out_of_stock(table, retailer):
-    """Mark all rows for a retailer as out-of-stock BEFORE crawling.
-    Products found during the crawl will be set back to in_stock=true."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-    )
-    body = json.dumps({"in_stock": False}).encode()
-    req = urllib.request.Request(url, data=body, method="PATCH", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    })
-    try:
-        urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode()
-        print(f"  x Mark-out-of-stock error ({e.code}): {err_body[:300]}")
-        return False
-
-
-def supabase_count_rows(table, retailer):
-    """Count existing in-stock rows for a retailer in a price table."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-        f"&select=id"
-    )
-    req = urllib.request.Request(url, method="HEAD", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "count=exact",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=15)
-        cr = resp.getheader("Content-Range", "")
-        if "/" in cr:
-            return int(cr.split("/")[-1])
-    except Exception:
-        pass
-    return 0
-
-
 # -- Reference slug loader ---------------------------------------------------
 
 def load_reference_slugs(ref_table):
@@ -552,6 +492,7 @@ def download_feed():
     })
     resp = urllib.request.urlopen(req, timeout=120)
     raw = resp.read()
+    CHECKPOINT.page()
     print(f"  -> Downloaded {len(raw) / 1024 / 1024:.1f} MB (compressed)")
 
     decompressed = gzip.decompress(raw)
@@ -743,27 +684,11 @@ def crawl_category(cat_name, cat_config, all_feed_rows):
         print(f"  ! No rows to upsert")
         return 0, 0
 
-    # Safety check
-    existing = supabase_count_rows(price_table, RETAILER)
-    if existing > 0 and len(rows) < existing * 0.5:
-        print(f"  ! Safety skip: found {len(rows)} rows but {existing} exist "
-              f"in {price_table} - not marking out-of-stock (threshold: 50%)")
-    else:
-        print(f"  Marking stale {RETAILER} rows as out-of-stock...")
-        supabase_mark_all_out_of_stock(price_table, RETAILER)
-
-    # Upsert in batches
-    print(f"  Upserting to '{price_table}'...")
-    total_upserted = 0
-    batch_size = 50
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i:i + batch_size]
-        n = supabase_upsert(price_table, batch)
-        total_upserted += n
-        if (i // batch_size + 1) % 5 == 0 or (i + batch_size) >= len(rows):
-            print(f"    -> {total_upserted}/{len(rows)} rows upserted")
-
-    print(f"\n  Done: {total_upserted} rows upserted to {price_table}")
+    # Diff against the live table and write only what changed
+    print(f"  Syncing '{price_table}'...")
+    stats = sync_prices(price_table, RETAILER, rows)
+
+    print(f"\n  Done: {stats['written']} rows written to {price_table}")
     print(f"  Matched: {matched}, Unmatched: {len(rows) - matched}")
 
     return len(rows), matched
@@ -793,10 +718,16 @@ if __name__ == "__main__":
     grand_total = 0
     grand_matched = 0
     for cat_name in cats_to_crawl:
+        if CHECKPOINT.is_done(cat_name):
+            print(f"\n  ↷ {cat_name} already synced in this run, skipping")
+            continue
         total, matched = crawl_category(cat_name, CATEGORIES[cat_name], all_feed_rows)
+        CHECKPOINT.complete(cat_name, products=total, matched=matched)
         grand_total += total
         grand_matched += matched
 
+    CHECKPOINT.finish()
+
     print(f"\n{'=' * 60}")
     print(f"  All done! {grand_matched}/{grand_total} matched across {len(cats_to_crawl)} categories")
     print(f"{'=' * 60}")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+crawl_health.py - Per-retailer crawl health gate against a rolling baseline.
+
+When a shop changes its markup, its crawler still "succeeds" but returns a
+fraction of the products (or prices parsed from the wrong element, or no
+slugs matched). Synced as-is, the rest of the retailer's rows vanish from
+the site. price_sync.sync_prices() asks this gate first. The run's stats
+come from one pass over the crawled rows, with no table reads:
+
+    products         distinct product URLs
+    in_stock_ratio   in-stock rows / rows
+    median_price     median price_eur
+    match_rate       rows with a product_slug / rows
+
+and are compared with the median of the last BASELINE_RUNS accepted runs of
+the same (retailer, table). If any metric crosses its THRESHOLDS entry, the
+sync is blocked: nothing is written and the previous data stays live.
+
+Baselines are small JSON files in ~/crawl_logs/health/<retailer>__<table>.json,
+one per (retailer, table), so parallel crawlers never share a file. Until
+MIN_BASELINE_RUNS runs are recorded, every run is accepted. If the shop really
+changed (REBASELINE_AFTER blocked runs in a row that agree with each other),
+those runs become the new baseline and the next sync goes through.
+
+    CRAWL_HEALTH_GATE=0   disable the gate (still records stats)
+
+Usage:
+    from crawl_health import HealthGate
+    gate = HealthGate("bergzeit.de", "shoe_prices")
+    verdict = gate.check(rows)          # .ok, .reasons, .stats
+    ...sync...
+    gate.accept(verdict)                # after a successful write
+
+    python3 crawl_health.py                     # print baselines
+    python3 crawl_health.py --selftest          # simulated markup breakages
+"""
+
+import json
+import os
+import statistics
+import sys
+from datetime import datetime, timezone
+
+HEALTH_DIR = os.path.expanduser("~/crawl_logs/health")
+ENABLED = os.environ.get("CRAWL_HEALTH_GATE", "1") != "0"
+
+BASELINE_RUNS = 10        # accepted runs kept per (retailer, table)
+MIN_BASELINE_RUNS = 3     # gate is open until this many runs are recorded
+REBASELINE_AFTER = 3      # consistent blocked runs in a row → new baseline
+
+# metric → (kind, limit)
+#   "ratio": blocked if value < limit x baseline
+#   "drop":  blocked if baseline - value > limit (absolute, for ratios)
+#   "rel":   blocked if |value - baseline| / baseline > limit
+THRESHOLDS = {
+    "products": ("ratio", 0.5),
+    "in_stock_ratio": ("drop", 0.3),
+    "median_price": ("rel", 0.4),
+    "match_rate": ("drop", 0.25),
+}
+
+
+def run_stats(rows):
+    """Health metrics of one crawl, in one pass over the rows."""
+    urls, prices = set(), []
+    in_stock = matched = n = 0
+    for r in rows:
+        n += 1
+        urls.add(r.get("product_url"))
+        if r.get("in_stock", True) is not False:
+            in_stock += 1
+        if r.get("product_slug"):
+            matched += 1
+        if r.get("price_eur") is not None:
+            prices.append(float(r["price_eur"]))
+    return {
+        "products": len(urls),
+        "in_stock_ratio": round(in_stock / n, 3) if n else 0.0,
+        "median_price": round(statistics.median(prices), 2) if prices else None,
+        "match_rate": round(matched / n, 3) if n else 0.0,
+    }
+
+
+def baseline_of(runs):
+    """Per-metric median over recorded runs."""
+    out = {}
+    for metric in THRESHOLDS:
+        values = [r[metric] for r in runs if r.get(metric) is not None]
+        out[metric] = statistics.median(values) if values else None
+    return out
+
+
+def deviations(stats, baseline):
+    """Human-readable reasons for every metric past its threshold (empty = healthy)."""
+    reasons = []
+    for metric, (kind, limit) in THRESHOLDS.items():
+        value, base = stats.get(metric), baseline.get(metric)
+        if base is None:
+            continue
+        if value is None:
+            reasons.append(f"{metric} missing (baseline {base})")
+        elif kind == "ratio" and value < limit * base:
+            reasons.append(f"{metric} {value} < {limit:.0%} of baseline {base:g}")
+        elif kind == "drop" and base - value > limit:
+            reasons.append(f"{metric} {value:.0%} vs baseline {base:.0%}")
+        elif kind == "rel" and base and abs(value - base) / base > limit:
+            reasons.append(f"{metric} {value:g} vs baseline {base:g} (±{limit:.0%})")
+    return reasons
+
+
+class Verdict:
+    def __init__(self, ok, reasons, stats, rebaselined=False):
+        self.ok = ok
+        self.reasons = reasons
+        self.stats = stats
+        self.rebaselined = rebaselined
+
+
+class HealthGate:
+    """Rolling baseline and block decisions for one (retailer, table)."""
+
+    def __init__(self, retailer, table, health_dir=HEALTH_DIR, enabled=ENABLED, clock=None):
+        self.retailer = retailer
+        self.table = table
+        self.enabled = enabled
+        self.clock = clock or (lambda: datetime.now(timezone.utc).isoformat())
+        safe = "".join(c if c.isalnum() or c in ".-" else "_" for c in retailer)
+        self.path = os.path.join(health_dir, f"{safe}__{table}.json")
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        state.setdefault("accepted", [])
+        state.setdefault("blocked", [])
+        return state
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def check(self, rows):
+        """Decide whether this crawl may be synced. Blocked runs are recorded."""
+        stats = dict(run_stats(rows), at=self.clock())
+        accepted = self.state["accepted"]
+        if not self.enabled or len(accepted) < MIN_BASELINE_RUNS:
+            return Verdict(True, [], stats)
+
+        reasons = deviations(stats, baseline_of(accepted))
+        if not reasons:
+            return Verdict(True, [], stats)
+
+        # A real catalog change looks the same run after run: once the last
+        # REBASELINE_AFTER blocked runs agree, they become the baseline.
+        blocked = self.state["blocked"][-(REBASELINE_AFTER - 1):] + [stats]
+        if len(blocked) >= REBASELINE_AFTER:
+            base = baseline_of(blocked)
+            if all(not deviations(b, base) for b in blocked):
+                self.state["accepted"] = blocked[:-1]
+                self.state["blocked"] = []
+                return Verdict(True, reasons, stats, rebaselined=True)
+
+        self.state["blocked"] = blocked
+        self._save()
+        return Verdict(False, reasons, stats)
+
+    def accept(self, verdict):
+        """Add an accepted run to the rolling baseline (call after the write)."""
+        self.state["accepted"] = (self.state["accepted"] + [verdict.stats])[-BASELINE_RUNS:]
+        self.state["blocked"] = []
+        self._save()
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _selftest():
+    """Simulated retailer history with markup breakages and one real change."""
+    import random
+    import tempfile
+
+    rng = random.Random(4)
+
+    def crawl(n, in_stock=0.9, match=0.8, price=(60, 180)):
+        return [{"product_url": f"https://shop/p{i}", "price_eur": round(rng.uniform(*price), 2),
+                 "in_stock": rng.random() < in_stock,
+                 "product_slug": f"s{i}" if rng.random() < match else None}
+                for i in range(int(n * rng.uniform(0.95, 1.05)))]
+
+    scenarios = [
+        ("normal", lambda: crawl(400), True),
+        ("half the listing pages broke", lambda: crawl(120), False),
+        ("stock badge selector broke", lambda: crawl(400, in_stock=0.2), False),
+        ("price parsed from wrong element", lambda: crawl(400, price=(5, 15)), False),
+        ("name markup changed, nothing matches", lambda: crawl(400, match=0.2), False),
+    ]
+    with tempfile.TemporaryDirectory() as d:
+        t = iter(range(10 ** 6))
+        gate = lambda: HealthGate("shop.example", "shoe_prices", health_dir=d, enabled=True,
+                                  clock=lambda: f"t{next(t)}")
+        for _ in range(6):
+            v = gate().check(crawl(400))
+            assert v.ok
+            gate().accept(v)
+        for label, make, expect_ok in scenarios:
+            g = gate()
+            v = g.check(make())
+            assert v.ok == expect_ok, f"{label}: ok={v.ok}, reasons={v.reasons}"
+            if v.ok:
+                g.accept(v)
+            print(f"  ✓ {label}: {'synced' if v.ok else 'blocked'}"
+                  f"{' (' + '; '.join(v.reasons) + ')' if v.reasons else ''}")
+
+        # Real catalog shrink: blocked REBASELINE_AFTER - 1 times, then accepted
+        outcomes = []
+        for _ in range(REBASELINE_AFTER + 1):
+            g = gate()
+            v = g.check(crawl(150))
+            outcomes.append("rebaseline" if v.rebaselined else ("ok" if v.ok else "blocked"))
+            if v.ok:
+                g.accept(v)
+        expected = ["blocked"] * (REBASELINE_AFTER - 1) + ["rebaseline", "ok"]
+        assert outcomes == expected, outcomes
+        print(f"  ✓ persistent catalog change: {' → '.join(outcomes)}")
+
+
+def _print_baselines():
+    if not os.path.isdir(HEALTH_DIR):
+        print(f"  No baselines in {HEALTH_DIR}")
+        return
+    for name in sorted(os.listdir(HEALTH_DIR)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(HEALTH_DIR, name)) as f:
+            state = json.load(f)
+        base = baseline_of(state.get("accepted", []))
+        flag = f"  ⚠ {len(state['blocked'])} blocked" if state.get("blocked") else ""
+        print(f"  {name[:-5]:45s} {len(state.get('accepted', []))} runs  "
+              f"products {base['products']}  in-stock {base['in_stock_ratio']}  "
+              f"median €{base['median_price']}  matched {base['match_rate']}{flag}")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        _print_baselines()
@@ -22,9 +22,16 @@ Usage:
     python3 crawl_oliunid.py shoes ropes  # crawl multiple
 """
 
-import sys, re, json, time, math, urllib.request, urllib.parse, html as htmlmod
+import sys, re, os, json, time, math, urllib.request, urllib.parse, html as htmlmod
 from datetime import datetime, timezone
 
+from price_sync import sync_prices
+from checkpoint import for_crawler
+from detail_cache import DetailCache
+
+# Progress checkpoint for resumable scheduler runs (no-op when run standalone)
+CHECKPOINT = for_crawler(__file__)
+
 # ── Config ──────────────────────────────────────────────────────────────────
 SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
@@ -277,6 +284,7 @@ def fetch_html(url):
     """Fetch a URL and return decoded HTML."""
     req = urllib.request.Request(url, headers=HEADERS)
     resp = urllib.request.urlopen(req, timeout=30)
+    CHECKPOINT.page()
     return resp.read().decode("utf-8", errors="replace")
 
 
@@ -291,89 +299,6 @@ def supabase_get(table, params=""):
     return json.loads(resp.read().decode())
 
 
-def supabase_upsert(table, rows):
-    """POST upsert to Supabase REST API (service_role write)."""
-    if not rows:
-        return 0
-    url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict=retailer,product_url"
-    data = json.dumps(rows).encode()
-    req = urllib.request.Request(url, data=data, method="POST", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates,return=minimal",
-    })
-    try:
-        urllib.request.urlopen(req, timeout=30)
-        return len(rows)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Upsert error ({e.code}): {body[:300]}")
-        return 0
-
-
-def supabase_delete(table, retailer):
-    """DELETE all rows for a given retailer from a Supabase table."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}?retailer=eq.{urllib.parse.quote(retailer)}"
-    req = urllib.request.Request(url, method="DELETE", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Delete error ({e.code}): {body[:300]}")
-        return False
-
-
-def supabase_mark_all_out_of_stock(table, retailer):
-    """Mark all rows for a retailer as out-of-stock BEFORE crawling.
-    Products found during the crawl will be set back to in_stock=true by the upsert."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-    )
-    body = json.dumps({"in_stock": False}).encode()
-    req = urllib.request.Request(url, data=body, method="PATCH", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode()
-        print(f"  ✗ Mark-out-of-stock error ({e.code}): {err_body[:300]}")
-        return False
-
-def supabase_count_rows(table, retailer):
-    """Count existing in-stock rows for a retailer in a price table."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-        f"&select=id"
-    )
-    req = urllib.request.Request(url, method="HEAD", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "count=exact",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=15)
-        # Supabase returns count in Content-Range header: "0-N/total"
-        cr = resp.getheader("Content-Range", "")
-        if "/" in cr:
-            return int(cr.split("/")[-1])
-    except Exception:
-        pass
-    return 0
-
-
 # ── Reference table loader ──────────────────────────────────────────────────
 def load_reference_slugs(ref_table):
     """Load all slugs + brand + model from a reference table for matching."""
@@ -1135,26 +1060,30 @@ def crawl_category(cat_key):
             seen_urls.add(p["product_url"])
             unique_products.append(p)
 
-    # Fetch sizes from product detail pages (shoes only)
-    if cat_key == "shoes":
-        print(f"\n  Fetching sizes from {len(unique_products)} product pages...")
-        for i, p in enumerate(unique_products):
-            sizes = fetch_product_sizes(p["product_url"])
-            p["sizes_available"] = json.dumps(sizes) if sizes else None
-            if (i + 1) % 25 == 0 or (i + 1) == len(unique_products):
-                with_sizes = sum(1 for pp in unique_products[:i+1] if pp.get("sizes_available"))
-                print(f"    {i+1}/{len(unique_products)} pages fetched ({with_sizes} with sizes)")
-            time.sleep(1.5)
-
-    # Fetch rope lengths from product detail pages
-    if cat_key == "ropes":
-        print(f"\n  Fetching rope lengths from {len(unique_products)} product pages...")
-        for i, p in enumerate(unique_products):
-            p["rope_lengths"] = fetch_rope_lengths(p["product_url"])
-            if (i + 1) % 25 == 0 or (i + 1) == len(unique_products):
-                with_lengths = sum(1 for pp in unique_products[:i+1] if pp.get("rope_lengths"))
-                print(f"    {i+1}/{len(unique_products)} pages fetched ({with_lengths} with lengths)")
+    # Fetch sizes (shoes) / lengths (ropes) from product detail pages, skipping
+    # products whose listing card is unchanged since the last fetch
+    if cat_key in ("shoes", "ropes"):
+        fetch_detail = fetch_product_sizes if cat_key == "shoes" else fetch_rope_lengths
+        what = "sizes" if cat_key == "shoes" else "rope lengths"
+        cache = DetailCache(f"{RETAILER}_{cat_key}",
+                            fields=("price_eur", "original_price_eur", "brand", "model"))
+        todo = cache.stale(unique_products)
+        print(f"\n  Fetching {what} from {len(todo)}/{len(unique_products)} product pages "
+              f"(rest unchanged since last fetch)...")
+        for i, p in enumerate(todo):
+            cache.put(p, fetch_detail(p["product_url"]))
+            if (i + 1) % 25 == 0 or (i + 1) == len(todo):
+                print(f"    {i+1}/{len(todo)} pages fetched")
             time.sleep(1.5)
+        for p in unique_products:
+            detail = cache.get(p)
+            if cat_key == "shoes":
+                p["sizes_available"] = json.dumps(detail) if detail else None
+            else:
+                p["rope_lengths"] = detail
+        with_detail = sum(1 for p in unique_products if cache.get(p))
+        print(f"    {with_detail}/{len(unique_products)} products with {what}")
+        cache.save()
 
     # Count matches
     matched = sum(1 for p in unique_products if p["product_slug"])
@@ -1219,34 +1148,12 @@ def crawl_category(cat_key):
         print(f"  Rope lengths: {ropes_with_lengths}/{len(unique_products)} products with length data → {total_length_rows} length rows")
     else:
         upsert_rows = unique_products
-        # Remove shoe-only field for non-shoe tables
-        if price_table != "shoe_prices":
-            for row in upsert_rows:
-                row.pop("sizes_available", None)
-
-    # For ropes: delete old rows first (length variants change URLs, so old rows become stale)
-    if price_table == "rope_prices":
-        print(f"  Deleting old {RETAILER} rows from {price_table}...")
-        supabase_delete(price_table, RETAILER)
-    # For non-rope tables, mark stale products before upsert
-    else:
-        existing = supabase_count_rows(price_table, RETAILER)
-        if existing > 0 and len(upsert_rows) < existing * 0.5:
-            print(f"  ⚠ Safety skip: found {len(upsert_rows)} rows but {existing} exist "
-                  f"in {price_table} — not marking out-of-stock (threshold: 50%)")
-        else:
-            print(f"  Marking stale {RETAILER} rows as out-of-stock...")
-            supabase_mark_all_out_of_stock(price_table, RETAILER)
 
+    # Diff against the live table and write only what changed. Columns and
+    # the vanished policy (ropes: delete) come from the category registry.
     if upsert_rows:
-        print(f"\n  Upserting to {price_table}...")
-        batch_size = 50
-        total_upserted = 0
-        for i in range(0, len(upsert_rows), batch_size):
-            batch = upsert_rows[i:i+batch_size]
-            n = supabase_upsert(price_table, batch)
-            total_upserted += n
-        print(f"  ✓ Upserted {total_upserted} rows")
+        print(f"\n  Syncing {price_table}...")
+        sync_prices(price_table, RETAILER, upsert_rows)
 
     return total, matched
 
@@ -1267,12 +1174,18 @@ if __name__ == "__main__":
     grand_total = 0
     grand_matched = 0
     for cat_key in cats_to_run:
+        if CHECKPOINT.is_done(cat_key):
+            print(f"\n  ↷ {cat_key} already synced in this run, skipping")
+            continue
         total, matched = crawl_category(cat_key)
+        CHECKPOINT.complete(cat_key, products=total, matched=matched)
         grand_total += total
         grand_matched += matched
         if len(cats_to_run) > 1:
             time.sleep(3)
 
+    CHECKPOINT.finish()
+
     print(f"\n{'='*60}")
     print(f"  All done! {grand_matched}/{grand_total} matched overall")
     print(f"{'='*60}")
@@ -21,9 +21,16 @@ Usage:
     python3 crawl_sportokay.py shoes ropes  # crawl multiple
 """
 
-import sys, re, json, time, math, urllib.request, urllib.parse, html as htmlmod
+import sys, re, os, json, time, math, urllib.request, urllib.parse, html as htmlmod
 from datetime import datetime, timezone
 
+from price_sync import sync_prices
+from checkpoint import for_crawler
+from detail_cache import DetailCache
+
+# Progress checkpoint for resumable scheduler runs (no-op when run standalone)
+CHECKPOINT = for_crawler(__file__)
+
 # ── Config ──────────────────────────────────────────────────────────────────
 SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
@@ -270,6 +277,7 @@ def fetch_html(url):
     """Fetch a URL and return decoded HTML."""
     req = urllib.request.Request(url, headers=HEADERS)
     resp = urllib.request.urlopen(req, timeout=30)
+    CHECKPOINT.page()
     return resp.read().decode("utf-8", errors="replace")
 
 
@@ -284,89 +292,6 @@ def supabase_get(table, params=""):
     return json.loads(resp.read().decode())
 
 
-def supabase_upsert(table, rows):
-    """POST upsert to Supabase REST API (service_role write)."""
-    if not rows:
-        return 0
-    url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict=retailer,product_url"
-    data = json.dumps(rows).encode()
-    req = urllib.request.Request(url, data=data, method="POST", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates,return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return len(rows)
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Upsert error ({e.code}): {body[:300]}")
-        return 0
-
-
-def supabase_delete(table, retailer):
-    """DELETE all rows for a given retailer from a Supabase table."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}?retailer=eq.{urllib.parse.quote(retailer)}"
-    req = urllib.request.Request(url, method="DELETE", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  ✗ Delete error ({e.code}): {body[:300]}")
-        return False
-
-
-def supabase_mark_all_out_of_stock(table, retailer):
-    """Mark all rows for a retailer as out-of-stock BEFORE crawling.
-    Products found during the crawl will be set back to in_stock=true by the upsert."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-    )
-    body = json.dumps({"in_stock": False}).encode()
-    req = urllib.request.Request(url, data=body, method="PATCH", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=30)
-        return True
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode()
-        print(f"  ✗ Mark-out-of-stock error ({e.code}): {err_body[:300]}")
-        return False
-
-def supabase_count_rows(table, retailer):
-    """Count existing in-stock rows for a retailer in a price table."""
-    url = (
-        f"{SUPABASE_URL}/rest/v1/{table}"
-        f"?retailer=eq.{urllib.parse.quote(retailer)}&in_stock=eq.true"
-        f"&select=id"
-    )
-    req = urllib.request.Request(url, method="HEAD", headers={
-        "apikey": SERVICE_KEY,
-        "Authorization": f"Bearer {SERVICE_KEY}",
-        "Prefer": "count=exact",
-    })
-    try:
-        resp = urllib.request.urlopen(req, timeout=15)
-        # Supabase returns count in Content-Range header: "0-N/total"
-        cr = resp.getheader("Content-Range", "")
-        if "/" in cr:
-            return int(cr.split("/")[-1])
-    except Exception:
-        pass
-    return 0
-
-
 # ── Reference table loader ──────────────────────────────────────────────────
 def load_reference_slugs(ref_table):
     """Load all slugs + brand + model from a reference table for matching."""
@@ -1170,16 +1095,23 @@ def crawl_category(cat_name, cat_config):
     if not products:
         return 0, 0
 
-    # Fetch sizes from product detail pages (shoes only)
+    # Fetch sizes from product detail pages (shoes only), skipping products
+    # whose listing card is unchanged since the last fetch
     if cat_name == "shoes":
-        print(f"  Fetching sizes from {len(products)} product pages...")
-        for i, p in enumerate(products):
-            sizes = fetch_product_sizes(p["product_url"])
-            p["sizes_available"] = sizes
-            if (i + 1) % 25 == 0 or (i + 1) == len(products):
-                with_sizes = sum(1 for pp in products[:i+1] if pp.get("sizes_available"))
-                print(f"    {i+1}/{len(products)} pages fetched ({with_sizes} with sizes)")
+        cache = DetailCache(f"{RETAILER}_{cat_name}", fields=("price_eur", "original_price_eur", "image_url", "_original_title"))
+        todo = cache.stale(products)
+        print(f"  Fetching sizes from {len(todo)}/{len(products)} product pages "
+              f"(rest unchanged since last fetch)...")
+        for i, p in enumerate(todo):
+            cache.put(p, fetch_product_sizes(p["product_url"]))
+            if (i + 1) % 25 == 0 or (i + 1) == len(todo):
+                print(f"    {i+1}/{len(todo)} pages fetched")
             time.sleep(1.0)
+        for p in products:
+            p["sizes_available"] = cache.get(p)
+        with_sizes = sum(1 for p in products if p.get("sizes_available"))
+        print(f"    {with_sizes}/{len(products)} products with sizes")
+        cache.save()
 
 
     now = datetime.now(timezone.utc).isoformat()
@@ -1236,35 +1168,12 @@ def crawl_category(cat_name, cat_config):
                     _diam = _diam2
             row["diameter_mm"] = _diam
             row["length_m"] = _len
-    # Remove shoe-only field for non-shoe tables
-    if price_table != "shoe_prices":
-        for row in rows:
-            row.pop("sizes_available", None)
-    # For ropes: delete old rows first (length variants change URLs, so old rows become stale)
-    if price_table == "rope_prices":
-        print(f"  Deleting old {RETAILER} rows from {price_table}...")
-        supabase_delete(price_table, RETAILER)
-    # For non-rope tables, mark stale products before upsert
-    else:
-        existing = supabase_count_rows(price_table, RETAILER)
-        if existing > 0 and len(rows) < existing * 0.5:
-            print(f"  ⚠ Safety skip: found {len(rows)} rows but {existing} exist "
-                  f"in {price_table} — not marking out-of-stock (threshold: 50%)")
-        else:
-            print(f"  Marking stale {RETAILER} rows as out-of-stock...")
-            supabase_mark_all_out_of_stock(price_table, RETAILER)
-
-    print(f"  Upserting to '{price_table}'...")
-    total_upserted = 0
-    batch_size = 50
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i:i+batch_size]
-        n = supabase_upsert(price_table, batch)
-        total_upserted += n
-        if n:
-            print(f"    ✓ Batch {i//batch_size + 1}: {n} rows")
-
-    print(f"  ✓ Done: {total_upserted} rows upserted to {price_table}")
+
+    # Diff against the live table and write only what changed. Columns and
+    # the vanished policy (ropes: delete) come from the category registry.
+    print(f"  Syncing '{price_table}'...")
+    sync_prices(price_table, RETAILER, rows)
+
     print(f"    Matched to reference: {matched}, Unmatched: {len(products) - matched}")
 
     return len(products), matched
@@ -1285,10 +1194,16 @@ if __name__ == "__main__":
             print(f"\n✗ Unknown category: {cat}")
             print(f"  Available: {', '.join(CATEGORIES.keys())}")
             continue
+        if CHECKPOINT.is_done(cat):
+            print(f"\n  ↷ {cat} already synced in this run, skipping")
+            continue
         total, matched = crawl_category(cat, CATEGORIES[cat])
+        CHECKPOINT.complete(cat, products=total, matched=matched)
         grand_total += total
         grand_matched += matched
 
+    CHECKPOINT.finish()
+
     print(f"\n{'='*60}")
     print(f"  All done! {grand_matched}/{grand_total} matched overall")
     print(f"{'='*60}")
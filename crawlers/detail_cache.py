@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+detail_cache.py - Fetch detail pages only for products whose listing changed.
+
+Most listing cards are identical from one day to the next, yet the size /
+per-size price crawlers used to open every product detail page on every
+run. DetailCache keeps, per retailer + category, a local record of
+
+    product_url → {listing fingerprint, detail result, fetched_at, seen_at}
+
+where the fingerprint is a hash of listing-card fields (price, old price,
+title, image, badge/availability text when the crawler extracts it). A
+detail page is fetched again only when:
+
+  - the product is new, or its fingerprint changed
+  - the last detail fetch is older than DETAIL_MAX_AGE_DAYS (default 10;
+    spread per URL between 0.5x and 1.5x so refreshes don't bunch up on
+    one day) - this catches size-only changes the listing can't show
+  - CRAWL_FULL_REFRESH=1 is set (full crawl, e.g. weekly)
+  - it is in the DETAIL_VERIFY_SAMPLE random sample of cached products:
+    these are re-fetched and compared with the cached result, and the
+    mismatch rate is printed as an ongoing correctness check
+
+Failed fetches (None) are never cached, so they are retried next run.
+
+Usage (inside a crawler):
+    cache = DetailCache(f"{RETAILER}_shoes", fields=("price_eur", "original_price_eur", "image_url"))
+    for p in cache.stale(products):
+        cache.put(p, fetch_product_sizes(p["product_url"]))
+    for p in products:
+        p["sizes_available"] = cache.get(p)
+    cache.save()
+
+Offline simulation (30 days, incremental vs full crawl):
+    python3 detail_cache.py --selftest
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+CACHE_DIR = os.path.expanduser("~/crawl_logs/detail_cache")
+MAX_AGE_DAYS = float(os.environ.get("DETAIL_MAX_AGE_DAYS", 10))
+VERIFY_SAMPLE = int(os.environ.get("DETAIL_VERIFY_SAMPLE", 10))
+FULL_REFRESH = os.environ.get("CRAWL_FULL_REFRESH") == "1"
+
+# Entries for products not seen on any listing for this long are dropped
+FORGET_AFTER_DAYS = 60
+
+DAY = 86400
+
+
+def fingerprint(product, fields):
+    """Stable short hash of the listing-card fields of a product."""
+    values = [product.get(f) for f in fields]
+    return hashlib.sha1(json.dumps(values, default=str).encode()).hexdigest()[:16]
+
+
+def _spread(url):
+    """Per-URL max-age factor in [0.5, 1.5), fixed across runs."""
+    h = int(hashlib.md5(url.encode()).hexdigest()[:8], 16)
+    return 0.5 + h / 0x100000000
+
+
+class DetailCache:
+    """Listing-fingerprint cache for one retailer + category.
+
+    name:          cache file name (e.g. "sportokay.com_shoes")
+    fields:        product keys that make up the listing fingerprint
+    url_key:       product key holding the detail page URL
+    """
+
+    def __init__(self, name, fields, url_key="product_url", max_age_days=MAX_AGE_DAYS,
+                 full=FULL_REFRESH, verify_sample=VERIFY_SAMPLE, cache_dir=CACHE_DIR,
+                 clock=time.time):
+        self.name = name
+        self.fields = tuple(fields)
+        self.url_key = url_key
+        self.max_age = max_age_days * DAY
+        self.full = full
+        self.verify_sample = verify_sample
+        self.path = os.path.join(cache_dir, f"{name}.json") if cache_dir else None
+        self.clock = clock
+        self.entries = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+        self._verify = set()
+        self.fetched = 0
+        self.reused = 0
+        self.verified = 0
+        self.mismatches = 0
+
+    def _due(self, url, entry, fp, now):
+        if self.full or entry is None or entry["fp"] != fp:
+            return True
+        return now - entry["fetched_at"] > self.max_age * _spread(url)
+
+    def stale(self, products):
+        """Return the products whose detail page must be fetched this run."""
+        now = self.clock()
+        todo, fresh = [], []
+        for p in products:
+            url = p[self.url_key]
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["seen_at"] = now
+            if self._due(url, entry, fingerprint(p, self.fields), now):
+                todo.append(p)
+            else:
+                fresh.append(p)
+
+        sample = random.sample(fresh, min(self.verify_sample, len(fresh)))
+        self._verify = {p[self.url_key] for p in sample}
+        self.reused = len(fresh) - len(sample)
+        return todo + sample
+
+    def put(self, product, detail):
+        """Record a fresh detail result (None = fetch failed, not cached)."""
+        url = product[self.url_key]
+        self.fetched += 1
+        if url in self._verify:
+            self.verified += 1
+            if detail != self.entries[url]["detail"]:
+                self.mismatches += 1
+        if detail is None:
+            self.entries.pop(url, None)
+            return
+        now = self.clock()
+        self.entries[url] = {
+            "fp": fingerprint(product, self.fields),
+            "detail": detail,
+            "fetched_at": now,
+            "seen_at": now,
+        }
+
+    def get(self, product):
+        """Detail result for a product (fresh or cached), or None."""
+        entry = self.entries.get(product[self.url_key])
+        return entry["detail"] if entry else None
+
+    def summary(self):
+        s = f"{self.fetched} detail pages fetched, {self.reused} reused from cache"
+        if self.verified:
+            s += f", verify: {self.mismatches}/{self.verified} cached results differed"
+        return s
+
+    def save(self):
+        """Drop long-unseen entries and write the cache atomically."""
+        cutoff = self.clock() - FORGET_AFTER_DAYS * DAY
+        self.entries = {u: e for u, e in self.entries.items() if e["seen_at"] >= cutoff}
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        print(f"  Detail cache: {self.summary()}")
+
+
+# ── Offline simulation ─────────────────────────────────────────────────────
+
+def _selftest(n_products=800, days=30, listing_change=0.03, detail_only_change=0.01,
+              churn=0.005, seed=11):
+    """Simulate daily runs of one category and compare against a full crawl.
+
+    Every day a few listings change price (listing + detail change), a few
+    products change sizes only (detail change, listing identical) and a few
+    products are replaced. Each day the incremental result is compared with
+    what a full crawl would return.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    sizes = lambda: sorted(rng.sample(range(36, 47), rng.randint(3, 9)))  # noqa: E731
+
+    shop = {}
+    next_id = [0]
+
+    def new_product():
+        url = f"https://shop.example/p/{next_id[0]}"
+        next_id[0] += 1
+        shop[url] = {"listing": {"product_url": url, "price_eur": rng.choice([89.95, 109.0, 139.9]),
+                                 "original_price_eur": None, "image_url": f"{url}.jpg"},
+                     "detail": sizes()}
+
+    for _ in range(n_products):
+        new_product()
+
+    now = [0.0]
+    cache = DetailCache("selftest", fields=("price_eur", "original_price_eur", "image_url"),
+                        cache_dir=None, clock=lambda: now[0], verify_sample=5)
+    day0_fetches = 0
+    fetches, stale_results, wrong_listing_changed = [], 0, 0
+    for day in range(days):
+        now[0] = day * DAY + 6 * 3600
+        if day:
+            for url in list(shop):
+                r = rng.random()
+                if r < listing_change:
+                    shop[url]["listing"]["price_eur"] = round(shop[url]["listing"]["price_eur"] * 0.9, 2)
+                    shop[url]["detail"] = sizes()
+                    shop[url]["changed_listing"] = day
+                elif r < listing_change + detail_only_change:
+                    shop[url]["detail"] = sizes()
+                elif r < listing_change + detail_only_change + churn:
+                    del shop[url]
+                    new_product()
+
+        products = [dict(v["listing"]) for v in shop.values()]
+        cache.fetched = 0
+        for p in cache.stale(products):
+            cache.put(p, list(shop[p["product_url"]]["detail"]))
+        if day == 0:
+            day0_fetches = cache.fetched
+        else:
+            fetches.append(cache.fetched)
+
+        for p in products:
+            truth = shop[p["product_url"]]
+            if cache.get(p) != truth["detail"]:
+                stale_results += 1
+                if truth.get("changed_listing") == day:
+                    wrong_listing_changed += 1
+
+    avg = sum(fetches) / len(fetches)
+    total = n_products * (days - 1)
+    print(f"  Full crawl:  {n_products} detail fetches per run")
+    print(f"  Incremental: {day0_fetches} on day 1, then avg {avg:.0f}/run "
+          f"({n_products / avg:.1f}x fewer) with max age {MAX_AGE_DAYS:g} days")
+    print(f"  Correctness vs full crawl: {total - stale_results}/{total} product-days identical, "
+          f"{stale_results} stale (size-only changes within max age)")
+    assert wrong_listing_changed == 0, "a product with a changed listing kept a cached detail"
+    assert n_products / avg >= 5, "incremental crawl should fetch far fewer detail pages"
+    print("  ✓ every product with a changed listing was re-fetched")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        print(__doc__)
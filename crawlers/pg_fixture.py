@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+pg_fixture.py - Throwaway local Postgres for checking SQL migrations.
+
+Starts a private cluster (initdb + pg_ctl) in a temp dir, listening only on
+a unix socket, creates the Supabase roles the migrations grant to (anon,
+authenticated, service_role), and talks to it through psql - no Python
+driver needed. Everything is removed on exit.
+
+    with LocalPostgres() as pg:
+        pg.run_file("supabase/migrations/20261019030000_detect_price_drops.sql")
+        pg.run("INSERT INTO ...")
+        rows = pg.query("SELECT * FROM detect_price_drops(0.10)")   # list of dicts
+
+Postgres binaries are looked up on PATH, then in $PG_BIN, then in
+/usr/lib/postgresql/*/bin. Pass dsn="postgresql://..." to use an existing
+database instead of starting a cluster.
+
+Requires: PostgreSQL server binaries (e.g. apt install postgresql)
+"""
+
+import glob
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+SUPABASE_ROLES = ("anon", "authenticated", "service_role")
+
+
+def find_pg_bin(name):
+    """Path of a Postgres binary (initdb, pg_ctl, psql) or None."""
+    path = shutil.which(name)
+    if path:
+        return path
+    candidates = []
+    if os.environ.get("PG_BIN"):
+        candidates.append(os.path.join(os.environ["PG_BIN"], name))
+    candidates += sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"), reverse=True)
+    return next((c for c in candidates if os.path.exists(c)), None)
+
+
+class LocalPostgres:
+    """Private Postgres cluster (or an existing dsn) driven through psql."""
+
+    def __init__(self, dsn=None, port=54329):
+        self.dsn = dsn
+        self.port = port
+        self._tmp = None
+        self._data = None
+        self.psql = find_pg_bin("psql")
+        if not self.psql:
+            raise RuntimeError("psql not found (install PostgreSQL or set PG_BIN)")
+
+    # ── Lifecycle ──
+
+    def __enter__(self):
+        if self.dsn is None:
+            self._start()
+        for role in SUPABASE_ROLES:
+            self.run(
+                f"DO $$ BEGIN CREATE ROLE {role} NOLOGIN; "
+                f"EXCEPTION WHEN duplicate_object THEN NULL; END $$;"
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._data:
+            subprocess.run([find_pg_bin("pg_ctl"), "-D", self._data, "-m", "immediate", "stop"],
+                           capture_output=True)
+        if self._tmp:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def _start(self):
+        initdb, pg_ctl = find_pg_bin("initdb"), find_pg_bin("pg_ctl")
+        if not initdb or not pg_ctl:
+            raise RuntimeError("initdb/pg_ctl not found (install PostgreSQL or set PG_BIN)")
+        self._tmp = tempfile.mkdtemp(prefix="pgfixture-")
+        self._data = os.path.join(self._tmp, "data")
+        subprocess.run([initdb, "-D", self._data, "-U", "postgres", "-A", "trust", "--no-sync"],
+                       check=True, capture_output=True)
+        opts = f"-k {self._tmp} -c listen_addresses='' -p {self.port} -c fsync=off"
+        subprocess.run([pg_ctl, "-D", self._data, "-o", opts, "-w", "-l",
+                        os.path.join(self._tmp, "server.log"), "start"],
+                       check=True, capture_output=True)
+        self.dsn = f"postgresql://postgres@/postgres?host={self._tmp}&port={self.port}"
+
+    # ── SQL ──
+
+    def _psql(self, args, sql=None):
+        proc = subprocess.run(
+            [self.psql, "-X", "-q", "-v", "ON_ERROR_STOP=1", "-d", self.dsn, *args],
+            input=sql, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"psql failed: {proc.stderr.strip()}")
+        return proc.stdout
+
+    def run(self, sql):
+        """Execute SQL statements."""
+        self._psql([], sql)
+
+    def run_file(self, path):
+        """Execute a .sql file (e.g. a migration)."""
+        self._psql(["-f", path])
+
+    def query(self, sql):
+        """Run a SELECT and return its rows as a list of dicts."""
+        out = self._psql(["-A", "-t"], f"SELECT coalesce(json_agg(t), '[]') FROM ({sql}) t;")
+        return json.loads(out)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+price_history.py - Change-only price history: delta rows and as-of queries.
+
+History tables are a sparse change log. snapshot_prices.py writes a row for
+a key only when its tracked fields differ from the last row recorded for
+that key, so the state of a key at time T is the latest row with
+recorded_at <= T. When a key disappears from the live table (row
+deleted, retailer dropped the product) a tombstone is recorded: price_eur
+NULL (categories: in_stock false), so the last price is not taken as
+current forever. Table, key and fields per category come from the
+registry (categories.py: history_table, history_key, history_fields):
+
+  shoes:       price_history           key (shoe_slug, retailer)  fields price_eur
+  categories:  {cat}_price_history     key {cat}_price_id          fields price_eur,
+                                                                   original_price_eur, in_stock
+
+Pure helpers (no network):
+    latest_per_key(rows, key)              last row per key
+    delta_rows(current, last, key, fields) current rows that differ from last
+    tombstone_rows(current, last, key, fields, now)
+                                           tombstones for keys gone from current
+    as_of(rows, key, when)                 state per key at `when` from a sparse log
+
+Supabase:
+    load_latest(table, key, fields)        last recorded row per key (*_latest view)
+    price_as_of(table, key, fields, when)  state per key at `when`
+
+Self-check (synthetic 90-day dataset, sparse log vs dense daily snapshots):
+    python3 price_history.py --selftest
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+
+# Tolerance for numeric comparison (prices are stored as numeric(8,2)).
+PRICE_EPSILON = 0.005
+
+
+# ── Pure helpers ────────────────────────────────────────────────────────────
+
+def _key(row, key):
+    return tuple(row[k] for k in key)
+
+
+def _same(a, b):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+            and not isinstance(a, bool) and not isinstance(b, bool):
+        return abs(float(a) - float(b)) < PRICE_EPSILON
+    if a is None or b is None:
+        return a is b
+    return str(a) == str(b)
+
+
+def latest_per_key(rows, key):
+    """Last row per key by recorded_at (rows may come in any order).
+
+    Returns dict: key tuple → row.
+    """
+    latest = {}
+    for r in rows:
+        k = _key(r, key)
+        if k not in latest or r["recorded_at"] >= latest[k]["recorded_at"]:
+            latest[k] = r
+    return latest
+
+
+def delta_rows(current, last, key, fields):
+    """Rows of `current` whose tracked fields differ from the last recorded row.
+
+    current: iterable of rows (key columns + fields)
+    last:    dict key tuple → last recorded row (see latest_per_key / load_latest)
+    """
+    out = []
+    for r in current:
+        prev = last.get(_key(r, key))
+        if prev is None or any(not _same(r.get(f), prev.get(f)) for f in fields):
+            out.append(r)
+    return out
+
+
+def is_tombstone(row):
+    """True for the row recorded when a key left the live table."""
+    return row.get("price_eur") is None
+
+
+def tombstone_rows(current, last, key, fields, now):
+    """Tombstones for keys that have a live last row in `last` but are
+    missing from `current`: every tracked field NULL, in_stock false."""
+    live = {_key(r, key) for r in current}
+    out = []
+    for k, prev in last.items():
+        if k in live or is_tombstone(prev):
+            continue
+        row = dict(zip(key, k))
+        row.update({f: (False if f == "in_stock" else None) for f in fields})
+        row["recorded_at"] = now
+        out.append(row)
+    return out
+
+
+def as_of(rows, key, when):
+    """Reconstruct the state per key at `when` from a sparse change log.
+
+    `when` is compared as an ISO timestamp string (same format as recorded_at).
+    Keys first recorded after `when`, or tombstoned by then, are absent.
+    """
+    latest = latest_per_key((r for r in rows if r["recorded_at"] <= when), key)
+    return {k: r for k, r in latest.items() if not is_tombstone(r)}
+
+
+# ── Supabase ────────────────────────────────────────────────────────────────
+
+def _get_all(path, page=1000):
+    """GET every row of a PostgREST query (offset pagination)."""
+    key = os.environ["SUPABASE_SECRET_KEY"]
+    headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+    rows, offset = [], 0
+    while True:
+        url = f"{SUPABASE_URL}/rest/v1/{path}&limit={page}&offset={offset}"
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            batch = json.loads(resp.read())
+        rows.extend(batch)
+        if len(batch) < page:
+            return rows
+        offset += page
+
+
+def key_order(key, first=()):
+    """PostgREST order= over `first` then every key column: a total order,
+    so offset pages neither skip nor repeat rows that tie on a prefix."""
+    return ",".join(f"{c}.asc" for c in (*first, *key))
+
+
+def load_latest(table, key, fields):
+    """Last recorded row per key, via the {table}_latest view (tombstones
+    included: snapshot_prices diffs against them).
+
+    Falls back to reading the whole history table if the view is missing
+    (migration 20261019020000_price_history_latest.sql not applied yet).
+    """
+    select = ",".join(key + fields + ("recorded_at",))
+    try:
+        rows = _get_all(f"{table}_latest?select={select}&order={key_order(key)}")
+        return {_key(r, key): r for r in rows}
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        print(f"    ⚠ {table}_latest view missing, scanning full history")
+    rows = _get_all(f"{table}?select={select}&order={key_order(key, ('recorded_at',))}")
+    return latest_per_key(rows, key)
+
+
+def price_as_of(table, key, fields, when, inclusive=True):
+    """State per key at `when` (ISO timestamp) read from a history table.
+
+    inclusive=False excludes rows recorded exactly at `when` (e.g. "before
+    the snapshot that started at `when`").
+    """
+    op = "lte" if inclusive else "lt"
+    select = ",".join(key + fields + ("recorded_at",))
+    ts = urllib.parse.quote(when, safe="")
+    rows = _get_all(f"{table}?select={select}&recorded_at={op}.{ts}"
+                    f"&order={key_order(key, ('recorded_at',))}")
+    return {k: r for k, r in latest_per_key(rows, key).items() if not is_tombstone(r)}
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _selftest(n_keys=400, days=90, seed=3):
+    """Dense daily snapshots vs the change-only log on synthetic data.
+
+    For every day, as_of(sparse log, day) must equal that day's dense
+    snapshot (for the keys that exist on that day). Keys are added,
+    repriced, removed and re-listed along the way.
+    """
+    import random
+    from datetime import datetime, timedelta, timezone
+
+    from categories import get
+
+    rng = random.Random(seed)
+    rope = get("rope")
+    key, fields = rope.history_key, rope.history_fields
+    id_col = key[0]
+    start = datetime(2026, 7, 1, 6, tzinfo=timezone.utc)
+
+    state, gone, next_id = {}, {}, 1
+    dense, sparse = [], []
+    for day in range(days):
+        ts = (start + timedelta(days=day)).isoformat()
+        # Catalog grows a little, prices move occasionally, stock flips
+        while next_id <= n_keys * (0.8 + 0.2 * day / days):
+            state[next_id] = {"price_eur": round(rng.uniform(40, 300), 2),
+                              "original_price_eur": None, "in_stock": True}
+            next_id += 1
+        # Rows vanish (deleted / delisted) and some come back later
+        for i in list(state):
+            if rng.random() < 0.01:
+                gone[i] = state.pop(i)
+        for i in list(gone):
+            if rng.random() < 0.05:
+                state[i] = gone.pop(i)
+        for s in state.values():
+            r = rng.random()
+            if r < 0.02:
+                s["original_price_eur"] = s["original_price_eur"] or s["price_eur"]
+                s["price_eur"] = round(s["price_eur"] * rng.uniform(0.7, 0.95), 2)
+            elif r < 0.03:
+                s["price_eur"], s["original_price_eur"] = s["original_price_eur"] or s["price_eur"], None
+            elif r < 0.04:
+                s["in_stock"] = not s["in_stock"]
+
+        today = [{id_col: i, **s, "recorded_at": ts} for i, s in state.items()]
+        dense.extend(today)
+        last = latest_per_key(sparse, key)
+        sparse.extend(delta_rows(today, last, key, fields))
+        sparse.extend(tombstone_rows(today, last, key, fields, ts))
+
+    for day in range(days):
+        ts = (start + timedelta(days=day)).isoformat()
+        expected = {_key(r, key): tuple(r[f] for f in fields)
+                    for r in dense if r["recorded_at"] == ts}
+        rebuilt = {k: tuple(r[f] for f in fields) for k, r in as_of(sparse, key, ts).items()}
+        assert rebuilt == expected, f"day {day}: reconstructed state differs from dense snapshot"
+
+    removed = sum(1 for r in sparse if is_tombstone(r))
+    print(f"  ✓ {days} days x up to {n_keys} keys: as-of reconstruction equals dense snapshots "
+          f"({removed} removals tombstoned)")
+    print(f"    dense rows {len(dense)}, change-only rows {len(sparse)} "
+          f"({len(dense) / len(sparse):.1f}x fewer)")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        print(__doc__)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+price_sync.py - Diff-based sync of one retailer's rows in a price table.
+
+Replaces the old "mark every row out-of-stock, then re-upsert everything"
+flow. A crawler builds its rows as before, then calls sync_prices() once at
+the end of the category:
+
+  1. Load the retailer's current rows from the price table (one paged read)
+  2. Diff locally, keyed on product_url:
+       - product_url not in the table        → insert
+       - any crawled field changed           → update
+       - nothing changed                     → no write at all
+       - in the table but not crawled        → vanished
+  3. Upsert inserts + updates in large batches (bulk_writer.BulkWriter)
+  4. Mark only the vanished rows out-of-stock (or delete them, for tables
+     whose URLs carry variant fragments, e.g. #length_60m, #size=42)
+
+Per-table conventions come from the category registry (categories.py):
+columns that belong to other categories are stripped from the rows (e.g.
+sizes_available outside shoe_prices) and the vanished policy defaults to
+the category's. Variant rows (#fragment URLs) are regenerated every crawl,
+so vanished ones are always deleted.
+
+Nothing is written to the live table until the crawl is finished, so the
+shop no longer shows as sold out on the site while a crawler is running,
+and unchanged products cost zero writes. Before the diff, the crawl health
+gate (crawl_health.py) compares the run against the retailer's recent runs
+and skips the whole sync if it looks like a markup breakage.
+
+last_crawled_at / updated_at are ignored when diffing: they only move when
+the row is actually written.
+
+Usage (inside a crawler):
+    from price_sync import sync_prices
+    sync_prices("shoe_prices", RETAILER, rows)
+    sync_prices("rope_prices", RETAILER, rows)      # vanished="delete" from the registry
+"""
+
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+import checkpoint
+from bulk_writer import BulkWriter
+from categories import by_table, foreign_columns
+from crawl_health import HealthGate
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
+
+# Send upserts through the bulk_upsert_rows RPC (one INSERT ... ON CONFLICT
+# per batch) instead of the table endpoint.
+USE_RPC = os.environ.get("PRICE_BULK_RPC") == "1"
+
+# Ids per PATCH/DELETE ?id=in.(...) request (keeps the URL under ~8 KB).
+ID_BATCH = 150
+
+# Safety net carried over from supabase_count_rows(): if a crawl returns
+# fewer than this fraction of the retailer's in-stock rows, the shop most
+# likely changed its markup - keep vanished rows live instead of hiding them.
+MIN_SEEN_RATIO = 0.5
+
+# Bookkeeping columns that change on every crawl and must not count as a diff.
+IGNORE_FIELDS = {"last_crawled_at", "updated_at", "created_at"}
+
+# Tolerance for numeric comparison (prices are stored as numeric(8,2)).
+PRICE_EPSILON = 0.005
+
+
+def _headers(extra=None):
+    h = {
+        "apikey": SERVICE_KEY,
+        "Authorization": f"Bearer {SERVICE_KEY}",
+        "Content-Type": "application/json",
+    }
+    if extra:
+        h.update(extra)
+    return h
+
+
+def _request(url, method="GET", body=None, headers=None, timeout=30):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers=_headers(headers))
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        raw = resp.read()
+    return json.loads(raw) if raw else None
+
+
+# ── Load ────────────────────────────────────────────────────────────────────
+
+def load_current_rows(table, retailer, columns):
+    """Fetch all rows for a retailer (paged, ordered by id for stable offsets).
+
+    Returns dict: product_url → row (row always includes id and in_stock).
+    """
+    select = ",".join(sorted({"id", "product_url", "in_stock"} | set(columns)))
+    retailer_q = urllib.parse.quote(retailer, safe="")
+    current = {}
+    offset = 0
+    page = 1000
+    while True:
+        url = (
+            f"{SUPABASE_URL}/rest/v1/{table}?select={select}"
+            f"&retailer=eq.{retailer_q}&order=id.asc&limit={page}&offset={offset}"
+        )
+        rows = _request(url, timeout=30) or []
+        for r in rows:
+            current[r["product_url"]] = r
+        if len(rows) < page:
+            break
+        offset += page
+    return current
+
+
+# ── Diff ────────────────────────────────────────────────────────────────────
+
+def _same_value(new, old):
+    """Compare a crawled value with what PostgREST returned for it."""
+    if new == old:
+        return True
+    if new is None or old is None:
+        return False
+    if isinstance(new, bool) or isinstance(old, bool):
+        return bool(new) == bool(old)
+    try:
+        return abs(float(new) - float(old)) < PRICE_EPSILON
+    except (TypeError, ValueError):
+        pass
+    # jsonb columns: crawlers send pre-encoded strings, PostgREST may return
+    # the decoded value
+    if isinstance(new, str) and not isinstance(old, str):
+        try:
+            return json.loads(new) == old
+        except ValueError:
+            return False
+    return str(new) == str(old)
+
+
+def row_changed(new, old):
+    """True if any crawled (non-bookkeeping) field differs from the stored row."""
+    for key, value in new.items():
+        if key in IGNORE_FIELDS:
+            continue
+        if not _same_value(value, old.get(key)):
+            return True
+    return False
+
+
+def diff_rows(current, rows):
+    """Split crawled rows against the current table contents.
+
+    current: dict product_url → stored row (from load_current_rows)
+    rows:    crawled rows (duplicates by product_url: first one wins)
+
+    Returns (inserts, updates, unchanged_count, vanished) where vanished is
+    the list of stored rows that were not crawled this run.
+    """
+    inserts, updates = [], []
+    unchanged = 0
+    seen = set()
+    for row in rows:
+        url = row["product_url"]
+        if url in seen:
+            continue
+        seen.add(url)
+        old = current.get(url)
+        if old is None:
+            inserts.append(row)
+        elif row_changed(row, old):
+            updates.append(row)
+        else:
+            unchanged += 1
+    vanished = [old for url, old in current.items() if url not in seen]
+    return inserts, updates, unchanged, vanished
+
+
+# ── Write ───────────────────────────────────────────────────────────────────
+
+def upsert_rows(table, rows):
+    """Upsert rows on (retailer, product_url). Returns number of rows written.
+
+    Goes through BulkWriter (adaptive gzip batches over keep-alive
+    connections). Set PRICE_BULK_RPC=1 to use the bulk_upsert_rows RPC once
+    its migration is applied.
+    """
+    with BulkWriter(table, on_conflict="retailer,product_url", rpc=USE_RPC) as writer:
+        return writer.write(rows)
+
+
+def _id_filter(ids):
+    return "id=in.(" + ",".join(urllib.parse.quote(str(i), safe="") for i in ids) + ")"
+
+
+def mark_out_of_stock(table, ids):
+    """Flip in_stock=false on the given row ids only. Returns rows touched."""
+    now = datetime.now(timezone.utc).isoformat()
+    body = {"in_stock": False, "updated_at": now}
+    touched = 0
+    for i in range(0, len(ids), ID_BATCH):
+        chunk = ids[i:i + ID_BATCH]
+        url = f"{SUPABASE_URL}/rest/v1/{table}?{_id_filter(chunk)}"
+        try:
+            _request(url, method="PATCH", body=body, headers={"Prefer": "return=minimal"})
+            touched += len(chunk)
+        except urllib.error.HTTPError as e:
+            err_body = e.read().decode()
+            print(f"  ✗ Mark-out-of-stock error ({e.code}): {err_body[:300]}")
+    return touched
+
+
+def delete_ids(table, ids):
+    """Delete the given row ids only. Returns rows deleted."""
+    deleted = 0
+    for i in range(0, len(ids), ID_BATCH):
+        chunk = ids[i:i + ID_BATCH]
+        url = f"{SUPABASE_URL}/rest/v1/{table}?{_id_filter(chunk)}"
+        try:
+            _request(url, method="DELETE", headers={"Prefer": "return=minimal"})
+            deleted += len(chunk)
+        except urllib.error.HTTPError as e:
+            err_body = e.read().decode()
+            print(f"  ✗ Delete error ({e.code}): {err_body[:300]}")
+    return deleted
+
+
+# ── Entry point for crawlers ────────────────────────────────────────────────
+
+def shape_rows(table, rows):
+    """Strip columns that belong to other categories (in place). Returns rows."""
+    category = by_table(table)
+    if category is not None:
+        foreign = foreign_columns(category)
+        for row in rows:
+            for col in foreign & row.keys():
+                del row[col]
+    return rows
+
+
+def sync_prices(table, retailer, rows, vanished=None):
+    """Diff crawled rows against the table and write only what changed.
+
+    vanished: "out_of_stock" flips missing rows to in_stock=false;
+              "delete" removes them (ropes, whose variant URLs are
+              regenerated every crawl and would otherwise pile up).
+              None (default) = the category's policy from the registry.
+              Vanished variant rows (#fragment URLs) are deleted either way.
+
+    Returns stats dict: inserted, updated, unchanged, vanished, written,
+    blocked (1 if the health gate refused the sync).
+    """
+    if vanished is None:
+        category = by_table(table)
+        vanished = category.vanished if category else "out_of_stock"
+    shape_rows(table, rows)
+
+    # Markup breakage check against this retailer's recent runs: a blocked
+    # crawl writes nothing, so the previous data stays live.
+    gate = HealthGate(retailer, table)
+    verdict = gate.check(rows)
+    if verdict.rebaselined:
+        print(f"  ⚠ Health gate: accepting a new baseline for {retailer} in {table} "
+              f"({'; '.join(verdict.reasons)})")
+    elif not verdict.ok:
+        print(f"  ⚠ Health gate: {table} NOT synced for {retailer}, previous data stays live "
+              f"({'; '.join(verdict.reasons)})")
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "vanished": 0, "written": 0,
+                 "blocked": 1}
+        checkpoint.note_sync(table, stats)
+        return stats
+
+    columns = set()
+    for row in rows:
+        columns.update(row)
+    columns -= IGNORE_FIELDS
+
+    current = load_current_rows(table, retailer, columns)
+    inserts, updates, unchanged, gone = diff_rows(current, rows)
+    if vanished != "delete":
+        # Already out of stock: nothing to flip (variant rows still get deleted)
+        gone = [r for r in gone
+                if r.get("in_stock") is not False or "#" in (r.get("product_url") or "")]
+    print(f"  Diff vs {len(current)} stored rows: {len(inserts)} new, "
+          f"{len(updates)} changed, {unchanged} unchanged, {len(gone)} vanished")
+
+    written = upsert_rows(table, inserts + updates) if (inserts or updates) else 0
+
+    in_stock_before = sum(1 for r in current.values() if r.get("in_stock") is not False)
+    removed = 0
+    if gone:
+        if in_stock_before and len(rows) < in_stock_before * MIN_SEEN_RATIO:
+            print(f"  ⚠ Safety skip: found {len(rows)} rows but {in_stock_before} in stock "
+                  f"in {table} - leaving {len(gone)} vanished rows untouched "
+                  f"(threshold: {MIN_SEEN_RATIO:.0%})")
+        else:
+            if vanished == "delete":
+                to_delete, to_flip = gone, []
+            else:
+                to_delete = [r for r in gone if "#" in (r.get("product_url") or "")]
+                to_flip = [r for r in gone if "#" not in (r.get("product_url") or "")]
+            if to_delete:
+                removed += delete_ids(table, [r["id"] for r in to_delete])
+                print(f"  → {len(to_delete)} vanished rows deleted")
+            if to_flip:
+                removed += mark_out_of_stock(table, [r["id"] for r in to_flip])
+                print(f"  → {len(to_flip)} vanished rows marked out-of-stock")
+
+    print(f"  ✓ {written} rows written to {table} ({unchanged} unchanged, skipped)")
+    stats = {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "unchanged": unchanged,
+        "vanished": removed,
+        "written": written,
+        "blocked": 0,
+    }
+    gate.accept(verdict)
+    checkpoint.note_sync(table, stats)
+    return stats
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+price_trends.py - Incremental per-product price trends (lows, medians, sparklines).
+
+"Lowest in 30 days", "all-time low" and sparklines used to need the full
+history of a product. This job keeps one compact row per (category,
+product_slug) in price_trends (migration 20261019050000_price_trends.sql) and
+updates it from the newest history rows only:
+
+  1. Read history rows recorded after the per-table watermark
+     (price_trend_state.last_recorded_at)
+  2. Map them to products (categories.py history grain): "product" tables
+     (shoes) carry the slug, "row" tables are mapped by looking up
+     {cat}_price_id → product_slug in the live table, or, for rows deleted
+     since (their tombstone), in the offers stored on price_trends
+  3. Replay them onto the stored trend state: offers = last known price
+     per retailer/price row (None = out of stock), series = product price
+     (cheapest in-stock offer) at each change within the last 90 days
+  4. Recompute the stats from the series and upsert, then move the
+     watermark
+
+Rows not touched for a day are "rolled" (stats recomputed from their
+stored series, no history reads) so their windows keep moving.
+
+Stats (product price = cheapest in-stock offer):
+    current_price, last_change_at
+    low/high/median over 30 and 90 days (median of daily closing prices)
+    all_time_low (+ _at), all_time_high
+    sparkline: daily closes over 90 days, SPARK_POINTS buckets (bucket min)
+
+Usage:
+    python3 price_trends.py              # incremental update (run after snapshot_prices)
+    python3 price_trends.py --rebuild    # rebuild every row from the full history
+    python3 price_trends.py --selftest   # incremental == rebuild == brute force
+"""
+
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from bisect import bisect_right
+
+from categories import with_history
+from price_history import PRICE_EPSILON, _get_all, key_order
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+TABLE = "price_trends"
+STATE_TABLE = "price_trend_state"
+
+WINDOWS = (30, 90)           # days; the largest one bounds the stored series
+SPARK_POINTS = 30
+ROLL_AFTER = datetime.timedelta(days=1)
+ID_BATCH = 200               # ids / slugs per ?col=in.(...) request
+
+UTC = datetime.timezone.utc
+DAY = datetime.timedelta(days=1)
+
+
+def _ts(value):
+    """ISO timestamp string → aware UTC datetime."""
+    dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
+
+def _iso(dt):
+    return dt.astimezone(UTC).isoformat()
+
+
+# ── Trend state (pure) ──────────────────────────────────────────────────────
+
+def new_state():
+    return {"offers": {}, "series": [], "all_time_low": None, "all_time_low_at": None,
+            "all_time_high": None}
+
+
+def _best(offers):
+    prices = [p for p in offers.values() if p is not None]
+    return round(min(prices), 2) if prices else None
+
+
+def apply_changes(state, changes):
+    """Replay offer changes onto a trend state (in place).
+
+    changes: iterable of (recorded_at, offer_key, price or None), any order.
+    Offers changed at the same timestamp count as one product-level change.
+    """
+    by_ts = {}
+    for ts, offer, price in changes:
+        by_ts.setdefault(_iso(_ts(ts)), []).append((str(offer), price))
+
+    offers, series = state["offers"], state["series"]
+    for ts in sorted(by_ts):
+        for offer, price in by_ts[ts]:
+            offers[offer] = None if price is None else float(price)
+        price = _best(offers)
+        last = series[-1][1] if series else None
+        if series and (price == last or (price is not None and last is not None
+                                         and abs(price - last) < PRICE_EPSILON)):
+            continue
+        series.append([ts, price])
+        if price is None:
+            continue
+        if state["all_time_low"] is None or price < state["all_time_low"] - PRICE_EPSILON:
+            state["all_time_low"], state["all_time_low_at"] = price, ts
+        if state["all_time_high"] is None or price > state["all_time_high"]:
+            state["all_time_high"] = price
+    return state
+
+
+def prune(series, now):
+    """Drop points older than the largest window, keeping one carry-in point."""
+    start = _iso(now - max(WINDOWS) * DAY)
+    i = bisect_right([p[0] for p in series], start)
+    return series[max(0, i - 1):]
+
+
+def _price_at(times, series, when):
+    """Product price at `when` (last point at or before it), None if unknown."""
+    i = bisect_right(times, when)
+    return series[i - 1][1] if i else None
+
+
+def daily_closes(series, now, days):
+    """Closing price for each of the last `days` days up to `now` (None = unknown)."""
+    times = [p[0] for p in series]
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    out = []
+    for d in range(days - 1, -1, -1):
+        close = min(now, today - (d - 1) * DAY - datetime.timedelta(microseconds=1))
+        out.append(_price_at(times, series, _iso(close)))
+    return out
+
+
+def sparkline(closes, points=SPARK_POINTS):
+    """Downsample daily closes to `points` buckets (bucket min, leading gaps dropped)."""
+    values = closes
+    while values and values[0] is None:
+        values = values[1:]
+    if not values:
+        return []
+    n = len(values)
+    points = min(points, n)
+    out = []
+    for b in range(points):
+        bucket = [v for v in values[b * n // points:(b + 1) * n // points] if v is not None]
+        out.append(min(bucket) if bucket else None)
+    return out
+
+
+def compute_stats(state, now):
+    """Trend columns for a state at `now`."""
+    series = state["series"]
+    times = [p[0] for p in series]
+    row = {
+        "current_price": series[-1][1] if series else None,
+        "last_change_at": series[-1][0] if series else None,
+        "all_time_low": state["all_time_low"],
+        "all_time_low_at": state["all_time_low_at"],
+        "all_time_high": state["all_time_high"],
+    }
+    closes = daily_closes(series, now, max(WINDOWS))
+    for days in WINDOWS:
+        start = _iso(now - days * DAY)
+        seen = [_price_at(times, series, start)]
+        seen += [p for t, p in series if start < t <= _iso(now)]
+        seen = [p for p in seen if p is not None]
+        window_closes = [c for c in closes[-days:] if c is not None]
+        row[f"low_{days}d"] = min(seen) if seen else None
+        row[f"high_{days}d"] = max(seen) if seen else None
+        row[f"median_{days}d"] = round(statistics.median(window_closes), 2) if window_closes else None
+    row["sparkline"] = sparkline(closes)
+    return row
+
+
+def trend_row(category, slug, state, now):
+    """Full price_trends row (stats + stored state) for an upsert."""
+    state["series"] = prune(state["series"], now)
+    return {"category": category, "product_slug": slug, **compute_stats(state, now),
+            "offers": state["offers"], "series": state["series"], "updated_at": _iso(now)}
+
+
+def offer_owners(trend_rows, ids):
+    """{live id: product_slug} for row-grain offers found in stored trend
+    rows: the product of an offer whose live row has been deleted."""
+    want = {str(i): i for i in ids}
+    owners = {}
+    for r in trend_rows:
+        for offer in r.get("offers") or {}:
+            if offer in want:
+                owners[want[offer]] = r["product_slug"]
+    return owners
+
+
+def row_changes(rows, id_col, slugs):
+    """Row-grain history rows → {slug: [(ts, offer, price)]}; the live row
+    is the offer and out of stock (or a tombstone) is price None."""
+    per_slug = {}
+    for r in rows:
+        slug = slugs.get(r[id_col])
+        if slug:  # rows that never had a product have no trend
+            price = r["price_eur"] if r.get("in_stock", True) else None
+            per_slug.setdefault(slug, []).append((r["recorded_at"], r[id_col], price))
+    return per_slug
+
+
+def state_from_row(row):
+    return {"offers": row.get("offers") or {}, "series": row.get("series") or [],
+            "all_time_low": row.get("all_time_low"), "all_time_low_at": row.get("all_time_low_at"),
+            "all_time_high": row.get("all_time_high")}
+
+
+# ── Supabase ────────────────────────────────────────────────────────────────
+
+def _headers():
+    key = os.environ["SUPABASE_SECRET_KEY"]
+    return {"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+
+
+def _get(path):
+    req = urllib.request.Request(f"{SUPABASE_URL}/rest/v1/{path}", headers=_headers())
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def _in_list(values):
+    quoted = ",".join('"' + str(v).replace('"', '') + '"' for v in values)
+    return f"in.({urllib.parse.quote(quoted, safe=',')})"
+
+
+def _chunks(values, n=ID_BATCH):
+    values = sorted(values)
+    for i in range(0, len(values), n):
+        yield values[i:i + n]
+
+
+def _upsert(table, rows, on_conflict):
+    from bulk_writer import BulkWriter
+
+    with BulkWriter(table, on_conflict=on_conflict) as writer:
+        n = writer.write(rows)
+    if writer.errors:
+        raise RuntimeError(f"{writer.errors} batch(es) to {table} failed")
+    return n
+
+
+def load_watermarks():
+    return {r["history_table"]: r["last_recorded_at"]
+            for r in _get(f"{STATE_TABLE}?select=history_table,last_recorded_at")}
+
+
+def read_changes(watermarks):
+    """New history rows per category → ({category: {slug: [(ts, offer, price)]}}, new watermarks)."""
+    changes, marks = {}, {}
+
+    def since(table):
+        wm = watermarks.get(table)
+        return f"&recorded_at=gt.{urllib.parse.quote(wm, safe='')}" if wm else ""
+
+    for category in with_history():
+        table, key = category.history_table, category.history_key
+        select = ",".join(key + ("price_eur", "recorded_at")
+                          + (("in_stock",) if category.history_grain == "row" else ()))
+        try:
+            rows = _get_all(f"{table}?select={select}{since(table)}"
+                            f"&order={key_order(key, ('recorded_at',))}")
+        except urllib.error.HTTPError as e:
+            print(f"    ⚠ {table}: {e.code}, skipping")
+            continue
+        if not rows:
+            continue
+        per_slug = changes.setdefault(category.name, {})
+        if category.history_grain == "product":
+            # Keyed by (slug, retailer): the retailer is the offer
+            slug_col, offer_col = key
+            for r in rows:
+                per_slug.setdefault(r[slug_col], []).append((r["recorded_at"], r[offer_col], r["price_eur"]))
+        else:
+            # Keyed by live row id: look up the product, the row is the offer
+            id_col = key[0]
+            ids = {r[id_col] for r in rows}
+            slugs = {}
+            for chunk in _chunks(ids):
+                for live in _get(f"{category.live_table}?select=id,product_slug&id={_in_list(chunk)}"):
+                    slugs[live["id"]] = live["product_slug"]
+            # Deleted since: the stored trend rows still hold their offers
+            gone = ids - set(slugs)
+            if gone:
+                stored = _get_all(f"{TABLE}?select=product_slug,offers"
+                                  f"&category=eq.{urllib.parse.quote(category.name)}"
+                                  f"&order=product_slug.asc")
+                slugs.update(offer_owners(stored, gone))
+            for slug, ch in row_changes(rows, id_col, slugs).items():
+                per_slug.setdefault(slug, []).extend(ch)
+        marks[table] = max(r["recorded_at"] for r in rows)
+    return changes, marks
+
+
+def load_trends(category, slugs):
+    rows = {}
+    for chunk in _chunks(slugs):
+        for r in _get(f"{TABLE}?select=*&category=eq.{urllib.parse.quote(category)}"
+                      f"&product_slug={_in_list(chunk)}"):
+            rows[r["product_slug"]] = r
+    return rows
+
+
+def roll_stale(now, skip):
+    """Recompute stats of rows not updated for ROLL_AFTER (stored series only)."""
+    cutoff = urllib.parse.quote(_iso(now - ROLL_AFTER), safe="")
+    stale = _get_all(f"{TABLE}?select=*&updated_at=lt.{cutoff}&order=category.asc,product_slug.asc")
+    rows = [trend_row(r["category"], r["product_slug"], state_from_row(r), now)
+            for r in stale if (r["category"], r["product_slug"]) not in skip]
+    return _upsert(TABLE, rows, "category,product_slug") if rows else 0
+
+
+def update_trends(rebuild=False, now=None):
+    """Apply new history rows to price_trends. Returns a stats dict."""
+    t0 = time.time()
+    now = now or datetime.datetime.now(UTC)
+    watermarks = {} if rebuild else load_watermarks()
+    changes, marks = read_changes(watermarks)
+
+    rows, touched = [], set()
+    for category, per_slug in changes.items():
+        existing = {} if rebuild else load_trends(category, per_slug)
+        for slug, slug_changes in per_slug.items():
+            state = state_from_row(existing[slug]) if slug in existing else new_state()
+            apply_changes(state, slug_changes)
+            rows.append(trend_row(category, slug, state, now))
+            touched.add((category, slug))
+
+    written = _upsert(TABLE, rows, "category,product_slug") if rows else 0
+    # Watermarks move only after the trend rows are stored, so a failed run
+    # re-reads the same history rows next time.
+    if marks:
+        _upsert(STATE_TABLE, [{"history_table": t, "last_recorded_at": ts, "updated_at": _iso(now)}
+                              for t, ts in marks.items()], "history_table")
+    rolled = roll_stale(now, touched)
+
+    n_changes = sum(len(c) for per_slug in changes.values() for c in per_slug.values())
+    stats = {"history_rows": n_changes, "updated": written, "rolled": rolled,
+             "seconds": round(time.time() - t0, 2)}
+    print(f"  Price trends: {n_changes} new history rows → {written} products updated, "
+          f"{rolled} rolled ({stats['seconds']}s)")
+    return stats
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _selftest(n_products=150, days=120, seed=11):
+    """Synthetic change-only history, replayed one snapshot at a time.
+
+    The incrementally maintained rows must equal a single rebuild from the
+    whole log and a brute-force reference computed straight from the log.
+    """
+    import random
+
+    from price_history import as_of, delta_rows, latest_per_key
+
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 6, 1, 6, tzinfo=UTC)
+    key, fields = ("slug", "offer"), ("price_eur",)
+    offers = {(f"p{i}", f"r{j}"): round(rng.uniform(50, 250), 2)
+              for i in range(n_products) for j in range(rng.randint(1, 4))}
+    log, snapshots = [], []
+    for day in range(days):
+        for snap in range(rng.choice([1, 2, 4])):
+            ts = _iso(start + day * DAY + snap * 6 * datetime.timedelta(hours=1))
+            for k, p in offers.items():
+                r = rng.random()
+                if r < 0.03:
+                    offers[k] = round((p or rng.uniform(50, 250)) * rng.uniform(0.6, 0.95), 2)
+                elif r < 0.05:
+                    offers[k] = round((p or rng.uniform(50, 250)) * rng.uniform(1.05, 1.3), 2)
+                elif r < 0.06:
+                    offers[k] = None if p else round(rng.uniform(50, 250), 2)
+            current = [{"slug": s, "offer": o, "price_eur": p, "recorded_at": ts}
+                       for (s, o), p in offers.items()]
+            new = delta_rows(current, latest_per_key(log, key), key, fields)
+            log.extend(new)
+            snapshots.append((ts, new))
+
+    # Incremental: one apply per snapshot, state carried between runs
+    t0 = time.time()
+    states, rows = {}, {}
+    for ts, new in snapshots:
+        now = _ts(ts)
+        per_slug = {}
+        for r in new:
+            per_slug.setdefault(r["slug"], []).append((r["recorded_at"], r["offer"], r["price_eur"]))
+        for slug, ch in per_slug.items():
+            state = states.setdefault(slug, new_state())
+            apply_changes(state, ch)
+            rows[slug] = trend_row("shoes", slug, state, now)
+            states[slug] = state_from_row(json.loads(json.dumps(rows[slug])))  # DB round trip
+    t_incr = time.time() - t0
+    now = _ts(snapshots[-1][0]) + datetime.timedelta(hours=1)
+    incremental = {s: trend_row("shoes", s, st, now) for s, st in states.items()}
+
+    # Rebuild from the whole log
+    per_slug = {}
+    for r in log:
+        per_slug.setdefault(r["slug"], []).append((r["recorded_at"], r["offer"], r["price_eur"]))
+    rebuilt = {s: trend_row("shoes", s, apply_changes(new_state(), ch), now) for s, ch in per_slug.items()}
+
+    # Brute force: product price at every change time, straight from the log
+    def product_price(when, slug):
+        prices = [r["price_eur"] for (s, _), r in as_of(log, key, when).items()
+                  if s == slug and r["price_eur"] is not None]
+        return round(min(prices), 2) if prices else None
+
+    cols = ["current_price", "low_30d", "high_30d", "median_30d", "low_90d", "median_90d",
+            "all_time_low", "all_time_high", "sparkline"]
+    mismatches = 0
+    for slug in sorted(rebuilt):
+        a, b = incremental[slug], rebuilt[slug]
+        if any(a[c] != b[c] for c in cols + ["last_change_at", "series"]):
+            mismatches += 1
+            continue
+        change_times = sorted({r["recorded_at"] for r in log if r["slug"] == slug})
+        prices = [product_price(t, slug) for t in change_times]
+        known = [p for p in prices if p is not None]
+        start30 = _iso(now - 30 * DAY)
+        win = [product_price(start30, slug)] + [p for t, p in zip(change_times, prices) if t > start30]
+        win = [p for p in win if p is not None]
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        closes = [product_price(_iso(min(now, today - (d - 1) * DAY - datetime.timedelta(microseconds=1))), slug)
+                  for d in range(29, -1, -1)]
+        closes = [c for c in closes if c is not None]
+        expect = {"all_time_low": min(known) if known else None,
+                  "all_time_high": max(known) if known else None,
+                  "low_30d": min(win) if win else None,
+                  "high_30d": max(win) if win else None,
+                  "median_30d": round(statistics.median(closes), 2) if closes else None,
+                  "current_price": prices[-1]}
+        if any(expect[c] != a[c] for c in expect):
+            mismatches += 1
+
+    assert mismatches == 0, f"{mismatches} products differ between incremental / rebuild / brute force"
+
+    # Row grain: a deleted live row is mapped back to its product through
+    # the stored offers, and its tombstone clears the offer
+    t1, t2 = _iso(now - 2 * DAY), _iso(now - DAY)
+    id_col = "rope_price_id"
+    hist = [{id_col: 7, "price_eur": 89.0, "in_stock": True, "recorded_at": t1},
+            {id_col: 8, "price_eur": 99.0, "in_stock": True, "recorded_at": t1}]
+    state = apply_changes(new_state(), row_changes(hist, id_col, {7: "rope-a", 8: "rope-a"})["rope-a"])
+    stored = [json.loads(json.dumps(trend_row("rope", "rope-a", state, now)))]
+    tomb = [{id_col: 7, "price_eur": None, "in_stock": False, "recorded_at": t2}]
+    owners = offer_owners(stored, {7})
+    assert owners == {7: "rope-a"}, owners
+    state = apply_changes(state_from_row(stored[0]), row_changes(tomb, id_col, owners)["rope-a"])
+    row = trend_row("rope", "rope-a", state, now)
+    assert row["current_price"] == 99.0 and row["offers"]["7"] is None, row
+    longest = max(len(st["series"]) for st in states.values())
+    print(f"  ✓ {len(rebuilt)} products, {len(snapshots)} snapshots over {days} days: "
+          f"incremental == rebuild == brute force; deleted row offers cleared")
+    print(f"    {len(log)} history rows, {t_incr:.2f}s for {len(snapshots)} incremental updates; "
+          f"stored series ≤ {longest} points per product")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        update_trends(rebuild="--rebuild" in sys.argv)
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+price_watch.py - Price watches: match drops against watches, send digests.
+
+A watch is (email, category, product_slug, eur_size or any, max price or
+any), stored in price_watches (migration 20261019040000_price_watches.sql).
+After the crawl, run_all_crawlers.py passes the drops from
+detect_price_drops() to notify_watchers():
+
+  1. Load only the active watches for the dropped (category, slug) keys
+     (chunked ?product_slug=in.(...) requests on the partial index)
+  2. WatchIndex: (category, slug) → size → watches sorted by max price,
+     so each drop finds its watches with one dict lookup + a bisect
+     instead of scanning every watch
+  3. Group the alerts into one digest per recipient (best price per watch)
+  4. Send through a pluggable sender (PRICE_ALERT_SENDER=file|smtp|stdout)
+  5. Store last_alert_price_eur so a watch only fires again on a lower price
+
+Shoe drops carry per-size prices ({eur_size: price}) for every in-stock
+size, not only the ones that fell, so a sized watch only fires when its
+size is in stock below the drop's old price and at or below its max price;
+the digest shows that size's own drop.
+
+Usage:
+    python3 price_watch.py add --email a@b.c --slug la-sportiva-solution [--size 41.5] [--max-price 120]
+    python3 price_watch.py add --email a@b.c --category rope --slug edelrid-boa-9-8
+    python3 price_watch.py list [--email a@b.c]
+    python3 price_watch.py remove --id 17
+    python3 price_watch.py --selftest        # 50k watches x 2k drops, vs nested loop
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+import os
+import re
+import smtplib
+import sys
+import time
+import urllib.parse
+import urllib.request
+from email.message import EmailMessage
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+TABLE = "price_watches"
+
+ALERT_DIR = os.path.expanduser("~/crawl_logs/alerts")
+SLUG_BATCH = 100          # slugs per ?product_slug=in.(...) request
+PRICE_EPSILON = 0.005
+
+SITE_URL = "https://www.climbing-gear.com"
+
+
+def _size(value):
+    return None if value is None else round(float(value), 1)
+
+
+def _max_price(watch):
+    v = watch.get("max_price_eur")
+    return float("inf") if v is None else float(v)
+
+
+def drop_pct(drop, price):
+    """Percentage drop from the drop's old price to `price` (a size's price
+    for sized watches)."""
+    return round((drop["old_price"] - price) / drop["old_price"] * 100, 1)
+
+
+# ── Matching ────────────────────────────────────────────────────────────────
+
+class WatchIndex:
+    """Active watches keyed by (category, product_slug) → size → watches.
+
+    Within a size bucket watches are sorted by max price, so the watches a
+    price satisfies are a suffix found with bisect.
+    """
+
+    def __init__(self, watches):
+        buckets = {}
+        for w in watches:
+            if not w.get("active", True):
+                continue
+            category = w.get("category") or "shoes"
+            size = _size(w.get("eur_size")) if category == "shoes" else None
+            buckets.setdefault((category, w["product_slug"]), {}).setdefault(size, []).append(w)
+
+        self._index = {}
+        for key, by_size in buckets.items():
+            self._index[key] = {}
+            for size, ws in by_size.items():
+                ws.sort(key=_max_price)
+                self._index[key][size] = ([_max_price(w) for w in ws], ws)
+        self.size = sum(len(ws) for by in self._index.values() for _, ws in by.values())
+
+    def match(self, drop):
+        """Return [(watch, price)] for one drop."""
+        by_size = self._index.get((drop["category"], drop.get("product_slug")))
+        if not by_size:
+            return []
+        sizes = drop.get("sizes") or {}
+        out = []
+        for size, (limits, watches) in by_size.items():
+            if size is None:
+                price = drop["new_price"]
+            else:
+                # A sized watch needs its size in the drop (a shoe drop with
+                # no parsed sizes says nothing about it), and sizes lists
+                # every in-stock size: only one below the old price dropped
+                price = sizes.get(size)
+                if price is None or price >= drop["old_price"] - PRICE_EPSILON:
+                    continue
+            for w in watches[bisect.bisect_left(limits, price - PRICE_EPSILON):]:
+                last = w.get("last_alert_price_eur")
+                if last is None or price < float(last) - PRICE_EPSILON:
+                    out.append((w, price))
+        return out
+
+
+def match_drops(drops, index):
+    """Match all drops. Returns dict: watch id → (watch, drop, price), best price per watch."""
+    best = {}
+    for d in drops:
+        for w, price in index.match(d):
+            if w["id"] not in best or price < best[w["id"]][2]:
+                best[w["id"]] = (w, d, price)
+    return best
+
+
+def build_digests(matches):
+    """Group matches into one digest per recipient.
+
+    Returns dict: email → list of (watch, drop, price), biggest drop first.
+    """
+    digests = {}
+    for w, d, price in matches.values():
+        digests.setdefault(w["email"].strip().lower(), []).append((w, d, price))
+    for items in digests.values():
+        items.sort(key=lambda x: -drop_pct(x[1], x[2]))
+    return digests
+
+
+def format_digest(items):
+    """(subject, plain-text body) for one recipient's digest."""
+    n = len(items)
+    subject = (f"Price drop: {items[0][1]['product']}" if n == 1
+               else f"Price drops on {n} products you're watching")
+    lines = ["Prices dropped on gear you're watching:", ""]
+    for w, d, price in items:
+        size = f" (EU {w['eur_size']:g})" if w.get("eur_size") is not None and d["category"] == "shoes" else ""
+        lines.append(f"  {d['product']}{size} at {d['retailer']}: "
+                     f"€{d['old_price']:.2f} → €{price:.2f} (-{drop_pct(d, price)}%)")
+    lines += ["", f"Manage your watches: {SITE_URL}", ""]
+    return subject, "\n".join(lines)
+
+
+# ── Senders ─────────────────────────────────────────────────────────────────
+
+class FileSender:
+    """Writes each digest to <out_dir>/<email>.txt (local default)."""
+
+    def __init__(self, out_dir=None):
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.out_dir = out_dir or os.path.join(ALERT_DIR, stamp)
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    def send(self, recipient, subject, body):
+        name = re.sub(r"[^a-z0-9@._-]", "_", recipient)
+        with open(os.path.join(self.out_dir, f"{name}.txt"), "w") as f:
+            f.write(f"To: {recipient}\nSubject: {subject}\n\n{body}")
+
+    def close(self):
+        pass
+
+
+class StdoutSender:
+    def send(self, recipient, subject, body):
+        print(f"\n  → {recipient}: {subject}\n{body}")
+
+    def close(self):
+        pass
+
+
+class SmtpSender:
+    """One SMTP connection for all digests of a run.
+
+    Configured via PRICE_ALERT_SMTP_HOST / _PORT / _USER / _PASSWORD and
+    PRICE_ALERT_FROM. Defaults to localhost:1025 (a local debugging SMTP
+    server, e.g. `python3 -m aiosmtpd -n`).
+    """
+
+    def __init__(self):
+        self.sender = os.environ.get("PRICE_ALERT_FROM", "alerts@climbing-gear.com")
+        self.smtp = smtplib.SMTP(os.environ.get("PRICE_ALERT_SMTP_HOST", "localhost"),
+                                 int(os.environ.get("PRICE_ALERT_SMTP_PORT", 1025)), timeout=30)
+        if os.environ.get("PRICE_ALERT_SMTP_USER"):
+            self.smtp.starttls()
+            self.smtp.login(os.environ["PRICE_ALERT_SMTP_USER"], os.environ["PRICE_ALERT_SMTP_PASSWORD"])
+
+    def send(self, recipient, subject, body):
+        msg = EmailMessage()
+        msg["From"], msg["To"], msg["Subject"] = self.sender, recipient, subject
+        msg.set_content(body)
+        self.smtp.send_message(msg)
+
+    def close(self):
+        self.smtp.quit()
+
+
+SENDERS = {"file": FileSender, "stdout": StdoutSender, "smtp": SmtpSender}
+
+
+def get_sender(name=None):
+    name = name or os.environ.get("PRICE_ALERT_SENDER", "file")
+    if name not in SENDERS:
+        raise ValueError(f"unknown PRICE_ALERT_SENDER '{name}' (use {', '.join(SENDERS)})")
+    return SENDERS[name]()
+
+
+def send_digests(digests, sender):
+    """Send every digest; returns the watch ids whose digest went out."""
+    sent = []
+    for recipient, items in digests.items():
+        subject, body = format_digest(items)
+        try:
+            sender.send(recipient, subject, body)
+        except Exception as e:
+            print(f"    ✗ Alert to {recipient} failed: {e}")
+            continue
+        sent.extend(w["id"] for w, _, _ in items)
+    return sent
+
+
+# ── Supabase ────────────────────────────────────────────────────────────────
+
+def _headers():
+    key = os.environ["SUPABASE_SECRET_KEY"]
+    return {"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+
+
+def _request(path, method="GET", body=None, prefer=None):
+    headers = _headers()
+    if prefer:
+        headers["Prefer"] = prefer
+    req = urllib.request.Request(f"{SUPABASE_URL}/rest/v1/{path}", method=method, headers=headers,
+                                 data=json.dumps(body).encode() if body is not None else None)
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        raw = resp.read()
+    return json.loads(raw) if raw else None
+
+
+def load_watches(keys):
+    """Active watches for a set of (category, product_slug) keys."""
+    by_cat = {}
+    for category, slug in keys:
+        if slug:
+            by_cat.setdefault(category, set()).add(slug)
+    watches = []
+    for category, slugs in by_cat.items():
+        slugs = sorted(slugs)
+        for i in range(0, len(slugs), SLUG_BATCH):
+            quoted = ",".join('"' + s.replace('"', '') + '"' for s in slugs[i:i + SLUG_BATCH])
+            watches += _request(
+                f"{TABLE}?select=*&active=eq.true"
+                f"&category=eq.{urllib.parse.quote(category)}"
+                f"&product_slug=in.({urllib.parse.quote(quoted, safe=',')})"
+            ) or []
+    return watches
+
+
+def record_alerts(matches, sent_ids):
+    """Store last_alert_price_eur / last_alert_at on the alerted watches.
+
+    PATCHes only those two columns (one request per alerted price), so an
+    edit made since load_watches (deactivated, new max price) is kept.
+    Returns the number of watches updated.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    by_price = {}
+    for wid in sent_ids:
+        by_price.setdefault(round(matches[wid][2], 2), []).append(wid)
+    updated = 0
+    for price, ids in by_price.items():
+        ids = sorted(ids)
+        for i in range(0, len(ids), SLUG_BATCH):
+            chunk = ids[i:i + SLUG_BATCH]
+            try:
+                _request(f"{TABLE}?id=in.({','.join(map(str, chunk))})", "PATCH",
+                         {"last_alert_price_eur": price, "last_alert_at": now},
+                         prefer="return=minimal")
+                updated += len(chunk)
+            except Exception as e:
+                print(f"    ✗ Storing alert price on {len(chunk)} watch(es) failed: {e}")
+    return updated
+
+
+def notify_watchers(drops, sender=None):
+    """Match drops against watches and send digests. Returns a stats dict."""
+    t0 = time.time()
+    keys = {(d["category"], d.get("product_slug")) for d in drops}
+    watches = load_watches(keys)
+    index = WatchIndex(watches)
+    matches = match_drops(drops, index)
+    digests = build_digests(matches)
+
+    sent = []
+    if digests:
+        sender = sender or get_sender()
+        try:
+            sent = send_digests(digests, sender)
+        finally:
+            sender.close()
+        record_alerts(matches, sent)
+
+    stats = {"watches": index.size, "alerts": len(matches), "digests": len(digests),
+             "sent": len(sent), "seconds": round(time.time() - t0, 2)}
+    print(f"  Price watches: {stats['watches']} candidate watches, {stats['alerts']} alerts, "
+          f"{stats['digests']} digests sent ({stats['seconds']}s)")
+    return stats
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def _cli(argv):
+    ap = argparse.ArgumentParser(description="Manage price watches")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add")
+    add.add_argument("--email", required=True)
+    add.add_argument("--slug", required=True)
+    add.add_argument("--category", default="shoes")
+    add.add_argument("--size", type=float)
+    add.add_argument("--max-price", type=float)
+    ls = sub.add_parser("list")
+    ls.add_argument("--email")
+    rm = sub.add_parser("remove")
+    rm.add_argument("--id", type=int, required=True)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "add":
+        row = _request(TABLE, "POST", {
+            "email": args.email.strip().lower(), "product_slug": args.slug,
+            "category": args.category, "eur_size": args.size, "max_price_eur": args.max_price,
+        }, prefer="return=representation")
+        print(f"  ✓ Watch {row[0]['id']} added")
+    elif args.cmd == "list":
+        q = f"{TABLE}?select=*&active=eq.true&order=id"
+        if args.email:
+            q += f"&email=eq.{urllib.parse.quote(args.email.strip().lower())}"
+        for w in _request(q) or []:
+            size = f" EU {w['eur_size']}" if w.get("eur_size") is not None else ""
+            limit = f" ≤ €{w['max_price_eur']}" if w.get("max_price_eur") is not None else ""
+            print(f"  {w['id']:>6}  {w['email']:30s} {w['category']:8s} {w['product_slug']}{size}{limit}")
+    elif args.cmd == "remove":
+        _request(f"{TABLE}?id=eq.{args.id}", "PATCH", {"active": False}, prefer="return=minimal")
+        print(f"  ✓ Watch {args.id} deactivated")
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _naive_match(drops, watches):
+    """Reference: every drop against every watch."""
+    best = {}
+    for d in drops:
+        sizes = d.get("sizes") or {}
+        for w in watches:
+            category = w.get("category") or "shoes"
+            if category != d["category"] or w["product_slug"] != d.get("product_slug"):
+                continue
+            size = _size(w.get("eur_size")) if category == "shoes" else None
+            price = d["new_price"] if size is None else sizes.get(size)
+            if size is not None and price is not None and price >= d["old_price"] - PRICE_EPSILON:
+                continue  # this size did not drop
+            if price is None or price > _max_price(w) + PRICE_EPSILON:
+                continue
+            last = w.get("last_alert_price_eur")
+            if last is not None and price >= float(last) - PRICE_EPSILON:
+                continue
+            if w["id"] not in best or price < best[w["id"]][2]:
+                best[w["id"]] = (w, d, price)
+    return best
+
+
+def _selftest(n_watches=50000, n_drops=2000, n_slugs=3000, seed=9):
+    import random
+    import tempfile
+
+    rng = random.Random(seed)
+    cats = ["shoes"] * 6 + ["rope", "helmet", "harness"]
+    sizes = [s / 2 for s in range(72, 92)]
+    watches = []
+    for i in range(n_watches):
+        cat = rng.choice(cats)
+        watches.append({
+            "id": i + 1, "email": f"user{rng.randrange(n_watches // 3)}@example.com",
+            "category": cat, "product_slug": f"{cat}-{rng.randrange(n_slugs)}",
+            "eur_size": rng.choice(sizes) if cat == "shoes" and rng.random() < 0.7 else None,
+            "max_price_eur": round(rng.uniform(50, 250), 2) if rng.random() < 0.8 else None,
+            "last_alert_price_eur": round(rng.uniform(50, 250), 2) if rng.random() < 0.1 else None,
+            "active": True,
+        })
+    drops = []
+    for _ in range(n_drops):
+        cat = rng.choice(cats)
+        new = round(rng.uniform(40, 240), 2)
+        drop = {"category": cat, "product": f"Product {cat}", "product_slug": f"{cat}-{rng.randrange(n_slugs)}",
+                "retailer": rng.choice(["bergzeit.de", "sportokay.com"]), "old_price": round(new * 1.25, 2),
+                "new_price": new, "drop_pct": 20.0, "sizes": {}}
+        if cat == "shoes" and rng.random() < 0.9:  # else sizes not parsed
+            drop["sizes"] = {s: round(new + rng.choice([0, 0, 5, 10, new * 0.4]), 2)
+                             for s in rng.sample(sizes, rng.randint(4, 12))}
+            drop["new_price"] = min(drop["sizes"].values())
+        drops.append(drop)
+
+    t0 = time.perf_counter()
+    index = WatchIndex(watches)
+    matches = match_drops(drops, index)
+    digests = build_digests(matches)
+    with tempfile.TemporaryDirectory() as out:
+        sender = FileSender(out)
+        sent = send_digests(digests, sender)
+        files = len(os.listdir(out))
+    elapsed = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    reference = _naive_match(drops[:200], watches)
+    naive_200 = time.perf_counter() - t1
+    subset = match_drops(drops[:200], index)
+    assert {k: v[2] for k, v in subset.items()} == {k: v[2] for k, v in reference.items()}, \
+        "indexed matching differs from nested loop"
+    assert files == len(digests) and len(sent) == len(matches)
+
+    # A shoe drop without parsed sizes alerts unsized watches only
+    w_any = {"id": -1, "email": "a@example.com", "product_slug": "shoes-x", "eur_size": None}
+    w_42 = {"id": -2, "email": "b@example.com", "product_slug": "shoes-x", "eur_size": 42}
+    bare = {"category": "shoes", "product": "Shoe X", "product_slug": "shoes-x", "retailer": "bergzeit.de",
+            "new_price": 80.0, "sizes": {}}
+    got = [w["id"] for w, _ in WatchIndex([w_any, w_42]).match(bare)]
+    assert got == [-1] and list(_naive_match([bare], [w_any, w_42])) == [-1], got
+
+    # Sizes lists every in-stock size: one that did not fall never alerts,
+    # and one that did shows its own drop
+    w_43 = {"id": -3, "email": "b@example.com", "product_slug": "shoes-x", "eur_size": 43}
+    drop = dict(bare, old_price=100.0, new_price=80.0, drop_pct=20.0, sizes={42: 130.0, 43: 90.0})
+    got = {w["id"]: p for w, p in WatchIndex([w_42, w_43]).match(drop)}
+    assert got == {-3: 90.0} and set(_naive_match([drop], [w_42, w_43])) == {-3}, got
+    assert "€100.00 → €90.00 (-10.0%)" in format_digest([(w_43, drop, 90.0)])[1]
+
+    print(f"  ✓ {n_watches} watches x {n_drops} drops: {len(matches)} alerts, "
+          f"{len(digests)} digests written in {elapsed:.2f}s (index + match + send)")
+    print(f"    nested loop on 200 drops alone: {naive_200:.2f}s "
+          f"(~{naive_200 * n_drops / 200:.0f}s for all); results identical")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    elif len(sys.argv) > 1:
+        _cli(sys.argv[1:])
+    else:
+        print(__doc__)
@@ -2,13 +2,21 @@
 """
 run_all_crawlers.py — Master scheduler for climbing-gear price crawlers.
 
-Runs all crawlers in parallel, snapshots prices to history, then detects
-major price drops (>10%) compared to the previous snapshot.
+Runs all crawlers (max MAX_PARALLEL at a time, priority + longest-first,
+per-crawler timeouts), snapshots prices to history, then detects major
+price drops (>10%) compared to the previous snapshot.
+
+An interrupted run is resumed on the next start (within RESUME_MAX_AGE):
+finished crawlers are skipped and the rest resume from their checkpoints
+(~/crawl_logs/checkpoints). The run counts as finished once its crawlers
+are done, even if a post-crawl step (snapshot, trends, drops) fails.
+Per-crawler duration, page and row counts go to ~/crawl_logs/crawler_runs.jsonl.
 
 Usage:
   python3 run_all_crawlers.py                          # Run all crawlers
   python3 run_all_crawlers.py bergzeit naturzeit       # Run specific crawlers only
   python3 run_all_crawlers.py --drops-only             # Skip crawling, just check drops
+  python3 run_all_crawlers.py --fresh                  # Start a new run even if the last one was interrupted
 
 Schedule: every 6 hours via cron (00:00, 06:00, 12:00, 18:00 CET).
 """
@@ -20,7 +28,6 @@ import time
 import datetime
 import json
 import urllib.request
-import urllib.parse
 
 CRAWL_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_DIR = os.path.expanduser("~/crawl_logs")
@@ -48,19 +55,6 @@ ALL_CRAWLERS = [
     "crawl_sport_conrad", "crawl_sportokay", "crawl_tapir",
 ]
 
-# ── Price tables and their key columns ──────────────────────────────────────
-# (live_table, slug_col_or_id, name_col)
-PRICE_TABLES = [
-    ("shoe_prices",      "product_slug", "product_name"),
-    ("rope_prices",      "product_slug", "product_name"),
-    ("belay_prices",     "product_slug", "product_name"),
-    ("crashpad_prices",  "product_slug", "product_name"),
-    ("quickdraw_prices", "product_slug", "product_name"),
-    ("helmet_prices",    "product_slug", "product_name"),
-    ("harness_prices",   "product_slug", "product_name"),
-    ("jacket_prices",    "product_slug", "product_name"),
-]
-
 
 def supabase_get(table, select="*", params=""):
     """Fetch all rows from a Supabase table (handles pagination)."""
@@ -79,193 +73,294 @@ def supabase_get(table, select="*", params=""):
     return all_rows
 
 
-# ── Crawl orchestration ────────────────────────────────────────────────────
+# ── Crawl scheduling ───────────────────────────────────────────────────────
+# Crawlers run under a global concurrency cap, highest business priority
+# first and (within a priority) longest historical runtime first, so the
+# slow shops never end up starting last. Each crawler gets a hard timeout.
+# Progress is checkpointed (see checkpoint.py): a restarted run reuses the
+# unfinished run_id, skips crawlers that already finished and lets the
+# others skip categories they already wrote.
+
+MAX_PARALLEL = 8
+POLL_INTERVAL = 1          # seconds
+DEFAULT_TIMEOUT = 45 * 60  # seconds per crawler
+CRAWLER_TIMEOUTS = {
+    # Playwright shops walk every detail page
+    "crawl_bergzeit": 90 * 60,
+    "crawl_naturzeit": 90 * 60,
+}
+
+# 1 = start first (affiliate partners), 2 = everything else
+DEFAULT_PRIORITY = 2
+CRAWLER_PRIORITY = {
+    "crawl_bergfreunde": 1,
+    "crawl_gigasport": 1,
+}
+
+CHECKPOINT_DIR = os.path.join(LOG_DIR, "checkpoints")
+RUN_STATE_FILE = os.path.join(LOG_DIR, "current_run.json")
+RUN_LOG = os.path.join(LOG_DIR, "crawler_runs.jsonl")   # one JSON line per crawler per run
+HISTORY_RUNS = 5                                        # runs used for the runtime estimate
+RESUME_MAX_AGE = 12 * 3600   # seconds; an older unfinished run is abandoned, not resumed
+
+sys.path.insert(0, CRAWL_DIR)
+from categories import with_history  # noqa: E402
+from checkpoint import read_checkpoint  # noqa: E402
+from price_watch import notify_watchers  # noqa: E402
+from price_trends import update_trends  # noqa: E402
+
+
+def load_run_history(path=RUN_LOG):
+    """Read the per-crawler run log. Returns dict: crawler → list of records (oldest first)."""
+    history = {}
+    if not os.path.exists(path):
+        return history
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            history.setdefault(rec["crawler"], []).append(rec)
+    return history
+
+
+def expected_runtime(records):
+    """Median duration of the last HISTORY_RUNS successful runs (None if unknown)."""
+    ok = [r for r in records if r.get("status") == "ok"][-HISTORY_RUNS:]
+    durations = sorted(r["duration_s"] for r in ok)
+    if not durations:
+        return None
+    return durations[len(durations) // 2]
+
 
-def run_crawlers(selected):
-    """Launch selected crawlers in parallel, wait for completion, return error set."""
+def order_crawlers(selected, history):
+    """Sort by business priority, then longest expected runtime first.
+
+    Crawlers with no history are treated as longest (start early, learn their runtime).
+    """
+    def key(name):
+        runtime = expected_runtime(history.get(name, []))
+        return (CRAWLER_PRIORITY.get(name, DEFAULT_PRIORITY),
+                -(runtime if runtime is not None else float("inf")))
+    return sorted(selected, key=key)
+
+
+def _load_run_state(fresh=False):
+    """Resume the last run if it never finished and started less than
+    RESUME_MAX_AGE ago, otherwise start a new one."""
+    if not fresh and os.path.exists(RUN_STATE_FILE):
+        try:
+            with open(RUN_STATE_FILE) as f:
+                state = json.load(f)
+            started = datetime.datetime.fromisoformat(state["started_at"])
+            age = (datetime.datetime.now() - started).total_seconds()
+            if not state.get("finished"):
+                if age <= RESUME_MAX_AGE:
+                    return state, True
+                print(f"  ⚠ Run {state.get('run_id')} unfinished but {age / 3600:.0f}h old, "
+                      f"starting a new run")
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    run_id = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return {"run_id": run_id, "started_at": datetime.datetime.now().isoformat(),
+            "finished": False, "crawlers": {}}, False
+
+
+def _save_run_state(state):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    tmp = RUN_STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, RUN_STATE_FILE)
+
+
+def finish_run():
+    """Mark the current run finished (after snapshot + drop detection)."""
+    if os.path.exists(RUN_STATE_FILE):
+        with open(RUN_STATE_FILE) as f:
+            state = json.load(f)
+        state["finished"] = True
+        state["finished_at"] = datetime.datetime.now().isoformat()
+        _save_run_state(state)
+
+
+def _run_record(run_id, name, started, duration, ret, status):
+    """Per-crawler log line: timing from the scheduler, counts from the checkpoint."""
+    ckpt = read_checkpoint(CHECKPOINT_DIR, run_id, name) or {}
+    cats = ckpt.get("categories", {}).values()
+    sync = ckpt.get("sync", {}).values()
+    blocked = sorted(t for t, s in ckpt.get("sync", {}).items() if s.get("blocked"))
+    return {
+        "run_id": run_id,
+        "crawler": name,
+        "started_at": datetime.datetime.fromtimestamp(started).isoformat(),
+        "duration_s": round(duration, 1),
+        "exit": ret,
+        "status": status,
+        "pages": ckpt.get("pages", 0),
+        "products": sum(c.get("products", 0) for c in cats),
+        "matched": sum(c.get("matched", 0) for c in cats),
+        "rows_written": sum(t.get("written", 0) for t in sync),
+        "rows_unchanged": sum(t.get("unchanged", 0) for t in sync),
+        "rows_vanished": sum(t.get("vanished", 0) for t in sync),
+        "blocked_tables": blocked,
+    }
+
+
+def _stop(proc, grace=10):
+    proc.terminate()
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_crawlers(selected, fresh=False, max_parallel=MAX_PARALLEL):
+    """Run selected crawlers under the concurrency cap, return error set."""
     os.makedirs(LOG_DIR, exist_ok=True)
+    state, resumed = _load_run_state(fresh)
+    run_id = state["run_id"]
+    history = load_run_history()
 
     print(f"\n{'=' * 60}")
     print(f"  Running {len(selected)} crawlers — {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print(f"  Run {run_id}{' (resumed)' if resumed else ''}, max {max_parallel} in parallel")
     print(f"{'=' * 60}\n")
 
-    processes = {}
-    for crawler in selected:
-        script = os.path.join(CRAWL_DIR, f"{crawler}.py")
-        if not os.path.exists(script):
+    pending = []
+    for crawler in order_crawlers(selected, history):
+        if not os.path.exists(os.path.join(CRAWL_DIR, f"{crawler}.py")):
             print(f"  ✗ {crawler}.py not found, skipping")
-            continue
-        log_file = os.path.join(LOG_DIR, f"{crawler}.log")
-        with open(log_file, "w") as log:
+        elif state["crawlers"].get(crawler, {}).get("status") == "ok":
+            print(f"  ↷ {crawler} already finished in this run, skipping")
+        else:
+            pending.append(crawler)
+
+    env = dict(os.environ, CRAWL_RUN_ID=run_id, CRAWL_CHECKPOINT_DIR=CHECKPOINT_DIR)
+    running = {}   # name → (proc, started, log handle)
+    errors = set()
+    blocked = {}   # crawler → tables the health gate refused to sync
+    finished = 0
+    total = len(pending)
+
+    while pending or running:
+        while pending and len(running) < max_parallel:
+            name = pending.pop(0)
+            log = open(os.path.join(LOG_DIR, f"{name}.log"), "w")
             proc = subprocess.Popen(
-                [PYTHON, "-u", script],
-                stdout=log, stderr=subprocess.STDOUT,
-                cwd=CRAWL_DIR,
+                [PYTHON, "-u", os.path.join(CRAWL_DIR, f"{name}.py")],
+                stdout=log, stderr=subprocess.STDOUT, cwd=CRAWL_DIR, env=env,
             )
-            processes[crawler] = proc
-            print(f"  ▶ {crawler} started (PID {proc.pid})")
+            running[name] = (proc, time.time(), log)
+            expected = expected_runtime(history.get(name, []))
+            hint = f", usually {expected / 60:.0f} min" if expected else ""
+            print(f"  ▶ {name} started (PID {proc.pid}{hint})")
 
-    print(f"\n  Waiting for all {len(processes)} crawlers to finish...\n")
+        time.sleep(POLL_INTERVAL)
 
-    completed = set()
-    errors = set()
-    while len(completed) < len(processes):
-        for name, proc in processes.items():
-            if name in completed:
-                continue
+        for name, (proc, started, log) in list(running.items()):
+            elapsed = time.time() - started
             ret = proc.poll()
-            if ret is not None:
-                completed.add(name)
-                status = "✓" if ret == 0 else "✗"
-                if ret != 0:
-                    errors.add(name)
-                print(f"  {status} {name} finished (exit {ret}) [{len(completed)}/{len(processes)}]")
-        time.sleep(2)
+            if ret is None:
+                if elapsed <= CRAWLER_TIMEOUTS.get(name, DEFAULT_TIMEOUT):
+                    continue
+                _stop(proc)
+                ret, status = proc.returncode, "timeout"
+            else:
+                status = "ok" if ret == 0 else "error"
+            log.close()
+            del running[name]
+            finished += 1
+
+            rec = _run_record(run_id, name, started, elapsed, ret, status)
+            with open(RUN_LOG, "a") as f:
+                f.write(json.dumps(rec) + "\n")
+            state["crawlers"][name] = {"status": status, "duration_s": rec["duration_s"]}
+            _save_run_state(state)
+
+            if status != "ok":
+                errors.add(name)
+            mark = {"ok": "✓", "error": "✗", "timeout": "⏱"}[status]
+            print(f"  {mark} {name} {status} after {elapsed / 60:.1f} min "
+                  f"(exit {ret}, {rec['pages']} pages, {rec['products']} products, "
+                  f"{rec['rows_written']} rows written) [{finished}/{total}]")
+            if rec["blocked_tables"]:
+                blocked[name] = rec["blocked_tables"]
+                print(f"    ⚠ health gate blocked {', '.join(rec['blocked_tables'])} - previous data kept")
 
     print(f"\n{'=' * 60}")
-    print(f"  Crawl complete: {len(completed) - len(errors)} OK, {len(errors)} errors")
+    print(f"  Crawl complete: {total - len(errors)} OK, {len(errors)} errors")
     if errors:
         print(f"  Failed: {', '.join(sorted(errors))}")
+    if blocked:
+        print(f"  ⚠ Health gate blocked: " +
+              ", ".join(f"{n} ({', '.join(t)})" for n, t in sorted(blocked.items())))
+    print(f"  Per-crawler stats appended to {RUN_LOG}")
     print(f"{'=' * 60}")
     return errors
 
 
 # ── Price drop detection ───────────────────────────────────────────────────
-
-def _get_previous_prices_shoes():
-    """Get the most recent history snapshot for shoes (legacy schema).
-
-    Returns dict: (shoe_slug, retailer) → price_eur
-    """
-    # Get the most recent recorded_at timestamp
-    latest = supabase_get(
-        "price_history",
-        select="recorded_at",
-        params="&order=recorded_at.desc&limit=1",
-    )
-    if not latest:
-        return {}
-
-    latest_ts = urllib.parse.quote(latest[0]["recorded_at"], safe="")
-    rows = supabase_get(
-        "price_history",
-        select="shoe_slug,retailer,price_eur",
-        params=f"&recorded_at=eq.{latest_ts}",
-    )
-    return {
-        (r["shoe_slug"], r["retailer"]): r["price_eur"]
-        for r in rows
-        if r["price_eur"] is not None
-    }
-
-
-def _get_previous_prices_category(category):
-    """Get the most recent history snapshot for a category.
-
-    Returns dict: price_row_id → price_eur
-    """
-    hist_table = f"{category}_price_history"
-    id_col = f"{category}_price_id"
-
-    latest = supabase_get(
-        hist_table,
-        select="recorded_at",
-        params="&order=recorded_at.desc&limit=1",
+# Done in the database (detect_price_drops RPC, migration
+# 20261019030000_detect_price_drops.sql): live prices are joined against the last
+# history row per key server-side and only rows past DROP_THRESHOLD come back.
+
+def supabase_rpc(fn, params):
+    """Call a Postgres function via PostgREST and return its JSON result."""
+    req = urllib.request.Request(
+        f"{SUPABASE_URL}/rest/v1/rpc/{fn}",
+        data=json.dumps(params).encode(),
+        headers={k: v for k, v in HEADERS.items() if k != "Prefer"},
+        method="POST",
     )
-    if not latest:
-        return {}
-
-    latest_ts = urllib.parse.quote(latest[0]["recorded_at"], safe="")
-    rows = supabase_get(
-        hist_table,
-        select=f"{id_col},price_eur",
-        params=f"&recorded_at=eq.{latest_ts}",
-    )
-    return {
-        r[id_col]: r["price_eur"]
-        for r in rows
-        if r["price_eur"] is not None
-    }
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        raw = resp.read()
+    return json.loads(raw) if raw else []
+
+
+def _parse_sizes(sizes):
+    """{eur_size text: price} → {float size: float price}, skipping non-numeric sizes."""
+    out = {}
+    for size, price in (sizes or {}).items():
+        try:
+            out[round(float(str(size).replace(",", ".")), 1)] = float(price)
+        except ValueError:
+            continue
+    return out
 
 
-def detect_price_drops():
+def detect_price_drops(before=None):
     """Compare current live prices against previous snapshot. Flag drops > threshold.
 
     IMPORTANT: Only considers in-stock products. A price drop on an unavailable
     product is useless to the user — they can't buy it.
 
+    before: ISO timestamp; compare against history recorded before it (the
+    start of this run's snapshot). None = last recorded price per key.
+
     Returns list of dicts with drop details.
     """
-    drops = []
-
-    # ── Shoes (legacy schema: keyed by slug+retailer) ──
-    print("  Checking shoes...")
-    prev_shoes = _get_previous_prices_shoes()
-    if prev_shoes:
-        live_shoes = supabase_get(
-            "shoe_prices",
-            select="product_slug,retailer,price_eur,product_name,in_stock",
-            params="&price_eur=not.is.null&product_slug=not.is.null&in_stock=eq.true",
-        )
-        # Keep cheapest per (slug, retailer)
-        current = {}
-        names = {}
-        for r in live_shoes:
-            key = (r["product_slug"], r["retailer"])
-            if key not in current or (r["price_eur"] and r["price_eur"] < current[key]):
-                current[key] = r["price_eur"]
-                names[key] = r.get("product_name") or r["product_slug"]
-
-        for key, new_price in current.items():
-            old_price = prev_shoes.get(key)
-            if old_price and new_price and old_price > 0:
-                pct = (old_price - new_price) / old_price
-                if pct >= DROP_THRESHOLD:
-                    drops.append({
-                        "category": "shoes",
-                        "product": names.get(key, key[0]),
-                        "retailer": key[1],
-                        "old_price": old_price,
-                        "new_price": new_price,
-                        "drop_pct": round(pct * 100, 1),
-                    })
-    else:
-        print("    (no previous shoe snapshot to compare)")
-
-    # ── Other categories (keyed by price row id) ──
-    for live_table, slug_col, name_col in PRICE_TABLES:
-        if live_table == "shoe_prices":
-            continue
-        category = live_table.replace("_prices", "")
-        print(f"  Checking {category}...")
-
-        prev = _get_previous_prices_category(category)
-        if not prev:
-            print(f"    (no previous {category} snapshot to compare)")
-            continue
-
-        live = supabase_get(
-            live_table,
-            select=f"id,{slug_col},{name_col},retailer,price_eur,in_stock",
-            params="&price_eur=not.is.null&in_stock=eq.true",
-        )
-
-        for r in live:
-            old_price = prev.get(r["id"])
-            new_price = r["price_eur"]
-            if old_price and new_price and old_price > 0:
-                pct = (old_price - new_price) / old_price
-                if pct >= DROP_THRESHOLD:
-                    drops.append({
-                        "category": category,
-                        "product": r.get(name_col) or r.get(slug_col) or str(r["id"]),
-                        "retailer": r.get("retailer", "?"),
-                        "old_price": old_price,
-                        "new_price": new_price,
-                        "drop_pct": round(pct * 100, 1),
-                    })
-
-    return drops
+    rows = supabase_rpc("detect_price_drops", {
+        "p_threshold": DROP_THRESHOLD,
+        "p_before": before,
+        "p_categories": [c.drop_spec() for c in with_history()],
+    })
+    return [
+        {
+            "category": r["category"],
+            "product": r["product"],
+            "product_slug": r.get("product_slug"),
+            "retailer": r["retailer"],
+            "old_price": float(r["old_price"]),
+            "new_price": float(r["new_price"]),
+            "drop_pct": float(r["drop_pct"]),
+            # shoes only: {eur_size: cheapest in-stock price}
+            "sizes": _parse_sizes(r.get("sizes")),
+        }
+        for r in rows
+    ]
 
 
 def report_drops(drops):
@@ -304,32 +399,51 @@ def report_drops(drops):
 
 # ── Main ───────────────────────────────────────────────────────────────────
 
-def main():
-    drops_only = "--drops-only" in sys.argv
-    args = [a for a in sys.argv[1:] if not a.startswith("--")]
-
+def post_crawl(drops_only=False):
+    """Snapshot, trends, best prices, drop detection and watch alerts.
+    A failing step is reported and the later steps still run."""
+    snapshot_started = None
     if not drops_only:
-        # Determine which crawlers to run
-        if args:
-            selected = [f"crawl_{name}" if not name.startswith("crawl_") else name for name in args]
-        else:
-            selected = ALL_CRAWLERS
-
-        # Run crawlers
-        run_crawlers(selected)
-
         # Snapshot prices to history
         print("\n  Recording price history snapshot...")
-        from snapshot_prices import snapshot_all
-        snapshot_all()
+        snapshot_started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        try:
+            from snapshot_prices import snapshot_all
+            snapshot_all()
+        except Exception as e:
+            print(f"  ⚠ Price history snapshot failed: {e}")
+
+        # Fold the new history rows into the per-product trend table
+        try:
+            update_trends()
+        except Exception as e:
+            print(f"  ⚠ Price trend update failed: {e}")
+
+        # Cheapest offer per (shoe, size) for the scanner (shoe_best_prices view)
+        try:
+            n = supabase_rpc("refresh_shoe_best_prices", {})
+            print(f"  Shoe best prices refreshed: {n} (slug, size) rows")
+        except Exception as e:
+            print(f"  ⚠ Shoe best price refresh failed: {e}")
 
     # Detect and report price drops
     print(f"\n{'=' * 60}")
     print(f"  Price Drop Detection (threshold: >{DROP_THRESHOLD * 100:.0f}%)")
     print(f"{'=' * 60}")
-    drops = detect_price_drops()
+    try:
+        drops = detect_price_drops(before=snapshot_started)
+    except Exception as e:
+        print(f"  ⚠ Price drop detection failed: {e}")
+        drops = []
     report_drops(drops)
 
+    # Fan drops out to price watches (one digest per recipient)
+    if drops:
+        try:
+            notify_watchers(drops)
+        except Exception as e:
+            print(f"  ⚠ Price watch alerts failed: {e}")
+
     # Append one-line summary to run log
     os.makedirs(LOG_DIR, exist_ok=True)
     run_log = os.path.join(LOG_DIR, "run_history.log")
@@ -337,6 +451,31 @@ def main():
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
         f.write(f"{ts} | drops={len(drops)}\n")
 
+
+def main():
+    drops_only = "--drops-only" in sys.argv
+    fresh = "--fresh" in sys.argv
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+
+    if not drops_only:
+        # Determine which crawlers to run
+        if args:
+            selected = [f"crawl_{name}" if not name.startswith("crawl_") else name for name in args]
+        else:
+            selected = ALL_CRAWLERS
+
+        # Run crawlers
+        run_crawlers(selected, fresh=fresh)
+
+    # The run is finished once its crawlers are done, whatever happens in
+    # the post-crawl steps below; otherwise every later start would
+    # "resume" it and skip every crawler.
+    try:
+        post_crawl(drops_only)
+    finally:
+        if not drops_only:
+            finish_run()
+
     print("\n  Done!")
 
 
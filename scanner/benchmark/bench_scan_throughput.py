@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+End-to-end scan throughput benchmark for scan_worker.
+
+Enqueues N synthetic scans (fixture sole + side photos in Storage, a
+pending foot_scan_fits row with preferences) on the local Supabase
+stand-in (scripts/local_supabase.py) and lets the worker's own poll /
+process functions drain the queue, with the segmenter swapped out:
+
+  stub     threshold + largest component on the fixture photos (no model)
+  cached   masks cached per photo in --mask-cache; SAM 3 runs only on a miss
+  sam3     the real segmenter every time
+
+Each worker function is timed into one stage. Time is exclusive (a stage
+nested in another, e.g. an update_scan inside scoring, is not counted
+twice); time not inside any stage goes to "other".
+
+  download   photo download from Storage
+  segment    foot_measure.segment (stub / cached / sam3)
+  normalize  sole / side orientation normalization
+  measure    sole / side measurement
+  overlay    overlay drawing + upload
+  score      recommendation scoring (V1 matrix scorer / V2 pipeline)
+  interpret  interpretation sections + shoe descriptions
+  write      stage updates, measurement and result writes
+  read       scan row re-fetches
+  poll       queue polls
+
+The report (JSON, sorted keys, milliseconds) has per-stage p50/p90/p99/
+mean/max over scans, end-to-end latency percentiles and scans per minute,
+and is meant to be diffed between commits (--compare prints the deltas).
+Only scans that reach pipeline_stage "complete" count toward the latency
+stats and throughput; the others show up in "outcomes" only.
+
+Usage:
+    python3 benchmark/bench_scan_throughput.py                       # 50 scans, stub segmenter, V2
+    python3 benchmark/bench_scan_throughput.py --scans 200 --latency-ms 40
+    python3 benchmark/bench_scan_throughput.py --segmenter cached --fixtures ~/scan_photos
+    python3 benchmark/bench_scan_throughput.py --pipeline v1 --out /tmp/v1.json
+    python3 benchmark/bench_scan_throughput.py --compare benchmark/results/scan_throughput.json
+
+--fixtures DIR uses real photo pairs (<name>-sole.jpg, optional <name>-side.jpg)
+instead of the synthetic silhouettes.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCANNER_DIR = Path(__file__).resolve().parents[1]
+REPO_ROOT = SCANNER_DIR.parent
+sys.path.insert(0, str(SCANNER_DIR))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from local_supabase import LocalSupabase  # noqa: E402
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+STAGES = ["download", "segment", "normalize", "measure", "overlay",
+          "score", "interpret", "write", "read", "poll", "other"]
+DEFAULT_OUT = Path(__file__).resolve().parent / "results" / "scan_throughput.json"
+BUCKET = "foot-scans"
+
+COMBOS = [("sport", "outdoor", "limestone", "balanced"),
+          ("boulder", "indoor", None, "aggressive"),
+          ("trad_multipitch", "outdoor", "granite", "comfort"),
+          ("sport", "indoor", None, "balanced")]
+
+
+# ── Stage timing ────────────────────────────────────────────────────────────
+
+class StageClock:
+    """Exclusive per-stage time of the scan currently in flight."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.current = None
+
+    def start_scan(self):
+        self.current = dict.fromkeys(STAGES, 0.0)
+        self.local.stack = [["other", time.perf_counter()]]
+
+    def finish_scan(self):
+        now = time.perf_counter()
+        stage, since = self.local.stack[0]
+        self.current[stage] += now - since
+        done, self.current = self.current, None
+        return done
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            stack = getattr(self.local, "stack", None)
+            if self.current is None or stack is None:
+                return fn(*args, **kwargs)
+            now = time.perf_counter()
+            top = stack[-1]
+            self.current[top[0]] += now - top[1]
+            stack.append([stage, now])
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                name, since = stack.pop()
+                self.current[name] += end - since
+                stack[-1][1] = end
+        return timed
+
+
+def instrument(clock, worker, segment_fn):
+    """Wrap the worker's functions (module attributes) into stages."""
+    import foot_measure
+    import scan_recommender
+
+    plan = [
+        (worker, "download_photo", "download"),
+        (foot_measure, "normalize_sole_orientation", "normalize"),
+        (foot_measure, "normalize_side_orientation", "normalize"),
+        (foot_measure, "measure_sole", "measure"),
+        (foot_measure, "measure_side", "measure"),
+        (foot_measure, "draw_sole_overlay", "overlay"),
+        (foot_measure, "draw_side_overlay", "overlay"),
+        (scan_recommender, "upload_overlay", "overlay"),
+        (worker, "generate_recommendations", "score"),
+        (scan_recommender, "update_scan", "write"),
+        (worker, "update_stage", "write"),
+        (scan_recommender, "fetch_scan_data", "read"),
+        (worker, "fetch_pending_scans", "poll"),
+    ]
+    # Interpretation engines, looked up as module attributes at call time
+    try:
+        import v2_pipeline
+        plan += [(v2_pipeline, name, "interpret") for name in (
+            "generate_foot_shape", "_shoe_fit_with_artifact_filter",
+            "generate_what_to_look_for_v2", "generate_shoe_description_v2")]
+    except ImportError:
+        pass
+    for module, name in [("benchmark.interp_foot_shape", "generate_foot_shape"),
+                         ("benchmark.interp_shoe_fit", "generate_shoe_fit"),
+                         ("benchmark.interp_what_to_look_for", "generate_what_to_look_for"),
+                         ("benchmark.interp_shoe_desc", "generate_shoe_description")]:
+        try:
+            mod = __import__(module, fromlist=[name])
+            plan.append((mod, name, "interpret"))
+        except ImportError:
+            pass
+
+    for mod, name, stage in plan:
+        if hasattr(mod, name):
+            setattr(mod, name, clock.wrap(stage, getattr(mod, name)))
+    foot_measure.segment = clock.wrap("segment", segment_fn)
+
+
+# ── Segmenters ──────────────────────────────────────────────────────────────
+
+def stub_segment(img_bgr, prompt="foot"):
+    """Otsu threshold → largest component → holes filled (the SAM 3 post-processing)."""
+    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(binary, 8)
+    if n_labels > 1:
+        largest = 1 + np.argmax(stats[1:, cv2.CC_STAT_AREA])
+        binary = ((labels == largest) * 255).astype(np.uint8)
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is not None:
+        for i in range(len(contours)):
+            if hierarchy[0][i][3] >= 0:
+                cv2.drawContours(binary, contours, i, 255, -1)
+    return binary
+
+
+def cached_segment(cache_dir, real_segment):
+    """Masks keyed by the decoded photo; SAM 3 only runs on a cache miss."""
+    os.makedirs(cache_dir, exist_ok=True)
+    stats = {"hits": 0, "misses": 0}
+
+    def segment(img_bgr, prompt="foot"):
+        key = hashlib.sha1(img_bgr.tobytes() + prompt.encode()).hexdigest()
+        path = os.path.join(cache_dir, f"{key}.png")
+        mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE) if os.path.exists(path) else None
+        if mask is not None:
+            stats["hits"] += 1
+            return mask
+        stats["misses"] += 1
+        mask = real_segment(img_bgr, prompt=prompt)
+        cv2.imwrite(path, mask)
+        return mask
+
+    segment.stats = stats
+    return segment
+
+
+# ── Fixtures ────────────────────────────────────────────────────────────────
+
+def _jpeg(img):
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    assert ok
+    return buf.tobytes()
+
+
+def synthetic_sole(rng):
+    """Light foot silhouette (toes up) on a dark floor, 900x1400."""
+    img = np.full((1400, 900, 3), 45, np.uint8)
+    img += np.linspace(0, 20, 1400, dtype=np.uint8)[:, None, None]
+    ff_w, heel_w = rng.randint(150, 190), rng.randint(115, 150)
+    cx, ff_y, heel_y = 450 + rng.randint(-20, 20), 560, 1150
+    color = (200, 205, 215)
+    cv2.ellipse(img, (cx, heel_y), (heel_w, 170), 0, 0, 360, color, -1)
+    cv2.ellipse(img, (cx + 15, ff_y), (ff_w, 230), 0, 0, 360, color, -1)
+    arch = np.array([[cx - heel_w + 10, heel_y], [cx - ff_w + 40, ff_y + 120],
+                     [cx + ff_w + 10, ff_y + 100], [cx + heel_w, heel_y]], np.int32)
+    cv2.fillPoly(img, [arch], color)
+    # Toe lengths: egyptian (big toe longest), greek (2nd), roman (first three level)
+    shape = rng.choice(["egyptian", "greek", "roman"])
+    lengths = {"egyptian": [60, 45, 35, 25, 15], "greek": [45, 60, 40, 25, 15],
+               "roman": [52, 52, 50, 30, 15]}[shape]
+    for i, length in enumerate(lengths):
+        x = cx - ff_w + 45 + i * (2 * ff_w - 70) // 4
+        radius = 42 - i * 5
+        cv2.circle(img, (x, ff_y - 200 - length), radius, color, -1)
+        cv2.rectangle(img, (x - radius, ff_y - 200 - length), (x + radius, ff_y - 120), color, -1)
+    return img
+
+
+def synthetic_side(rng):
+    """Medial side profile, heel left / toes right, 1400x900."""
+    img = np.full((900, 1400, 3), 50, np.uint8)
+    instep = rng.randint(0, 60)
+    pts = np.array([[200, 780], [170, 700], [210, 560], [330, 430 - instep],
+                    [520, 520 - instep // 2], [900, 650], [1180, 730],
+                    [1210, 770], [1150, 790], [600, 800], [300, 800]], np.int32)
+    cv2.fillPoly(img, [pts], (190, 196, 210))
+    return img
+
+
+def fixture_photos(n, seed, fixtures_dir=None):
+    """[(sole_jpeg, side_jpeg or None)] for n scans."""
+    if fixtures_dir:
+        pairs = []
+        for sole in sorted(Path(fixtures_dir).expanduser().glob("*-sole.jpg")):
+            side = sole.with_name(sole.name.replace("-sole.jpg", "-side.jpg"))
+            pairs.append((sole.read_bytes(), side.read_bytes() if side.exists() else None))
+        if not pairs:
+            raise SystemExit(f"  ✗ no *-sole.jpg photos in {fixtures_dir}")
+        return [pairs[i % len(pairs)] for i in range(n)]
+    rng = random.Random(seed)
+    # A pool of distinct feet, reused round-robin (like repeat customers in cached mode)
+    pool = [(_jpeg(synthetic_sole(rng)), _jpeg(synthetic_side(rng))) for _ in range(min(n, 20))]
+    return [pool[i % len(pool)] for i in range(n)]
+
+
+def enqueue(sb, n, seed, pipeline, photos):
+    """Upload photos and insert pending scans with preferences filled in."""
+    rng = random.Random(seed)
+    profiles = [json.loads(json.dumps(r)) for r in sb.rows("foot_scan_fits")] or [{}]
+    scan_ids = []
+    for i in range(n):
+        scan_id = f"bench-{seed}-{i:05d}"
+        sole, side = photos[i]
+        sb.put_object(BUCKET, f"scans/{scan_id}-sole.jpg", sole, "image/jpeg")
+        if side:
+            sb.put_object(BUCKET, f"scans/{scan_id}-side.jpg", side, "image/jpeg")
+        base = profiles[i % len(profiles)]
+        row = {"scan_id": scan_id, "pipeline_stage": "pending",
+               "sex": base.get("sex") or rng.choice(["female", "male"]),
+               "street_size_eu": base.get("street_size_eu") or rng.choice([39, 41, 42.5, 44]),
+               "shoes": base.get("shoes") or [],
+               "next_shoe_preference": base.get("next_shoe_preference") or "allround",
+               "created_at": f"2026-10-19T00:00:00.{i:06d}+00:00"}
+        if pipeline == "v2":
+            discipline, environment, rock, aggressiveness = COMBOS[i % len(COMBOS)]
+            row.update(discipline=discipline, environment=environment,
+                       rock_type=rock, aggressiveness=aggressiveness)
+        sb.insert("foot_scan_fits", [row])
+        scan_ids.append(scan_id)
+    return scan_ids
+
+
+# ── Report ──────────────────────────────────────────────────────────────────
+
+def _pct(values, q):
+    if not values:
+        return None
+    s = sorted(values)
+    k = (len(s) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def summarize(values):
+    ms = [v * 1000 for v in values]
+    return {"p50": round(_pct(ms, 0.5), 2), "p90": round(_pct(ms, 0.9), 2),
+            "p99": round(_pct(ms, 0.99), 2), "mean": round(statistics.fmean(ms), 2),
+            "max": round(max(ms), 2)} if ms else None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(config, per_scan, outcomes, wall_s, warmup_s, extra):
+    totals = [sum(s.values()) for s in per_scan]
+    return {
+        "config": config,
+        "commit": _git_commit(),
+        "scans": len(per_scan),
+        "outcomes": dict(sorted(outcomes.items())),
+        "throughput_scans_per_min": round(len(per_scan) / wall_s * 60, 2) if wall_s else None,
+        "wall_s": round(wall_s, 3),
+        "warmup_s": round(warmup_s, 3),
+        "end_to_end_ms": summarize(totals),
+        "stages_ms": {st: summarize([s[st] for s in per_scan]) for st in STAGES},
+        "stage_share_pct": {st: round(100 * sum(s[st] for s in per_scan) / sum(totals), 1)
+                            for st in STAGES} if sum(totals) else {},
+        **extra,
+    }
+
+
+def print_report(r):
+    print(f"\n  {r['scans']} scans in {r['wall_s']:.1f}s → {r['throughput_scans_per_min']} scans/min "
+          f"(warm-up {r['warmup_s']:.1f}s)  outcomes: {r['outcomes']}")
+    e = r["end_to_end_ms"]
+    if e:
+        print(f"  end-to-end   p50 {e['p50']:9.1f}  p90 {e['p90']:9.1f}  p99 {e['p99']:9.1f} ms")
+    for st in STAGES:
+        s = r["stages_ms"].get(st)
+        if s and s["max"] > 0:
+            print(f"  {st:11s}  p50 {s['p50']:9.1f}  p90 {s['p90']:9.1f}  p99 {s['p99']:9.1f} ms"
+                  f"   {r['stage_share_pct'].get(st, 0):5.1f}%")
+
+
+def print_compare(old, new):
+    print(f"\n  vs {old.get('commit') or 'baseline'}: throughput "
+          f"{old.get('throughput_scans_per_min')} → {new['throughput_scans_per_min']} scans/min")
+    for st in ["end_to_end"] + STAGES:
+        a = old["end_to_end_ms"] if st == "end_to_end" else old.get("stages_ms", {}).get(st)
+        b = new["end_to_end_ms"] if st == "end_to_end" else new["stages_ms"].get(st)
+        if not a or not b or not (a["p50"] or b["p50"]):
+            continue
+        delta = (b["p50"] - a["p50"]) / a["p50"] * 100 if a["p50"] else float("inf")
+        print(f"  {st:11s}  p50 {a['p50']:9.1f} → {b['p50']:9.1f} ms ({delta:+.0f}%)"
+              f"   p90 {a['p90']:9.1f} → {b['p90']:9.1f}")
+
+
+# ── Main ────────────────────────────────────────────────────────────────────
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scans", type=int, default=50)
+    ap.add_argument("--segmenter", choices=["stub", "cached", "sam3"], default="stub")
+    ap.add_argument("--mask-cache", default=os.path.expanduser("~/foot-scanner/mask_cache"))
+    ap.add_argument("--fixtures", help="directory of real <name>-sole.jpg / <name>-side.jpg photos")
+    ap.add_argument("--pipeline", choices=["v1", "v2"], default="v2")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulated Supabase round trip")
+    ap.add_argument("--seed", type=int, default=11)
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--compare", help="earlier report to diff against")
+    args = ap.parse_args()
+
+    os.environ["SCANNER_PIPELINE"] = args.pipeline
+    photos = fixture_photos(args.scans, args.seed, args.fixtures)
+
+    with LocalSupabase(latency_ms=args.latency_ms, redirect_children=False) as sb, \
+            tempfile.TemporaryDirectory() as results_dir:
+        import foot_measure
+        import scan_worker
+
+        scan_worker.RESULTS_DIR = results_dir
+        scan_worker.log = lambda msg: None
+
+        if args.segmenter == "stub":
+            segment_fn = stub_segment
+        elif args.segmenter == "cached":
+            segment_fn = cached_segment(args.mask_cache, foot_measure.segment)
+        else:
+            segment_fn = foot_measure.segment
+        clock = StageClock()
+        instrument(clock, scan_worker, segment_fn)
+
+        # Engine data and (real segmenter) model load once per worker process
+        t0 = time.perf_counter()
+        if args.pipeline == "v2":
+            scan_worker._load_v2_engine_data()
+        else:
+            scan_worker._load_engine_data()
+        if args.segmenter != "stub":
+            foot_measure._load_sam3()
+        warmup_s = time.perf_counter() - t0
+
+        scan_ids = enqueue(sb, args.scans, args.seed, args.pipeline, photos)
+        per_scan, processed = [], []
+        t0 = time.perf_counter()
+        while True:
+            clock.start_scan()
+            pending = scan_worker.fetch_pending_scans()
+            if not pending:
+                clock.finish_scan()
+                break
+            scan_worker.process_pending_scan(pending[0])
+            per_scan.append(clock.finish_scan())
+            processed.append(pending[0]["scan_id"])
+            if len(per_scan) % 10 == 0:
+                print(f"  {len(per_scan)}/{len(scan_ids)} scans", file=sys.stderr)
+        wall_s = time.perf_counter() - t0
+
+        ids = set(scan_ids)
+        outcomes, stages = {}, {}
+        for row in sb.rows("foot_scan_fits"):
+            if row["scan_id"] in ids:
+                stage = row.get("pipeline_stage") or "none"
+                outcomes[stage] = outcomes.get(stage, 0) + 1
+                stages[row["scan_id"]] = stage
+        # A scan that errored out skips most stages: keep it out of the stats
+        per_scan = [t for sid, t in zip(processed, per_scan) if stages.get(sid) == "complete"]
+        if len(per_scan) < len(scan_ids):
+            print(f"  ⚠ {len(scan_ids) - len(per_scan)} of {len(scan_ids)} scans did not complete "
+                  f"({outcomes}); left out of the latency stats", file=sys.stderr)
+        extra = {"rest_requests": sb.store.requests}
+        if args.segmenter == "cached":
+            extra["mask_cache"] = dict(segment_fn.stats)
+
+    config = {"scans": args.scans, "segmenter": args.segmenter, "pipeline": args.pipeline,
+              "latency_ms": args.latency_ms, "seed": args.seed,
+              "fixtures": "real" if args.fixtures else "synthetic"}
+    report = build_report(config, per_scan, outcomes, wall_s, warmup_s, extra)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\n  Report written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,10 @@ if not SB_KEY:
     raise RuntimeError("SUPABASE_SECRET_KEY (or legacy SUPABASE_SERVICE_KEY) must be set")
 HEADERS = {"apikey": SB_KEY, "Authorization": f"Bearer {SB_KEY}"}
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shoe_best_prices import load_best_price_rows, best_price_per_slug, size_availability
+from shoe_catalog import catalog_for
+
 
 def load_shoes():
     resp = requests.get(f"{SB_URL}/rest/v1/shoes", headers=HEADERS,
@@ -39,61 +43,17 @@ def load_brand_sizing():
 
 
 def load_best_prices():
-    """Load best (lowest) in-stock price per shoe slug."""
-    all_rows = []
-    offset = 0
-    while True:
-        resp = requests.get(f"{SB_URL}/rest/v1/shoe_prices", headers=HEADERS,
-            params={"select": "product_slug,price_eur",
-                    "in_stock": "eq.true", "price_eur": "not.is.null",
-                    "limit": 1000, "offset": offset})
-        resp.raise_for_status()
-        batch = resp.json()
-        if not batch:
-            break
-        all_rows.extend(batch)
-        offset += 1000
+    """Load best (lowest) in-stock price per shoe slug, over all sizes.
 
-    best = {}
-    for row in all_rows:
-        slug = row.get("product_slug")
-        price = row.get("price_eur")
-        if slug and price is not None:
-            price = float(price)
-            if slug not in best or price < best[slug]:
-                best[slug] = price
-    return best
+    From shoe_best_prices (one row per slug + size, see
+    scanner/shoe_best_prices.py), shared with load_size_availability.
+    """
+    return best_price_per_slug(load_best_price_rows())
 
 
 def load_size_availability():
-    # Paginate through all in-stock rows (Supabase default limit is 1000)
-    all_rows = []
-    offset = 0
-    while True:
-        resp = requests.get(f"{SB_URL}/rest/v1/shoe_prices", headers=HEADERS,
-            params={"select": "product_slug,sizes_available", "in_stock": "eq.true",
-                    "limit": 1000, "offset": offset})
-        resp.raise_for_status()
-        batch = resp.json()
-        if not batch:
-            break
-        all_rows.extend(batch)
-        offset += 1000
-
-    avail = {}
-    for row in all_rows:
-        slug = row.get("product_slug")
-        sizes_raw = row.get("sizes_available") or []
-        if isinstance(sizes_raw, str):
-            try: sizes_raw = json.loads(sizes_raw)
-            except: sizes_raw = []
-        if slug and sizes_raw:
-            if slug not in avail:
-                avail[slug] = set()
-            for s in sizes_raw:
-                try: avail[slug].add(float(s))
-                except: pass
-    return avail
+    """slug -> set of in-stock EU sizes at any retailer (both storage models)."""
+    return size_availability(load_best_price_rows())
 
 
 # --- Helpers ---
@@ -152,24 +112,7 @@ def _tier_rank(levels):
 
 def _lookup_user_shoes(profile, shoes_db):
     """Look up user's current shoes in DB. Returns list of (user_shoe_entry, db_shoe)."""
-    shoe_by_key = {}
-    for s in shoes_db:
-        key = f"{s['brand']} {s['model']}".lower()
-        shoe_by_key[key] = s
-
-    results = []
-    for us in profile.get("shoes") or []:
-        brand = us.get("brand", "")
-        model = us.get("model", "")
-        key = f"{brand} {model}".lower()
-        db_shoe = shoe_by_key.get(key)
-        if not db_shoe:
-            for db_key, s in shoe_by_key.items():
-                if key in db_key or db_key in key:
-                    db_shoe = s
-                    break
-        results.append((us, db_shoe))
-    return results
+    return catalog_for(shoes_db).lookup_user_shoes(profile.get("shoes"), require_both=False)
 
 
 # --- Matrix Scoring ---
@@ -1116,11 +1059,13 @@ def score_all_shoes(case, shoes_db, brand_sizing, size_avail):
     profile = case["profile"]
     scored = []
 
-    for shoe in shoes_db:
-        # Hard filter: kids
-        if shoe.get("kids_friendly") and (profile.get("street_size_eu") or 42) >= 36:
-            continue
+    # Hard filter: kids (catalog bitset; adult-sized users skip kids shoes)
+    catalog = catalog_for(shoes_db)
+    candidates = catalog.all_mask
+    if (profile.get("street_size_eu") or 42) >= 36:
+        candidates &= ~catalog.kids_mask
 
+    for shoe in catalog.subset(candidates):
         total, breakdown = matrix_score(shoe, profile, shoes_db)
 
         # Size availability penalty
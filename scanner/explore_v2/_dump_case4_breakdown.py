@@ -6,6 +6,9 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+# Per-(slug,size) best prices (shoe_best_prices view), as the V2 engine reads them
+from shoe_best_prices import load_best_price_rows as load_price_rows
+
 from target_resolver_v2 import resolve_targets_v2
 from matrix_scorer_v2 import compute_use_case_target, assemble_tiers
 from interp_shoe_desc_v2 import flatten_pick
@@ -34,20 +37,6 @@ def load_scan(sid):
     return r.json()[0]
 
 
-def load_price_rows():
-    rows, offset = [], 0
-    while True:
-        r = requests.get(f"{SB_URL}/rest/v1/shoe_prices", headers=HEADERS,
-            params={"select": "product_slug,price_eur,in_stock,sizes_available",
-                    "limit": 1000, "offset": offset}, timeout=30)
-        r.raise_for_status()
-        b = r.json()
-        if not b: break
-        rows.extend(b)
-        offset += 1000
-    return rows
-
-
 def main():
     print(f"# Loading scan {SCAN_ID[:8]} ...", file=sys.stderr)
     scan = load_scan(SCAN_ID)
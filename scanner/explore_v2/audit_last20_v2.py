@@ -5,6 +5,9 @@ scan, runs §1+§2+§3 generators, writes a markdown report for review.
 
 Sandbox-only.  No production writes.
 
+Scans render in parallel (case_runner); `--limit N` audits the last N
+scans instead of 20, `--workers 1` runs serially.
+
 Output: scanner/explore_v2/audit_last20_2026_05_01.md
 """
 import os, sys, json, random, requests
@@ -20,6 +23,7 @@ from interp_foot_shape_v2 import generate_foot_shape
 from interp_shoe_fit_v2 import generate_shoe_fit
 from interp_what_to_look_for_v2 import generate_what_to_look_for_v2
 from check_full_v2_matrix import load_shoes_db, build_profile
+from case_runner import run_cases, workers_arg
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 # Roman 2026-05-08: keys migrated to sb_secret_/sb_publishable_ format.
@@ -128,7 +132,7 @@ def render_scan(scan, shoes_db):
 
 def render_md(results):
     lines = []
-    lines.append("# V2 audit — last 20 scans")
+    lines.append(f"# V2 audit - last {len(results)} scans")
     lines.append("")
     lines.append("Generated 2026-05-01. Sandbox-only. Per-scan random V2 inputs "
                  "(seeded by scan_id for reproducibility).")
@@ -177,21 +181,25 @@ def render_md(results):
 
 
 def main():
-    print("# loading shoes_db + last 20 scans …", file=sys.stderr)
+    limit = 20
+    if "--limit" in sys.argv:
+        limit = int(sys.argv[sys.argv.index("--limit") + 1])
+    print(f"# loading shoes_db + last {limit} scans …", file=sys.stderr)
     shoes_db = load_shoes_db()
-    scans = load_recent_scans(20)
+    scans = load_recent_scans(limit)
     print(f"# {len(scans)} scans loaded", file=sys.stderr)
 
     results = []
-    for i, scan in enumerate(scans, 1):
-        print(f"  [{i}/{len(scans)}] {scan['scan_id']}", file=sys.stderr)
-        try:
-            results.append(render_scan(scan, shoes_db))
-        except Exception as e:
+    for r, scan in zip(run_cases(render_scan, scans, shared=shoes_db,
+                                 workers=workers_arg(sys.argv), progress=True),
+                       scans):
+        if r.ok:
+            results.append(r.value)
+        else:
             results.append({
                 "scan_id": scan["scan_id"],
                 "created_at": scan.get("created_at"),
-                "error": f"{type(e).__name__}: {e}",
+                "error": r.error,
             })
 
     md = render_md([r for r in results if "error" not in r])
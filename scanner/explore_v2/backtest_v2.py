@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""Historical backtest - how a scoring change moves picks across past scans.
+
+Streams completed foot_scan_fits rows from a local export, scores every
+scan twice on a process pool (case_runner) - once with the current
+matrix_scorer_v2 config, once with a candidate config - and reports:
+
+    pick churn          per tier and overall, top-pick changes, scans touched
+    brand distribution  pick counts per brand, current vs candidate
+    price distribution  price at recommended size over all picks
+    hard-filter drops   share of the catalog removed per scan by the kids
+                        and owned filters, a closure override and no discipline
+                        overlap (config-independent, reported once)
+
+and, for rows that carry stored V2 recommendations, how far the current
+code's picks have drifted from what production wrote.
+
+Scoring goes through whatif_v2.WhatIfScorer (indexed prices, shared axis
+columns), which reproduces assemble_tiers pick-for-pick.
+
+Candidate config (JSON), every key optional:
+    {
+      "axis_weights":         {"toe_form": 1.5, "availability": 0},
+      "tier_stiffness_shift": {"softer": -0.15, "stiffer": 0.15},
+      "per_tier_brand_cap": 1, "global_brand_cap": 3,
+      "per_tier_no_edge_cap": 1, "tier_size": 3, "budget_pool_size": 30
+    }
+axis_weights multiply the named SCORING_AXES scores (1 = unchanged).
+
+Inputs:
+    export   foot_scan_fits rows as .jsonl / .jsonl.gz (one row per line),
+             a .json array, or a local_supabase.py --dump state file.
+             Rows without V2 preferences (V1 scans) get seeded-random ones,
+             as in audit_last20_v2.
+    engine   {"shoes_db", "price_rows", "brand_sizing"} - the golden
+             fixture format (golden_run.py capture), default
+             golden/fixtures/engine.json.
+
+Usage:
+    python3 backtest_v2.py scans.jsonl --candidate cand.json
+        [--engine engine.json] [--limit N] [--workers N] [--json out.json]
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+_ROOT = _HERE.parent
+for _p in (str(_HERE), str(_ROOT)):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+import matrix_scorer_v2 as M
+from matrix_scorer_v2 import HARD_FILTERS, HARD_FILTER_MASKS, discipline_mask
+from v2_pipeline import closure_override
+from whatif_v2 import WhatIfScorer, TIERS, DISCIPLINES, ENVIRONMENTS, ROCKS, AGGRESSIVENESS
+from case_runner import run_cases, timing_summary
+
+DEFAULT_ENGINE = _HERE / "golden" / "fixtures" / "engine.json"
+
+# config key -> matrix_scorer_v2 module constant
+_CAP_KEYS = {
+    "per_tier_brand_cap":   "PER_TIER_BRAND_CAP",
+    "global_brand_cap":     "GLOBAL_BRAND_CAP",
+    "per_tier_no_edge_cap": "PER_TIER_NO_EDGE_CAP",
+    "tier_size":            "TIER_SIZE",
+    "budget_pool_size":     "BUDGET_POOL_SIZE",
+}
+CONFIG_KEYS = {"axis_weights", "tier_stiffness_shift"} | set(_CAP_KEYS)
+
+
+# ── Candidate config ────────────────────────────────────────────────────
+
+def validate_config(cfg):
+    """Raise ValueError on keys the scorer does not have."""
+    unknown = set(cfg) - CONFIG_KEYS
+    if unknown:
+        raise ValueError(f"unknown config key(s): {sorted(unknown)}")
+    axes = {name for name, _fn in M.SCORING_AXES}
+    bad = set(cfg.get("axis_weights") or {}) - axes
+    if bad:
+        raise ValueError(f"unknown axis(es): {sorted(bad)} (have {sorted(axes)})")
+    bad = set(cfg.get("tier_stiffness_shift") or {}) - set(M.TIER_STIFFNESS_SHIFT)
+    if bad:
+        raise ValueError(f"unknown tier(s): {sorted(bad)}")
+    return cfg
+
+
+def _weighted(fn, w):
+    def axis(shoe, target, profile):
+        s, note = fn(shoe, target, profile)
+        return s * w, note
+    return axis
+
+
+@contextlib.contextmanager
+def scoring_config(cfg):
+    """Apply a candidate config to matrix_scorer_v2 for the with-block.
+
+    Patches the module constants in place (SCORING_AXES and
+    TIER_STIFFNESS_SHIFT are shared by name with whatif_v2), then
+    restores them."""
+    axes = list(M.SCORING_AXES)
+    shifts = dict(M.TIER_STIFFNESS_SHIFT)
+    caps = {attr: getattr(M, attr) for attr in _CAP_KEYS.values()}
+    weights = cfg.get("axis_weights") or {}
+    try:
+        M.SCORING_AXES[:] = [(name, fn if weights.get(name, 1) == 1
+                              else _weighted(fn, weights[name]))
+                             for name, fn in axes]
+        M.TIER_STIFFNESS_SHIFT.update(cfg.get("tier_stiffness_shift") or {})
+        for key, attr in _CAP_KEYS.items():
+            if key in cfg:
+                setattr(M, attr, int(cfg[key]))
+        yield
+    finally:
+        M.SCORING_AXES[:] = axes
+        M.TIER_STIFFNESS_SHIFT.clear()
+        M.TIER_STIFFNESS_SHIFT.update(shifts)
+        for attr, value in caps.items():
+            setattr(M, attr, value)
+
+
+# ── Export reading ──────────────────────────────────────────────────────
+
+def iter_scan_rows(path):
+    """Yield foot_scan_fits rows from a .jsonl[.gz], .json array or
+    local_supabase dump, one at a time for line-delimited files."""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    if path.name.endswith((".jsonl", ".jsonl.gz")):
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with opener(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = (data.get("tables") or data).get("foot_scan_fits") or []
+    yield from data
+
+
+def is_complete(row):
+    """Scans the worker finished and that carry the measurements V2 reads."""
+    stage = row.get("pipeline_stage")
+    return (stage in (None, "complete")
+            and row.get("forefoot_width_class") is not None
+            and bool(row.get("scan_id")))
+
+
+def scan_preferences(row):
+    """(discipline, environment, rock, aggressiveness, source). Stored V2
+    inputs when present, else seeded-random per scan_id (audit_last20_v2)."""
+    if row.get("discipline") and row.get("environment") and row.get("aggressiveness"):
+        return (row["discipline"], row["environment"], row.get("rock_type"),
+                row["aggressiveness"], "stored")
+    rng = random.Random(row["scan_id"])
+    environment = rng.choice(ENVIRONMENTS)
+    return (rng.choice(DISCIPLINES), environment,
+            rng.choice(ROCKS) if environment == "outdoor" else None,
+            rng.choice(AGGRESSIVENESS), "seeded")
+
+
+# ── Per scan (runs in the pool) ─────────────────────────────────────────
+
+def _picks(scorer, tiers, pref):
+    """{tier: [(slug, brand, price or None)]} with prices at recommended size."""
+    out = {}
+    for t in TIERS:
+        out[t] = []
+        for sc, sh in tiers[t]:
+            price = sc.get("best_price_at_size")
+            if price is None:
+                size = scorer.rec_size(sh.get("brand"), pref)
+                price = scorer.prices.price_at(sh.get("slug"), size) if size else None
+            out[t].append((sh.get("slug"), sh.get("brand"), price))
+    return out
+
+
+def _drops(scorer, variant):
+    """Catalog shoes removed per filter, each counted under the first
+    filter that removes it (HARD_FILTERS order, then closure, then
+    discipline overlap)."""
+    catalog, profile = scorer.catalog, scorer.profile
+    counts = {}
+    left = catalog.all_mask
+    for hf in HARD_FILTERS:
+        to_mask = HARD_FILTER_MASKS.get(hf)
+        if to_mask is not None:
+            removed = left & to_mask(catalog, profile)
+        else:
+            removed = 0
+            for i in catalog.indices(left):
+                if hf(scorer.shoes_db[i], profile) is not None:
+                    removed |= 1 << i
+        counts[hf.__name__.replace("hard_filter_", "")] = bin(removed).count("1")
+        left &= ~removed
+    allowed = closure_override(variant.get("preference_overrides"))
+    pool = left & catalog.closure_mask(allowed) if allowed else left
+    counts["closure"] = bin(left & ~pool).count("1")
+    counts["discipline"] = bin(pool & ~discipline_mask(scorer.shoes_db,
+                                                       variant["discipline"])).count("1")
+    return counts
+
+
+def _stored_slugs(row):
+    recs = row.get("recommendations")
+    if isinstance(recs, str):
+        try:
+            recs = json.loads(recs)
+        except ValueError:
+            recs = None
+    if row.get("pipeline_version") != "v2" or not recs:
+        return None
+    return [r.get("slug") for r in recs]
+
+
+def backtest_scan(row, job):
+    """Current vs candidate picks for one scan row (case_runner fn)."""
+    engine, cfg = job
+    disc, env, rock, agg, source = scan_preferences(row)
+    variant = {"discipline": disc, "environment": env, "rock": rock,
+               "aggressiveness": agg,
+               "preference_overrides": row.get("preference_overrides")}
+    pref = "performance" if agg in ("moderate", "aggressive") else "comfort"
+    args = (row, engine["shoes_db"], engine["price_rows"], engine["brand_sizing"])
+    scorer = WhatIfScorer(*args)
+    current = _picks(scorer, scorer.tiers(variant), pref)
+    with scoring_config(cfg):
+        # Fresh scorer: axis columns are cached by axis name, not weight.
+        cand_scorer = WhatIfScorer(*args)
+        candidate = _picks(cand_scorer, cand_scorer.tiers(variant), pref)
+    return {"prefs": source, "catalog": len(engine["shoes_db"]),
+            "drops": _drops(scorer, variant), "stored": _stored_slugs(row),
+            "current": current, "candidate": candidate}
+
+
+# ── Aggregation ─────────────────────────────────────────────────────────
+
+def _quantiles(values, qs=(0.1, 0.25, 0.5, 0.75, 0.9)):
+    v = sorted(values)
+    if not v:
+        return {}
+    return {f"p{int(q * 100)}": round(v[min(len(v) - 1, int(q * len(v)))], 2) for q in qs}
+
+
+def _price_stats(scans, side):
+    prices = [p for s in scans for t in TIERS for _slug, _b, p in s[side][t]]
+    priced = [p for p in prices if p is not None]
+    out = {"picks": len(prices), "priced": len(priced)}
+    if priced:
+        out["mean"] = round(sum(priced) / len(priced), 2)
+        out.update(_quantiles(priced))
+    return out
+
+
+def summarize(scans):
+    """Aggregate report dict over backtest_scan values."""
+    n = len(scans)
+    churn = {t: [0, 0] for t in TIERS}          # tier -> [changed slots, slots]
+    touched = top_changed = 0
+    brands = {"current": Counter(), "candidate": Counter()}
+    drops = Counter()
+    drift = [0, 0, 0]                           # scans, changed picks, picks
+    for s in scans:
+        any_change = False
+        for t in TIERS:
+            cur = [p[0] for p in s["current"][t]]
+            cand = [p[0] for p in s["candidate"][t]]
+            slots = max(len(cur), len(cand))
+            churn[t][0] += slots - len(set(cur) & set(cand))
+            churn[t][1] += slots
+            any_change = any_change or cur != cand
+        touched += any_change
+        if s["current"]["baseline"][:1] != s["candidate"]["baseline"][:1]:
+            top_changed += 1
+        for side in brands:
+            brands[side].update(p[1] for t in TIERS for p in s[side][t])
+        for k, v in s["drops"].items():
+            drops[k] += v / s["catalog"]
+        if s["stored"] is not None:
+            cur = [p[0] for t in TIERS for p in s["current"][t]]
+            drift[0] += 1
+            slots = max(len(cur), len(s["stored"]))
+            drift[1] += slots - len(set(cur) & set(s["stored"]))
+            drift[2] += slots
+    all_slots = sum(c[1] for c in churn.values())
+    return {
+        "scans": n,
+        "prefs": dict(Counter(s["prefs"] for s in scans)),
+        "churn": {
+            "overall": round(sum(c[0] for c in churn.values()) / all_slots, 4) if all_slots else 0.0,
+            "per_tier": {t: round(c[0] / c[1], 4) if c[1] else 0.0 for t, c in churn.items()},
+            "scans_touched": touched,
+            "top_pick_changed": top_changed,
+        },
+        "brands": {side: dict(c.most_common()) for side, c in brands.items()},
+        "prices": {side: _price_stats(scans, side) for side in ("current", "candidate")},
+        "drop_rates": {k: round(v / n, 4) for k, v in sorted(drops.items())} if n else {},
+        "stored_drift": ({"scans": drift[0],
+                          "changed_share": round(drift[1] / drift[2], 4) if drift[2] else 0.0}
+                         if drift[0] else None),
+    }
+
+
+def print_report(rep, errors):
+    pct = lambda x: f"{x * 100:5.1f}%"
+    print(f"# {rep['scans']} scans backtested ({', '.join(f'{k}: {v}' for k, v in rep['prefs'].items())} "
+          f"preferences), {len(errors)} failed\n")
+    c = rep["churn"]
+    print(f"  pick churn      {pct(c['overall'])} of pick slots  |  "
+          + "  ".join(f"{t} {pct(v)}" for t, v in c["per_tier"].items()))
+    print(f"  scans touched   {c['scans_touched']}/{rep['scans']}   "
+          f"top pick changed {c['top_pick_changed']}/{rep['scans']}")
+
+    print(f"\n  {'brand':22s}{'current':>9s}{'candidate':>11s}{'delta':>8s}")
+    cur, cand = rep["brands"]["current"], rep["brands"]["candidate"]
+    names = sorted(set(cur) | set(cand), key=lambda b: -max(cur.get(b, 0), cand.get(b, 0)))
+    for b in names[:15]:
+        d = cand.get(b, 0) - cur.get(b, 0)
+        print(f"  {str(b)[:22]:22s}{cur.get(b, 0):9d}{cand.get(b, 0):11d}{d:+8d}")
+
+    print(f"\n  {'price (EUR)':22s}" + "".join(f"{k:>9s}" for k in ("priced", "mean", "p10", "p50", "p90")))
+    for side, st in rep["prices"].items():
+        share = f"{st['priced']}/{st['picks']}"
+        print(f"  {side:22s}{share:>9s}" + "".join(f"{st.get(k, '-'):>9}" for k in ("mean", "p10", "p50", "p90")))
+
+    print("\n  hard-filter drops (mean share of catalog per scan)")
+    for k, v in rep["drop_rates"].items():
+        print(f"    {k:12s} {pct(v)}")
+    if rep["stored_drift"]:
+        d = rep["stored_drift"]
+        print(f"\n  current code vs stored production picks: {pct(d['changed_share'])} "
+              f"of picks differ over {d['scans']} V2 scans")
+    for key, err in errors[:10]:
+        print(f"  ✗ {key}: {err}")
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("export", help="foot_scan_fits export (.jsonl[.gz], .json, dump)")
+    ap.add_argument("--candidate", required=True, help="candidate config JSON file")
+    ap.add_argument("--engine", default=str(DEFAULT_ENGINE),
+                    help="engine data JSON (shoes_db / price_rows / brand_sizing)")
+    ap.add_argument("--limit", type=int, help="first N completed scans only")
+    ap.add_argument("--workers", type=int, help="pool size (1 = serial)")
+    ap.add_argument("--json", help="write the report (and per-scan picks) here")
+    args = ap.parse_args(argv)
+
+    cfg = validate_config(json.loads(Path(args.candidate).read_text(encoding="utf-8")))
+    engine = json.loads(Path(args.engine).read_text(encoding="utf-8"))
+    rows = []
+    for row in iter_scan_rows(args.export):
+        if is_complete(row):
+            rows.append(row)
+            if args.limit and len(rows) >= args.limit:
+                break
+    print(f"# {len(rows)} completed scans, {len(engine['shoes_db'])} shoes, "
+          f"{len(engine['price_rows'])} price rows", file=sys.stderr)
+
+    results = run_cases(backtest_scan, rows, shared=(engine, cfg),
+                        workers=args.workers, progress=len(rows) <= 50)
+    print(f"# {timing_summary(results)}", file=sys.stderr)
+    scans = [r.value for r in results if r.ok]
+    errors = [(r.key, r.error) for r in results if not r.ok]
+    rep = summarize(scans)
+    print_report(rep, errors)
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"config": cfg, "report": rep, "errors": errors,
+             "scans": {r.key: r.value for r in results if r.ok}},
+            indent=2, default=str), encoding="utf-8")
+        print(f"\n# wrote {args.json}", file=sys.stderr)
+    return 1 if errors and not scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Parallel case runner for the golden gates and last-N audits.
+
+The harnesses (golden_run, golden_xcheck, golden_worker_check,
+audit_last20_v2) all do the same thing: load engine data once, then run
+one independent function per case. run_cases fans those cases out over a
+fork()ed process pool. The shared state (shoes_db, price rows, brand
+sizing, the shoe catalog, compiled rule tables, ...) is loaded in the
+parent before the fork, so children read it copy-on-write; only the case
+index goes out and only the case's return value comes back.
+
+Every case comes back as a CaseResult in input order, with its wall time
+and either a value or the exception text, so one bad scan never hides the
+rest of the run. json_diff gives a structured (path, expected, actual)
+list for comparing a result against a baseline inside the worker.
+
+Where fork() is unavailable (Windows) or workers=1 the cases run
+serially in-process, through the same code path.
+
+Usage:
+    from case_runner import run_cases, workers_arg, json_diff
+    results = run_cases(check_one, cases, shared=engine,
+                        workers=workers_arg(sys.argv))
+    for r in results:
+        print(r.key, r.seconds, r.error or r.value)
+
+    # check_one(case, shared) -> any picklable value
+"""
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Set in the parent just before the pool forks; children inherit it.
+_JOB = None
+
+_MISSING = "<missing>"
+
+
+@dataclass
+class CaseResult:
+    key: Any
+    value: Any = None
+    error: Optional[str] = None
+    trace: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _run_one(i):
+    fn, cases, shared, key_fn = _JOB
+    case = cases[i]
+    t0 = time.perf_counter()
+    try:
+        value = fn(case, shared)
+        pickle.dumps(value)  # fail here, not in the pool's result pipe
+        return CaseResult(key_fn(case), value=value,
+                          seconds=time.perf_counter() - t0)
+    except Exception as e:
+        return CaseResult(key_fn(case), error=f"{type(e).__name__}: {e}",
+                          trace=traceback.format_exc(),
+                          seconds=time.perf_counter() - t0)
+
+
+def _default_key(case):
+    if isinstance(case, (tuple, list)) and case:
+        return case[0]
+    if isinstance(case, dict):
+        return case.get("scan_id") or case.get("id")
+    return case
+
+
+def default_workers():
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def workers_arg(argv, default=None):
+    """Value of a `--workers N` / `--workers=N` flag in argv, else default.
+
+    `--workers 1` forces a serial run (handy under a debugger)."""
+    for i, a in enumerate(argv):
+        if a == "--workers" and i + 1 < len(argv):
+            return max(1, int(argv[i + 1]))
+        if a.startswith("--workers="):
+            return max(1, int(a.split("=", 1)[1]))
+    return default
+
+
+def run_cases(fn, cases, shared=None, workers=None, key=None, progress=False):
+    """Run fn(case, shared) for every case; [CaseResult] in input order.
+
+    workers defaults to min(cpu_count, 8). fn and shared are never
+    pickled (children inherit them), so closures and big dicts are fine;
+    each case's return value must be picklable.
+    """
+    global _JOB
+    cases = list(cases)
+    workers = min(workers or default_workers(), len(cases) or 1)
+    _JOB = (fn, cases, shared, key or _default_key)
+    t0 = time.perf_counter()
+    try:
+        if workers == 1 or "fork" not in multiprocessing.get_all_start_methods():
+            results = []
+            for i in range(len(cases)):
+                results.append(_run_one(i))
+                if progress:
+                    _progress(len(results), len(cases), results[-1])
+            return results
+        ctx = multiprocessing.get_context("fork")
+        results = []
+        with ctx.Pool(workers) as pool:
+            for r in pool.imap(_run_one, range(len(cases)), chunksize=1):
+                results.append(r)
+                if progress:
+                    _progress(len(results), len(cases), r)
+        return results
+    finally:
+        _JOB = None
+        if progress:
+            print(f"# {len(cases)} cases on {workers} worker(s) in "
+                  f"{time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+def _progress(done, total, r):
+    status = "ok" if r.ok else f"✗ {r.error}"
+    print(f"  [{done}/{total}] {r.key}  {r.seconds * 1e3:.0f}ms  {status}",
+          file=sys.stderr)
+
+
+def raise_first_error(results):
+    """Re-raise the first failed case (for harnesses that used to crash)."""
+    for r in results:
+        if not r.ok:
+            raise RuntimeError(f"case {r.key} failed: {r.error}\n{r.trace}")
+    return results
+
+
+def json_diff(expected, actual, path="", limit=20):
+    """[(path, expected, actual)] for the leaves where two JSON values differ.
+
+    Lists are compared by index; a length mismatch is reported at the list
+    path as (len(expected), len(actual)). Stops after `limit` entries.
+    """
+    out = []
+
+    def walk(a, b, p):
+        if len(out) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            for k in sorted(set(a) | set(b), key=str):
+                walk(a.get(k, _MISSING), b.get(k, _MISSING), f"{p}.{k}" if p else str(k))
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                out.append((f"{p}#len", len(a), len(b)))
+            for i in range(min(len(a), len(b))):
+                walk(a[i], b[i], f"{p}[{i}]")
+        elif a != b or type(a) is not type(b):
+            out.append((p, a, b))
+
+    walk(expected, actual, path)
+    return out[:limit]
+
+
+def timing_summary(results):
+    """One-line wall-time summary over CaseResults."""
+    secs = sorted(r.seconds for r in results)
+    if not secs:
+        return "no cases"
+    p50 = secs[len(secs) // 2]
+    return (f"{len(secs)} cases, {sum(secs):.2f}s summed, "
+            f"p50 {p50 * 1e3:.0f}ms, max {secs[-1] * 1e3:.0f}ms")
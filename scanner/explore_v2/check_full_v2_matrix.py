@@ -29,9 +29,12 @@ from matrix_scorer_v2 import compute_use_case_target, assemble_tiers
 from interp_what_to_look_for_v2 import generate_what_to_look_for_v2
 from interp_shoe_desc_v2 import flatten_pick, generate_shoe_description_v2
 
+from shoe_best_prices import load_best_price_rows
+
 # v1 (unchanged, used for Sections 1 and 2)
 from benchmark.interp_foot_shape import generate_foot_shape
 from benchmark.interp_shoe_fit  import generate_shoe_fit
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 # Roman 2026-05-08: keys migrated to sb_secret_/sb_publishable_ format.
@@ -103,29 +106,16 @@ def load_shoes_db():
 
 
 def load_price_rows():
-    """Load per-(slug,size) price rows from the shoe_prices_by_size view.
-
-    The view normalises both shoe_prices storage models — the array model
-    (sizes_available) and the per-size model (eur_size, used by the
-    bergfreunde/gigasport AWIN affiliate feeds) — into one row per
-    product+size. Each row carries a single numeric ``size_eu``.
-
-    Paginated: the REST API hard-caps every response at 1000 rows, so a
-    single large ``limit`` would silently truncate.
+    """Load per-(slug,size) best-price rows from shoe_best_prices.
+
+    One row per product+size (cheapest in-stock offer across retailers,
+    both shoe_prices storage models covered via shoe_prices_by_size),
+    with keys product_slug, price_eur, in_stock (always True), size_eu,
+    plus retailer / product_url. best_price_at_size gives the same answer
+    as over the raw per-size rows, on a fraction of the rows. See
+    scanner/shoe_best_prices.py.
     """
-    rows, offset = [], 0
-    while True:
-        r = requests.get(f"{SB_URL}/rest/v1/shoe_prices_by_size", headers=HEADERS,
-            params={"select": "product_slug,price_eur,in_stock,size_eu",
-                    "order": "source_id,size_eu",
-                    "limit": 1000, "offset": offset}, timeout=30)
-        r.raise_for_status()
-        b = r.json()
-        if not b: break
-        rows.extend(b)
-        if len(b) < 1000: break
-        offset += 1000
-    return rows
+    return load_best_price_rows()
 
 
 # ─────────────────────────────────────────────────────────────────────
@@ -133,15 +123,7 @@ def load_price_rows():
 # ─────────────────────────────────────────────────────────────────────
 
 def lookup_db(shoes_db, brand, model):
-    if not brand or not model: return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key: return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key: return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_user_shoes(raw, shoes_db):
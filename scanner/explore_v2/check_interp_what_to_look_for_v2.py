@@ -17,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from interp_what_to_look_for_v2 import generate_what_to_look_for_v2
 from target_resolver_v2 import resolve_targets_v2
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SERVICE_KEY",
@@ -54,15 +55,7 @@ def load_shoes_db():
 
 
 def lookup_db(shoes_db, brand, model):
-    if not brand or not model: return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key: return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key: return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_user_shoes(raw, shoes_db):
@@ -18,6 +18,7 @@ from target_resolver_v2 import (
     WIDTH_LABELS, HV_LABELS, FV_LABELS,
     ASYM_LABELS, DOWNTURN_LABELS,
 )
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SERVICE_KEY",
@@ -57,18 +58,7 @@ def load_shoes_db():
 
 
 def lookup(shoes_db, brand, model):
-    if not brand or not model:
-        return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key:
-            return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key:
-            return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_shoes(user_shoes_raw, shoes_db):
@@ -19,6 +19,7 @@ from matrix_scorer_v2 import (
     score_shoe, compute_use_case_target, apply_post_caps,
     SCORING_AXES, HARD_FILTERS,
 )
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SERVICE_KEY",
@@ -54,17 +55,7 @@ def load_shoes_db():
 
 
 def lookup_db(shoes_db, brand, model):
-    if not brand or not model: return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key:
-            return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key:
-            return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_user_shoes(raw, shoes_db):
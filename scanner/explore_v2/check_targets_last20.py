@@ -15,6 +15,7 @@ from benchmark.target_resolver import (
     resolve_targets, width_rank, heel_vol_rank, rank_label,
     WIDTH_LABELS, HV_LABELS,
 )
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SERVICE_KEY",
@@ -44,19 +45,7 @@ def load_shoes_db():
 
 
 def lookup(shoes_db, brand, model):
-    if not brand or not model:
-        return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key:
-            return s
-    # fuzzy: substring either way
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key:
-            return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def shoe_fit_label(fit):
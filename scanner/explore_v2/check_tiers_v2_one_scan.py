@@ -15,12 +15,16 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+# Per-(slug,size) best prices (shoe_best_prices view), as the V2 engine reads them
+from shoe_best_prices import load_best_price_rows as load_price_rows
+
 from target_resolver_v2 import resolve_targets_v2
 from matrix_scorer_v2 import (
     compute_use_case_target, assemble_tiers,
     PER_TIER_BRAND_CAP, GLOBAL_BRAND_CAP, PER_TIER_NO_EDGE_CAP,
     TIER_SIZE, BUDGET_POOL_SIZE,
 )
+from shoe_catalog import catalog_for
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SERVICE_KEY",
@@ -55,35 +59,8 @@ def load_shoes_db():
     return r.json()
 
 
-def load_price_rows():
-    """Paginate full shoe_prices table."""
-    rows = []
-    offset = 0
-    while True:
-        r = requests.get(f"{SB_URL}/rest/v1/shoe_prices", headers=HEADERS,
-            params={"select": "product_slug,price_eur,in_stock,sizes_available",
-                    "limit": 1000, "offset": offset}, timeout=30)
-        r.raise_for_status()
-        batch = r.json()
-        if not batch:
-            break
-        rows.extend(batch)
-        offset += 1000
-    return rows
-
-
 def lookup_db(shoes_db, brand, model):
-    if not brand or not model: return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key:
-            return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key:
-            return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_user_shoes(raw, shoes_db):
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Golden-case definitions and comparison helpers.
+
+Shared by golden_run.py (live Supabase) and golden_offline.py (captured
+fixtures). Pure: no network, no environment dependency at import.
+
+Fixture layout (written by `golden_run.py capture`):
+    fixtures/engine.json      pinned engine data: shoes_db, price_rows,
+                              brand_sizing
+    fixtures/<case>.json      {"name", "scan_id", "scan": foot_scan_fits row}
+"""
+import json
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent          # explore_v2/golden
+BASELINE_DIR = _HERE / "baseline"
+FIXTURE_DIR = _HERE / "fixtures"
+ENGINE_FIXTURE = FIXTURE_DIR / "engine.json"
+BUDGET_PATH = _HERE / "budget.json"
+
+# build_v2_results keys outside the golden lock: browse_extended (the
+# price-sensitive browse list), derived_preferences (the question-derived
+# defaults), interpretation_deps (render cache keys) and scoring_state
+# (the stored rescore state). The gate is interpretation + recommendations.
+UNLOCKED_KEYS = ("browse_extended", "derived_preferences", "interpretation_deps",
+                 "scoring_state")
+
+# ---------------------------------------------------------------------
+# The 15 golden cases.  rock is None for indoor / both environments.
+# ---------------------------------------------------------------------
+GOLDEN_CASES = [
+    # name, scan_id, discipline, environment, rock, aggressiveness
+    ("narrow_greek_sport_outdoor",      "scan-2026-03-06T17-59-21", "sport",           "outdoor", "limestone", "balanced"),
+    ("narrow_egyptian_high_instep",     "scan-2026-04-17T18-15-45", "boulder",         "indoor",  None,        "aggressive"),
+    ("wide_egyptian_hva_pronounced",    "scan-2026-05-19T14-43-26", "sport",           "outdoor", "granite",   "comfort"),
+    ("wide_egyptian_hva_mild_trad",     "scan-2026-04-08T18-25-58", "trad_multipitch", "outdoor", "granite",   "comfort"),
+    ("shallow_heel_greek_boulder",      "scan-2026-03-30T21-09-52", "boulder",         "indoor",  None,        "moderate"),
+    ("shallow_heel_egyptian_sandstone", "scan-2026-05-03T14-51-02", "sport",           "outdoor", "sandstone", "balanced"),
+    ("deep_heel_egyptian_boulder",      "scan-2026-03-31T15-18-23", "boulder",         "outdoor", "sandstone", "aggressive"),
+    ("deep_heel_egyptian_2shoe_both",   "scan-2026-05-01T19-14-14", "sport",           "both",    None,        "balanced"),
+    ("low_instep_roman_trad",           "scan-2026-05-11T16-07-54", "trad_multipitch", "outdoor", "limestone", "comfort"),
+    ("hva_pronounced_egyptian_boulder", "scan-2026-05-16T09-40-14", "boulder",         "indoor",  None,        "moderate"),
+    ("greek_6shoe_sport_aggressive",    "scan-2026-04-18T00-23-40", "sport",           "outdoor", "limestone", "aggressive"),
+    ("greek_5shoe_boulder_mixed",       "scan-2026-05-19T14-28-51", "boulder",         "outdoor", "mixed",     "moderate"),
+    ("roman_5shoe_sport_indoor",        "scan-2026-04-16T09-08-56", "sport",           "indoor",  None,        "balanced"),
+    ("roman_4shoe_trad_mixed",          "scan-2026-04-26T20-18-19", "trad_multipitch", "outdoor", "mixed",     "comfort"),
+    ("egyptian_5shoe_boulder_granite",  "scan-2026-04-26T20-39-30", "boulder",         "outdoor", "granite",   "aggressive"),
+]
+
+
+def locked(result):
+    """The golden-locked part of a build_v2_results() payload (in place)."""
+    for key in UNLOCKED_KEYS:
+        result.pop(key, None)
+    return result
+
+
+def read_json(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def write_json(path, obj):
+    Path(path).write_text(json.dumps(obj, indent=2, ensure_ascii=False,
+                                     sort_keys=True), encoding="utf-8")
+
+
+def canon(obj):
+    """Stable JSON string for deep comparison."""
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False)
+
+
+def sanity(name, result):
+    """Structural checks. Returns list of warning strings (empty = clean)."""
+    warns = []
+    interp = result.get("interpretation") or []
+    recs = result.get("recommendations") or []
+    titles = [b.get("title") for b in interp]
+    expect_titles = ["Your Foot Shape",
+                     "What Your Current Shoe Fit Tells Us",
+                     "What to Look For"]
+    if titles != expect_titles:
+        warns.append(f"interp titles {titles} != {expect_titles}")
+    for b in interp:
+        paras = b.get("paragraphs") or []
+        if not paras or not any((p or "").strip() for p in paras):
+            warns.append(f"interp block '{b.get('title')}' has no paragraphs")
+    cats = {}
+    for r in recs:
+        cats[r.get("category")] = cats.get(r.get("category"), 0) + 1
+    for tier in ("baseline", "softer", "stiffer", "budget"):
+        if cats.get(tier, 0) == 0:
+            warns.append(f"tier '{tier}' has 0 recommendations")
+    if len(recs) != 12:
+        warns.append(f"{len(recs)} recommendations (expected 12)")
+    # User-facing copy checks.
+    facing = []
+    for b in interp:
+        facing.extend(b.get("paragraphs") or [])
+    for r in recs:
+        facing.extend([r.get("description"), r.get("why"), r.get("tradeoffs")])
+        if r.get("slug") is None or r.get("brand") is None or r.get("model") is None:
+            warns.append(f"rec missing slug/brand/model: {r}")
+        sz = r.get("recommended_size_eu")
+        if sz is not None and round(sz * 2) != sz * 2:
+            warns.append(f"rec size {sz} not half-EU ({r.get('slug')})")
+    for txt in facing:
+        if not txt:
+            continue
+        if "—" in txt or "–" in txt:
+            warns.append(f"em/en dash in copy: {txt[:60]!r}")
+        if "cinch" in txt.lower():
+            warns.append(f"banned word 'cinch' in copy: {txt[:60]!r}")
+    return warns
+
+
+def show_diff(baseline, result):
+    """Print the first few differing fields."""
+    b_interp = baseline.get("interpretation") or []
+    r_interp = result.get("interpretation") or []
+    for i in range(max(len(b_interp), len(r_interp))):
+        bb = b_interp[i] if i < len(b_interp) else {}
+        rr = r_interp[i] if i < len(r_interp) else {}
+        if canon(bb) != canon(rr):
+            print(f"      interp[{i}] '{bb.get('title')}' differs")
+    b_recs = baseline.get("recommendations") or []
+    r_recs = result.get("recommendations") or []
+    if len(b_recs) != len(r_recs):
+        print(f"      rec count {len(b_recs)} -> {len(r_recs)}")
+    for i in range(min(len(b_recs), len(r_recs))):
+        if canon(b_recs[i]) != canon(r_recs[i]):
+            print(f"      rec[{i}] {b_recs[i].get('slug')} -> {r_recs[i].get('slug')}")
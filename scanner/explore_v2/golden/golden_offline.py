@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Offline golden gate with a per-stage performance budget.
+
+Replays the golden cases from captured fixtures (see golden_cases.py for
+the layout; `golden_run.py capture` writes them) so the gate runs without
+Supabase. Each case must reproduce its locked baseline exactly, and the
+time spent in every build_v2_results stage (v2_pipeline.STAGES: profile,
+targets, scoring, tiers, interpretation, browse), summed over the cases,
+must stay within budget.json.
+
+Timings are best-of-N per (case, stage). The interpretation render cache
+and the target resolver cache are cleared before every call, so each round
+renders all text and resolves every target. The catalog_for /
+price_index_for memos stay warm on purpose: the worker builds them once
+per engine data load, not per scan, and they are not per-scan work. Budgets
+are machine-specific: re-record after changing hardware, or after a
+change that is meant to move the numbers.
+
+Usage:
+    python3 golden_offline.py                # verify outputs + budget
+    python3 golden_offline.py --rounds 20    # more rounds, steadier timings
+    python3 golden_offline.py --record       # verify, then write budget.json
+
+Exit codes: 0 clean, 1 output mismatch, 2 over budget, 3 missing fixtures,
+4 missing budget (no budget.json, or a stage without one; --record sets it).
+"""
+import argparse
+import copy
+import platform
+import sys
+from datetime import date
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent          # explore_v2/golden
+_EXPLORE = _HERE.parent                          # explore_v2
+_SCANNER = _EXPLORE.parent                       # scanner
+for _p in (str(_EXPLORE), str(_SCANNER)):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+from v2_pipeline import build_v2_results, clear_interp_cache, STAGES
+from target_resolver_v2 import clear_resolve_cache
+from golden_cases import (GOLDEN_CASES, BASELINE_DIR, FIXTURE_DIR, ENGINE_FIXTURE,
+                          BUDGET_PATH, locked, canon, sanity, show_diff,
+                          read_json, write_json)
+
+BUDGET_HEADROOM = 1.5   # recorded budget = measured * headroom + slack
+BUDGET_SLACK_MS = 2.0   # keeps sub-millisecond stages out of timer noise
+
+
+def load_fixtures():
+    """(engine, {case name: scan row}), or None after listing what is missing."""
+    missing = [p for p in [ENGINE_FIXTURE] + [FIXTURE_DIR / f"{c[0]}.json"
+                                              for c in GOLDEN_CASES]
+               if not p.exists()]
+    if missing:
+        for p in missing:
+            print(f"  ✗ missing fixture {p.relative_to(_HERE)}")
+        print("  run `golden_run.py capture` (needs SUPABASE_SECRET_KEY)")
+        return None
+    engine = read_json(ENGINE_FIXTURE)
+    scans = {name: read_json(FIXTURE_DIR / f"{name}.json")["scan"]
+             for (name, *_rest) in GOLDEN_CASES}
+    return engine, scans
+
+
+def run_case(case, scan, engine):
+    """(locked result, {stage: seconds}) for one golden case."""
+    name, _scan_id, disc, env, rock, agg = case
+    timings = {}
+    clear_interp_cache()
+    clear_resolve_cache()
+    result = build_v2_results(copy.deepcopy(scan), engine["shoes_db"],
+                              engine["price_rows"], engine["brand_sizing"],
+                              disc, env, rock, agg, timings=timings)
+    return locked(result), timings
+
+
+def run_all(engine, scans, rounds):
+    """{name: result} from the first round and {name: {stage: best seconds}}."""
+    results, best = {}, {}
+    for r in range(rounds):
+        for case in GOLDEN_CASES:
+            name = case[0]
+            result, timings = run_case(case, scans[name], engine)
+            if r == 0:
+                results[name] = result
+                best[name] = timings
+            else:
+                best[name] = {s: min(best[name][s], timings[s]) for s in STAGES}
+    return results, best
+
+
+def verify_outputs(results):
+    """Baseline comparison + sanity checks. Returns the failure count."""
+    fails = 0
+    for name, result in results.items():
+        path = BASELINE_DIR / f"{name}.json"
+        if not path.exists():
+            print(f"  {name:34s}  NO BASELINE")
+            fails += 1
+            continue
+        baseline = read_json(path)
+        warns = sanity(name, result)
+        if canon(baseline) != canon(result):
+            fails += 1
+            print(f"  {name:34s}  *** MISMATCH ***")
+            show_diff(baseline, result)
+        else:
+            print(f"  {name:34s}  PASS" + ("  !! " + " | ".join(warns) if warns else ""))
+    return fails
+
+
+def stage_totals(best):
+    """Milliseconds per stage, summed over the golden cases."""
+    return {s: sum(t[s] for t in best.values()) * 1e3 for s in STAGES}
+
+
+def print_timings(best):
+    print(f"\n  {'case':34s}" + "".join(f"{s:>15s}" for s in STAGES))
+    for name, t in best.items():
+        print(f"  {name:34s}" + "".join(f"{t[s] * 1e3:13.2f}ms" for s in STAGES))
+
+
+def check_budget(totals):
+    """Compare stage totals to budget.json. Returns (over budget, stages
+    without a budget); every stage is unbudgeted when the file is missing."""
+    if not BUDGET_PATH.exists():
+        print(f"\n  ✗ no {BUDGET_PATH.name}; run with --record to set budgets")
+        return 0, len(STAGES)
+    budget = read_json(BUDGET_PATH)["stages_ms"]
+    over = missing = 0
+    print(f"\n  {'stage':16s}{'measured':>12s}{'budget':>12s}")
+    for s in STAGES:
+        limit = budget.get(s)
+        flag = ""
+        if limit is None:
+            missing += 1
+            flag = "  ✗ no budget"
+        elif totals[s] > limit:
+            over += 1
+            flag = "  ✗ OVER"
+        limit_txt = f"{limit:10.2f}ms" if limit is not None else f"{'-':>12s}"
+        print(f"  {s:16s}{totals[s]:10.2f}ms{limit_txt}{flag}")
+    return over, missing
+
+
+def record_budget(totals, rounds):
+    write_json(BUDGET_PATH, {
+        "recorded": date.today().isoformat(),
+        "machine": f"{platform.machine()} / Python {platform.python_version()}",
+        "rounds": rounds,
+        "headroom": BUDGET_HEADROOM,
+        "slack_ms": BUDGET_SLACK_MS,
+        "measured_ms": {s: round(totals[s], 2) for s in STAGES},
+        "stages_ms": {s: round(totals[s] * BUDGET_HEADROOM + BUDGET_SLACK_MS, 2)
+                      for s in STAGES},
+    })
+    print(f"\n# wrote {BUDGET_PATH}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--rounds", type=int, default=5,
+                    help="timing rounds per case (best-of, default 5)")
+    ap.add_argument("--record", action="store_true",
+                    help="write budget.json from this run (outputs must pass)")
+    args = ap.parse_args()
+
+    fixtures = load_fixtures()
+    if fixtures is None:
+        return 3
+    engine, scans = fixtures
+    print(f"# {len(engine['shoes_db'])} shoes, {len(engine['price_rows'])} price rows, "
+          f"{len(engine['brand_sizing'])} brands; {len(GOLDEN_CASES)} cases "
+          f"x {args.rounds} rounds\n")
+
+    results, best = run_all(engine, scans, max(1, args.rounds))
+    fails = verify_outputs(results)
+    print_timings(best)
+    totals = stage_totals(best)
+
+    if args.record:
+        if fails:
+            print(f"\n# {fails} output failure(s); budget not recorded")
+            return 1
+        record_budget(totals, args.rounds)
+        return 0
+
+    over, missing = check_budget(totals)
+    print(f"\n# {len(results) - fails} pass, {fails} fail; "
+          f"{over} stage(s) over budget, {missing} without; "
+          f"total {sum(totals.values()):.1f}ms")
+    if fails:
+        return 1
+    if over:
+        return 2
+    return 4 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@ A golden case is a frozen (scan_id + 4 V2 preference inputs) tuple with
 its build_v2_results() output locked to disk. Before the worker cutover
 flips to V2, every golden case must reproduce its locked output exactly.
 
-The 15 cases below were picked from production scans (2026-05-20) to
+The 15 cases (golden_cases.GOLDEN_CASES) were picked from production scans (2026-05-20) to
 span the dimension extremes - very narrow / very wide forefoot, shallow
 / deep heel, high / low instep, every toe shape, HVA none/mild/pronounced
 - crossed with the preference space (all 3 disciplines, all 3
@@ -14,13 +14,23 @@ environments, all 4 rock types, all 4 aggressiveness levels).
 Usage:
     SUPABASE_SECRET_KEY=... python3 golden_run.py gen      # lock baselines
     SUPABASE_SECRET_KEY=... python3 golden_run.py verify   # regression check
+    SUPABASE_SECRET_KEY=... python3 golden_run.py shoefit  # shoe-fit latency per case
+    SUPABASE_SECRET_KEY=... python3 golden_run.py capture  # freeze offline fixtures
 
-Both modes also run structural sanity checks (3 interp sections, 4 rec
+gen and verify run the cases on a process pool (case_runner);
+`--workers 1` runs them serially.
+
+`capture` writes the scan rows and engine data to fixtures/ so
+golden_offline.py can run the same gate (plus per-stage timing budgets)
+without Supabase.
+
+gen and verify also run structural sanity checks (3 interp sections, 4 rec
 tiers, half-EU sizes, no banned copy).
 """
 import json
 import os
 import sys
+import time
 from pathlib import Path
 
 _HERE = Path(__file__).resolve().parent          # explore_v2/golden
@@ -31,37 +41,18 @@ for _p in (str(_EXPLORE), str(_SCANNER)):
         sys.path.insert(0, _p)
 
 import requests
-from v2_pipeline import build_v2_results
+from v2_pipeline import (build_v2_results, build_profile, variant_target,
+                         _shoe_fit_with_artifact_filter)
 from check_full_v2_matrix import load_shoes_db, load_price_rows
 from scan_recommender import _load_brand_sizing
+from case_runner import (run_cases, raise_first_error, timing_summary,
+                         json_diff, workers_arg)
+from golden_cases import (GOLDEN_CASES, BASELINE_DIR, FIXTURE_DIR, ENGINE_FIXTURE,
+                          locked, canon, sanity, show_diff, write_json)
 
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SECRET_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
 HEADERS = {"apikey": SB_KEY, "Authorization": f"Bearer {SB_KEY}"}
-BASELINE_DIR = _HERE / "baseline"
-
-# ---------------------------------------------------------------------
-# The 15 golden cases.  rock is None for indoor / both environments.
-# ---------------------------------------------------------------------
-GOLDEN_CASES = [
-    # name, scan_id, discipline, environment, rock, aggressiveness
-    ("narrow_greek_sport_outdoor",      "scan-2026-03-06T17-59-21", "sport",           "outdoor", "limestone", "balanced"),
-    ("narrow_egyptian_high_instep",     "scan-2026-04-17T18-15-45", "boulder",         "indoor",  None,        "aggressive"),
-    ("wide_egyptian_hva_pronounced",    "scan-2026-05-19T14-43-26", "sport",           "outdoor", "granite",   "comfort"),
-    ("wide_egyptian_hva_mild_trad",     "scan-2026-04-08T18-25-58", "trad_multipitch", "outdoor", "granite",   "comfort"),
-    ("shallow_heel_greek_boulder",      "scan-2026-03-30T21-09-52", "boulder",         "indoor",  None,        "moderate"),
-    ("shallow_heel_egyptian_sandstone", "scan-2026-05-03T14-51-02", "sport",           "outdoor", "sandstone", "balanced"),
-    ("deep_heel_egyptian_boulder",      "scan-2026-03-31T15-18-23", "boulder",         "outdoor", "sandstone", "aggressive"),
-    ("deep_heel_egyptian_2shoe_both",   "scan-2026-05-01T19-14-14", "sport",           "both",    None,        "balanced"),
-    ("low_instep_roman_trad",           "scan-2026-05-11T16-07-54", "trad_multipitch", "outdoor", "limestone", "comfort"),
-    ("hva_pronounced_egyptian_boulder", "scan-2026-05-16T09-40-14", "boulder",         "indoor",  None,        "moderate"),
-    ("greek_6shoe_sport_aggressive",    "scan-2026-04-18T00-23-40", "sport",           "outdoor", "limestone", "aggressive"),
-    ("greek_5shoe_boulder_mixed",       "scan-2026-05-19T14-28-51", "boulder",         "outdoor", "mixed",     "moderate"),
-    ("roman_5shoe_sport_indoor",        "scan-2026-04-16T09-08-56", "sport",           "indoor",  None,        "balanced"),
-    ("roman_4shoe_trad_mixed",          "scan-2026-04-26T20-18-19", "trad_multipitch", "outdoor", "mixed",     "comfort"),
-    ("egyptian_5shoe_boulder_granite",  "scan-2026-04-26T20-39-30", "boulder",         "outdoor", "granite",   "aggressive"),
-]
-
 
 def fetch_scan(scan_id):
     r = requests.get(f"{SB_URL}/rest/v1/foot_scan_fits", headers=HEADERS,
@@ -74,69 +65,25 @@ def fetch_scan(scan_id):
     return rows[0]
 
 
-def _canon(obj):
-    """Stable JSON string for deep comparison."""
-    return json.dumps(obj, sort_keys=True, ensure_ascii=False)
-
-
-def _sanity(name, result):
-    """Structural checks. Returns list of warning strings (empty = clean)."""
-    warns = []
-    interp = result.get("interpretation") or []
-    recs = result.get("recommendations") or []
-    titles = [b.get("title") for b in interp]
-    expect_titles = ["Your Foot Shape",
-                     "What Your Current Shoe Fit Tells Us",
-                     "What to Look For"]
-    if titles != expect_titles:
-        warns.append(f"interp titles {titles} != {expect_titles}")
-    for b in interp:
-        paras = b.get("paragraphs") or []
-        if not paras or not any((p or "").strip() for p in paras):
-            warns.append(f"interp block '{b.get('title')}' has no paragraphs")
-    cats = {}
-    for r in recs:
-        cats[r.get("category")] = cats.get(r.get("category"), 0) + 1
-    for tier in ("baseline", "softer", "stiffer", "budget"):
-        if cats.get(tier, 0) == 0:
-            warns.append(f"tier '{tier}' has 0 recommendations")
-    if len(recs) != 12:
-        warns.append(f"{len(recs)} recommendations (expected 12)")
-    # User-facing copy checks.
-    facing = []
-    for b in interp:
-        facing.extend(b.get("paragraphs") or [])
-    for r in recs:
-        facing.extend([r.get("description"), r.get("why"), r.get("tradeoffs")])
-        if r.get("slug") is None or r.get("brand") is None or r.get("model") is None:
-            warns.append(f"rec missing slug/brand/model: {r}")
-        sz = r.get("recommended_size_eu")
-        if sz is not None and round(sz * 2) != sz * 2:
-            warns.append(f"rec size {sz} not half-EU ({r.get('slug')})")
-    for txt in facing:
-        if not txt:
-            continue
-        if "—" in txt or "–" in txt:
-            warns.append(f"em/en dash in copy: {txt[:60]!r}")
-        if "cinch" in txt.lower():
-            warns.append(f"banned word 'cinch' in copy: {txt[:60]!r}")
-    return warns
+def _run_case(case, engine):
+    name, scan_id, disc, env, rock, agg = case
+    result = build_v2_results(fetch_scan(scan_id), engine["shoes_db"],
+                              engine["price_rows"], engine["brand_sizing"],
+                              disc, env, rock, agg)
+    return locked(result)
 
 
-def run_all(shoes_db, price_rows, brand_sizing):
-    """Build results for every golden case. Returns {name: result}."""
-    out = {}
-    for (name, scan_id, disc, env, rock, agg) in GOLDEN_CASES:
-        scan = fetch_scan(scan_id)
-        result = build_v2_results(scan, shoes_db, price_rows, brand_sizing,
-                                  disc, env, rock, agg)
-        # browse_extended (price-sensitive browse list) and derived_preferences
-        # (the question-derived defaults) are not part of the golden lock -
-        # the gate is interpretation + recommendations.
-        result.pop("browse_extended", None)
-        result.pop("derived_preferences", None)
-        out[name] = result
-    return out
+def run_all(shoes_db, price_rows, brand_sizing, workers=None):
+    """Build results for every golden case. Returns {name: result}.
+
+    Cases run in parallel (case_runner); pass workers=1 for a serial run.
+    """
+    engine = {"shoes_db": shoes_db, "price_rows": price_rows,
+              "brand_sizing": brand_sizing}
+    results = raise_first_error(run_cases(_run_case, GOLDEN_CASES, shared=engine,
+                                          workers=workers))
+    print(f"# {timing_summary(results)}\n")
+    return {r.key: r.value for r in results}
 
 
 def cmd_gen():
@@ -146,13 +93,13 @@ def cmd_gen():
     brand_sizing = _load_brand_sizing()
     print(f"# loaded {len(shoes_db)} shoes, {len(price_rows)} price rows, "
           f"{len(brand_sizing)} brands\n")
-    results = run_all(shoes_db, price_rows, brand_sizing)
+    results = run_all(shoes_db, price_rows, brand_sizing,
+                      workers=workers_arg(sys.argv))
     total_warn = 0
     for name, result in results.items():
         path = BASELINE_DIR / f"{name}.json"
-        path.write_text(json.dumps(result, indent=2, ensure_ascii=False,
-                                   sort_keys=True), encoding="utf-8")
-        warns = _sanity(name, result)
+        write_json(path, result)
+        warns = sanity(name, result)
         total_warn += len(warns)
         n_recs = len(result.get("recommendations") or [])
         flag = "  !! " + " | ".join(warns) if warns else "  ok"
@@ -166,7 +113,8 @@ def cmd_verify():
     shoes_db = load_shoes_db()
     price_rows = load_price_rows()
     brand_sizing = _load_brand_sizing()
-    results = run_all(shoes_db, price_rows, brand_sizing)
+    results = run_all(shoes_db, price_rows, brand_sizing,
+                      workers=workers_arg(sys.argv))
     fails = 0
     missing = 0
     for name, result in results.items():
@@ -176,33 +124,62 @@ def cmd_verify():
             missing += 1
             continue
         baseline = json.loads(path.read_text(encoding="utf-8"))
-        if _canon(baseline) == _canon(result):
+        if canon(baseline) == canon(result):
             print(f"  {name:34s}  PASS")
         else:
             fails += 1
             print(f"  {name:34s}  *** MISMATCH ***")
-            _show_diff(baseline, result)
+            show_diff(baseline, result)
+            for path, was, now in json_diff(baseline, result, limit=5):
+                print(f"        {path}: {str(was)[:50]!r} -> {str(now)[:50]!r}")
     print(f"\n# {len(results)-fails-missing} pass, {fails} mismatch, "
           f"{missing} missing baseline")
     return 0 if (fails == 0 and missing == 0) else 1
 
 
-def _show_diff(baseline, result):
-    """Print the first few differing fields."""
-    b_interp = baseline.get("interpretation") or []
-    r_interp = result.get("interpretation") or []
-    for i in range(max(len(b_interp), len(r_interp))):
-        bb = b_interp[i] if i < len(b_interp) else {}
-        rr = r_interp[i] if i < len(r_interp) else {}
-        if _canon(bb) != _canon(rr):
-            print(f"      interp[{i}] '{bb.get('title')}' differs")
-    b_recs = baseline.get("recommendations") or []
-    r_recs = result.get("recommendations") or []
-    if len(b_recs) != len(r_recs):
-        print(f"      rec count {len(b_recs)} -> {len(r_recs)}")
-    for i in range(min(len(b_recs), len(r_recs))):
-        if _canon(b_recs[i]) != _canon(r_recs[i]):
-            print(f"      rec[{i}] {b_recs[i].get('slug')} -> {r_recs[i].get('slug')}")
+def cmd_capture():
+    """Freeze every golden case's scan row and the engine data it ran on.
+
+    golden_offline.py replays these fixtures with no network. Capture
+    together with `gen` so fixtures and baselines come from the same
+    engine data.
+    """
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    shoes_db = load_shoes_db()
+    price_rows = load_price_rows()
+    brand_sizing = _load_brand_sizing()
+    write_json(ENGINE_FIXTURE, {"shoes_db": shoes_db, "price_rows": price_rows,
+                                "brand_sizing": brand_sizing})
+    print(f"# pinned {len(shoes_db)} shoes, {len(price_rows)} price rows, "
+          f"{len(brand_sizing)} brands -> {ENGINE_FIXTURE}\n")
+    for (name, scan_id, *_prefs) in GOLDEN_CASES:
+        write_json(FIXTURE_DIR / f"{name}.json",
+                   {"name": name, "scan_id": scan_id, "scan": fetch_scan(scan_id)})
+        print(f"  {name:34s} {scan_id}")
+    print(f"\n# wrote {len(GOLDEN_CASES)} case fixtures to {FIXTURE_DIR}")
+    return 0
+
+
+def cmd_shoefit(rounds=200):
+    """Per-call latency of the shoe-fit section on each golden case.
+
+    Times _shoe_fit_with_artifact_filter (the renderer build_v2_results
+    calls) on the case's profile and V2 target, best of `rounds`.
+    """
+    shoes_db = load_shoes_db()
+    total = 0.0
+    for (name, scan_id, disc, env, rock, agg) in GOLDEN_CASES:
+        profile = build_profile(fetch_scan(scan_id), shoes_db)
+        target, _ = variant_target(profile, disc, env, rock, agg)
+        best = float("inf")
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            _shoe_fit_with_artifact_filter(profile, target=target)
+            best = min(best, time.perf_counter() - t0)
+        total += best
+        print(f"  {name:34s} {len(profile['shoes']):2d} shoes  {best * 1e6:8.1f}us")
+    print(f"\n# {len(GOLDEN_CASES)} cases, {total * 1e3:.2f}ms total (best of {rounds})")
+    return 0
 
 
 if __name__ == "__main__":
@@ -214,6 +191,10 @@ if __name__ == "__main__":
         sys.exit(cmd_gen())
     elif mode == "verify":
         sys.exit(cmd_verify())
+    elif mode == "shoefit":
+        sys.exit(cmd_shoefit())
+    elif mode == "capture":
+        sys.exit(cmd_capture())
     else:
-        print(f"unknown mode {mode!r} (use gen|verify)", file=sys.stderr)
+        print(f"unknown mode {mode!r} (use gen|verify|shoefit|capture)", file=sys.stderr)
         sys.exit(3)
@@ -8,7 +8,7 @@ flag, and the result payload shape - without needing SAM3 / photos.
 
 scan_recommender.update_scan is stubbed so nothing is written to the DB.
 
-    SUPABASE_SECRET_KEY=... python3 golden_worker_check.py
+    SUPABASE_SECRET_KEY=... python3 golden_worker_check.py [--workers N]
 """
 import json
 import os
@@ -23,6 +23,7 @@ for _p in (str(_EXPLORE), str(_SCANNER)):
         sys.path.insert(0, _p)
 
 from golden_run import GOLDEN_CASES, fetch_scan, BASELINE_DIR
+from case_runner import run_cases, workers_arg, json_diff
 
 
 def main():
@@ -51,8 +52,11 @@ def main():
         print("  _scan_wants_v2 with all 3 should be True"); flag_fails += 1
     print(f"  feature-flag logic: {'OK' if flag_fails == 0 else 'FAIL'}")
 
-    fails = flag_fails
-    for (name, scan_id, disc, env, rock, agg) in GOLDEN_CASES:
+    # Engine data loads once here; the forked case workers inherit it.
+    scan_worker._load_v2_engine_data()
+
+    def check_case(case, _shared):
+        name, scan_id, disc, env, rock, agg = case
         # Real rows have no V2 inputs (they are V1 scans); inject the
         # golden case's preference set so _generate_recommendations_v2
         # sees them, exactly as a live V2 scan row would carry them.
@@ -63,26 +67,28 @@ def main():
         n = scan_worker._generate_recommendations_v2(scan_id, {}, row)
         written = captured.get(scan_id)
         if not written:
-            fails += 1
-            print(f"  {name:34s}  *** no DB write captured ***")
-            continue
+            return n, ["no DB write captured"]
         problems = []
         if written.get("pipeline_stage") != "complete":
             problems.append(f"stage={written.get('pipeline_stage')}")
         if written.get("pipeline_version") != "v2":
             problems.append(f"version={written.get('pipeline_version')}")
-        result = {"interpretation": written.get("interpretation"),
-                  "recommendations": written.get("recommendations")}
+        # JSON round trip so tuples/lists compare the way the stored row would.
+        result = json.loads(json.dumps({"interpretation": written.get("interpretation"),
+                                        "recommendations": written.get("recommendations")}))
         baseline = json.loads((BASELINE_DIR / f"{name}.json").read_text(encoding="utf-8"))
-        same = (json.dumps(result, sort_keys=True, ensure_ascii=False)
-                == json.dumps(baseline, sort_keys=True, ensure_ascii=False))
-        if not same:
-            problems.append("output != golden baseline")
+        for path, _was, _now in json_diff(baseline, result, limit=3):
+            problems.append(f"output != golden baseline at {path}")
+        return n, problems
+
+    fails = flag_fails
+    for r in run_cases(check_case, GOLDEN_CASES, workers=workers_arg(sys.argv)):
+        n, problems = r.value if r.ok else (0, [r.error])
         if problems:
             fails += 1
-            print(f"  {name:34s}  *** {' | '.join(problems)} ***")
+            print(f"  {r.key:34s}  *** {' | '.join(problems)} ***")
         else:
-            print(f"  {name:34s}  worker output == golden ({n} recs)")
+            print(f"  {r.key:34s}  worker output == golden ({n} recs)")
 
     print(f"\n# {fails} failure(s)")
     return 0 if fails == 0 else 1
@@ -6,7 +6,7 @@ This guards against transcription error in the extraction performed at
 V2 go-live (2026-05-20). If this passes, v2_pipeline is a faithful
 restatement of the validated reference implementation.
 
-    SUPABASE_SECRET_KEY=... python3 golden_xcheck.py
+    SUPABASE_SECRET_KEY=... python3 golden_xcheck.py [--workers N]
 """
 import json
 import os
@@ -27,6 +27,26 @@ from target_resolver_v2 import resolve_targets_v2
 from matrix_scorer_v2 import compute_use_case_target
 from golden_run import GOLDEN_CASES, fetch_scan
 from check_full_v2_matrix import load_shoes_db, load_price_rows
+from case_runner import run_cases, workers_arg
+
+
+def _xcheck_case(case, shoes_db):
+    """[(para index, reference, v2)] where the two shoe-fit outputs differ."""
+    name, scan_id, disc, env, rock, agg = case
+    scan = fetch_scan(scan_id)
+    profile = V.build_profile(scan, shoes_db)
+    fit_target = resolve_targets_v2(profile, profile["shoes"], agg)
+    use_target = compute_use_case_target(disc, env, rock, agg)
+    target = {**fit_target, **use_target}
+    r_out = list(R._shoe_fit_with_artifact_filter(profile, target=target))
+    v_out = list(V._shoe_fit_with_artifact_filter(profile, target=target))
+    diffs = []
+    for i in range(max(len(r_out), len(v_out))):
+        rr = r_out[i] if i < len(r_out) else "<missing>"
+        vv = v_out[i] if i < len(v_out) else "<missing>"
+        if rr != vv:
+            diffs.append((i, rr, vv))
+    return diffs
 
 
 def main():
@@ -49,25 +69,19 @@ def main():
             fails += 1
 
     # _shoe_fit_with_artifact_filter: identical output on every golden profile.
-    for (name, scan_id, disc, env, rock, agg) in GOLDEN_CASES:
-        scan = fetch_scan(scan_id)
-        profile = V.build_profile(scan, shoes_db)
-        fit_target = resolve_targets_v2(profile, profile["shoes"], agg)
-        use_target = compute_use_case_target(disc, env, rock, agg)
-        target = {**fit_target, **use_target}
-        r_out = list(R._shoe_fit_with_artifact_filter(profile, target=target))
-        v_out = list(V._shoe_fit_with_artifact_filter(profile, target=target))
-        if r_out != v_out:
+    for r in run_cases(_xcheck_case, GOLDEN_CASES, shared=shoes_db,
+                       workers=workers_arg(sys.argv)):
+        if not r.ok:
+            fails += 1
+            print(f"  {r.key:34s}  *** {r.error} ***")
+        elif r.value:
             fails += 1
-            print(f"  {name:34s}  *** _shoe_fit MISMATCH ***")
-            for i in range(max(len(r_out), len(v_out))):
-                rr = r_out[i] if i < len(r_out) else "<missing>"
-                vv = v_out[i] if i < len(v_out) else "<missing>"
-                if rr != vv:
-                    print(f"      para[{i}] ref={rr!r}")
-                    print(f"      para[{i}] v2 ={vv!r}")
+            print(f"  {r.key:34s}  *** _shoe_fit MISMATCH ***")
+            for i, rr, vv in r.value:
+                print(f"      para[{i}] ref={rr!r}")
+                print(f"      para[{i}] v2 ={vv!r}")
         else:
-            print(f"  {name:34s}  helpers match")
+            print(f"  {r.key:34s}  helpers match")
 
     print(f"\n# {fails} fidelity mismatch(es)")
     return 0 if fails == 0 else 1
@@ -118,6 +118,17 @@ def _tier_intends(tier, direction):
            (tier == "stiffer" and direction == "stiffer")
 
 
+# Everything generate_shoe_description_v2 reads beyond the pick and the
+# profile: these target keys, and per peer pick only whether each
+# peer-suppressed axis scored negative. v2_pipeline keys the cached pick
+# descriptions on exactly these, so keep in sync.
+DESC_TARGET_KEYS = ("target_fw", "target_hv", "target_dt", "target_asym",
+                    "stiff_target", "closure_pref", "discipline")
+PEER_SUPPRESS_KEYS = {
+    "asymmetry": "asymmetry",
+}
+
+
 def _shared_by_most(axis, picks_minus_self):
     """True if this axis is also negative for >= 70% of peer picks."""
     if not picks_minus_self:
@@ -381,13 +392,10 @@ def _para_tradeoffs_v2(pick, profile, all_picks=None):
     # medium-fw + wide-heel shoes are rare, so most picks miss a wide
     # heel, but each card still has to disclose its own heel miss.
     if peers:
-        suppress_keys = {
-            "asymmetry": "asymmetry",
-        }
         rank_diffs = [
             d for d in rank_diffs
-            if not (d[0] in suppress_keys
-                    and _shared_by_most(suppress_keys[d[0]], peers))
+            if not (d[0] in PEER_SUPPRESS_KEYS
+                    and _shared_by_most(PEER_SUPPRESS_KEYS[d[0]], peers))
         ]
 
     # ── Append the categorical issues already in `issues`, then add
@@ -754,6 +762,8 @@ def generate_shoe_description_v2(pick, profile, all_picks=None):
 
 
 __all__ = [
+    "DESC_TARGET_KEYS",
+    "PEER_SUPPRESS_KEYS",
     "flatten_pick",
     "generate_shoe_description_v2",
     "_para_tradeoffs_v2",
@@ -12,6 +12,7 @@ Output: list of paragraph strings (plain text, no markdown).
 """
 
 import json
+import sys
 from pathlib import Path
 
 # ── Brand typical downsize (EU sizes below street size) ─────────────────
@@ -1697,31 +1698,30 @@ def _aim_suppressed(profile, ratio_key):
 
 # ─── Cascade: HEEL EMPTY ────────────────────────────────────────────────
 
-def _cascade_heel_empty(shoe, profile, street):
+def _cascade_heel_empty(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("heel", "empty", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     shoe_hv  = shoe.get("db_heel_volume")
     user_hw  = profile.get("heel_width_class")
-    user_hd  = (profile.get("heel_depth_class") or "").lower()
-    shoe_r   = _vol_rank(shoe_hv)
-    user_r   = _vol_rank(user_hw)
 
     # A: shoe heel volume rank > user heel width rank
-    if shoe_r is not None and user_r is not None and shoe_r > user_r:
+    if branch == "A":
         return (f"Your {name} has a {_clean_width(shoe_hv)} heel volume while "
                 f"your heel is {_clean_width(user_hw)}. The wider cup is the "
                 f"most likely cause of the empty feel.")
 
     # B: width matches + user has shallow heel
-    if "shallow" in user_hd:
+    if branch == "B":
         return (f"Your {_possessive(name)} {_clean_width(shoe_hv) or 'heel'} volume matches "
                 f"your {_clean_width(user_hw)} heel width, but your shallow heel "
                 f"may not fill deeply sculpted cups. The cause is likely heel "
                 f"depth, so try shoes with a flatter, less sculpted heel cup.")
 
     # C: width and depth check out, but user under-downsized -> suggest going smaller
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "C":
         clause = _under_downsize_clause(brand, raw, user_ds, typical_ds,
                                         typical_value, profile.get("street_size_eu"))
         return (f"Comparing your {name} to your foot profile, it should fit. "
@@ -1733,30 +1733,29 @@ def _cascade_heel_empty(shoe, profile, street):
     fit_clause = _fit_summary_clause(brand, status, user_ds, typical_ds)
     msg = (f"Your {name} should fit based on heel width and depth, and "
            f"{fit_clause}.")
-    if not _aim_suppressed(profile, "heel_width_ratio"):
+    if not facts.aim_suppressed("heel_width_ratio"):
         msg += " In the recommendations we aim for even narrower heel cups."
     return msg
 
 
 # ─── Cascade: HEEL TIGHT ────────────────────────────────────────────────
 
-def _cascade_heel_tight(shoe, profile, street):
+def _cascade_heel_tight(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("heel", "tight", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     shoe_hv = shoe.get("db_heel_volume")
     user_hw = profile.get("heel_width_class")
-    user_hd = (profile.get("heel_depth_class") or "").lower()
-    shoe_r  = _vol_rank(shoe_hv)
-    user_r  = _vol_rank(user_hw)
 
     # A: shoe heel volume narrower than user heel width
-    if shoe_r is not None and user_r is not None and shoe_r < user_r:
+    if branch == "A":
         return (f"Your {name} has a {_clean_width(shoe_hv)} heel volume while "
                 f"your heel is {_clean_width(user_hw)}. The narrower cup is the "
                 f"most likely cause of the tight feel.")
 
     # B: width matches + user has deep heel
-    if "deep" in user_hd:
+    if branch == "B":
         return (f"Your {_possessive(name)} {_clean_width(shoe_hv) or 'heel'} volume matches "
                 f"your {_clean_width(user_hw)} heel width, but your deep heel may "
                 f"not fit cups designed for less backward projection. The cause "
@@ -1764,8 +1763,8 @@ def _cascade_heel_tight(shoe, profile, street):
                 f"sculpted heel cup.")
 
     # C: width + depth fit, user over-downsized -> suggest going up
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "C":
         clause = _over_downsize_clause(brand, raw, user_ds, typical_ds)
         return (f"Comparing your {name} to your foot profile, it should fit. "
                 f"{clause}, so going up half a size could relieve the tightness.")
@@ -1774,27 +1773,25 @@ def _cascade_heel_tight(shoe, profile, street):
     fit_clause = _fit_summary_clause(brand, status, user_ds, typical_ds)
     msg = (f"Your {name} should fit based on heel width and depth, and "
            f"{fit_clause}.")
-    if not _aim_suppressed(profile, "heel_width_ratio"):
+    if not facts.aim_suppressed("heel_width_ratio"):
         msg += " In the recommendations we aim for slightly roomier heel cups."
     return msg
 
 
 # ─── Cascade: TOES SQUEEZED (5-step) ────────────────────────────────────
 
-def _cascade_toes_squeezed(shoe, profile, street):
+def _cascade_toes_squeezed(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("toes", "squeezed", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     user_toe  = (profile.get("toe_shape") or "egyptian").lower()
-    user_fw   = profile.get("forefoot_width_class")
-    arch_cls  = (profile.get("arch_length_class") or "").lower()
     shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
 
     # A: toe shape mismatch
     # Roman 2026-05-01 audit S13/S18: capitalize toe-shape labels (Egyptian/Greek/Roman)
     # for consistency with §1 prose.
-    if not _toe_match(profile, shoe):
+    if branch == "A":
         shoe_forms = shoe.get("db_toe_form") or []
         if isinstance(shoe_forms, str): shoe_forms = [shoe_forms]
         shoe_form_str = "/".join(_toe_label(str(f)) for f in shoe_forms) or "different"
@@ -1806,21 +1803,20 @@ def _cascade_toes_squeezed(shoe, profile, street):
                 f"toe box.")
 
     # B: toe shape matches + wide forefoot in narrower last
-    if (_clean_width(user_fw) == "wide" and shoe_w_r is not None
-            and user_fw_r is not None and shoe_w_r < user_fw_r):
+    if branch == "B":
         return (f"Your {_possessive(name)} toe shape matches your {_toe_label(user_toe)} foot, but "
                 f"your wide forefoot in this {_clean_width(shoe_w)} last is "
                 f"likely causing the squeezed toes. Look for wider lasts.")
 
     # C: toe shape + width fit + long arch
-    if "long" in arch_cls:
+    if branch == "C":
         return (f"Your {_possessive(name)} toe shape and width match your foot, but your "
                 f"long arch may push the ball of your foot into the toe box. "
                 f"Look for shoes with a shorter toe box to relieve the squeeze.")
 
     # D: toe + width + arch fit, over-downsized -> suggest going up
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "D":
         clause = _over_downsize_clause(brand, raw, user_ds, typical_ds)
         return (f"Comparing your {name} to your foot profile, it should fit. "
                 f"{clause}, so going up half a size could relieve the squeeze.")
@@ -1832,25 +1828,24 @@ def _cascade_toes_squeezed(shoe, profile, street):
     msg = (f"Your {name} matches your toe form and width class and "
            f"{fit_clause}, so the squeezed toes aren't explained by toe "
            f"form, width, or sizing.")
-    if not _aim_suppressed(profile, "forefoot_width_ratio"):
+    if not facts.aim_suppressed("forefoot_width_ratio"):
         msg += " In the recommendations we aim for slightly more toe room."
     return msg
 
 
 # ─── Cascade: TOES ROOMY (4-step) ───────────────────────────────────────
 
-def _cascade_toes_roomy(shoe, profile, street):
+def _cascade_toes_roomy(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("toes", "roomy", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     user_toe  = (profile.get("toe_shape") or "egyptian").lower()
-    user_fw   = profile.get("forefoot_width_class")
     shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
 
     # A: toe shape mismatch
     # Roman 2026-05-01 audit S13/S18: capitalize toe-shape labels.
-    if not _toe_match(profile, shoe):
+    if branch == "A":
         shoe_forms = shoe.get("db_toe_form") or []
         if isinstance(shoe_forms, str): shoe_forms = [shoe_forms]
         shoe_form_str = "/".join(_toe_label(str(f)) for f in shoe_forms) or "different"
@@ -1862,15 +1857,14 @@ def _cascade_toes_roomy(shoe, profile, street):
                 f"{user_lbl}-compatible toe box.")
 
     # B: toe shape matches + narrow user in wider shoe
-    if (_clean_width(user_fw) == "narrow" and shoe_w_r is not None
-            and user_fw_r is not None and shoe_w_r > user_fw_r):
+    if branch == "B":
         return (f"Your {_possessive(name)} toe shape matches your foot, but the "
                 f"{_clean_width(shoe_w)} forefoot is wider than your narrow "
                 f"forefoot. Look for narrower lasts.")
 
     # C: toe + width fit + under-downsized -> suggest going smaller
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "C":
         clause = _under_downsize_clause(brand, raw, user_ds, typical_ds,
                                         typical_value, profile.get("street_size_eu"))
         return (f"Comparing your {name} to your foot profile, it should fit. "
@@ -1880,38 +1874,36 @@ def _cascade_toes_roomy(shoe, profile, street):
     fit_clause = _fit_summary_clause(brand, status, user_ds, typical_ds)
     msg = (f"Your {name} should fit based on toe form and forefoot width, "
            f"and {fit_clause}.")
-    if not _aim_suppressed(profile, "forefoot_width_ratio"):
+    if not facts.aim_suppressed("forefoot_width_ratio"):
         msg += " In the recommendations we aim for snugger toe boxes."
     return msg
 
 
 # ─── Cascade: FOREFOOT TIGHT (4-step) ───────────────────────────────────
 
-def _cascade_ff_tight(shoe, profile, street):
+def _cascade_ff_tight(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("forefoot", "tight", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     user_fw   = profile.get("forefoot_width_class")
-    arch_cls  = (profile.get("arch_length_class") or "").lower()
     shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
 
     # A: width mismatch (shoe narrower than user forefoot)
-    if (shoe_w_r is not None and user_fw_r is not None
-            and shoe_w_r < user_fw_r):
+    if branch == "A":
         return (f"Your {_possessive(name)} {_clean_width(shoe_w)} forefoot is narrower "
                 f"than your {_clean_width(user_fw)} forefoot. The width "
                 f"mismatch is the most likely cause.")
 
     # B: width matches + long arch
-    if "long" in arch_cls:
+    if branch == "B":
         return (f"Your {_possessive(name)} width matches your forefoot, but your long "
                 f"arch may push the ball forward into the toe box. Look for "
                 f"shoes with a shorter toe box.")
 
     # C: width + arch fit + over-downsized -> suggest going up
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "C":
         clause = _over_downsize_clause(brand, raw, user_ds, typical_ds)
         return (f"Comparing your {name} to your foot profile, it should fit. "
                 f"{clause}, so half a size up could relieve the tightness.")
@@ -1922,31 +1914,30 @@ def _cascade_ff_tight(shoe, profile, street):
     fit_clause = _fit_summary_clause(brand, status, user_ds, typical_ds)
     msg = (f"Your {name} matches your width class and {fit_clause}, "
            f"so the tight forefoot isn't explained by width or sizing.")
-    if not _aim_suppressed(profile, "forefoot_width_ratio"):
+    if not facts.aim_suppressed("forefoot_width_ratio"):
         msg += " In the recommendations we aim for slightly wider forefoots."
     return msg
 
 
 # ─── Cascade: FOREFOOT LOOSE (3-step) ───────────────────────────────────
 
-def _cascade_ff_loose(shoe, profile, street):
+def _cascade_ff_loose(shoe, profile, street, facts=None):
+    facts = facts or _FitFacts(profile, street)
+    branch = facts.branch("forefoot", "loose", shoe)
     name = _name(shoe)
     brand = shoe.get("brand", "")
     user_fw   = profile.get("forefoot_width_class")
     shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
 
     # A: shoe wider than user forefoot
-    if (shoe_w_r is not None and user_fw_r is not None
-            and shoe_w_r > user_fw_r):
+    if branch == "A":
         return (f"Your {_possessive(name)} {_clean_width(shoe_w)} forefoot is wider than "
                 f"your {_clean_width(user_fw)} forefoot. The width mismatch is "
                 f"the most likely cause of the loose feel.")
 
     # B: width matches + under-downsized -> suggest going smaller
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
+    status, raw, user_ds, typical_ds, typical_value = facts.sizing(shoe)
+    if branch == "B":
         clause = _under_downsize_clause(brand, raw, user_ds, typical_ds,
                                         typical_value, profile.get("street_size_eu"))
         return (f"Comparing your {name} to your foot profile, it should fit. "
@@ -1955,7 +1946,7 @@ def _cascade_ff_loose(shoe, profile, street):
     # C: typical or over-downsized (over doesn't fix loose)
     fit_clause = _fit_summary_clause(brand, status, user_ds, typical_ds)
     msg = f"Your {name} should fit based on width, and {fit_clause}."
-    if not _aim_suppressed(profile, "forefoot_width_ratio"):
+    if not facts.aim_suppressed("forefoot_width_ratio"):
         msg += " In the recommendations we aim for snugger forefoots."
     return msg
 
@@ -2152,10 +2143,11 @@ _DIM_DISPATCH = {
 #    In {n_a} of these ({names_a}) {cause_a_sentence}.
 #    The other {n_b} ({names_b}) {cause_b_sentence}."
 #
-# Each cascade has a paired classifier (_classify_*) that returns
-# (branch_id, params_dict) without calling the full cascade. The group
-# renderer (_group_*) consumes the list of (shoe, params) tuples and
-# emits a sentence covering them all.
+# Each cascade's decision tree is a rule list in _RULE_TABLE; classifying
+# a shoe returns (branch_id, params_dict) without rendering anything. The
+# single-shoe cascade renders the winning branch; the group renderer
+# (_group_*) consumes the list of (shoe, params) tuples and emits a
+# sentence covering them all.
 # ════════════════════════════════════════════════════════════════════════
 
 def _join_names(names):
@@ -2176,136 +2168,231 @@ def _join_brands(brands):
     return _join_names(seen)
 
 
-# ─── Classifiers (mirror cascade decision trees) ───────────────────────
+# ─── Classification rule table ─────────────────────────────────────────
+#
+# Every (dim, rating) cascade is an ordered list of
+#     (branch_id, predicate, params)
+# rules: the first rule whose predicate holds wins, and the last rule is
+# the unconditional fall-through. Predicates are named facts about the
+# user and the shoe, shared across cascades ("the shoe is over-downsized"
+# drives heel-tight C, toes-squeezed D and forefoot-tight C).
+#
+# _compile_rules() turns each rule list into one straight-line function
+# at import (see `python3 interp_shoe_fit_v2.py --rules`), so a lookup
+# costs no more than the hand-written if/elif chains it replaces. The
+# predicates read the user's side from _FitFacts, which normalizes the
+# profile once per generate_shoe_fit call and memoizes each shoe's
+# sizing status; params are only built for shoes that end up in a
+# minority group or the cross-dim consolidation.
+
+def _rank_diff(shoe_r, user_r):
+    """shoe rank - user rank, or 0 when either is unknown."""
+    if shoe_r is None or user_r is None:
+        return 0
+    return shoe_r - user_r
+
+
+def _toe_forms(shoe):
+    forms = shoe.get("db_toe_form") or []
+    if isinstance(forms, str):
+        forms = [forms]
+    return [str(f).lower() for f in forms]
+
+
+# name -> Python expression over ``f`` (the _FitFacts) and ``s`` (the shoe).
+_PREDICATES = {
+    "heel_shallow":    '"shallow" in f.user_hd',
+    "heel_deep":       '"deep" in f.user_hd',
+    "arch_long":       '"long" in f.arch_cls',
+    "cup_wider":       '_rank_diff(_vol_rank(s.get("db_heel_volume")), f.user_hw_r) > 0',
+    "cup_narrower":    '_rank_diff(_vol_rank(s.get("db_heel_volume")), f.user_hw_r) < 0',
+    "last_wider":      '_rank_diff(_vol_rank(s.get("db_width")), f.user_fw_r) > 0',
+    "last_narrower":   '_rank_diff(_vol_rank(s.get("db_width")), f.user_fw_r) < 0',
+    "wide_ff_in_narrower_last":
+        'f.user_fw_clean == "wide" and _rank_diff(_vol_rank(s.get("db_width")), f.user_fw_r) < 0',
+    "narrow_ff_in_wider_last":
+        'f.user_fw_clean == "narrow" and _rank_diff(_vol_rank(s.get("db_width")), f.user_fw_r) > 0',
+    "toe_mismatch":    'not _toe_match(f.profile, s)',
+    "under_downsized": 'f.sizing(s)[0] == "under"',
+    "over_downsized":  'f.sizing(s)[0] == "over"',
+}
 
-def _classify_heel_empty(shoe, profile, street):
-    shoe_hv  = shoe.get("db_heel_volume")
-    user_hw  = profile.get("heel_width_class")
-    user_hd  = (profile.get("heel_depth_class") or "").lower()
-    shoe_r   = _vol_rank(shoe_hv)
-    user_r   = _vol_rank(user_hw)
-    if shoe_r is not None and user_r is not None and shoe_r > user_r:
-        return ("A", {"shoe_hv": _clean_width(shoe_hv),
-                      "user_hw": _clean_width(user_hw)})
-    if "shallow" in user_hd:
-        return ("B", {"user_hw": _clean_width(user_hw)})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
-        return ("C", {"brand": shoe.get("brand"), "raw": raw,
-                      "user_ds": user_ds, "typical_ds": typical_ds,
-                      "typical_value": typical_value})
-    return ("D", {})
 
+def _params_under(f, s):
+    status, raw, user_ds, typical_ds, typical_value = f.sizing(s)
+    return {"brand": s.get("brand"), "raw": raw, "user_ds": user_ds,
+            "typical_ds": typical_ds, "typical_value": typical_value}
 
-def _classify_heel_tight(shoe, profile, street):
-    shoe_hv = shoe.get("db_heel_volume")
-    user_hw = profile.get("heel_width_class")
-    user_hd = (profile.get("heel_depth_class") or "").lower()
-    shoe_r  = _vol_rank(shoe_hv)
-    user_r  = _vol_rank(user_hw)
-    if shoe_r is not None and user_r is not None and shoe_r < user_r:
-        return ("A", {"shoe_hv": _clean_width(shoe_hv),
-                      "user_hw": _clean_width(user_hw)})
-    if "deep" in user_hd:
-        return ("B", {"user_hw": _clean_width(user_hw)})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
-        return ("C", {"brand": shoe.get("brand"), "raw": raw,
-                      "user_ds": user_ds, "typical_ds": typical_ds})
-    return ("D", {})
-
-
-def _classify_toes_squeezed(shoe, profile, street):
-    if not _toe_match(profile, shoe):
-        forms = shoe.get("db_toe_form") or []
-        if isinstance(forms, str): forms = [forms]
-        forms_lc = [str(f).lower() for f in forms]
-        return ("A", {"shoe_forms": forms_lc,
-                      "user_toe": (profile.get("toe_shape") or "").lower()})
-    user_fw   = profile.get("forefoot_width_class")
-    arch_cls  = (profile.get("arch_length_class") or "").lower()
-    shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
-    if (_clean_width(user_fw) == "wide" and shoe_w_r is not None
-            and user_fw_r is not None and shoe_w_r < user_fw_r):
-        return ("B", {"shoe_w": _clean_width(shoe_w)})
-    if "long" in arch_cls:
-        return ("C", {})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
-        return ("D", {"brand": shoe.get("brand"), "user_ds": user_ds,
-                      "typical_ds": typical_ds})
-    return ("E", {})
-
-
-def _classify_toes_roomy(shoe, profile, street):
-    if not _toe_match(profile, shoe):
-        forms = shoe.get("db_toe_form") or []
-        if isinstance(forms, str): forms = [forms]
-        forms_lc = [str(f).lower() for f in forms]
-        return ("A", {"shoe_forms": forms_lc,
-                      "user_toe": (profile.get("toe_shape") or "").lower()})
-    user_fw   = profile.get("forefoot_width_class")
-    shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
-    if (_clean_width(user_fw) == "narrow" and shoe_w_r is not None
-            and user_fw_r is not None and shoe_w_r > user_fw_r):
-        return ("B", {"shoe_w": _clean_width(shoe_w)})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
-        return ("C", {"brand": shoe.get("brand"), "raw": raw,
-                      "user_ds": user_ds, "typical_ds": typical_ds,
-                      "typical_value": typical_value})
-    return ("D", {})
 
+def _params_over(f, s):
+    status, raw, user_ds, typical_ds, typical_value = f.sizing(s)
+    return {"brand": s.get("brand"), "user_ds": user_ds, "typical_ds": typical_ds}
 
-def _classify_ff_tight(shoe, profile, street):
-    user_fw   = profile.get("forefoot_width_class")
-    arch_cls  = (profile.get("arch_length_class") or "").lower()
-    shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
-    if (shoe_w_r is not None and user_fw_r is not None
-            and shoe_w_r < user_fw_r):
-        return ("A", {"shoe_w": _clean_width(shoe_w),
-                      "user_fw": _clean_width(user_fw)})
-    if "long" in arch_cls:
-        return ("B", {})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "over":
-        return ("C", {"brand": shoe.get("brand"), "user_ds": user_ds,
-                      "typical_ds": typical_ds})
-    return ("D", {})
-
-
-def _classify_ff_loose(shoe, profile, street):
-    user_fw   = profile.get("forefoot_width_class")
-    shoe_w    = shoe.get("db_width")
-    shoe_w_r  = _vol_rank(shoe_w)
-    user_fw_r = _vol_rank(user_fw)
-    if (shoe_w_r is not None and user_fw_r is not None
-            and shoe_w_r > user_fw_r):
-        return ("A", {"shoe_w": _clean_width(shoe_w),
-                      "user_fw": _clean_width(user_fw)})
-    status, raw, user_ds, typical_ds, typical_value = _sizing_status(shoe, street)
-    if status == "under":
-        return ("B", {"brand": shoe.get("brand"), "raw": raw,
-                      "user_ds": user_ds, "typical_ds": typical_ds,
-                      "typical_value": typical_value})
-    return ("C", {})
-
-
-_CLASSIFIERS = {
-    ("heel",     "empty"):    _classify_heel_empty,
-    ("heel",     "tight"):    _classify_heel_tight,
-    ("toes",     "squeezed"): _classify_toes_squeezed,
-    ("toes",     "roomy"):    _classify_toes_roomy,
-    ("forefoot", "tight"):    _classify_ff_tight,
-    ("forefoot", "loose"):    _classify_ff_loose,
+
+def _params_over_raw(f, s):
+    status, raw, user_ds, typical_ds, typical_value = f.sizing(s)
+    return {"brand": s.get("brand"), "raw": raw, "user_ds": user_ds,
+            "typical_ds": typical_ds}
+
+
+# name -> params(facts, shoe): what the group renderers / consolidation read.
+_PARAMS = {
+    "cup_widths":  lambda f, s: {"shoe_hv": _clean_width(s.get("db_heel_volume")),
+                                 "user_hw": _clean_width(f.user_hw)},
+    "user_heel":   lambda f, s: {"user_hw": _clean_width(f.user_hw)},
+    "last_widths": lambda f, s: {"shoe_w": _clean_width(s.get("db_width")),
+                                 "user_fw": _clean_width(f.user_fw)},
+    "shoe_width":  lambda f, s: {"shoe_w": _clean_width(s.get("db_width"))},
+    "toe_forms":   lambda f, s: {"shoe_forms": _toe_forms(s),
+                                 "user_toe": f.user_toe},
+    "under":       _params_under,
+    "over":        _params_over,
+    "over_raw":    _params_over_raw,
 }
 
+_RULE_TABLE = {
+    ("heel", "empty"): [
+        ("A", "cup_wider",                "cup_widths"),
+        ("B", "heel_shallow",             "user_heel"),
+        ("C", "under_downsized",          "under"),
+        ("D", None,                       None),
+    ],
+    ("heel", "tight"): [
+        ("A", "cup_narrower",             "cup_widths"),
+        ("B", "heel_deep",                "user_heel"),
+        ("C", "over_downsized",           "over_raw"),
+        ("D", None,                       None),
+    ],
+    ("toes", "squeezed"): [
+        ("A", "toe_mismatch",             "toe_forms"),
+        ("B", "wide_ff_in_narrower_last", "shoe_width"),
+        ("C", "arch_long",                None),
+        ("D", "over_downsized",           "over"),
+        ("E", None,                       None),
+    ],
+    ("toes", "roomy"): [
+        ("A", "toe_mismatch",             "toe_forms"),
+        ("B", "narrow_ff_in_wider_last",  "shoe_width"),
+        ("C", "under_downsized",          "under"),
+        ("D", None,                       None),
+    ],
+    ("forefoot", "tight"): [
+        ("A", "last_narrower",            "last_widths"),
+        ("B", "arch_long",                None),
+        ("C", "over_downsized",           "over"),
+        ("D", None,                       None),
+    ],
+    ("forefoot", "loose"): [
+        ("A", "last_wider",               "last_widths"),
+        ("B", "under_downsized",          "under"),
+        ("C", None,                       None),
+    ],
+}
+
+
+def _rules_source(table):
+    """Python source of one decide(f, s) -> (branch_id, params name) per
+    rule list. Raises ValueError on an unknown predicate / params name, a
+    duplicate branch id or a missing fall-through."""
+    lines = []
+    for (dim, rating), rules in table.items():
+        key = f"{dim}/{rating}"
+        if not rules or rules[-1][1] is not None:
+            raise ValueError(f"{key}: last rule must be unconditional")
+        if len({r[0] for r in rules}) != len(rules):
+            raise ValueError(f"{key}: duplicate branch id")
+        lines.append(f"def _decide_{dim}_{rating}(f, s):")
+        for branch, pred, params in rules:
+            if pred is not None and pred not in _PREDICATES:
+                raise ValueError(f"{key}: unknown predicate {pred!r}")
+            if params is not None and params not in _PARAMS:
+                raise ValueError(f"{key}: unknown params {params!r}")
+            ret = f"return {branch!r}, {params!r}"
+            if pred is None:
+                lines.append(f"    {ret}")
+            else:
+                lines.append(f"    if {_PREDICATES[pred]}:  # {pred}")
+                lines.append(f"        {ret}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _compile_rules(table):
+    """{(dim, rating): decide(f, s)} compiled from ``table``."""
+    namespace = {"_rank_diff": _rank_diff, "_vol_rank": _vol_rank,
+                 "_toe_match": _toe_match}
+    exec(compile(_rules_source(table), "<shoe-fit rules>", "exec"), namespace)
+    return {(dim, rating): namespace[f"_decide_{dim}_{rating}"]
+            for dim, rating in table}
+
+
+_DECISIONS = _compile_rules(_RULE_TABLE)
+
+
+class _FitFacts:
+    """The user's side of every predicate, normalized once per
+    generate_shoe_fit call, plus each shoe's memoized sizing status.
+    Shoe entries are keyed on id(shoe), so one instance must not outlive
+    the shoes list it was used with.
+    """
+
+    __slots__ = ("profile", "street", "user_hw", "user_hw_r", "user_hd",
+                 "user_fw", "user_fw_r", "user_fw_clean", "arch_cls",
+                 "user_toe", "_sizing", "_aim", "_rated_for", "_rated")
+
+    def __init__(self, profile, street):
+        self.profile = profile
+        self.street = street
+        self.user_hw = profile.get("heel_width_class")
+        self.user_hw_r = _vol_rank(self.user_hw)
+        self.user_hd = (profile.get("heel_depth_class") or "").lower()
+        self.user_fw = profile.get("forefoot_width_class")
+        self.user_fw_r = _vol_rank(self.user_fw)
+        self.user_fw_clean = _clean_width(self.user_fw)
+        self.arch_cls = (profile.get("arch_length_class") or "").lower()
+        self.user_toe = (profile.get("toe_shape") or "").lower()
+        self._sizing = {}
+        self._aim = {}
+        self._rated_for, self._rated = None, {}
+
+    def sizing(self, shoe):
+        """_sizing_status(shoe, street)."""
+        hit = self._sizing.get(id(shoe))
+        if hit is None:
+            hit = self._sizing[id(shoe)] = _sizing_status(shoe, self.street)
+        return hit
+
+    def aim_suppressed(self, ratio_key):
+        """_aim_suppressed(profile, ratio_key)."""
+        hit = self._aim.get(ratio_key)
+        if hit is None:
+            hit = self._aim[ratio_key] = _aim_suppressed(self.profile, ratio_key)
+        return hit
+
+    def branch(self, dim, rating, shoe):
+        """branch_id of the first matching rule for this shoe."""
+        return _DECISIONS[(dim, rating)](self, shoe)[0]
+
+    def classify(self, dim, rating, shoe):
+        """(branch_id, params): the winning branch plus what the group
+        renderers and the cross-dim consolidation read about the shoe."""
+        branch, params = _DECISIONS[(dim, rating)](self, shoe)
+        return branch, (_PARAMS[params](self, shoe) if params else {})
+
+    def rated(self, shoes, dim, rating):
+        """Shoes whose fit on ``dim`` is ``rating``, in order. Every
+        (dim, rating) group comes from one pass over ``shoes``; the
+        returned list is shared, so callers must not mutate it."""
+        if self._rated_for is not shoes:
+            index = {}
+            for s in shoes:
+                fit = s.get("fit")
+                if fit:
+                    for d, r in fit.items():
+                        index.setdefault((d, r), []).append(s)
+            self._rated_for, self._rated = shoes, index
+        return self._rated.get((dim, rating), ())
+
 
 # ─── Group renderers ───────────────────────────────────────────────────
 #
@@ -2467,7 +2554,8 @@ _GROUP_RENDERERS = {
 
 # ─── Minority dispatch (count + cause groups) ──────────────────────────
 
-def _emit_minority(dim, rating, shoes_with_rating, n_total, profile, street, cascade_fn):
+def _emit_minority(dim, rating, shoes_with_rating, n_total, profile, street, cascade_fn,
+                   facts=None):
     """Roman 2026-05-02 case-4 review, A: replace per-shoe sentence-spam
     with a count statement + one sentence per cause group.
 
@@ -2480,6 +2568,7 @@ def _emit_minority(dim, rating, shoes_with_rating, n_total, profile, street, cas
                               {verb} {rating}. In n_a of these (X, Y) <cause_a>.
                               <fix_a> In n_b of these (Z) <cause_b>. <fix_b>"
     """
+    facts = facts or _FitFacts(profile, street)
     n_affected = len(shoes_with_rating)
     verb = "feel" if dim == "toes" else "feels"
 
@@ -2487,24 +2576,23 @@ def _emit_minority(dim, rating, shoes_with_rating, n_total, profile, street, cas
         sh = shoes_with_rating[0]
         return [f"Your {_possessive(_name(sh))} {dim} {verb} {rating} "
                 f"while the other shoes fit on the {dim}. "
-                + cascade_fn(sh, profile, street)]
+                + cascade_fn(sh, profile, street, facts)]
 
-    classifier = _CLASSIFIERS.get((dim, rating))
     renderer = _GROUP_RENDERERS.get((dim, rating))
-    if classifier is None or renderer is None:
+    if (dim, rating) not in _DECISIONS or renderer is None:
         # Safety fallback: dim/rating not covered by classifiers — emit
         # per-shoe cascades so we never silently drop output.
         out = []
         for sh in shoes_with_rating:
             out.append(f"Your {_possessive(_name(sh))} {dim} {verb} {rating} "
                        f"while the other shoes fit on the {dim}. "
-                       + cascade_fn(sh, profile, street))
+                       + cascade_fn(sh, profile, street, facts))
         return out
 
     # Group by branch_id; preserve A->E ordering.
     groups = {}
     for sh in shoes_with_rating:
-        branch_id, params = classifier(sh, profile, street)
+        branch_id, params = facts.classify(dim, rating, sh)
         groups.setdefault(branch_id, []).append((sh, params))
 
     # ── Single-branch path: all minority shoes hit the same cause.
@@ -2549,6 +2637,10 @@ def _emit_minority(dim, rating, shoes_with_rating, n_total, profile, street, cas
 _HV_LABELS = ("narrow", "medium", "wide")
 _FW_LABELS = ("narrow", "medium", "wide")
 
+# The only target keys generate_shoe_fit reads (via _hv_label/_fw_label).
+# v2_pipeline keys the cached shoe-fit block on these, so keep in sync.
+SHOE_FIT_TARGET_KEYS = ("target_hv", "target_fw")
+
 
 def _hv_label(target):
     """Map target dict (or rank int) to user-facing heel-volume label."""
@@ -2575,7 +2667,8 @@ def _fw_label(target):
     return "medium"
 
 
-def _dispatch_dim(dim, shoes, profile, street, suppressed=None, target=None):
+def _dispatch_dim(dim, shoes, profile, street, suppressed=None, target=None,
+                  facts=None):
     """Returns list of paragraphs for the given dim across all shoes.
 
     Decision logic:
@@ -2589,12 +2682,13 @@ def _dispatch_dim(dim, shoes, profile, street, suppressed=None, target=None):
     matching a suppressed entry are skipped here.
     """
     suppressed = suppressed or set()
+    facts = facts or _FitFacts(profile, street)
     cfg = _DIM_DISPATCH[dim]
     pos_label = cfg["positive"]
     neg_label = cfg["negative"]
 
-    pos_shoes = [s for s in shoes if (s.get("fit") or {}).get(dim) == pos_label]
-    neg_shoes = [s for s in shoes if (s.get("fit") or {}).get(dim) == neg_label]
+    pos_shoes = facts.rated(shoes, dim, pos_label)
+    neg_shoes = facts.rated(shoes, dim, neg_label)
 
     n = len(shoes)
     out = []
@@ -2622,24 +2716,24 @@ def _dispatch_dim(dim, shoes, profile, street, suppressed=None, target=None):
     # Positive rating present
     if pos_shoes:
         if n == 1:
-            out.append(cfg["cascade_pos"](pos_shoes[0], profile, street))
+            out.append(cfg["cascade_pos"](pos_shoes[0], profile, street, facts))
         elif len(pos_shoes) == n:
             out.append(cfg["aggregate_pos"](pos_shoes, profile))
         else:
             # MINORITY: count + cause-grouped via _emit_minority
             # (Roman 2026-05-02 case-4 review, A).
             out.extend(_emit_minority(dim, pos_label, pos_shoes, n,
-                                      profile, street, cfg["cascade_pos"]))
+                                      profile, street, cfg["cascade_pos"], facts))
 
     # Negative rating present
     if neg_shoes:
         if n == 1:
-            out.append(cfg["cascade_neg"](neg_shoes[0], profile, street))
+            out.append(cfg["cascade_neg"](neg_shoes[0], profile, street, facts))
         elif len(neg_shoes) == n:
             out.append(cfg["aggregate_neg"](neg_shoes, profile))
         else:
             out.extend(_emit_minority(dim, neg_label, neg_shoes, n,
-                                      profile, street, cfg["cascade_neg"]))
+                                      profile, street, cfg["cascade_neg"], facts))
 
     return out
 
@@ -2706,7 +2800,7 @@ _SIZING_UP_BRANCH = {
 }
 
 
-def _classify_per_shoe_minorities(shoes, profile, street):
+def _classify_per_shoe_minorities(shoes, profile, street, facts=None):
     """For each shoe that's the SOLE minority on a dim, classify its
     cascade branch. Returns {shoe_key: [(dim, rating, branch_id, params, shoe), ...]}.
     Only fires when total_shoes >= 2 (otherwise no minority case).
@@ -2714,18 +2808,17 @@ def _classify_per_shoe_minorities(shoes, profile, street):
     out = {}
     if len(shoes) < 2:
         return out
+    facts = facts or _FitFacts(profile, street)
     for dim in ("heel", "toes", "forefoot"):
         cfg = _DIM_DISPATCH[dim]
         for rating in (cfg["positive"], cfg["negative"]):
-            affected = [s for s in shoes
-                        if (s.get("fit") or {}).get(dim) == rating]
+            affected = facts.rated(shoes, dim, rating)
             if len(affected) != 1:
                 continue
             sh = affected[0]
-            classifier = _CLASSIFIERS.get((dim, rating))
-            if not classifier:
+            if (dim, rating) not in _DECISIONS:
                 continue
-            branch_id, params = classifier(sh, profile, street)
+            branch_id, params = facts.classify(dim, rating, sh)
             shoe_key = _name(sh)
             out.setdefault(shoe_key, []).append(
                 (dim, rating, branch_id, params, sh))
@@ -2846,8 +2939,12 @@ def generate_shoe_fit(profile, target=None):
     if sizing:
         paragraphs.append(sizing)
 
+    # One fact base for the whole call: every predicate below is evaluated
+    # at most once per profile / shoe.
+    facts = _FitFacts(profile, street)
+
     # Cross-dim sizing consolidation (Roman 2026-05-08).
-    per_shoe = _classify_per_shoe_minorities(shoes, profile, street)
+    per_shoe = _classify_per_shoe_minorities(shoes, profile, street, facts)
     cross_dim_paras, suppressed = _consolidate_cross_dim_sizing(per_shoe, shoes)
     paragraphs.extend(cross_dim_paras)
 
@@ -2856,7 +2953,7 @@ def generate_shoe_fit(profile, target=None):
     for dim in ("heel", "toes", "forefoot"):
         for para in _dispatch_dim(dim, shoes, profile, street,
                                   suppressed=suppressed,
-                                  target=target):
+                                  target=target, facts=facts):
             paragraphs.append(para)
 
     return paragraphs
@@ -2892,4 +2989,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if "--rules" in sys.argv:
+        print(_rules_source(_RULE_TABLE))
+    else:
+        main()
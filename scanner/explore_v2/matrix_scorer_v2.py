@@ -38,6 +38,8 @@ Inputs (profile dict)
 """
 
 import sys
+import threading
+import time
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -54,6 +56,7 @@ from combinations_top5 import (
     DISCIPLINE_USE_CASES, ROCK_ALIASES,
     DOWNTURN_ORDER, ASYM_ORDER,
 )
+from shoe_catalog import catalog_for
 
 # ── Constants from the locked scoring spec ────────────────────────────
 INSTEP_HIGH_THRESHOLD = 0.273   # ≥ this → "high instep"
@@ -111,6 +114,39 @@ def hard_filter_owned(shoe, profile):
 HARD_FILTERS = [hard_filter_kids, hard_filter_owned]
 
 
+# Bitset form of each hard filter over the shoe catalog (shoe_catalog
+# masks): (catalog, profile) -> mask of shoes the filter removes. A filter
+# in HARD_FILTERS without an entry here is still run per shoe.
+def _kids_mask(catalog, profile):
+    street = profile.get("street_size_eu")
+    if street is None or street >= KIDS_STREET_SIZE_CUT:
+        return catalog.kids_mask
+    return 0
+
+HARD_FILTER_MASKS = {
+    hard_filter_kids:  _kids_mask,
+    hard_filter_owned: lambda catalog, profile: catalog.owned_mask(profile.get("shoes")),
+}
+
+
+def eligible_mask(shoes_db, profile, pool_mask=None):
+    """Bitset (over shoes_db) of the shoes in pool_mask that pass every
+    hard filter. pool_mask defaults to the whole catalog."""
+    catalog = catalog_for(shoes_db)
+    mask = catalog.all_mask if pool_mask is None else pool_mask
+    per_shoe = []
+    for hf in HARD_FILTERS:
+        to_mask = HARD_FILTER_MASKS.get(hf)
+        if to_mask is None:
+            per_shoe.append(hf)
+        else:
+            mask &= ~to_mask(catalog, profile)
+    for i in catalog.indices(mask) if per_shoe else ():
+        if any(hf(shoes_db[i], profile) is not None for hf in per_shoe):
+            mask &= ~(1 << i)
+    return mask
+
+
 # ══════════════════════════════════════════════════════════════════════
 # Use-case target  (stiffness window + closure prefs + ankle requirement)
 # Mirrors combinations_top5.compute_target — kept here so the scorer
@@ -164,6 +200,13 @@ def discipline_overlap(shoe, discipline):
     return any(a == uc or a in uc or uc in a for a in aliases for uc in use_cases)
 
 
+def discipline_mask(shoes_db, discipline):
+    """Bitset of discipline_overlap over shoes_db, built once per catalog."""
+    return catalog_for(shoes_db).predicate_mask(
+        ("discipline_overlap", discipline),
+        lambda shoe: discipline_overlap(shoe, discipline))
+
+
 # ══════════════════════════════════════════════════════════════════════
 # 9 SCORING AXES
 # ══════════════════════════════════════════════════════════════════════
@@ -357,6 +400,38 @@ SCORING_AXES = [
     ("availability",     axis_availability),
 ]
 
+# Target keys each axis reads. An axis result is a pure function of
+# (shoe, profile, these keys), which is what lets whatif_v2 reuse one
+# axis column across every preference variant that agrees on them.
+# Keep in sync when an axis starts reading a new target key.
+AXIS_TARGET_KEYS = {
+    "stiffness":      ("stiff_lo", "stiff_hi", "stiff_target"),
+    "ankle":          ("ankle_required",),
+    "downturn":       ("target_dt",),
+    "toe_form":       (),
+    "forefoot_width": ("target_fw",),
+    "heel_volume":    ("target_hv",),
+    "asymmetry":      ("target_asym",),
+    "closure":        ("closure_pref", "closure_bad", "discipline"),
+    "instep_extreme": (),
+    "availability":   ("priced_slugs",),
+}
+
+
+def _freeze(value):
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def axis_column_key(name, target):
+    """Key of one axis column: the axis name plus the values of the
+    target keys it reads. Two targets with the same key score every shoe
+    identically on that axis."""
+    return (name,) + tuple(_freeze(target.get(k)) for k in AXIS_TARGET_KEYS[name])
+
 
 # ══════════════════════════════════════════════════════════════════════
 # Main scoring entry point
@@ -375,14 +450,22 @@ def score_shoe(shoe, target, profile):
             return None  # caller can log `why` if interested
 
     # Soft eligibility: discipline overlap (heavy penalty if missing)
-    breakdown = {}
     if not discipline_overlap(shoe, target["discipline"]):
-        return {
-            "score": -100,
-            "breakdown": {"discipline_overlap": (-100, "no discipline overlap")},
-            "hard_filtered": False,
-        }
+        return _no_overlap_score()
+    return _axes_score(shoe, target, profile)
 
+
+def _no_overlap_score():
+    return {
+        "score": -100,
+        "breakdown": {"discipline_overlap": (-100, "no discipline overlap")},
+        "hard_filtered": False,
+    }
+
+
+def _axes_score(shoe, target, profile):
+    """score_shoe for a shoe that passed the hard filters and overlaps."""
+    breakdown = {}
     total = 0
     for name, fn in SCORING_AXES:
         s, note = fn(shoe, target, profile)
@@ -431,20 +514,57 @@ def _shift_target(target, dstiff):
     return out
 
 
-def _score_against(shoes_db, target, profile):
+def _score_against(shoes_db, target, profile, eligible=None, columns=None):
     """Score every shoe and return [(score_dict, shoe), ...] sorted desc.
-    Hard-filtered shoes are dropped."""
+    Hard-filtered shoes are dropped.
+
+    ``eligible`` is the eligible_mask bitset when the caller already has
+    it; only its shoes are visited, and discipline overlap comes from the
+    catalog's discipline_mask instead of a per-shoe check.
+
+    ``columns`` is an axis column cache, {axis_column_key: {shoe index:
+    (score, note)}}. Axis results are read from it and missing ones are
+    added, so calls sharing one cache only score what their targets
+    change (assemble_tiers' three passes differ in stiffness only)."""
+    if eligible is None:
+        eligible = eligible_mask(shoes_db, profile)
+    overlap = discipline_mask(shoes_db, target["discipline"])
+    catalog = catalog_for(shoes_db)
+    if columns is None:
+        scored = set(catalog.indices(eligible & overlap))
+        out = []
+        for i in catalog.indices(eligible):
+            s = shoes_db[i]
+            r = _axes_score(s, target, profile) if i in scored else _no_overlap_score()
+            out.append((r, s))
+        out.sort(key=lambda x: -x[0]["score"])
+        return out
+
+    scorable = catalog.indices(eligible & overlap)
+    axes = []
+    for name, fn in SCORING_AXES:
+        col = columns.setdefault(axis_column_key(name, target), {})
+        for i in scorable:
+            if i not in col:
+                col[i] = fn(shoes_db[i], target, profile)
+        axes.append((name, col))
+    scored = set(scorable)
     out = []
-    for s in shoes_db:
-        r = score_shoe(s, target, profile)
-        if r is None:
-            continue
-        out.append((r, s))
+    for i in catalog.indices(eligible):
+        if i in scored:
+            breakdown = {name: col[i] for name, col in axes}
+            total = 0
+            for v in breakdown.values():
+                total += v[0]
+            r = {"score": total, "breakdown": breakdown, "hard_filtered": False}
+        else:
+            r = _no_overlap_score()
+        out.append((r, shoes_db[i]))
     out.sort(key=lambda x: -x[0]["score"])
     return out
 
 
-def _pick_with_caps(scored, picked_slugs, brand_count, no_edge_count, n=TIER_SIZE):
+def _pick_with_caps(scored, picked_slugs, brand_count, no_edge_count, n=None):
     """Walk a sorted-desc scored list and pick up to n entries respecting:
       * skip if slug already picked (cross-tier dedup)
       * skip if brand already at PER_TIER_BRAND_CAP within this tier
@@ -452,8 +572,11 @@ def _pick_with_caps(scored, picked_slugs, brand_count, no_edge_count, n=TIER_SIZ
       * skip if no_edge and tier already has PER_TIER_NO_EDGE_CAP
     Mutates picked_slugs / brand_count / no_edge_count counters in-place
     so that GLOBAL caps carry between tiers.
+    n defaults to TIER_SIZE, read at call time.
     Returns list of (score_dict, shoe).
     """
+    if n is None:
+        n = TIER_SIZE
     tier_picks = []
     tier_brand_count = {}
     tier_no_edge = 0
@@ -525,8 +648,45 @@ def best_price_at_size(slug, user_size_eu, price_rows):
     return best
 
 
+class PriceIndex:
+    """best_price_at_size over price rows grouped by slug, memoized per
+    (slug, size). Same answers as scanning the full row list."""
+
+    def __init__(self, price_rows):
+        self.rows = price_rows or []
+        self.by_slug = {}
+        for row in self.rows:
+            self.by_slug.setdefault(row.get("product_slug"), []).append(row)
+        self._memo = {}
+
+    def price_at(self, slug, size):
+        key = (slug, size)
+        if key not in self._memo:
+            self._memo[key] = best_price_at_size(slug, size, self.by_slug.get(slug))
+        return self._memo[key]
+
+
+_PRICE_INDEX_CACHE = 4   # loaded price-row lists kept indexed
+_price_indexes = []      # [(price_rows, PriceIndex)], most recent last
+_price_indexes_lock = threading.Lock()
+
+
+def price_index_for(price_rows):
+    """PriceIndex for a loaded price-row list, built once per list
+    (like shoe_catalog.catalog_for)."""
+    with _price_indexes_lock:
+        for rows, index in _price_indexes:
+            if rows is price_rows and len(index.rows) == len(price_rows or []):
+                return index
+        index = PriceIndex(price_rows)
+        _price_indexes[:] = [e for e in _price_indexes
+                             if e[0] is not price_rows][-(_PRICE_INDEX_CACHE - 1):]
+        _price_indexes.append((price_rows, index))
+        return index
+
+
 def _select_budget(baseline_scored, profile, price_rows,
-                   picked_slugs, brand_count, rec_size_fn=None):
+                   picked_slugs, brand_count, rec_size_fn=None, price_at=None):
     """Budget tier: top-30 by baseline score → cheapest-3 by price-at-size.
 
     See project_v2_tier_assembly memory for the locked rules.
@@ -536,6 +696,9 @@ def _select_budget(baseline_scored, profile, price_rows,
     climbing shoes run 1-2.5 EU down, so street-size stock lookups
     almost always miss. Falls back to street size if no rec_size_fn is
     supplied (keeps other callers working).
+
+    ``price_at(slug, size) -> price`` replaces the best_price_at_size scan
+    over ``price_rows`` when the caller has the rows indexed (PriceIndex).
     """
     street_size = profile.get("street_size_eu")
     pool = baseline_scored[:BUDGET_POOL_SIZE]
@@ -550,7 +713,8 @@ def _select_budget(baseline_scored, profile, price_rows,
         size = rec_size_fn(shoe) if rec_size_fn else street_size
         if size is None:
             size = street_size
-        price = best_price_at_size(slug, size, price_rows)
+        price = (price_at(slug, size) if price_at
+                 else best_price_at_size(slug, size, price_rows))
         if price is None:
             continue
         # Annotate the score dict so the harness can show the price
@@ -569,7 +733,8 @@ def _select_budget(baseline_scored, profile, price_rows,
                            no_edge_count=0, n=TIER_SIZE)
 
 
-def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None):
+def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None,
+                   timings=None, pool_mask=None, columns=None):
     """Build all 4 tiers in one call.
 
     Parameters
@@ -581,6 +746,14 @@ def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None)
     rec_size_fn : optional callable shoe -> recommended EU size, used to
         price budget candidates at their downsized size. Falls back to
         the user's street size when not supplied.
+    pool_mask : optional shoe_catalog bitset over shoes_db restricting the
+        candidates (build_v2_results' closure override); all shoes if None.
+    timings : optional dict; when given, seconds spent in "scoring" (price
+        availability + the three scored passes) and "tiers" (pick caps +
+        budget) are written into it.
+    columns : optional axis column cache (see _score_against). The three
+        passes always share one; pass a dict to keep it, or to seed it
+        with columns restored from a stored scoring state.
 
     Returns
     -------
@@ -592,6 +765,7 @@ def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None)
       "scored_baseline": full baseline-scored list (debug / further-browse)
     }
     """
+    t0 = time.perf_counter()
     picked_slugs = set()
     brand_count  = {}
 
@@ -600,29 +774,38 @@ def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None)
     # it on the target dict so axis_availability can read it. Mutating
     # `target` in place is intentional — it keeps a caller's subsequent
     # standalone score_shoe(...) calls (e.g. the review harness) in sync.
+    eligible = eligible_mask(shoes_db, profile, pool_mask)
+    prices = price_index_for(price_rows or [])
     priced_slugs = set()
     if price_rows and rec_size_fn:
-        for s in shoes_db:
+        for s in catalog_for(shoes_db).subset(eligible):
             slug = s.get("slug")
-            if slug and best_price_at_size(slug, rec_size_fn(s), price_rows):
+            if slug and prices.price_at(slug, rec_size_fn(s)):
                 priced_slugs.add(slug)
     target["priced_slugs"] = priced_slugs
 
+    if columns is None:
+        columns = {}
     baseline_scored = _score_against(shoes_db,
                                      _shift_target(target, TIER_STIFFNESS_SHIFT["baseline"]),
-                                     profile)
+                                     profile, eligible, columns)
     softer_scored   = _score_against(shoes_db,
                                      _shift_target(target, TIER_STIFFNESS_SHIFT["softer"]),
-                                     profile)
+                                     profile, eligible, columns)
     stiffer_scored  = _score_against(shoes_db,
                                      _shift_target(target, TIER_STIFFNESS_SHIFT["stiffer"]),
-                                     profile)
+                                     profile, eligible, columns)
+    t1 = time.perf_counter()
 
     baseline = _pick_with_caps(baseline_scored, picked_slugs, brand_count, 0)
     softer   = _pick_with_caps(softer_scored,   picked_slugs, brand_count, 0)
     stiffer  = _pick_with_caps(stiffer_scored,  picked_slugs, brand_count, 0)
     budget   = _select_budget(baseline_scored, profile, price_rows or [],
-                              picked_slugs, brand_count, rec_size_fn=rec_size_fn)
+                              picked_slugs, brand_count, rec_size_fn=rec_size_fn,
+                              price_at=prices.price_at)
+    if timings is not None:
+        timings["scoring"] = t1 - t0
+        timings["tiers"] = time.perf_counter() - t1
 
     return {
         "baseline":        baseline,
@@ -638,7 +821,9 @@ def assemble_tiers(profile, shoes_db, target, price_rows=None, rec_size_fn=None)
 __all__ = [
     "score_shoe", "compute_use_case_target",
     "assemble_tiers", "best_price_at_size",
-    "SCORING_AXES", "HARD_FILTERS",
+    "SCORING_AXES", "AXIS_TARGET_KEYS", "HARD_FILTERS", "HARD_FILTER_MASKS",
+    "eligible_mask", "discipline_mask", "axis_column_key",
+    "PriceIndex", "price_index_for",
     "TIER_STIFFNESS_SHIFT", "PER_TIER_BRAND_CAP", "GLOBAL_BRAND_CAP",
     "PER_TIER_NO_EDGE_CAP", "TIER_SIZE", "BUDGET_POOL_SIZE",
     "INSTEP_HIGH_THRESHOLD", "INSTEP_LOW_THRESHOLD",
@@ -22,7 +22,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 import requests
 
-from target_resolver_v2 import (resolve_targets_v2, _scrub_sizing_artifacts,
+from target_resolver_v2 import (resolve_targets_v2, scrubbed_shoes,
                                   _user_dim_rank, _cup_rank)
 from matrix_scorer_v2 import compute_use_case_target, assemble_tiers
 from interp_what_to_look_for_v2 import generate_what_to_look_for_v2
@@ -820,7 +820,7 @@ def _shoe_fit_with_artifact_filter(profile, target=None):
     from interp_shoe_fit_v2 import _relative_downsize, _brand_typical, _downsize_label_raw
     raw_shoes = profile.get("shoes") or []
     street    = profile.get("street_size_eu")
-    clean_shoes = _scrub_sizing_artifacts(raw_shoes, street, profile=profile)
+    clean_shoes = scrubbed_shoes(profile, raw_shoes)
 
     # Identify each discounted (shoe, dim, rating) and tag the most-
     # likely cause. Priority:
@@ -38,7 +38,11 @@ foot_scan_fits). ``aggressiveness`` is the new user input from
 schema_v2_inputs.sql.
 """
 
+import hashlib
+import json
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 # v1 production resolver (unchanged for fw/hv/fv)
@@ -217,6 +221,87 @@ def _cup_rank(label):
     return _CUP_RANK_MAP.get(str(label).strip().lower())
 
 
+# ── Memoized resolution ────────────────────────────────────────────────
+# Target resolution is a pure function of a handful of scan ratios, the
+# user's shoes with their fit ratings, the street size and aggressiveness.
+# A rescore of the same scan with different preference toggles (and the
+# interpretation's artifact disclosure) asks for the same answer again, so
+# results are memoized per process under a canonical hash of exactly those
+# inputs. Bounded LRU, shared by every caller in the worker process.
+_RESOLVE_CACHE_SIZE = 256
+
+# Everything resolve_targets_v2 / _scrub_sizing_artifacts read. A new read
+# in either function must be added here, or the cache returns stale targets.
+_FINGERPRINT_PROFILE_KEYS = ("forefoot_width_ratio", "heel_width_ratio",
+                             "heel_depth_ratio", "toe_shape",
+                             "hva_offset_ratio", "street_size_eu")
+_FINGERPRINT_SHOE_KEYS = ("brand", "model", "size_eu", "db_width",
+                          "db_heel_volume", "db_forefoot_volume", "fit")
+
+_resolve_cache = OrderedDict()
+_resolve_cache_lock = threading.Lock()
+_resolve_cache_stats = {"hits": 0, "misses": 0}
+
+
+def profile_fingerprint(profile, shoes, aggressiveness=None):
+    """Canonical hash of the resolver inputs (order of shoes matters: it
+    orders the votes). ``aggressiveness=None`` fingerprints the
+    aggressiveness-independent part (the artifact scrub)."""
+    doc = {
+        "profile": {k: profile.get(k) for k in _FINGERPRINT_PROFILE_KEYS},
+        "shoes":   [{k: s.get(k) for k in _FINGERPRINT_SHOE_KEYS}
+                    for s in shoes or []],
+        "aggressiveness": aggressiveness,
+    }
+    blob = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _memoized(key, compute):
+    with _resolve_cache_lock:
+        if key in _resolve_cache:
+            _resolve_cache.move_to_end(key)
+            _resolve_cache_stats["hits"] += 1
+            return _resolve_cache[key]
+        _resolve_cache_stats["misses"] += 1
+    value = compute()
+    with _resolve_cache_lock:
+        _resolve_cache[key] = value
+        _resolve_cache.move_to_end(key)
+        while len(_resolve_cache) > _RESOLVE_CACHE_SIZE:
+            _resolve_cache.popitem(last=False)
+    return value
+
+
+def resolve_cache_info():
+    """{"hits", "misses", "size", "max_size"} of the shared resolver cache."""
+    with _resolve_cache_lock:
+        return dict(_resolve_cache_stats, size=len(_resolve_cache),
+                    max_size=_RESOLVE_CACHE_SIZE)
+
+
+def clear_resolve_cache():
+    with _resolve_cache_lock:
+        _resolve_cache.clear()
+        _resolve_cache_stats.update(hits=0, misses=0)
+
+
+def scrubbed_shoes(profile, shoes):
+    """``shoes`` with sizing-artifact ratings blanked - the memoized form of
+    ``_scrub_sizing_artifacts(shoes, profile["street_size_eu"], profile)``.
+
+    Only the scrubbed fit dicts are cached; they are laid back onto the
+    caller's shoe dicts, so every other field is the caller's own.
+    """
+    if not shoes:
+        return shoes or []
+    key = ("scrub", profile_fingerprint(profile, shoes))
+    fits = _memoized(key, lambda: tuple(
+        s["fit"] for s in _scrub_sizing_artifacts(
+            shoes, profile.get("street_size_eu"), profile=profile)))
+    return [dict(s, fit=dict(fit)) for s, fit in zip(shoes, fits)]
+
+
 def resolve_targets_v2(profile, shoes, aggressiveness):
     """Resolve all five v2 targets in one call.
 
@@ -231,7 +316,7 @@ def resolve_targets_v2(profile, shoes, aggressiveness):
         zero-delta branch).
     shoes : list[dict]
         Same shape as v1: brand, model, db_width, db_heel_volume,
-        db_forefoot_volume, fit.
+        db_forefoot_volume, fit (plus size_eu for the artifact scrub).
     aggressiveness : str
         One of: comfort | balanced | moderate | aggressive.
         Drives baseline asym + dt; defaults to "balanced" inside the
@@ -249,7 +334,18 @@ def resolve_targets_v2(profile, shoes, aggressiveness):
     All v1 keys (target_fw, target_hv, target_fv, votes_*, etc.) are
     preserved verbatim — downstream callers that only care about width/
     volume keep working.
+
+    Memoized per process under profile_fingerprint(). Each call gets a
+    fresh top-level dict; the vote lists inside are shared with the cache
+    and must not be mutated.
     """
+    key = ("targets", profile_fingerprint(profile, shoes, aggressiveness))
+    target = _memoized(key, lambda: _resolve_targets_v2(profile, shoes, aggressiveness))
+    return dict(target)
+
+
+def _resolve_targets_v2(profile, shoes, aggressiveness):
+    """Uncached resolve_targets_v2."""
     # ── Sizing-artifact filter (Roman 2026-05-12) ────────────────────
     # A feedback rating is a SIZING ARTIFACT when the user's downsize
     # choice (vs brand typical) fully explains it:
@@ -267,8 +363,7 @@ def resolve_targets_v2(profile, shoes, aggressiveness):
     # to all three dims (heel / forefoot / toes) — blanking the
     # offending dim per shoe BEFORE the v1 resolver runs so the
     # artifact never generates a vote. Sandbox-only.
-    street = profile.get("street_size_eu")
-    clean_shoes = _scrub_sizing_artifacts(shoes, street, profile=profile)
+    clean_shoes = scrubbed_shoes(profile, shoes)
     out = dict(_v1_resolve_targets(profile, clean_shoes))
 
     # ── T1: V2-aligned scan votes for target_fw and target_hv ────────
@@ -278,8 +373,7 @@ def resolve_targets_v2(profile, shoes, aggressiveness):
     # target says "normal". Rerun aggregation with V2-aligned scan
     # votes so target stays in sync with what the user sees.
     from benchmark.target_resolver import _shoe_votes, _aggregate
-    _, fb_hv_clean, _ = _shoe_votes(clean_shoes or [])
-    fb_fw_clean, _, fb_fv_clean = _shoe_votes(clean_shoes or [])
+    fb_fw_clean, fb_hv_clean, fb_fv_clean = _shoe_votes(clean_shoes or [])
 
     scan_fw_v2 = _scan_vote_v2(
         profile.get("forefoot_width_ratio"), "forefoot_width_ratio",
@@ -378,4 +472,8 @@ __all__ = [
     # API
     "resolve_targets_v2",
     "resolve_targets_v2_from_user_shoes",
+    "scrubbed_shoes",
+    "profile_fingerprint",
+    "resolve_cache_info",
+    "clear_resolve_cache",
 ]
@@ -18,9 +18,13 @@ This module is PURE: it takes already-loaded data (shoes_db, price_rows,
 brand_sizing) as arguments and never touches Supabase itself, so it has
 no import-time environment dependency.
 """
+import hashlib
 import json
 import math
 import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 # explore_v2/ (siblings) and scanner/ (for benchmark.*) on the path.
@@ -30,15 +34,17 @@ for _p in (str(_HERE), str(_ROOT)):
     if _p not in sys.path:
         sys.path.insert(0, _p)
 
-from target_resolver_v2 import (resolve_targets_v2, _scrub_sizing_artifacts,
+from target_resolver_v2 import (resolve_targets_v2, scrubbed_shoes,
                                 _user_dim_rank, _cup_rank)
 from matrix_scorer_v2 import (compute_use_case_target, assemble_tiers,
-                              best_price_at_size)
+                              price_index_for, _freeze)
 from combinations_top5 import DOWNTURN_ORDER, ASYM_ORDER
 from interp_what_to_look_for_v2 import generate_what_to_look_for_v2
-from interp_shoe_desc_v2 import flatten_pick, generate_shoe_description_v2
+from interp_shoe_desc_v2 import (flatten_pick, generate_shoe_description_v2,
+                                 DESC_TARGET_KEYS, PEER_SUPPRESS_KEYS)
 from interp_foot_shape_v2 import generate_foot_shape
-from interp_shoe_fit_v2 import generate_shoe_fit
+from interp_shoe_fit_v2 import generate_shoe_fit, SHOE_FIT_TARGET_KEYS
+from shoe_catalog import catalog_for
 
 
 # ---------------------------------------------------------------------
@@ -48,18 +54,7 @@ from interp_shoe_fit_v2 import generate_shoe_fit
 # ---------------------------------------------------------------------
 
 def lookup_db(shoes_db, brand, model):
-    if not brand or not model:
-        return None
-    key = f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if k == key:
-            return s
-    for s in shoes_db:
-        k = f"{s['brand'].strip().lower()} {s['model'].strip().lower()}"
-        if key in k or k in key:
-            return s
-    return None
+    return catalog_for(shoes_db).lookup(brand, model)
 
 
 def normalize_user_shoes(raw, shoes_db):
@@ -174,7 +169,7 @@ def _shoe_fit_with_artifact_filter(profile, target=None):
     from interp_shoe_fit_v2 import _relative_downsize, _brand_typical, _downsize_label_raw
     raw_shoes = profile.get("shoes") or []
     street    = profile.get("street_size_eu")
-    clean_shoes = _scrub_sizing_artifacts(raw_shoes, street, profile=profile)
+    clean_shoes = scrubbed_shoes(profile, raw_shoes)
 
     # Identify each discounted (shoe, dim, rating) and tag the most-
     # likely cause. Priority:
@@ -369,6 +364,258 @@ def _shoe_fit_with_artifact_filter(profile, target=None):
     return paragraphs
 
 
+# ---------------------------------------------------------------------
+# Interpretation cache. Each interpretation block and pick description
+# is a pure function of a few declared inputs, and its text is keyed by
+# a hash of exactly those inputs. build_v2_results looks every key up in
+# the stored row first (a rescore reuses unchanged text verbatim), then
+# in a per-process LRU, and renders only what is left. The hashes are
+# salted with the renderer source, so a deploy never reuses old text.
+# ---------------------------------------------------------------------
+_INTERP_CACHE_SIZE = 4096
+
+_interp_cache = OrderedDict()
+_interp_cache_lock = threading.Lock()
+_interp_cache_stats = {"stored": 0, "hits": 0, "misses": 0}
+_renderer_digest = []
+
+# Every source file whose code ends up in interpretation text.
+_RENDERER_SOURCES = (
+    _HERE / "interp_foot_shape_v2.py",
+    _HERE / "interp_shoe_fit_v2.py",
+    _HERE / "interp_what_to_look_for_v2.py",
+    _HERE / "interp_shoe_desc_v2.py",
+    _HERE / "target_resolver_v2.py",
+    _HERE / "v2_pipeline.py",
+    _ROOT / "benchmark" / "interp_shoe_desc.py",
+)
+
+
+def _json_default(o):
+    if isinstance(o, (set, frozenset)):
+        return sorted(o, key=str)
+    return str(o)
+
+
+def _source_digest(paths, memo):
+    """Short sha1 over the source files in ``paths``, computed once per
+    process into the ``memo`` list."""
+    if not memo:
+        h = hashlib.sha1()
+        for path in paths:
+            try:
+                h.update(path.read_bytes())
+            except OSError:
+                h.update(path.name.encode())
+        memo.append(h.hexdigest()[:12])
+    return memo[0]
+
+
+def _renderer_salt():
+    """Short sha1 over _RENDERER_SOURCES, computed once per process."""
+    return _source_digest(_RENDERER_SOURCES, _renderer_digest)
+
+
+def input_hash(kind, inputs):
+    """Short canonical hash of one block's declared inputs."""
+    blob = json.dumps([_renderer_salt(), kind, inputs], sort_keys=True,
+                      separators=(",", ":"), default=_json_default)
+    return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+
+def _text_hash(paragraphs):
+    blob = json.dumps(list(paragraphs), separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:12]
+
+
+def interpretation_inputs(profile_key, target, discipline, environment,
+                          rock, aggressiveness, preference_overrides):
+    """Declared inputs of the three interpretation blocks, in page order.
+
+    ``profile_key`` is input_hash("profile", profile): every block reads
+    the profile, so it is hashed once per build.
+    """
+    return [
+        ("foot_shape", {"profile": profile_key}),
+        ("shoe_fit",   {"profile": profile_key,
+                        "target": {k: target[k] for k in SHOE_FIT_TARGET_KEYS
+                                   if k in target}}),
+        ("look_for",   {"profile": profile_key, "target": target,
+                        "discipline": discipline, "environment": environment,
+                        "rock": rock, "aggressiveness": aggressiveness,
+                        "overrides": preference_overrides or None}),
+    ]
+
+
+def description_inputs(profile_key, pick, all_picks):
+    """Declared inputs of generate_shoe_description_v2(pick, profile,
+    all_picks): the pick minus its target, the DESC_TARGET_KEYS of the
+    target, and the peer counts peer suppression looks at."""
+    target = pick.get("target") or {}
+    peers = [p for p in all_picks or [] if p.get("slug") != pick.get("slug")]
+    return {
+        "profile": profile_key,
+        "pick":    {k: v for k, v in pick.items() if k != "target"},
+        "target":  {k: target[k] for k in DESC_TARGET_KEYS if k in target},
+        "peers":   [len(peers)] + [
+            sum(1 for p in peers if (p.get("breakdown") or {}).get(axis, 0) < 0)
+            for axis in sorted(set(PEER_SUPPRESS_KEYS.values()))],
+    }
+
+
+def _load(v):
+    """A jsonb column value: as PostgREST returns it, or JSON text."""
+    if isinstance(v, str):
+        try:
+            return json.loads(v)
+        except ValueError:
+            return None
+    return v
+
+
+def stored_interpretation(row):
+    """{input hash: paragraphs} for the text already stored on a
+    foot_scan_fits row. An entry is only returned while its text still
+    hashes to the recorded text hash, so text written by anything else
+    (the V1 path, a manual edit) is never mistaken for ours."""
+    row = row or {}
+    deps = _load(row.get("interpretation_deps"))
+    if not isinstance(deps, dict):
+        return {}
+    out = {}
+
+    def _take(dep, paras):
+        if (isinstance(dep, list) and len(dep) == 2
+                and _text_hash(paras) == dep[1]):
+            out[dep[0]] = paras
+
+    for dep, block in zip(deps.get("blocks") or [],
+                          _load(row.get("interpretation")) or []):
+        if isinstance(block, dict) and isinstance(block.get("paragraphs"), list):
+            _take(dep, tuple(block["paragraphs"]))
+    for dep, rec in zip(deps.get("recommendations") or [],
+                        _load(row.get("recommendations")) or []):
+        if isinstance(rec, dict):
+            _take(dep, (rec.get("description"), rec.get("why"),
+                        rec.get("tradeoffs")))
+    return out
+
+
+def _render_cached(key, stored, render):
+    """Paragraphs for ``key``: from the stored row, the process cache, or
+    ``render()``, in that order."""
+    if key in stored:
+        value, source = stored[key], "stored"
+    else:
+        with _interp_cache_lock:
+            value = _interp_cache.get(key)
+            if value is not None:
+                _interp_cache.move_to_end(key)
+                _interp_cache_stats["hits"] += 1
+                return list(value)
+        value, source = tuple(render()), "misses"
+    with _interp_cache_lock:
+        _interp_cache_stats[source] += 1
+        _interp_cache[key] = value
+        _interp_cache.move_to_end(key)
+        while len(_interp_cache) > _INTERP_CACHE_SIZE:
+            _interp_cache.popitem(last=False)
+    return list(value)
+
+
+def interp_cache_info():
+    """{"stored", "hits", "misses", "size", "max_size"} of the shared
+    interpretation cache ("stored" = reused from the scan row)."""
+    with _interp_cache_lock:
+        return dict(_interp_cache_stats, size=len(_interp_cache),
+                    max_size=_INTERP_CACHE_SIZE)
+
+
+def clear_interp_cache():
+    with _interp_cache_lock:
+        _interp_cache.clear()
+        _interp_cache_stats.update(stored=0, hits=0, misses=0)
+
+
+# ---------------------------------------------------------------------
+# Scoring state. A rescore changes preferences, not the foot: the fit
+# target for an aggressiveness and the axis columns that read only the
+# shoe, the profile and fit-target keys come out the same every time.
+# build_v2_results returns them as scoring_state (stored on the row) and
+# restores them on the next run while the scoring fingerprint (scorer
+# sources, catalog rows, profile) still matches, so a rescore only
+# scores the preference axes again. A missing or stale state means a
+# full run, never a different result.
+# ---------------------------------------------------------------------
+_scorer_digest = []
+
+# Every source file whose code decides a fit target or an axis score.
+_SCORER_SOURCES = (
+    _HERE / "matrix_scorer_v2.py",
+    _HERE / "target_resolver_v2.py",
+    _HERE / "target_asym_dt.py",
+    _HERE / "combinations_top5.py",
+    _HERE / "v2_pipeline.py",
+    _ROOT / "benchmark" / "target_resolver.py",
+    _ROOT / "shoe_catalog.py",
+)
+
+# Axes whose AXIS_TARGET_KEYS come from the fit target only, which no
+# preference question or override changes.
+STATE_AXES = ("toe_form", "forefoot_width", "heel_volume", "instep_extreme")
+
+
+def scoring_fingerprint(profile, shoes_db):
+    """Hash of everything a stored scoring state was computed from."""
+    blob = json.dumps([_source_digest(_SCORER_SOURCES, _scorer_digest),
+                       catalog_for(shoes_db).fingerprint(), profile],
+                      sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+
+def export_scoring_state(fingerprint, fit_targets, columns):
+    """The compact, JSON-ready scoring state: fit targets by
+    aggressiveness, and the STATE_AXES columns as parallel lists over
+    shoes_db positions with the notes stored once per axis."""
+    axes = []
+    for key, col in columns.items():
+        if key[0] not in STATE_AXES:
+            continue
+        shoes = sorted(col)
+        texts, note_ids = [], {}
+        for i in shoes:
+            note_ids.setdefault(col[i][1], len(texts))
+            if len(texts) < len(note_ids):
+                texts.append(col[i][1])
+        axes.append({"axis": key[0], "key": list(key[1:]), "shoes": shoes,
+                     "scores": [col[i][0] for i in shoes],
+                     "notes": [note_ids[col[i][1]] for i in shoes],
+                     "note_text": texts})
+    return {"fingerprint": fingerprint, "targets": fit_targets, "axes": axes}
+
+
+def load_scoring_state(raw, fingerprint):
+    """(fit targets by aggressiveness, axis columns) from a stored
+    scoring_state, or ({}, {}) when there is none or it was computed
+    from anything other than ``fingerprint``."""
+    state = _load(raw)
+    if not isinstance(state, dict) or state.get("fingerprint") != fingerprint:
+        return {}, {}
+    try:
+        columns = {}
+        for a in state.get("axes") or []:
+            if a["axis"] not in STATE_AXES:
+                continue
+            key = (a["axis"],) + tuple(_freeze(v) for v in a["key"])
+            text = a["note_text"]
+            columns[key] = {i: (sc, text[n])
+                            for i, sc, n in zip(a["shoes"], a["scores"], a["notes"])}
+        targets = dict(state.get("targets") or {})
+    except (KeyError, TypeError, IndexError, ValueError):
+        return {}, {}
+    return targets, columns
+
+
 # ---------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------
@@ -454,6 +701,34 @@ def apply_preference_overrides(target, overrides):
     return t
 
 
+def variant_target(profile, discipline, environment, rock, aggressiveness,
+                   preference_overrides=None, fit_target=None):
+    """Merged scoring target for one preference set.
+
+    Returns (target, derived_prefs): the fit target ∪ use-case target
+    with the user's overrides applied, and the pre-override snapshot
+    from derive_preferences(). ``fit_target`` is an already resolved
+    resolve_targets_v2(profile, ..., aggressiveness) (stored state).
+    """
+    if fit_target is None:
+        fit_target = resolve_targets_v2(profile, profile["shoes"], aggressiveness)
+    use_target = compute_use_case_target(discipline, environment, rock, aggressiveness)
+    target = {**fit_target, **use_target}
+    # Snapshot what the four questions derived, then lay the user's
+    # explicit preference overrides (if any) on top before scoring.
+    derived_prefs = derive_preferences(target)
+    return apply_preference_overrides(target, preference_overrides), derived_prefs
+
+
+def closure_override(preference_overrides):
+    """The closures a closure override restricts the shoe pool to (empty
+    set = no restriction)."""
+    cl = (preference_overrides or {}).get("closure")
+    if isinstance(cl, str):
+        cl = [cl]
+    return {c for c in (cl or []) if c in _CLOSURE_ALL}
+
+
 def build_browse_extended(profile, tiers, brand_sizing, price_rows,
                           street_size, pref, top_n=30):
     """Build the browse_extended payload that powers /scan/:id/browse.
@@ -484,10 +759,11 @@ def build_browse_extended(profile, tiers, brand_sizing, price_rows,
 
     # Budget browse: the baseline-scored pool re-ranked cheapest-first,
     # restricted to shoes that have a price at the user's recommended size.
+    prices = price_index_for(price_rows)
     budget = []
     for sc, sh in (tiers.get("scored_baseline") or [])[:80]:
         rs = _rec(sh.get("brand"))
-        price = (best_price_at_size(sh.get("slug"), rs, price_rows)
+        price = (prices.price_at(sh.get("slug"), rs)
                  if rs is not None else None)
         if price is not None:
             budget.append((price, sc, sh))
@@ -504,9 +780,22 @@ def build_browse_extended(profile, tiers, brand_sizing, price_rows,
     }
 
 
+# build_v2_results stages, in pipeline order (the timings= keys).
+STAGES = ("profile", "targets", "scoring", "tiers", "interpretation", "browse")
+
+
+def _lap(timings, stage, t0):
+    """Record seconds since t0 under timings[stage]; returns the new t0."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = now - t0
+    return now
+
+
 def build_v2_results(scan, shoes_db, price_rows, brand_sizing,
                      discipline, environment, rock, aggressiveness,
-                     preference_overrides=None):
+                     preference_overrides=None, previous=None, timings=None,
+                     scoring_state=None):
     """Run the full V2 pipeline for one scan + preference set.
 
     Parameters
@@ -521,6 +810,18 @@ def build_v2_results(scan, shoes_db, price_rows, brand_sizing,
         brand -> typical_downsize_mid.
     discipline / environment / rock / aggressiveness : str
         The four V2 preference inputs. ``rock`` is None for indoor/both.
+    previous : dict, optional
+        The stored foot_scan_fits row when re-scoring. Interpretation
+        blocks and pick descriptions whose inputs are unchanged are taken
+        from it verbatim (see stored_interpretation) instead of rendered.
+    timings : dict, optional
+        When given, seconds per stage are written into it: profile,
+        targets, scoring, tiers, interpretation (blocks + pick
+        descriptions) and browse. See STAGES.
+    scoring_state : dict, optional
+        The scoring_state a previous run returned for this scan. Its fit
+        targets and STATE_AXES columns are reused while its fingerprint
+        still matches (see load_scoring_state); otherwise ignored.
 
     Returns
     -------
@@ -528,48 +829,68 @@ def build_v2_results(scan, shoes_db, price_rows, brand_sizing,
         Exactly the shape ScanResult.jsx consumes - interpretation is an
         array of {title, paragraphs} blocks; each recommendation carries
         slug/brand/model/category/recommended_size_eu/description/why/
-        tradeoffs and an optional best_offer.
+        tradeoffs and an optional best_offer. Also browse_extended,
+        derived_preferences, interpretation_deps ([input_hash,
+        text_hash] per block and per recommendation) and scoring_state,
+        both stored for the next rescore.
     """
+    t0 = time.perf_counter()
     profile = build_profile(scan, shoes_db)
+    t0 = _lap(timings, "profile", t0)
     street_size = float(scan.get("street_size_eu") or 0) or None
     pref = "performance" if aggressiveness in ("moderate", "aggressive") else "comfort"
     rec_size_fn = lambda sh: calc_rec_size(profile["shoes"], sh.get("brand"),
                                            brand_sizing, street_size, pref)
 
-    # V2 unified target + tiers
-    fit_target = resolve_targets_v2(profile, profile["shoes"], aggressiveness)
-    use_target = compute_use_case_target(discipline, environment, rock, aggressiveness)
-    target = {**fit_target, **use_target}
-    # Snapshot what the four questions derived, then lay the user's
-    # explicit preference overrides (if any) on top before scoring.
-    derived_prefs = derive_preferences(target)
-    target = apply_preference_overrides(target, preference_overrides)
+    # V2 unified target + tiers. The fit target and the preference-free
+    # axis columns come from the stored scoring state when it still
+    # matches this profile and catalog.
+    fingerprint = scoring_fingerprint(profile, shoes_db)
+    fit_targets, columns = load_scoring_state(scoring_state, fingerprint)
+    fit_target = fit_targets.get(aggressiveness)
+    if fit_target is None:
+        fit_target = resolve_targets_v2(profile, profile["shoes"], aggressiveness)
+        fit_targets[aggressiveness] = fit_target
+    target, derived_prefs = variant_target(profile, discipline, environment,
+                                           rock, aggressiveness,
+                                           preference_overrides,
+                                           fit_target=fit_target)
+    t0 = _lap(timings, "targets", t0)
     # A closure override is a hard constraint: restrict the shoe pool to the
     # chosen closure so the override fully overwrites the derived closure
     # preference (build_profile already ran on the full db, so the user's
-    # own current-shoe lookup is unaffected).
-    _cl = (preference_overrides or {}).get("closure")
-    if isinstance(_cl, str):
-        _cl = [_cl]
-    _cl_set = {c for c in (_cl or []) if c in ("lace", "velcro", "slipper")}
-    if _cl_set:
-        shoes_db = [s for s in shoes_db
-                    if str(s.get("closure") or "").strip().lower() in _cl_set]
+    # own current-shoe lookup is unaffected). The pool is a catalog
+    # bitset, so the scorer keeps using the indexed full shoes_db.
+    _cl_set = closure_override(preference_overrides)
+    pool_mask = catalog_for(shoes_db).closure_mask(_cl_set) if _cl_set else None
     tiers = assemble_tiers(profile, shoes_db, target, price_rows=price_rows,
-                           rec_size_fn=rec_size_fn)
-
-    interpretation = [
-        {"title": "Your Foot Shape",
-         "paragraphs": list(generate_foot_shape(profile))},
-        {"title": "What Your Current Shoe Fit Tells Us",
-         "paragraphs": list(_shoe_fit_with_artifact_filter(profile, target=target))},
-        {"title": "What to Look For",
-         "paragraphs": list(generate_what_to_look_for_v2(
-             profile, profile["shoes"],
-             discipline=discipline, environment=environment,
-             rock=rock, aggressiveness=aggressiveness, target=target,
-             preference_overrides=preference_overrides))},
-    ]
+                           rec_size_fn=rec_size_fn, timings=timings,
+                           pool_mask=pool_mask, columns=columns)
+    t0 = time.perf_counter()
+
+    stored = stored_interpretation(previous)
+    profile_key = input_hash("profile", profile)
+    renderers = {
+        "foot_shape": ("Your Foot Shape",
+                       lambda: generate_foot_shape(profile)),
+        "shoe_fit":   ("What Your Current Shoe Fit Tells Us",
+                       lambda: _shoe_fit_with_artifact_filter(profile, target=target)),
+        "look_for":   ("What to Look For",
+                       lambda: generate_what_to_look_for_v2(
+                           profile, profile["shoes"],
+                           discipline=discipline, environment=environment,
+                           rock=rock, aggressiveness=aggressiveness, target=target,
+                           preference_overrides=preference_overrides)),
+    }
+    interpretation, block_deps = [], []
+    for kind, inputs in interpretation_inputs(profile_key, target, discipline,
+                                              environment, rock, aggressiveness,
+                                              preference_overrides):
+        title, render = renderers[kind]
+        key = input_hash(kind, inputs)
+        paragraphs = _render_cached(key, stored, render)
+        interpretation.append({"title": title, "paragraphs": paragraphs})
+        block_deps.append([key, _text_hash(paragraphs)])
 
     # Flat all-picks list for peer-suppression in P3.
     all_picks_flat = []
@@ -591,18 +912,22 @@ def build_v2_results(scan, shoes_db, price_rows, brand_sizing,
             rec_size = calc_rec_size(profile["shoes"], sh.get("brand"),
                                      brand_sizing, street_size, pref)
             if rec_size is not None:
-                p = best_price_at_size(slug, rec_size, price_rows)
+                p = price_index_for(price_rows).price_at(slug, rec_size)
                 if p is not None:
                     price_lookup[slug] = p
 
-    recommendations = []
+    recommendations, rec_deps = [], []
     for tname in ("baseline", "softer", "stiffer", "budget"):
         for sc, sh in tiers[tname]:
             best_price = price_lookup.get(sh["slug"])
             pick = flatten_pick(sc, sh, tier=tname, target=target,
                                 best_price=best_price)
-            paras = generate_shoe_description_v2(pick, profile,
-                                                 all_picks=all_picks_flat)
+            key = input_hash("pick", description_inputs(profile_key, pick,
+                                                        all_picks_flat))
+            paras = _render_cached(
+                key, stored,
+                lambda: generate_shoe_description_v2(pick, profile,
+                                                     all_picks=all_picks_flat))
             P1 = paras[0] if len(paras) > 0 else ""
             P2 = paras[1] if len(paras) > 1 else ""
             P3 = paras[2] if len(paras) > 2 else ""
@@ -615,11 +940,18 @@ def build_v2_results(scan, shoes_db, price_rows, brand_sizing,
             if best_price is not None:
                 rec["best_offer"] = {"price_eur": round(float(best_price), 2)}
             recommendations.append(rec)
+            rec_deps.append([key, _text_hash((P1, P2, P3))])
+    t0 = _lap(timings, "interpretation", t0)
 
     browse_extended = build_browse_extended(profile, tiers, brand_sizing,
                                             price_rows, street_size, pref)
+    _lap(timings, "browse", t0)
 
     return {"interpretation": interpretation,
             "recommendations": recommendations,
             "browse_extended": browse_extended,
-            "derived_preferences": derived_prefs}
+            "derived_preferences": derived_prefs,
+            "interpretation_deps": {"blocks": block_deps,
+                                    "recommendations": rec_deps},
+            "scoring_state": export_scoring_state(fingerprint, fit_targets,
+                                                  columns)}
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Batch what-if scorer - one profile, a grid of V2 preference variants.
+
+Auditing a scan across (discipline, environment, rock, aggressiveness,
+closure override) combinations used to mean one full build_v2_results /
+assemble_tiers run per combination: profile build, target resolution,
+price-at-size scans and 3 x catalog x 10 axis calls every time. Most of
+that does not depend on the variant:
+
+    once per scan         profile, hard filters (H1 kids / H2 owned),
+                          toe_form + instep axes
+    once per value        discipline overlap (per discipline), each
+                          remaining axis column per distinct value of the
+                          target keys it reads (AXIS_TARGET_KEYS), the
+                          fit target (per aggressiveness, memoized in
+                          target_resolver_v2), recommended sizes and
+                          priced slugs (per comfort/performance)
+    once per shoe/size    best price at size (rows indexed by slug)
+
+Per variant only the merged target, the score sums, the sort and the tier
+picks are redone, with the same matrix_scorer_v2 axis functions and pick
+helpers, so the picks equal assemble_tiers for that variant (--verify
+checks every variant against the per-variant path).
+
+Usage:
+    from whatif_v2 import WhatIfScorer, preference_grid
+    scorer = WhatIfScorer(scan, shoes_db, price_rows, brand_sizing)
+    rows = scorer.run(preference_grid())        # [{"variant", "picks"}, ...]
+
+    SUPABASE_SECRET_KEY=... python3 whatif_v2.py SCAN_ID [SCAN_ID ...]
+        [--verify] [--json out.json]
+"""
+import json
+import os
+import sys
+import time
+from itertools import product
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+_ROOT = _HERE.parent
+for _p in (str(_HERE), str(_ROOT)):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+from matrix_scorer_v2 import (eligible_mask, TIER_STIFFNESS_SHIFT,
+                              price_index_for, assemble_tiers, _score_against,
+                              _shift_target, _pick_with_caps, _select_budget)
+from v2_pipeline import (build_profile, calc_rec_size, variant_target,
+                         closure_override)
+from shoe_catalog import catalog_for
+
+DISCIPLINES    = ("boulder", "sport", "trad_multipitch")
+ENVIRONMENTS   = ("indoor", "outdoor", "both")
+ROCKS          = ("granite", "limestone", "sandstone", "mixed")
+AGGRESSIVENESS = ("comfort", "balanced", "moderate", "aggressive")
+CLOSURES       = (None, ("lace",), ("velcro",), ("slipper",))
+
+TIERS = ("baseline", "softer", "stiffer", "budget")
+
+
+def preference_grid(disciplines=DISCIPLINES, environments=ENVIRONMENTS,
+                    rocks=ROCKS, aggressiveness=AGGRESSIVENESS,
+                    closures=CLOSURES):
+    """Every preference variant; rock only varies for outdoor (None for
+    indoor / both, as the questionnaire sends it)."""
+    out = []
+    for d, e, a, cl in product(disciplines, environments, aggressiveness, closures):
+        for r in (rocks if e == "outdoor" else (None,)):
+            out.append({"discipline": d, "environment": e, "rock": r,
+                        "aggressiveness": a,
+                        "preference_overrides": {"closure": list(cl)} if cl else None})
+    return out
+
+
+def variant_label(v):
+    cl = (v.get("preference_overrides") or {}).get("closure")
+    return " / ".join(str(x) for x in (v["discipline"], v["environment"],
+                                       v["rock"] or "-", v["aggressiveness"],
+                                       "+".join(cl) if cl else "any"))
+
+
+def _rec_pref(aggressiveness):
+    return "performance" if aggressiveness in ("moderate", "aggressive") else "comfort"
+
+
+class WhatIfScorer:
+    """Preference-independent scoring state for one scan."""
+
+    def __init__(self, scan, shoes_db, price_rows, brand_sizing):
+        self.profile = build_profile(scan, shoes_db)
+        self.street_size = float(scan.get("street_size_eu") or 0) or None
+        self.shoes_db = shoes_db
+        self.price_rows = price_rows or []
+        self.brand_sizing = brand_sizing
+        self.prices = price_index_for(self.price_rows)
+        self.catalog = catalog_for(shoes_db)
+        # H1 / H2 read only the shoe and the profile.
+        self._eligible = eligible_mask(shoes_db, self.profile)
+        self.eligible = self.catalog.indices(self._eligible)
+        self._columns = {}    # axis_column_key -> {shoe index: (score, note)}
+        self._rec = {}        # (brand, pref) -> recommended size
+        self._priced = {}     # pref -> priced slugs
+
+    # ── Shared pieces ────────────────────────────────────────────────
+
+    def rec_size(self, brand, pref):
+        key = (brand, pref)
+        if key not in self._rec:
+            self._rec[key] = calc_rec_size(self.profile["shoes"], brand,
+                                           self.brand_sizing, self.street_size, pref)
+        return self._rec[key]
+
+    def priced_slugs(self, pref):
+        """assemble_tiers' priced_slugs for the comfort / performance sizing."""
+        if pref not in self._priced:
+            priced = set()
+            if self.price_rows:
+                for i in self.eligible:
+                    s = self.shoes_db[i]
+                    slug = s.get("slug")
+                    if slug and self.prices.price_at(slug, self.rec_size(s.get("brand"), pref)):
+                        priced.add(slug)
+            self._priced[pref] = priced
+        return self._priced[pref]
+
+    def _pool(self, overrides):
+        """Eligible shoes, restricted to a closure override if any."""
+        allowed = closure_override(overrides)
+        if allowed:
+            return self._eligible & self.catalog.closure_mask(allowed)
+        return self._eligible
+
+    def _score(self, pool, target):
+        """_score_against over the pool, from the shared axis columns."""
+        return _score_against(self.shoes_db, target, self.profile, pool,
+                              self._columns)
+
+    # ── Per variant ──────────────────────────────────────────────────
+
+    def tiers(self, variant):
+        """assemble_tiers output for one variant (same keys), plus "target"."""
+        agg = variant["aggressiveness"]
+        overrides = variant.get("preference_overrides")
+        pref = _rec_pref(agg)
+        target, _ = variant_target(self.profile, variant["discipline"],
+                                   variant["environment"], variant["rock"], agg,
+                                   overrides)
+        target["priced_slugs"] = self.priced_slugs(pref)
+        pool = self._pool(overrides)
+
+        scored = {t: self._score(pool, _shift_target(target, TIER_STIFFNESS_SHIFT[t]))
+                  for t in ("baseline", "softer", "stiffer")}
+        picked, brand_count = set(), {}
+        out = {t: _pick_with_caps(scored[t], picked, brand_count, 0)
+               for t in ("baseline", "softer", "stiffer")}
+        out["budget"] = _select_budget(
+            scored["baseline"], self.profile, self.price_rows, picked, brand_count,
+            rec_size_fn=lambda sh: self.rec_size(sh.get("brand"), pref),
+            price_at=self.prices.price_at)
+        for t in ("baseline", "softer", "stiffer"):
+            out[f"scored_{t}"] = scored[t]
+        out["target"] = target
+        return out
+
+    def reference_tiers(self, variant):
+        """The per-variant path (build_v2_results' scoring) for --verify."""
+        agg = variant["aggressiveness"]
+        overrides = variant.get("preference_overrides")
+        pref = _rec_pref(agg)
+        target, _ = variant_target(self.profile, variant["discipline"],
+                                   variant["environment"], variant["rock"], agg,
+                                   overrides)
+        allowed = closure_override(overrides)
+        pool_mask = self.catalog.closure_mask(allowed) if allowed else None
+        rec_size_fn = lambda sh: calc_rec_size(self.profile["shoes"], sh.get("brand"),
+                                               self.brand_sizing, self.street_size, pref)
+        return assemble_tiers(self.profile, self.shoes_db, target,
+                              price_rows=self.price_rows, rec_size_fn=rec_size_fn,
+                              pool_mask=pool_mask)
+
+    def run(self, variants):
+        """[{"variant", "picks": {tier: [{slug, score, price?}]}}] per variant."""
+        rows = []
+        for v in variants:
+            tiers = self.tiers(v)
+            rows.append({"variant": v, "picks": pick_table(tiers)})
+        return rows
+
+
+def pick_table(tiers):
+    """{tier: [{slug, score[, price]}]} - the comparable part of a tiers dict."""
+    out = {}
+    for t in TIERS:
+        out[t] = []
+        for sc, sh in tiers[t]:
+            pick = {"slug": sh.get("slug"), "score": sc["score"]}
+            if sc.get("best_price_at_size") is not None:
+                pick["price"] = sc["best_price_at_size"]
+            out[t].append(pick)
+    return out
+
+
+# ── CLI ──────────────────────────────────────────────────────────────
+
+def _fetch_scan(scan_id):
+    import requests
+    key = os.environ.get("SUPABASE_SECRET_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
+    r = requests.get("https://wsjsuhvpgupalwgcjatp.supabase.co/rest/v1/foot_scan_fits",
+                     headers={"apikey": key, "Authorization": f"Bearer {key}"},
+                     params={"select": "*", "scan_id": f"eq.{scan_id}", "limit": 1},
+                     timeout=30)
+    r.raise_for_status()
+    rows = r.json()
+    if not rows:
+        raise RuntimeError(f"no scan row for {scan_id}")
+    return rows[0]
+
+
+def main(argv):
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("scan_ids", nargs="+")
+    ap.add_argument("--verify", action="store_true",
+                    help="compare every variant against the per-variant assemble_tiers path")
+    ap.add_argument("--json", help="write the pick table here")
+    args = ap.parse_args(argv)
+
+    from check_full_v2_matrix import load_shoes_db, load_price_rows
+    from scan_recommender import _load_brand_sizing
+    shoes_db, price_rows = load_shoes_db(), load_price_rows()
+    brand_sizing = _load_brand_sizing()
+    grid = preference_grid()
+    print(f"# {len(shoes_db)} shoes, {len(price_rows)} price rows, "
+          f"{len(grid)} variants per scan", file=sys.stderr)
+
+    table, mismatches = [], 0
+    for scan_id in args.scan_ids:
+        scan = _fetch_scan(scan_id)
+        t0 = time.perf_counter()
+        scorer = WhatIfScorer(scan, shoes_db, price_rows, brand_sizing)
+        rows = scorer.run(grid)
+        t_batch = time.perf_counter() - t0
+        line = f"{scan_id}: {len(rows)} variants in {t_batch:.2f}s"
+        if args.verify:
+            t0 = time.perf_counter()
+            for row in rows:
+                ref = pick_table(scorer.reference_tiers(row["variant"]))
+                if ref != row["picks"]:
+                    mismatches += 1
+                    print(f"  ✗ {variant_label(row['variant'])}: batch {row['picks']} "
+                          f"≠ reference {ref}")
+            t_ref = time.perf_counter() - t0
+            line += f", per-variant path {t_ref:.2f}s ({t_ref / max(t_batch, 1e-9):.0f}x)"
+        print(line)
+        for row in rows:
+            picks = "  ".join(f"{t}: " + ",".join(p["slug"] for p in row["picks"][t])
+                              for t in TIERS)
+            print(f"  {variant_label(row['variant']):55s} {picks}")
+        table.extend({"scan_id": scan_id, **row} for row in rows)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(table, indent=1, sort_keys=True))
+        print(f"# wrote {args.json}", file=sys.stderr)
+    if mismatches:
+        print(f"✗ {mismatches} variants differ from the per-variant path")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
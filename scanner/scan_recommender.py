@@ -11,6 +11,9 @@ from typing import Optional
 
 import requests
 
+from shoe_best_prices import load_best_price_rows, best_prices_by_size, size_availability
+from shoe_catalog import catalog_for
+
 SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
 SB_KEY = os.environ.get("SUPABASE_SECRET_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
 if not SB_KEY:
@@ -190,117 +193,37 @@ def _load_proven_slugs():
 
 
 def _load_size_availability():
-    """Load available sizes per shoe slug from shoe_prices_by_size (in-stock).
-
-    Builds a dict: slug -> set of EU sizes available at any retailer.
-    Only loads once per CACHE_TTL.
+    """Load available sizes per shoe slug (in-stock at any retailer).
 
-    Reads the shoe_prices_by_size view (one row per product+size) so BOTH
-    storage models are covered: the array model (sizes_available) and the
-    per-size model (eur_size, used by the bergfreunde/gigasport AWIN
-    affiliate feeds). Paginated — the REST API hard-caps every response at
-    1000 rows, so a single large ``limit`` would silently truncate.
+    Builds a dict: slug -> set of EU sizes. Only loads once per CACHE_TTL.
+    Derived from shoe_best_prices (one row per slug + size, see
+    shoe_best_prices.py), which covers both storage models of
+    shoe_prices: the array model (sizes_available) and the per-size model
+    (eur_size, used by the bergfreunde/gigasport AWIN affiliate feeds).
     """
     global _size_avail_cache
     if _size_avail_cache and (time.time() - _caches_loaded_at) < CACHE_TTL:
         return _size_avail_cache
 
-    t0 = time.time()
-    avail = {}
-    offset = 0
-    while True:
-        resp = requests.get(
-            f"{SB_URL}/rest/v1/shoe_prices_by_size",
-            headers=HEADERS,
-            params={
-                "select": "product_slug,size_eu",
-                "in_stock": "eq.true",
-                "order": "source_id,size_eu",
-                "limit": 1000,
-                "offset": offset,
-            },
-            timeout=REST_TIMEOUT,
-        )
-        resp.raise_for_status()
-        batch = resp.json()
-        if not batch:
-            break
-        for row in batch:
-            slug = row.get("product_slug")
-            size = row.get("size_eu")
-            if not slug or size is None:
-                continue
-            try:
-                avail.setdefault(slug, set()).add(float(size))
-            except (ValueError, TypeError):
-                pass
-        if len(batch) < 1000:
-            break
-        offset += 1000
-
-    _size_avail_cache = avail
-    print(f"[scan_recommender] Size availability loaded for {len(avail)} shoes in {time.time()-t0:.1f}s")
+    _size_avail_cache = size_availability(load_best_price_rows())
+    print(f"[scan_recommender] Size availability loaded for {len(_size_avail_cache)} shoes")
     return _size_avail_cache
 
 
 def _load_best_prices():
-    """Load cheapest in-stock price per shoe slug per size from
-    shoe_prices_by_size.
+    """Load cheapest in-stock price per shoe slug per size.
 
     Builds a dict: slug -> {size_eu: lowest_price_eur}.
     Used for the budget recommendation category - we only show prices
     that are actually available in the user's recommended size.
-
-    Reads the shoe_prices_by_size view (one row per product+size) so BOTH
-    storage models are covered: the array model (sizes_available) and the
-    per-size model (eur_size, used by the bergfreunde/gigasport AWIN
-    affiliate feeds).
+    Shares one shoe_best_prices load with _load_size_availability.
     """
     global _best_price_cache
     if _best_price_cache and (time.time() - _caches_loaded_at) < CACHE_TTL:
         return _best_price_cache
 
-    t0 = time.time()
-    # prices[slug][size] = lowest price
-    prices = {}
-    offset = 0
-    while True:
-        resp = requests.get(
-            f"{SB_URL}/rest/v1/shoe_prices_by_size",
-            headers=HEADERS,
-            params={
-                "select": "product_slug,price_eur,size_eu",
-                "in_stock": "eq.true",
-                "order": "source_id,size_eu",
-                "limit": 1000,
-                "offset": offset,
-            },
-            timeout=REST_TIMEOUT,
-        )
-        resp.raise_for_status()
-        batch = resp.json()
-        if not batch:
-            break
-        for row in batch:
-            slug = row.get("product_slug")
-            price = row.get("price_eur")
-            size = row.get("size_eu")
-            if not slug or price is None or size is None:
-                continue
-            try:
-                p = float(price)
-                sz = float(size)
-            except (ValueError, TypeError):
-                continue
-            slot = prices.setdefault(slug, {})
-            if sz not in slot or p < slot[sz]:
-                slot[sz] = p
-        if len(batch) < 1000:
-            break
-        offset += 1000
-
-    _best_price_cache = prices
-    print(f"[scan_recommender] Best prices loaded for {len(prices)} shoes in {time.time()-t0:.1f}s")
+    _best_price_cache = best_prices_by_size(load_best_price_rows())
+    print(f"[scan_recommender] Best prices loaded for {len(_best_price_cache)} shoes")
     return _best_price_cache
 
 
@@ -419,11 +342,7 @@ def _extract_user_shoe_profile(profile: dict) -> dict:
     Looks up each shoe in the DB to compute stiffness and get skill_level.
     Returns {"stiffnesses": list[float], "skill_levels": set, "owned_models": set}.
     """
-    shoes = _load_shoes()
-    shoe_by_brand_model = {}
-    for s in shoes:
-        key = f"{s['brand']} {s['model']}".lower()
-        shoe_by_brand_model[key] = s
+    catalog = catalog_for(_load_shoes())
 
     user_shoes = profile.get("shoes") or []
     stiffnesses = []
@@ -436,13 +355,8 @@ def _extract_user_shoe_profile(profile: dict) -> dict:
         key = f"{brand} {model}".lower()
         owned_models.add(key)
 
-        # Try exact match, then partial (e.g. "Instinct VSR" -> "Instinct VSR Men's")
-        db_shoe = shoe_by_brand_model.get(key)
-        if not db_shoe:
-            for db_key, s in shoe_by_brand_model.items():
-                if key in db_key or db_key in key:
-                    db_shoe = s
-                    break
+        # Exact match, then partial (e.g. "Instinct VSR" -> "Instinct VSR Men's")
+        db_shoe = catalog.lookup(brand, model, require_both=False)
 
         if db_shoe:
             stiffnesses.append(get_stiffness(db_shoe))
@@ -507,26 +421,14 @@ def _user_current_shoe_widths(profile: dict, shoes_db: list) -> dict:
     the shoe's actual heel_volume from the DB, so scoring can reason
     about what heel volume the user actually needs.
     """
-    shoe_by_key = {}
-    for s in shoes_db:
-        key = f"{s['brand']} {s['model']}".lower()
-        shoe_by_key[key] = s
+    catalog = catalog_for(shoes_db)
 
     widths = set()
     heel_volumes = set()
     forefoot_fits = set()
     heel_fit_signals = []
 
-    for us in profile.get("shoes") or []:
-        brand = us.get("brand", "")
-        model = us.get("model", "")
-        key = f"{brand} {model}".lower()
-        db_shoe = shoe_by_key.get(key)
-        if not db_shoe:
-            for db_key, s in shoe_by_key.items():
-                if key in db_key or db_key in key:
-                    db_shoe = s
-                    break
+    for us, db_shoe in catalog.lookup_user_shoes(profile.get("shoes"), require_both=False):
         if db_shoe:
             widths.add(str(db_shoe.get("width") or ""))
             heel_volumes.add(str(db_shoe.get("heel_volume") or ""))
@@ -957,21 +859,9 @@ def get_categorized_candidates(profile: dict) -> dict:
         avg_stiffness = sum(user_shoe_profile["stiffnesses"]) / len(user_shoe_profile["stiffnesses"])
 
     # Compute user's average performance level from their shoes
-    shoes_db = _load_shoes()
-    shoe_by_key = {}
-    for s in shoes_db:
-        key = f"{s['brand']} {s['model']}".lower()
-        shoe_by_key[key] = s
-
     user_downturns = []
-    for us in profile.get("shoes") or []:
-        key = f"{us.get('brand', '')} {us.get('model', '')}".lower()
-        db_shoe = shoe_by_key.get(key)
-        if not db_shoe:
-            for db_key, s in shoe_by_key.items():
-                if key in db_key or db_key in key:
-                    db_shoe = s
-                    break
+    shoes = profile.get("shoes")
+    for us, db_shoe in catalog_for(_load_shoes()).lookup_user_shoes(shoes, require_both=False):
         if db_shoe and db_shoe.get("downturn"):
             user_downturns.append(db_shoe["downturn"])
 
@@ -1014,8 +904,7 @@ def get_categorized_candidates(profile: dict) -> dict:
 
 def verify_slug(slug: str) -> bool:
     """Verify a shoe slug exists in the DB. Uses cached shoes."""
-    shoes = _load_shoes()
-    return any(s["slug"] == slug for s in shoes)
+    return catalog_for(_load_shoes()).has_slug(slug)
 
 
 def fetch_scan_data(scan_id: str) -> Optional[dict]:
@@ -42,6 +42,7 @@ for _p in (os.path.join(_REAL_SCANNER_DIR, "explore_v2"), _REAL_SCANNER_DIR):
 import foot_measure
 import scan_recommender
 import scan_alert
+from shoe_catalog import catalog_for
 
 # ── Config ──────────────────────────────────────────────────────────────
 POLL_INTERVAL = 5          # seconds between polls
@@ -462,6 +463,7 @@ def _load_engine_data():
     brand_sizing = load_brand_sizing()
     size_avail = load_size_availability()
     best_prices = load_best_prices()
+    catalog = catalog_for(shoes_db)
     log(f"  Loaded {len(shoes_db)} shoes, {len(brand_sizing)} brands, "
         f"{len(size_avail)} size entries, {len(best_prices)} prices")
     _engine_data = {
@@ -469,7 +471,8 @@ def _load_engine_data():
         "brand_sizing": brand_sizing,
         "size_avail": size_avail,
         "best_prices": best_prices,
-        "shoe_by_slug": {s["slug"]: s for s in shoes_db},
+        "catalog": catalog,
+        "shoe_by_slug": catalog.by_slug,
     }
     return _engine_data
 
@@ -755,7 +758,8 @@ def _load_v2_engine_data():
     log(f"  V2 engine data: {len(shoes_db)} shoes, {len(price_rows)} price rows, "
         f"{len(brand_sizing)} brands")
     _v2_engine_data = {"shoes_db": shoes_db, "price_rows": price_rows,
-                       "brand_sizing": brand_sizing}
+                       "brand_sizing": brand_sizing,
+                       "catalog": catalog_for(shoes_db)}
     return _v2_engine_data
 
 
@@ -782,10 +786,12 @@ def _generate_recommendations_v2(scan_id, profile, scan_data):
     log(f"  V2 pipeline: {discipline} / {environment} / {rock or '-'} / {aggressiveness}")
 
     preference_overrides = scan_data.get("preference_overrides")
+    stored_state = scan_data.get("scoring_state")
     res = build_v2_results(merged, ed["shoes_db"], ed["price_rows"],
                            ed["brand_sizing"], discipline, environment,
                            rock, aggressiveness,
-                           preference_overrides=preference_overrides)
+                           preference_overrides=preference_overrides,
+                           previous=scan_data, scoring_state=stored_state)
     interpretation = res["interpretation"]
     recommendations = res["recommendations"]
     log(f"  Generated {len(recommendations)} V2 recommendations across 4 tiers")
@@ -804,17 +810,29 @@ def _generate_recommendations_v2(scan_id, profile, scan_data):
     derived_prefs = res.get("derived_preferences")
     if derived_prefs:
         result_data["derived_preferences"] = derived_prefs
+    interp_deps = res.get("interpretation_deps")
+    if interp_deps:
+        result_data["interpretation_deps"] = interp_deps
+    scoring_state = res.get("scoring_state")
+    if scoring_state:
+        result_data["scoring_state"] = scoring_state
+        if (isinstance(stored_state, dict)
+                and stored_state.get("fingerprint") == scoring_state["fingerprint"]):
+            log("  Reused stored scoring state (fit targets + fit axes)")
     scan_recommender.update_scan(scan_id, result_data)
     return len(recommendations)
 
 
-def generate_recommendations(scan_id, profile):
+def generate_recommendations(scan_id, profile, row=None):
     """Score shoes deterministically, generate interpretation, write to DB.
 
     Feature-flag dispatch (W9): a scan carrying the four V2 inputs is
     scored by the V2 pipeline unless SCANNER_PIPELINE forces V1. The V1
     path below is unchanged and stays the rollback target.
 
+    ``row`` is the foot_scan_fits row when the caller has just fetched
+    it (_regenerate_from_stored); otherwise it is fetched here.
+
     V1 path:
     - matrix_scorer for shoe selection + scoring (4 tiers: baseline/softer/stiffer/budget)
     - interp_foot_shape for Section 1
@@ -823,7 +841,7 @@ def generate_recommendations(scan_id, profile):
     - interp_shoe_desc for per-shoe description paragraphs (P1/P2/P3)
     """
     # Dispatch: re-fetch the row so we see the latest V2 inputs / prefs.
-    _row = scan_recommender.fetch_scan_data(scan_id)
+    _row = row or scan_recommender.fetch_scan_data(scan_id)
     if _row and _scan_wants_v2(_row):
         return _generate_recommendations_v2(scan_id, profile, _row)
 
@@ -1034,7 +1052,9 @@ def _regenerate_from_stored(scan_id, log_prefix):
     """Run rec generation using stored measurements (no SAM3).
 
     Shared by check_waiting_scans (preferences just filled) and
-    check_rescore_scans (preferences changed on results page).
+    check_rescore_scans (preferences changed on results page). The row
+    fetched here is handed on, so the V2 path reads its stored
+    interpretation and scoring state without a second fetch.
     """
     log(f"{log_prefix} for {scan_id} - generating recommendations")
     try:
@@ -1061,7 +1081,7 @@ def _regenerate_from_stored(scan_id, log_prefix):
         }
 
         t0 = time.time()
-        n_recs = generate_recommendations(scan_id, profile)
+        n_recs = generate_recommendations(scan_id, profile, row=scan_data)
         elapsed = time.time() - t0
         log(f"  Recommendations done in {elapsed:.1f}s ({n_recs} recs)")
 
@@ -1085,7 +1105,9 @@ def check_rescore_scans():
     """Re-check scans whose preferences were edited on the results page.
 
     Triggered by frontend PATCHing pipeline_stage='rescore'. We skip SAM3
-    and regenerate recommendations + interpretation from stored measurements.
+    and regenerate recommendations + interpretation from stored measurements;
+    on the V2 path the row's scoring_state and interpretation_deps let the
+    pipeline redo only the preference axes and the changed text.
     """
     for scan in fetch_rescore_scans():
         _regenerate_from_stored(scan["scan_id"], "Rescore requested")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Cheapest in-stock offer per (shoe slug, EU size) - the one place the
+scanner reads shoe prices from.
+
+The reduction lives in the database: the shoe_best_prices materialized
+view (supabase/migrations/20261019080000_shoe_best_prices.sql, refreshed by
+run_all_crawlers after every crawl) holds one row per (product_slug,
+size_eu) with the cheapest in-stock price_eur and its retailer /
+product_url. Loading it is a few pages instead of the whole
+shoe_prices_by_size view.
+
+Every loader derives its shape from the same rows:
+
+    best_prices_by_size(rows)   slug -> {size: price}    (scan_recommender budget pick)
+    size_availability(rows)     slug -> set of sizes     (size filters)
+    best_price_per_slug(rows)   slug -> cheapest price   (V1 matrix scorer)
+    load_best_price_rows()      rows shaped like shoe_prices_by_size with
+                                in_stock=True            (V2 best_price_at_size)
+
+If the view is not deployed yet (404), the rows are rebuilt from
+shoe_prices_by_size with reduce_best(), the same reduction in Python.
+
+Usage:
+    python3 shoe_best_prices.py            # summary of the current view
+"""
+import os, sys, time
+
+import requests
+
+SB_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+SB_KEY = os.environ.get("SUPABASE_SECRET_KEY") or os.environ.get("SUPABASE_SERVICE_KEY")
+
+# (connect_timeout_seconds, read_timeout_seconds), as in scan_recommender
+REST_TIMEOUT = (10, 30)
+PAGE = 1000            # PostgREST hard cap per response
+CACHE_TTL = 3600       # same refresh cadence as the scan_recommender caches
+
+_rows_cache = None
+_rows_loaded_at = 0.0
+
+
+def _headers():
+    if not SB_KEY:
+        raise RuntimeError("SUPABASE_SECRET_KEY (or legacy SUPABASE_SERVICE_KEY) must be set")
+    return {"apikey": SB_KEY, "Authorization": f"Bearer {SB_KEY}"}
+
+
+def _paginate(table, params):
+    """All rows of a REST query, PAGE at a time."""
+    out, offset = [], 0
+    while True:
+        resp = requests.get(
+            f"{SB_URL}/rest/v1/{table}",
+            headers=_headers(),
+            params={**params, "limit": PAGE, "offset": offset},
+            timeout=REST_TIMEOUT,
+        )
+        resp.raise_for_status()
+        batch = resp.json()
+        out.extend(batch)
+        if len(batch) < PAGE:
+            return out
+        offset += PAGE
+
+
+def reduce_best(rows):
+    """Cheapest in-stock row per (slug, size) from per-size offer rows.
+
+    Same reduction as the shoe_best_prices view: ties on price go to the
+    alphabetically first retailer. Returns rows with product_slug, size_eu
+    (float), price_eur (float), retailer, product_url, offers, in_stock=True.
+    """
+    best = {}
+    for row in rows:
+        slug = row.get("product_slug")
+        if not slug or row.get("in_stock") is False:
+            continue
+        try:
+            size = float(row["size_eu"])
+            price = float(row["price_eur"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        key = (slug, size)
+        cur = best.get(key)
+        retailer = row.get("retailer") or ""
+        if cur is None:
+            best[key] = cur = {"product_slug": slug, "size_eu": size, "price_eur": price,
+                               "retailer": retailer, "product_url": row.get("product_url"),
+                               "offers": 0, "in_stock": True}
+        elif (price, retailer) < (cur["price_eur"], cur["retailer"]):
+            cur.update(price_eur=price, retailer=retailer, product_url=row.get("product_url"))
+        cur["offers"] += 1
+    return list(best.values())
+
+
+def _normalize(rows):
+    """View rows → float size/price, in_stock=True (the view holds in-stock offers only)."""
+    out = []
+    for row in rows:
+        try:
+            size = float(row["size_eu"])
+            price = float(row["price_eur"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        out.append({**row, "size_eu": size, "price_eur": price, "in_stock": True})
+    return out
+
+
+def load_best_price_rows(force=False):
+    """Rows of shoe_best_prices, cached per process for CACHE_TTL seconds."""
+    global _rows_cache, _rows_loaded_at
+    if not force and _rows_cache is not None and (time.time() - _rows_loaded_at) < CACHE_TTL:
+        return _rows_cache
+
+    t0 = time.time()
+    try:
+        rows = _normalize(_paginate("shoe_best_prices", {
+            "select": "product_slug,size_eu,price_eur,retailer,product_url,offers",
+            "order": "product_slug,size_eu",
+        }))
+        source = "shoe_best_prices"
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+        # View not deployed yet: same reduction over the per-size view. It
+        # has no retailer / product_url; like the view, take them from
+        # shoe_prices via source_id (they also break price ties)
+        raw = _paginate("shoe_prices_by_size", {
+            "select": "product_slug,size_eu,price_eur,in_stock,source_id",
+            "in_stock": "eq.true",
+            "order": "source_id,size_eu",
+        })
+        offers = {r["id"]: r for r in _paginate("shoe_prices", {
+            "select": "id,retailer,product_url",
+            "order": "id",
+        })}
+        for r in raw:
+            src = offers.get(r.get("source_id")) or {}
+            r["retailer"], r["product_url"] = src.get("retailer"), src.get("product_url")
+        rows = reduce_best(raw)
+        source = f"shoe_prices_by_size ({len(raw)} offers)"
+
+    _rows_cache, _rows_loaded_at = rows, time.time()
+    print(f"[shoe_best_prices] {len(rows)} (slug, size) best prices from {source} "
+          f"in {time.time() - t0:.1f}s")
+    return rows
+
+
+def best_prices_by_size(rows):
+    """slug -> {size_eu: cheapest price}."""
+    out = {}
+    for r in rows:
+        out.setdefault(r["product_slug"], {})[r["size_eu"]] = r["price_eur"]
+    return out
+
+
+def size_availability(rows):
+    """slug -> set of EU sizes in stock at any retailer."""
+    out = {}
+    for r in rows:
+        out.setdefault(r["product_slug"], set()).add(r["size_eu"])
+    return out
+
+
+def best_price_per_slug(rows):
+    """slug -> cheapest in-stock price over all sizes."""
+    out = {}
+    for r in rows:
+        slug, price = r["product_slug"], r["price_eur"]
+        if slug not in out or price < out[slug]:
+            out[slug] = price
+    return out
+
+
+if __name__ == "__main__":
+    rows = load_best_price_rows()
+    by_slug = best_prices_by_size(rows)
+    offers = sum(r.get("offers") or 1 for r in rows)
+    print(f"  {len(by_slug)} shoes, {len(rows)} (slug, size) rows, {offers} in-stock offers")
+    for slug in sys.argv[1:]:
+        for size, price in sorted(by_slug.get(slug, {}).items()):
+            print(f"    {slug} EU {size:g}: €{price:.2f}")
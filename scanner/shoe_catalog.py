@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Shoe catalog index - resolves user-entered (brand, model) pairs and slugs
+against the loaded shoes table.
+
+Users type their current shoes free-form ("La Sportiva", "Solution Comp",
+"Instinct VSR Men's"). Every engine matches them the same way:
+
+    1. exact:     "<brand> <model>" (stripped, lowercased) equals the DB key
+    2. substring: user key inside the DB key, or DB key inside the user key;
+                  the first shoe in shoes_db order wins
+    3. no brand or no model → no match
+
+The V1 engine (benchmark/matrix_scorer, scan_recommender) keeps its own
+older rules, lookup(..., require_both=False): keys are only lowercased,
+not stripped; a blank brand or model still matches (" solution" is inside
+"la sportiva solution"); a key shared by several shoes resolves to the
+last of them, and the substring pass walks distinct keys in first-seen
+order.
+
+ShoeCatalog does this without scanning shoes_db:
+
+    exact       dict of normalized key → first shoe with that key
+    substring   token index over the DB keys (_KeyIndex; a second one over
+                the V1 keys, built on the first V1 lookup). Both keys always
+                contain the brand/model space, so for "a in b" the last token
+                of a starts a token of b. Candidates come from
+                  _by_prefix: token prefix → shoes   (user key inside DB key)
+                  _by_last:   last DB token → shoes  (DB key inside user key)
+                and are verified with the plain substring test, keeping the
+                lowest shoes_db index, so results match the linear scan.
+                Resolved keys are memoized.
+    slugs       slug → shoe (scan_recommender.verify_slug, pick enrichment)
+    masks       int bitsets over shoes_db positions (bit i = shoes_db[i]) for
+                the categorical hard filters: kids_friendly, closure value,
+                (brand, model) pairs for "already owned", plus memoized
+                predicate masks (discipline overlap). Scorers AND them into
+                one candidate mask and only visit its set bits.
+
+catalog_for(shoes_db) builds the catalog once per loaded list (the engine
+data in scan_worker, the cached shoes in scan_recommender) and returns the
+same instance on later calls.
+
+Usage:
+    from shoe_catalog import catalog_for
+    catalog = catalog_for(shoes_db)
+    catalog.lookup("Scarpa", "Instinct VSR")     # shoe dict or None
+    catalog.by_slug.get("scarpa-instinct-vsr")
+    pool = catalog.all_mask & ~catalog.kids_mask & catalog.closure_mask({"lace"})
+    for i in catalog.indices(pool): ...
+
+    python3 shoe_catalog.py --selftest   # index vs linear scan over the seed catalog
+"""
+import hashlib
+import json
+import sys
+import threading
+
+_CACHE_SIZE = 4   # loaded shoe lists kept indexed (engine data, recommender cache, ...)
+
+_catalogs = []    # [(shoes_db, ShoeCatalog)], most recent last
+_catalogs_lock = threading.Lock()
+
+
+def _norm(v):
+    """matrix_scorer_v2._norm: strip/lower strings, other values as-is."""
+    return v.strip().lower() if isinstance(v, str) else v
+
+
+def shoe_key(brand, model):
+    """Normalized lookup key for a (brand, model) pair."""
+    return f"{(brand or '').strip().lower()} {(model or '').strip().lower()}"
+
+
+def v1_shoe_key(brand, model):
+    """The V1 engine's key: lowercased only ("None" for a None value)."""
+    return f"{brand} {model}".lower()
+
+
+class _KeyIndex:
+    """Exact + substring lookup over (key, shoe) pairs; the substring pass
+    returns the first pair, in list order, whose key contains or is
+    contained in the query."""
+
+    def __init__(self, pairs):
+        self._keys = [k for k, _ in pairs]
+        self._shoes = [s for _, s in pairs]
+        self._exact = {}
+        self._by_prefix = {}
+        self._by_last = {}
+        self._fuzzy = {}
+        for i, key in enumerate(self._keys):
+            self._exact.setdefault(key, self._shoes[i])
+            tokens = key.split(" ")
+            for tok in set(tokens):
+                for n in range(len(tok) + 1):
+                    self._by_prefix.setdefault(tok[:n], []).append(i)
+            self._by_last.setdefault(tokens[-1], []).append(i)
+
+    def find(self, key):
+        shoe = self._exact.get(key)
+        if shoe is not None:
+            return shoe
+        if key not in self._fuzzy:
+            self._fuzzy[key] = self._substring_match(key)
+        return self._fuzzy[key]
+
+    def _substring_match(self, key):
+        tokens = key.split(" ")
+        candidates = set(self._by_prefix.get(tokens[-1], ()))
+        for tok in set(tokens):
+            for n in range(len(tok) + 1):
+                candidates.update(self._by_last.get(tok[:n], ()))
+        for i in sorted(candidates):
+            k = self._keys[i]
+            if key in k or k in key:
+                return self._shoes[i]
+        return None
+
+
+class ShoeCatalog:
+    """Hash and token indexes over one shoes_db list."""
+
+    def __init__(self, shoes_db):
+        self.shoes = shoes_db
+        self._v1 = None
+        self.by_slug = {}
+        self.all_mask = (1 << len(shoes_db)) - 1
+        self.kids_mask = 0
+        self._by_closure = {}   # normalized closure → bitset
+        self._by_pair = {}      # (_norm(brand), _norm(model)) → bitset
+        self._predicates = {}   # caller key → bitset
+        self._fingerprint = None
+        self._index = _KeyIndex([(shoe_key(s.get("brand"), s.get("model")), s)
+                                 for s in shoes_db])
+        for i, s in enumerate(shoes_db):
+            bit = 1 << i
+            if s.get("kids_friendly"):
+                self.kids_mask |= bit
+            closure = str(s.get("closure") or "").strip().lower()
+            self._by_closure[closure] = self._by_closure.get(closure, 0) | bit
+            try:
+                pair = (_norm(s.get("brand")), _norm(s.get("model")))
+                self._by_pair[pair] = self._by_pair.get(pair, 0) | bit
+            except TypeError:   # unhashable brand/model: never matches a user shoe
+                pass
+            if s.get("slug"):
+                self.by_slug[s["slug"]] = s
+
+    def __len__(self):
+        return len(self.shoes)
+
+    def lookup(self, brand, model, require_both=True):
+        """DB shoe for a user-entered (brand, model), or None.
+
+        require_both=False applies the V1 engine's rules (module docstring).
+        """
+        if not require_both:
+            return self._v1_index().find(v1_shoe_key(brand, model))
+        if not brand or not model:
+            return None
+        return self._index.find(shoe_key(brand, model))
+
+    def _v1_index(self):
+        # V1 built {key: shoe} with plain assignment: last shoe per key,
+        # keys in first-seen order
+        if self._v1 is None:
+            by_key = {}
+            for s in self.shoes:
+                by_key[v1_shoe_key(s["brand"], s["model"])] = s
+            self._v1 = _KeyIndex(list(by_key.items()))
+        return self._v1
+
+    # ── Bitset masks ──
+
+    def closure_mask(self, closures):
+        """Shoes whose normalized closure is in `closures`."""
+        mask = 0
+        for c in closures:
+            mask |= self._by_closure.get(c, 0)
+        return mask
+
+    def owned_mask(self, user_shoes):
+        """Shoes with the same normalized (brand, model) as a user shoe."""
+        mask = 0
+        for us in user_shoes or []:
+            try:
+                mask |= self._by_pair.get((_norm(us.get("brand")), _norm(us.get("model"))), 0)
+            except TypeError:
+                pass
+        return mask
+
+    def predicate_mask(self, key, pred):
+        """Bitset of pred(shoe), built once per key for this catalog."""
+        mask = self._predicates.get(key)
+        if mask is None:
+            mask = 0
+            for i, s in enumerate(self.shoes):
+                if pred(s):
+                    mask |= 1 << i
+            self._predicates[key] = mask
+        return mask
+
+    @staticmethod
+    def indices(mask):
+        """shoes_db positions of the set bits, ascending."""
+        return [i for i, bit in enumerate(bin(mask)[:1:-1]) if bit == "1"]
+
+    def subset(self, mask):
+        """The shoes of a mask, in shoes_db order."""
+        shoes = self.shoes
+        return [shoes[i] for i in self.indices(mask)]
+
+    def fingerprint(self):
+        """Short hash of every shoe row, in order: equal fingerprints mean
+        the same shoes at the same positions (scoring state built against
+        one catalog is only reused against an equal one)."""
+        if self._fingerprint is None:
+            blob = json.dumps(self.shoes, sort_keys=True, separators=(",", ":"),
+                              default=str)
+            self._fingerprint = hashlib.sha1(blob.encode()).hexdigest()[:16]
+        return self._fingerprint
+
+    def has_slug(self, slug):
+        return slug in self.by_slug
+
+    def lookup_user_shoes(self, user_shoes, require_both=True):
+        """[(user_shoe_entry, db_shoe or None)] for a profile's shoes list."""
+        return [(us, self.lookup(us.get("brand", ""), us.get("model", ""), require_both))
+                for us in user_shoes or []]
+
+
+def catalog_for(shoes_db):
+    """ShoeCatalog for a loaded shoes list, built once per list."""
+    with _catalogs_lock:
+        for db, catalog in _catalogs:
+            if db is shoes_db and len(catalog) == len(shoes_db):
+                return catalog
+        catalog = ShoeCatalog(shoes_db)
+        _catalogs[:] = [e for e in _catalogs if e[0] is not shoes_db][-(_CACHE_SIZE - 1):]
+        _catalogs.append((shoes_db, catalog))
+        return catalog
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _linear_lookup(shoes_db, brand, model):
+    """The scan every engine used before the index (reference for --selftest)."""
+    if not brand or not model:
+        return None
+    key = shoe_key(brand, model)
+    for s in shoes_db:
+        if shoe_key(s["brand"], s["model"]) == key:
+            return s
+    for s in shoes_db:
+        k = shoe_key(s["brand"], s["model"])
+        if key in k or k in key:
+            return s
+    return None
+
+
+def _linear_lookup_v1(shoes_db, brand, model):
+    """The V1 engine's dict + scan (reference for --selftest)."""
+    shoe_by_key = {}
+    for s in shoes_db:
+        shoe_by_key[f"{s['brand']} {s['model']}".lower()] = s
+    key = f"{brand} {model}".lower()
+    db_shoe = shoe_by_key.get(key)
+    if not db_shoe:
+        for db_key, s in shoe_by_key.items():
+            if key in db_key or db_key in key:
+                db_shoe = s
+                break
+    return db_shoe
+
+
+def _selftest():
+    """Index vs linear scan over the seed catalog, on exact and mangled inputs."""
+    import json
+    import random
+    import time
+    from pathlib import Path
+
+    seed = Path(__file__).resolve().parent.parent / "src" / "seed_data.json"
+    shoes_db = json.loads(seed.read_text())
+    rng = random.Random(41)
+
+    queries = [("", "Solution"), ("Scarpa", ""), (None, None), ("  ", "  "),
+               ("la", "sportiva"), ("x", "y"), ("Sportiva", "Solution"),
+               ("La Sportiva", "Solution Comp Women's Extra"), ("Five Ten", "Hiangle")]
+    for s in shoes_db:
+        b, m = s["brand"], s["model"]
+        words = m.split()
+        queries += [
+            (b, m), (b.upper(), f"  {m} "), (b, words[0]), (b, words[-1]),
+            (b, m + " Men's"), (b, m + " LV"), (b.split()[-1], m),
+            (b, m[: rng.randint(1, len(m))]), (b, m[rng.randint(0, len(m) - 1):]),
+            (rng.choice(shoes_db)["brand"], m),
+        ]
+
+    catalog = catalog_for(shoes_db)
+    assert catalog_for(shoes_db) is catalog
+    mismatches = [(b, m) for b, m in queries
+                  if catalog.lookup(b, m) is not _linear_lookup(shoes_db, b, m)]
+    assert not mismatches, mismatches[:5]
+    assert all(catalog.has_slug(s["slug"]) for s in shoes_db) and not catalog.has_slug("nope")
+    matched = sum(1 for b, m in queries if catalog.lookup(b, m))
+    print(f"  ✓ {len(queries)} lookups identical to the linear scan ({matched} matched)")
+
+    # V1 rules, including a duplicated key and padded DB entries
+    v1_db = shoes_db + [dict(shoes_db[0], slug="dup"), dict(shoes_db[1], model=shoes_db[1]["model"] + " ")]
+    v1 = ShoeCatalog(v1_db)
+    mismatches = [(b, m) for b, m in queries
+                  if v1.lookup(b, m, require_both=False) is not _linear_lookup_v1(v1_db, b, m)]
+    assert not mismatches, mismatches[:5]
+    assert v1.lookup("", "Solution", require_both=False) is not None
+    assert v1.lookup(shoes_db[0]["brand"], shoes_db[0]["model"], require_both=False)["slug"] == "dup"
+    print(f"  ✓ {len(queries)} V1 lookups (require_both=False) identical to the V1 scan")
+
+    shoes_db = [dict(s, kids_friendly=rng.random() < 0.1,
+                     closure=rng.choice([s.get("closure"), None, " Lace ", "VELCRO"]))
+                for s in shoes_db]
+    catalog = ShoeCatalog(shoes_db)
+    norm_closure = lambda s: str(s.get("closure") or "").strip().lower()
+    assert catalog.subset(catalog.kids_mask) == [s for s in shoes_db if s.get("kids_friendly")]
+    for closures in ({"lace"}, {"velcro", "slipper"}, {""}, set()):
+        assert catalog.subset(catalog.closure_mask(closures)) == \
+            [s for s in shoes_db if norm_closure(s) in closures]
+    for _ in range(200):
+        owned = [{"brand": rng.choice([s["brand"], s["brand"].upper() + " ", None]),
+                  "model": s["model"]} for s in rng.sample(shoes_db, rng.randint(0, 3))]
+        expect = [s for s in shoes_db
+                  if any(_norm(u["brand"]) == _norm(s["brand"])
+                         and _norm(u["model"]) == _norm(s["model"]) for u in owned)]
+        assert catalog.subset(catalog.owned_mask(owned)) == expect
+    mask = rng.getrandbits(len(shoes_db))
+    assert catalog.indices(mask) == [i for i in range(len(shoes_db)) if mask >> i & 1]
+    print("  ✓ kids / closure / owned masks and indices() match the per-shoe checks")
+
+    fresh = ShoeCatalog(shoes_db)
+    t0 = time.perf_counter()
+    for b, m in queries:
+        fresh.lookup(b, m)
+    t_index = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for b, m in queries:
+        _linear_lookup(shoes_db, b, m)
+    t_linear = time.perf_counter() - t0
+    print(f"  ✓ {len(shoes_db)} shoes: index {t_index * 1e3:.1f}ms vs linear {t_linear * 1e3:.1f}ms "
+          f"for {len(queries)} lookups")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        print(__doc__)
@@ -0,0 +1,1028 @@
+#!/usr/bin/env python3
+"""
+local_supabase.py - Local stand-in for the Supabase REST (PostgREST) and
+Storage APIs, for offline runs and load tests of the scan, crawl and
+snapshot pipelines.
+
+Every Python entry point talks to the hosted project URL directly
+(SUPABASE_URL / SB_URL constants). LocalSupabase serves the subset of both
+APIs those scripts use from memory, on a loopback HTTP server in a
+background thread, and redirects calls to the hosted URL to it:
+
+  REST      GET / POST / PATCH / DELETE /rest/v1/<table>
+            filters eq neq gt gte lt lte like ilike in is cs, not.<op>,
+            select (column list, alias:col), order (asc/desc, nullsfirst/last),
+            limit / offset, on_conflict, Prefer: resolution=merge-duplicates |
+            ignore-duplicates, return=representation | minimal, count=exact,
+            gzip request bodies (bulk_writer)
+  views     shoe_prices_by_size, shoe_best_prices (refreshed by its RPC),
+            <history table>_latest
+  RPC       bulk_upsert_rows, detect_price_drops, refresh_shoe_best_prices,
+            history_storage (register more with .rpc(name, fn))
+  Storage   POST / PUT / GET / DELETE /storage/v1/object/[public/]<bucket>/<path>,
+            x-upsert
+
+Redirected clients: requests (Session.request), urllib.request.urlopen and
+http.client.HTTPSConnection (bulk_writer's keep-alive connections), in this
+process and - through local_supabase_site/sitecustomize.py on PYTHONPATH -
+in child processes (run_all_crawlers starts every crawler as one).
+
+Seed data (seed=True): shoes from src/seed_data.json, plus any slugs only in
+src/shoes_seed_data.json or scanner/benchmark/shoes_database.json; ropes,
+crashpads, belay_devices, quickdraws and shoe_reviews from their
+src/*_seed_data.json; brand_sizing from the shoes' manufacturer downsize
+ranges; foot_scan_fits from scanner/benchmark/test_cases.json inputs; one
+synthetic in-stock shoe_prices offer (size ladder) per shoe with a
+current_price_eur.
+
+Not PostgREST: tables are schemaless (any table name exists and starts
+empty, rows keep whatever keys were written), there is no RLS, and ids /
+created_at / recorded_at are filled in like the column defaults.
+
+Usage:
+    from local_supabase import LocalSupabase
+    with LocalSupabase() as sb:            # seeded, redirects this process + children
+        import scan_recommender ...        # talks to sb instead of the hosted project
+        sb.rows("foot_scan_fits")          # inspect the store directly
+
+    python3 scripts/local_supabase.py serve [--port 54321] [--no-seed] [--dump state.json]
+                                            [--latency-ms 40]
+    python3 scripts/local_supabase.py --selftest
+"""
+
+import argparse
+import copy
+import datetime
+import gzip
+import http.client
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
+SUPABASE_HOST = urllib.parse.urlsplit(SUPABASE_URL).hostname
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_supabase_site")
+ENV_URL = "SUPABASE_LOCAL_URL"   # set for child processes, read by sitecustomize
+
+# Tables whose primary key is not an `id` serial
+PRIMARY_KEYS = {
+    "price_trends": ("category", "product_slug"),
+    "price_trend_state": ("history_table",),
+    "brand_sizing": ("brand",),
+}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+SEED_SIZES = [36 + 0.5 * i for i in range(23)]     # EU 36 - 47
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class RestError(Exception):
+    """PostgREST-style error: HTTP status + JSON body with code / message."""
+
+    def __init__(self, status, message, code="PGRST100"):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": None, "hint": None}
+
+
+# ── Filters ─────────────────────────────────────────────────────────────────
+
+_TS_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+
+
+def _as_time(s):
+    s = s.strip().replace("Z", "+00:00")
+    # An unencoded "+" in a query string arrives as a space
+    s = re.sub(r" (\d{2}:?\d{2})$", r"+\1", s)
+    t = datetime.datetime.fromisoformat(s)
+    return t if t.tzinfo else t.replace(tzinfo=datetime.timezone.utc)
+
+
+def _coerce(raw, value):
+    """Filter literal → comparable with the row value (number, bool, time, text)."""
+    if isinstance(value, bool):
+        return raw.lower() in ("true", "t", "1")
+    if isinstance(value, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    if isinstance(value, str) and _TS_RE.match(value) and _TS_RE.match(raw):
+        try:
+            return _as_time(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _comparable(value, raw):
+    if isinstance(value, str) and _TS_RE.match(value) and _TS_RE.match(raw):
+        try:
+            return _as_time(value)
+        except ValueError:
+            return value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def _split_list(body):
+    """'a,"b,c",d' → ['a', 'b,c', 'd'] (PostgREST in.(...) / cs.{...} lists)."""
+    out, cur, quoted = [], [], False
+    for ch in body:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            out.append("".join(cur))
+            cur = []
+        else:
+            cur.append(ch)
+    if cur or out:
+        out.append("".join(cur))
+    return [x.strip() for x in out]
+
+
+def _like(pattern, value, flags=0):
+    rx = "^" + ".*".join(re.escape(p) for p in re.split(r"[*%]", pattern)) + "$"
+    return value is not None and re.match(rx, str(value), flags | re.S) is not None
+
+
+def parse_filter(column, expr):
+    """'not.is.null' → predicate(row) for one query parameter."""
+    negate = False
+    if expr.startswith("not."):
+        negate, expr = True, expr[4:]
+    op, _, raw = expr.partition(".")
+
+    def test(row):
+        value = row.get(column)
+        if op == "is":
+            want = {"null": None, "true": True, "false": False, "unknown": None}.get(raw.lower(), ...)
+            if want is ...:
+                raise RestError(400, f'"failed to parse filter (is.{raw})"')
+            return value is want if want is not None else value is None
+        if op == "in":
+            items = _split_list(raw.strip("()"))
+            return value is not None and any(_comparable(value, i) == _coerce(i, value) for i in items)
+        if op == "cs":
+            items = _split_list(raw.strip("{}[]"))
+            have = value if isinstance(value, list) else []
+            return all(any(str(h) == i for h in have) for i in items)
+        if op == "like":
+            return _like(raw, value)
+        if op == "ilike":
+            return _like(raw, value, re.I)
+        if value is None:
+            return False
+        left, right = _comparable(value, raw), _coerce(raw, value)
+        try:
+            if op == "eq":
+                return left == right
+            if op == "neq":
+                return left != right
+            if op == "gt":
+                return left > right
+            if op == "gte":
+                return left >= right
+            if op == "lt":
+                return left < right
+            if op == "lte":
+                return left <= right
+        except TypeError:
+            return False
+        raise RestError(400, f'"failed to parse filter ({op}.{raw})"')
+
+    if op not in {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in", "is", "cs"}:
+        raise RestError(400, f'"failed to parse filter ({expr})"')
+    return (lambda row: not test(row)) if negate else test
+
+
+def _order_key(value):
+    if isinstance(value, str) and _TS_RE.match(value):
+        try:
+            return (1, _as_time(value))
+        except ValueError:
+            pass
+    if isinstance(value, bool):
+        return (0, int(value))
+    if isinstance(value, (int, float)):
+        return (0, float(value))
+    return (2, str(value))
+
+
+def apply_order(rows, order):
+    """PostgREST order=col.desc.nullslast,col2 - nulls last on asc, first on desc."""
+    for term in reversed([t for t in order.split(",") if t]):
+        parts = term.split(".")
+        col, desc = parts[0], "desc" in parts[1:]
+        nulls_first = "nullsfirst" in parts[1:] or (desc and "nullslast" not in parts[1:])
+        present = [r for r in rows if r.get(col) is not None]
+        missing = [r for r in rows if r.get(col) is None]
+        present.sort(key=lambda r: _order_key(r[col]), reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def apply_select(rows, select):
+    if not select or select.strip() == "*":
+        return rows
+    if "(" in select:
+        raise RestError(400, "resource embedding is not supported by the local stand-in")
+    cols = []
+    for term in select.split(","):
+        term = term.strip()
+        alias, _, col = term.rpartition(":") if ":" in term and "::" not in term else ("", "", term)
+        col = col.split("::")[0]
+        cols.append((alias or col, col))
+    return [{alias: r.get(col) for alias, col in cols} for r in rows]
+
+
+# ── Store ───────────────────────────────────────────────────────────────────
+
+class Store:
+    """In-memory tables, views, RPCs and storage objects."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.next_id = {}
+        self.views = {}
+        self.matviews = {}
+        self.rpcs = {}
+        self.objects = {}
+        self.requests = 0
+        _register_builtins(self)
+
+    # ── Tables ──
+
+    def rows(self, table):
+        """Live rows of a table or view (not copies)."""
+        with self.lock:
+            if table in self.matviews:
+                return self.matviews[table]
+            if table in self.views:
+                return self.views[table](self)
+            if table.endswith("_latest") and table[:-len("_latest")] in self.tables:
+                return _latest_view(self, table[:-len("_latest")])
+            return self.tables.setdefault(table, [])
+
+    def _key_cols(self, table, on_conflict=None):
+        if on_conflict:
+            return tuple(c.strip() for c in on_conflict.split(",") if c.strip())
+        return PRIMARY_KEYS.get(table, ("id",))
+
+    def _defaults(self, table, row):
+        if "id" not in row and table not in PRIMARY_KEYS:
+            n = self.next_id.get(table)
+            if n is None:
+                ids = [r["id"] for r in self.tables.get(table, []) if isinstance(r.get("id"), int)]
+                n = max(ids, default=0) + 1
+            row["id"] = n
+            self.next_id[table] = n + 1
+        elif isinstance(row.get("id"), int):
+            self.next_id[table] = max(self.next_id.get(table, 1), row["id"] + 1)
+        stamp = "recorded_at" if table.endswith("history") else "created_at"
+        row.setdefault(stamp, _now())
+        return row
+
+    def insert(self, table, rows, on_conflict=None, resolution=None):
+        """INSERT (ON CONFLICT ... DO UPDATE / DO NOTHING). Returns the written rows."""
+        with self.lock:
+            if table in self.views or table in self.matviews:
+                raise RestError(405, f"cannot insert into view {table}", code="42809")
+            data = self.tables.setdefault(table, [])
+            key_cols = self._key_cols(table, on_conflict)
+            index = {tuple(r.get(c) for c in key_cols): r for r in data
+                     if all(r.get(c) is not None for c in key_cols)}
+            out = []
+            for row in rows:
+                row = dict(row)
+                key = tuple(row.get(c) for c in key_cols)
+                existing = index.get(key) if all(k is not None for k in key) else None
+                if existing is not None:
+                    if resolution == "ignore-duplicates":
+                        continue
+                    if resolution != "merge-duplicates":
+                        raise RestError(409, f'duplicate key value violates unique constraint on '
+                                             f'{table} ({", ".join(key_cols)})', code="23505")
+                    existing.update(row)
+                    out.append(existing)
+                    continue
+                row = self._defaults(table, row)
+                data.append(row)
+                key = tuple(row.get(c) for c in key_cols)
+                if all(k is not None for k in key):
+                    index[key] = row
+                out.append(row)
+            return out
+
+    def select(self, table, filters=(), order=None, limit=None, offset=0):
+        with self.lock:
+            rows = [r for r in self.rows(table) if all(f(r) for f in filters)]
+            total = len(rows)
+            if order:
+                rows = apply_order(rows, order)
+            rows = rows[offset:offset + limit if limit is not None else None]
+            return copy.deepcopy(rows), total
+
+    def update(self, table, filters, patch):
+        with self.lock:
+            hit = [r for r in self.tables.get(table, []) if all(f(r) for f in filters)]
+            for r in hit:
+                r.update(patch)
+            return hit
+
+    def delete(self, table, filters):
+        with self.lock:
+            data = self.tables.get(table, [])
+            keep, gone = [], []
+            for r in data:
+                (gone if all(f(r) for f in filters) else keep).append(r)
+            self.tables[table] = keep
+            return gone
+
+    def rpc(self, name, fn=None):
+        """Register an RPC: fn(store, params) → JSON-able result. Decorator if fn is None."""
+        if fn is None:
+            return lambda f: self.rpc(name, f)
+        self.rpcs[name] = fn
+        return fn
+
+    # ── Persistence ──
+
+    def dump(self, path):
+        with self.lock:
+            state = {"tables": self.tables,
+                     "objects": {f"{b}/{p}": {"content_type": ct, "size": len(data)}
+                                 for (b, p), (data, ct) in self.objects.items()}}
+            with open(path, "w") as f:
+                json.dump(state, f, default=str)
+
+    def load(self, path):
+        with open(path) as f:
+            state = json.load(f)
+        with self.lock:
+            self.tables = state.get("tables", {})
+            self.next_id = {}
+            refresh_shoe_best_prices(self, {})
+
+
+# ── Views and RPCs (mirrors of the SQL in supabase/migrations) ──────────────
+
+def _num(v):
+    try:
+        return float(str(v).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def shoe_prices_by_size(store):
+    """One row per shoe_prices row and size (eur_size, else sizes_available)."""
+    out = []
+    for r in store.tables.get("shoe_prices", []):
+        sizes = r.get("sizes_available")
+        if isinstance(sizes, str):
+            try:
+                sizes = json.loads(sizes)
+            except ValueError:
+                sizes = []
+        if r.get("eur_size") is not None:
+            sizes = [r["eur_size"]]
+        for s in sizes or []:
+            size = _num(s)
+            if size is None:
+                continue
+            out.append({"product_slug": r.get("product_slug"), "price_eur": r.get("price_eur"),
+                        "in_stock": r.get("in_stock", True), "size_eu": size,
+                        "source_id": r.get("id")})
+    return out
+
+
+def refresh_shoe_best_prices(store, params):
+    """REFRESH MATERIALIZED VIEW shoe_best_prices (cheapest in-stock offer per slug + size)."""
+    with store.lock:
+        by_id = {r.get("id"): r for r in store.tables.get("shoe_prices", [])}
+        best, offers = {}, {}
+        for v in shoe_prices_by_size(store):
+            if not v["in_stock"] or v["price_eur"] is None or not v["product_slug"]:
+                continue
+            src = by_id.get(v["source_id"], {})
+            key = (v["product_slug"], v["size_eu"])
+            cand = (float(v["price_eur"]), src.get("retailer") or "")
+            offers[key] = offers.get(key, 0) + 1
+            if key not in best or cand < best[key][0]:
+                best[key] = (cand, src.get("product_url"))
+        now = _now()
+        store.matviews["shoe_best_prices"] = [
+            {"product_slug": k[0], "size_eu": k[1], "price_eur": price, "retailer": retailer,
+             "product_url": url, "offers": offers[k], "refreshed_at": now}
+            for k, ((price, retailer), url) in sorted(best.items())
+        ]
+        return len(best)
+
+
+def _latest_view(store, history_table):
+    """<history>_latest: last row per key, like the DISTINCT ON views."""
+    if history_table == "price_history":
+        key = ("shoe_slug", "retailer")
+    else:
+        key = (history_table[:-len("_price_history")] + "_price_id",)
+    latest = {}
+    for r in store.tables.get(history_table, []):
+        k = tuple(r.get(c) for c in key)
+        if k not in latest or _order_key(r.get("recorded_at")) >= _order_key(latest[k].get("recorded_at")):
+            latest[k] = r
+    return list(latest.values())
+
+
+def bulk_upsert_rows(store, params):
+    conflict = params.get("p_conflict") or []
+    rows = store.insert(params["p_table"], params.get("p_rows") or [],
+                        on_conflict=",".join(conflict) or None,
+                        resolution="merge-duplicates" if conflict else None)
+    return len(rows)
+
+
+def detect_price_drops(store, params):
+    """detect_price_drops(p_threshold, p_before, p_categories) over the store."""
+    threshold = float(params.get("p_threshold", 0.10))
+    before = params.get("p_before")
+    before = _as_time(before) if before else None
+    out = []
+
+    def last_price(history, match):
+        best = None
+        for h in history:
+            if not match(h):
+                continue
+            t = _as_time(str(h["recorded_at"]))
+            if before is not None and t >= before:
+                continue
+            if best is None or t > best[0]:
+                best = (t, h.get("price_eur"))
+        return None if best is None else best[1]
+
+    def drop(old, new):
+        return old and new and float(old) > 0 and (float(old) - float(new)) / float(old) >= threshold
+
+    for spec in params.get("p_categories") or []:
+        live = store.tables.get(spec["live_table"], [])
+        history = store.tables.get(spec.get("history_table") or "", [])
+        if not spec.get("history_table"):
+            continue
+        key = spec["history_key"]
+        if spec["grain"] == "product":
+            cheapest = {}
+            for r in live:
+                if not (r.get("product_slug") and r.get("in_stock") and (r.get("price_eur") or 0) > 0):
+                    continue
+                k = (r["product_slug"], r.get("retailer"))
+                if k not in cheapest or float(r["price_eur"]) < float(cheapest[k]["price_eur"]):
+                    cheapest[k] = r
+            for (slug, retailer), r in cheapest.items():
+                old = last_price(history, lambda h: (h.get(key[0]), h.get(key[1])) == (slug, retailer))
+                if not drop(old, r["price_eur"]):
+                    continue
+                sizes = {}
+                for s in live:
+                    if (s.get("product_slug"), s.get("retailer")) == (slug, retailer) and s.get("in_stock") \
+                            and (s.get("price_eur") or 0) > 0 and s.get("eur_size") is not None:
+                        size = str(s["eur_size"])
+                        sizes[size] = min(sizes.get(size, float("inf")), float(s["price_eur"]))
+                out.append({"category": spec["category"], "product": r.get("product_name") or slug,
+                            "product_slug": slug, "retailer": retailer, "old_price": float(old),
+                            "new_price": float(r["price_eur"]),
+                            "drop_pct": round((float(old) - float(r["price_eur"])) / float(old) * 100, 1),
+                            "sizes": sizes or None})
+        else:
+            for r in live:
+                if not (r.get("in_stock") and (r.get("price_eur") or 0) > 0):
+                    continue
+                old = last_price(history, lambda h: h.get(key[0]) == r.get("id"))
+                if not drop(old, r["price_eur"]):
+                    continue
+                out.append({"category": spec["category"],
+                            "product": r.get("product_name") or r.get("product_slug") or str(r.get("id")),
+                            "product_slug": r.get("product_slug"), "retailer": r.get("retailer") or "?",
+                            "old_price": float(old), "new_price": float(r["price_eur"]),
+                            "drop_pct": round((float(old) - float(r["price_eur"])) / float(old) * 100, 1),
+                            "sizes": None})
+    return out
+
+
+def history_storage(store, params):
+    out = []
+    for t in params.get("p_tables") or []:
+        rows = store.tables.get(t, [])
+        size = sum(len(json.dumps(r, default=str)) for r in rows)
+        out.append({"table_name": t, "total_bytes": size, "live_rows": len(rows), "dead_rows": 0})
+    return out
+
+
+def _register_builtins(store):
+    store.views["shoe_prices_by_size"] = shoe_prices_by_size
+    store.matviews["shoe_best_prices"] = []
+    for name, fn in [("bulk_upsert_rows", bulk_upsert_rows),
+                     ("detect_price_drops", detect_price_drops),
+                     ("refresh_shoe_best_prices", refresh_shoe_best_prices),
+                     ("history_storage", history_storage)]:
+        store.rpc(name, fn)
+
+
+# ── Seed data ───────────────────────────────────────────────────────────────
+
+def _read_json(*parts):
+    path = os.path.join(REPO_ROOT, *parts)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def seed(store):
+    """Catalog, a few scans and one offer per priced shoe, from the repo's JSON files."""
+    shoes, seen = [], set()
+    for parts in [("src", "seed_data.json"), ("src", "shoes_seed_data.json"),
+                  ("scanner", "benchmark", "shoes_database.json")]:
+        for s in _read_json(*parts):
+            if s.get("slug") and s["slug"] not in seen:
+                seen.add(s["slug"])
+                shoes.append(s)
+    store.insert("shoes", shoes)
+
+    for table, name in [("ropes", "rope_seed_data.json"), ("crashpads", "crashpad_seed_data.json"),
+                        ("belay_devices", "belay_seed_data.json"),
+                        ("quickdraws", "quickdraw_seed_data.json"),
+                        ("shoe_reviews", "shoe_reviews_seed_data.json")]:
+        store.insert(table, _read_json("src", name))
+
+    downsize = {}
+    for s in shoes:
+        lo, hi = _num(s.get("mfr_downsize_min_eu")), _num(s.get("mfr_downsize_max_eu"))
+        if s.get("brand") and lo is not None and hi is not None:
+            downsize.setdefault(s["brand"], []).append((lo + hi) / 2)
+    store.insert("brand_sizing", [{"brand": b, "typical_downsize_mid": round(statistics.median(v) * 2) / 2}
+                                  for b, v in sorted(downsize.items())])
+
+    offers = []
+    for i, s in enumerate(shoes):
+        if not s.get("current_price_eur"):
+            continue
+        url = s.get("current_price_url") or f"https://seed.local/{s['slug']}"
+        offers.append({"product_slug": s["slug"], "retailer": urllib.parse.urlsplit(url).hostname,
+                       "product_url": url, "product_name": f"{s.get('brand')} {s.get('model')}",
+                       "brand": s.get("brand"), "model": s.get("model"),
+                       "price_eur": float(s["current_price_eur"]), "currency": "EUR",
+                       # Deterministic gaps in the size ladder
+                       "sizes_available": [z for j, z in enumerate(SEED_SIZES) if (i + j) % 5],
+                       "in_stock": True, "last_crawled_at": _now()})
+    store.insert("shoe_prices", offers, on_conflict="retailer,product_url",
+                 resolution="merge-duplicates")
+
+    scans = []
+    for n, case in enumerate(_read_json("scanner", "benchmark", "test_cases.json")):
+        scan = dict(case["input"])
+        scan.update(pipeline_stage="complete",
+                    created_at=f"2026-01-01T00:{n:02d}:00+00:00")
+        scans.append(scan)
+    store.insert("foot_scan_fits", scans)
+    refresh_shoe_best_prices(store, {})
+    return {t: len(rows) for t, rows in store.tables.items() if rows}
+
+
+# ── HTTP front end ──────────────────────────────────────────────────────────
+
+def _prefer(headers):
+    out = {}
+    for part in (headers.get("Prefer") or "").split(","):
+        k, _, v = part.strip().partition("=")
+        if k:
+            out[k] = v
+    return out
+
+
+def handle(store, method, url, headers, body):
+    """One REST / Storage request → (status, headers dict, body bytes)."""
+    parts = urllib.parse.urlsplit(url)
+    path = urllib.parse.unquote(parts.path)
+    with store.lock:
+        store.requests += 1
+    try:
+        if path.startswith("/rest/v1/rpc/"):
+            return _handle_rpc(store, path[len("/rest/v1/rpc/"):], body)
+        if path.startswith("/rest/v1/"):
+            return _handle_rest(store, method, path[len("/rest/v1/"):], parts.query, headers, body)
+        if path.startswith("/storage/v1/object/"):
+            return _handle_storage(store, method, path[len("/storage/v1/object/"):], headers, body)
+        raise RestError(404, f"no route for {path}", code="PGRST125")
+    except RestError as e:
+        return e.status, {"Content-Type": "application/json"}, json.dumps(e.body).encode()
+
+
+def _json(status, payload, extra=None):
+    return status, {"Content-Type": "application/json", **(extra or {})}, \
+        json.dumps(payload, default=str).encode()
+
+
+def _handle_rpc(store, name, body):
+    fn = store.rpcs.get(name)
+    if fn is None:
+        raise RestError(404, f"Could not find the function public.{name} in the schema cache",
+                        code="PGRST202")
+    params = json.loads(body) if body else {}
+    return _json(200, fn(store, params))
+
+
+def _handle_rest(store, method, table, query, headers, body):
+    params = urllib.parse.parse_qsl(query, keep_blank_values=True)
+    opts = {k: v for k, v in params if k in RESERVED_PARAMS}
+    if any(k in ("or", "and") for k, _ in params):
+        raise RestError(400, "or/and filters are not supported by the local stand-in")
+    filters = [parse_filter(k, v) for k, v in params if k not in RESERVED_PARAMS]
+    prefer = _prefer(headers)
+    representation = prefer.get("return") == "representation"
+
+    if method in ("GET", "HEAD"):
+        try:
+            limit = int(opts["limit"]) if "limit" in opts else None
+            offset = int(opts.get("offset", 0))
+        except ValueError:
+            raise RestError(400, "limit / offset must be integers")
+        rows, total = store.select(table, filters, opts.get("order"), limit, offset)
+        rows = apply_select(rows, opts.get("select"))
+        extra = {}
+        if "count" in prefer:
+            last = offset + len(rows) - 1
+            extra["Content-Range"] = f"{offset}-{last}/{total}" if rows else f"*/{total}"
+        return _json(200, rows, extra)
+
+    if method == "POST":
+        data = json.loads(body) if body else []
+        rows = store.insert(table, data if isinstance(data, list) else [data],
+                            on_conflict=opts.get("on_conflict"), resolution=prefer.get("resolution"))
+        if representation:
+            return _json(201, apply_select(copy.deepcopy(rows), opts.get("select")))
+        return 201, {}, b""
+
+    if method == "PATCH":
+        if not filters:
+            raise RestError(400, "UPDATE requires a WHERE clause", code="21000")
+        rows = store.update(table, filters, json.loads(body) if body else {})
+        if representation:
+            return _json(200, apply_select(copy.deepcopy(rows), opts.get("select")))
+        return 204, {}, b""
+
+    if method == "DELETE":
+        if not filters:
+            raise RestError(400, "DELETE requires a WHERE clause", code="21000")
+        rows = store.delete(table, filters)
+        if representation:
+            return _json(200, apply_select(rows, opts.get("select")))
+        return 204, {}, b""
+
+    raise RestError(405, f"method {method} not supported")
+
+
+def _storage_error(status, error, message):
+    return _json(status, {"statusCode": str(status), "error": error, "message": message})
+
+
+def _handle_storage(store, method, rest, headers, body):
+    public = False
+    for prefix in ("public/", "authenticated/", "sign/"):
+        if rest.startswith(prefix):
+            rest, public = rest[len(prefix):], True
+    bucket, _, name = rest.partition("/")
+
+    with store.lock:
+        if method in ("GET", "HEAD"):
+            obj = store.objects.get((bucket, name))
+            if obj is None:
+                return _storage_error(404, "not_found", "Object not found")
+            return 200, {"Content-Type": obj[1]}, obj[0]
+        if public:
+            return _storage_error(400, "invalid_request", "public URLs are read-only")
+        if method in ("POST", "PUT"):
+            upsert = method == "PUT" or (headers.get("x-upsert") or "").lower() == "true"
+            if (bucket, name) in store.objects and not upsert:
+                return _storage_error(400, "Duplicate", "The resource already exists")
+            store.objects[(bucket, name)] = (body or b"",
+                                             headers.get("Content-Type") or "application/octet-stream")
+            return _json(200, {"Key": f"{bucket}/{name}", "Id": str(uuid.uuid4())})
+        if method == "DELETE":
+            names = [name] if name else (json.loads(body or b"{}").get("prefixes") or [])
+            gone = [n for n in names if store.objects.pop((bucket, n), None) is not None]
+            return _json(200, [{"name": n, "bucket_id": bucket} for n in gone])
+    return _storage_error(405, "invalid_request", f"method {method} not supported")
+
+
+def _make_handler(store, latency_s=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _serve(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            status, headers, payload = handle(store, self.command, self.path, self.headers, raw)
+            if latency_s:
+                time.sleep(latency_s)
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(payload)
+
+        do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+    return Handler
+
+
+# ── Redirecting clients ─────────────────────────────────────────────────────
+
+_target = None          # SplitResult of the local base URL while redirected
+_originals = {}
+
+
+def _rewrite(url):
+    if _target is not None and isinstance(url, str) and url.startswith(SUPABASE_URL):
+        return f"{_target.scheme}://{_target.netloc}{url[len(SUPABASE_URL):]}"
+    return url
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that hands out a plain local connection for the project host."""
+
+    def __new__(cls, host, *args, **kwargs):
+        if _target is not None and host.split(":")[0] == SUPABASE_HOST:
+            conn = http.client.HTTPConnection(_target.netloc)
+            if kwargs.get("timeout") is not None:
+                conn.timeout = kwargs["timeout"]
+            return conn
+        return super().__new__(cls)
+
+
+def redirect(base_url):
+    """Send this process's calls to the hosted project to base_url (idempotent)."""
+    global _target
+    _target = urllib.parse.urlsplit(base_url)
+    if _originals:
+        return
+
+    _originals["urlopen"] = urllib.request.urlopen
+
+    def urlopen(url, *args, **kwargs):
+        if isinstance(url, urllib.request.Request):
+            url.full_url = _rewrite(url.full_url)
+        else:
+            url = _rewrite(url)
+        return _originals["urlopen"](url, *args, **kwargs)
+
+    urllib.request.urlopen = urlopen
+
+    _originals["HTTPSConnection"] = http.client.HTTPSConnection
+    http.client.HTTPSConnection = _HTTPSConnection
+
+    try:
+        import requests
+    except ImportError:
+        return
+    _originals["Session.request"] = requests.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        return _originals["Session.request"](self, method, _rewrite(url), *args, **kwargs)
+
+    requests.Session.request = request
+
+
+def unredirect():
+    global _target
+    _target = None
+    if not _originals:
+        return
+    urllib.request.urlopen = _originals.pop("urlopen")
+    http.client.HTTPSConnection = _originals.pop("HTTPSConnection")
+    if "Session.request" in _originals:
+        import requests
+        requests.Session.request = _originals.pop("Session.request")
+
+
+class LocalSupabase:
+    """Seeded store + loopback server + client redirect, as a context manager."""
+
+    def __init__(self, seed_data=True, port=0, redirect_children=True, latency_ms=0.0):
+        self.store = Store()
+        if seed_data:
+            self.seeded = seed(self.store)
+        self.port = port
+        self.redirect_children = redirect_children
+        self.latency_ms = latency_ms
+        self.server = None
+        self.url = None
+        self._saved_env = {}
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port),
+                                         _make_handler(self.store, self.latency_ms / 1000))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        redirect(self.url)
+        env = {"SUPABASE_SECRET_KEY": os.environ.get("SUPABASE_SECRET_KEY") or "local-supabase"}
+        if self.redirect_children:
+            env[ENV_URL] = self.url
+            env["PYTHONPATH"] = os.pathsep.join(
+                p for p in [SITE_DIR, os.environ.get("PYTHONPATH")] if p)
+        for k, v in env.items():
+            self._saved_env[k] = os.environ.get(k)
+            os.environ[k] = v
+        return self
+
+    def __exit__(self, *exc):
+        unredirect()
+        for k, v in self._saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Shortcuts for harnesses
+    def rows(self, table):
+        with self.store.lock:
+            return copy.deepcopy(self.store.rows(table))
+
+    def insert(self, table, rows, **kwargs):
+        return self.store.insert(table, rows, **kwargs)
+
+    def put_object(self, bucket, name, data, content_type="application/octet-stream"):
+        with self.store.lock:
+            self.store.objects[(bucket, name)] = (data, content_type)
+
+    def get_object(self, bucket, name):
+        obj = self.store.objects.get((bucket, name))
+        return obj[0] if obj else None
+
+
+# ── Self-check ──────────────────────────────────────────────────────────────
+
+def _selftest():
+    """Exercise the REST / Storage subset through the redirected urllib and http.client."""
+    with LocalSupabase() as sb:
+        def call(method, path, body=None, headers=None):
+            data = json.dumps(body).encode() if body is not None and not isinstance(body, bytes) else body
+            req = urllib.request.Request(f"{SUPABASE_URL}{path}", data=data, method=method,
+                                         headers={"Content-Type": "application/json", **(headers or {})})
+            try:
+                with urllib.request.urlopen(req, timeout=10) as resp:
+                    raw = resp.read()
+                    return resp.status, (json.loads(raw) if raw and resp.headers.get_content_type()
+                                         == "application/json" else raw), resp.headers
+            except urllib.error.HTTPError as e:
+                return e.code, json.loads(e.read() or b"null"), e.headers
+
+        checks = []
+
+        def check(label, ok):
+            checks.append(ok)
+            print(f"  {'✓' if ok else '✗'} {label}")
+
+        n_shoes = len(sb.rows("shoes"))
+        _, rows, _ = call("GET", "/rest/v1/shoes?select=slug,brand&limit=1000")
+        check(f"seeded shoes readable ({n_shoes})", len(rows) == n_shoes and set(rows[0]) == {"slug", "brand"})
+
+        brand = rows[0]["brand"]
+        _, rows, _ = call("GET", f"/rest/v1/shoes?select=slug&brand=eq.{urllib.parse.quote(brand)}"
+                                 f"&order=slug.desc&limit=2&offset=1")
+        want = sorted((s["slug"] for s in sb.rows("shoes") if s.get("brand") == brand), reverse=True)[1:3]
+        check("eq + order desc + limit/offset", [r["slug"] for r in rows] == want)
+
+        pending = [{"scan_id": f"load-{i}", "pipeline_stage": "pending" if i % 2 else "waiting_preferences",
+                    "sex": None if i % 3 == 0 else "female"} for i in range(9)]
+        status, _, _ = call("POST", "/rest/v1/foot_scan_fits", pending, {"Prefer": "return=minimal"})
+        _, rows, _ = call("GET", "/rest/v1/foot_scan_fits?select=scan_id&pipeline_stage=in.(pending,rescore)"
+                                 "&sex=not.is.null&order=created_at.asc,scan_id.asc")
+        want = [p["scan_id"] for p in pending if p["pipeline_stage"] == "pending" and p["sex"]]
+        check("insert 201 + in.() + not.is.null", status == 201 and [r["scan_id"] for r in rows] == want)
+
+        _, rows, _ = call("PATCH", "/rest/v1/foot_scan_fits?scan_id=eq.load-1",
+                          {"pipeline_stage": "complete"}, {"Prefer": "return=representation"})
+        _, none, _ = call("PATCH", "/rest/v1/foot_scan_fits?scan_id=eq.missing",
+                          {"pipeline_stage": "complete"}, {"Prefer": "return=representation"})
+        check("PATCH return=representation (hit / miss)",
+              len(rows) == 1 and rows[0]["pipeline_stage"] == "complete" and none == [])
+
+        offer = {"retailer": "shop.example", "product_url": "https://shop.example/a", "price_eur": 100.0,
+                 "product_slug": "x", "in_stock": True, "eur_size": "42"}
+        upsert = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+        call("POST", "/rest/v1/shoe_prices?on_conflict=retailer,product_url", [offer], upsert)
+        call("POST", "/rest/v1/shoe_prices?on_conflict=retailer,product_url", [dict(offer, price_eur=80.0)], upsert)
+        status, err, _ = call("POST", "/rest/v1/shoe_prices", [dict(offer, id=sb.rows("shoe_prices")[0]["id"])])
+        _, rows, _ = call("GET", "/rest/v1/shoe_prices?select=price_eur&retailer=eq.shop.example")
+        check("upsert on_conflict merges, duplicate pk → 409",
+              rows == [{"price_eur": 80.0}] and status == 409 and err["code"] == "23505")
+
+        _, n, _ = call("POST", "/rest/v1/rpc/refresh_shoe_best_prices", {})
+        _, rows, _ = call("GET", "/rest/v1/shoe_best_prices?product_slug=eq.x&size_eu=eq.42")
+        check(f"refresh_shoe_best_prices RPC ({n} rows)", rows and rows[0]["price_eur"] == 80.0)
+
+        t0 = "2026-10-01T00:00:00+00:00"
+        hist = [{"rope_price_id": 1, "price_eur": 100, "recorded_at": t0},
+                {"rope_price_id": 1, "price_eur": 90, "recorded_at": "2026-10-02T00:00:00+00:00"}]
+        call("POST", "/rest/v1/rope_price_history", hist)
+        _, rows, _ = call("GET", "/rest/v1/rope_price_history?select=price_eur"
+                                 f"&recorded_at=gte.{urllib.parse.quote(t0)}&recorded_at=lt.2026-10-02T00:00:00Z")
+        _, latest, _ = call("GET", "/rest/v1/rope_price_history_latest?select=price_eur")
+        check("repeated time filters + _latest view", rows == [{"price_eur": 100}] and latest == [{"price_eur": 90}])
+
+        call("DELETE", "/rest/v1/foot_scan_fits?scan_id=like.load-*")
+        check("DELETE with like", not [r for r in sb.rows("foot_scan_fits") if r["scan_id"].startswith("load-")])
+
+        status, _, _ = call("POST", "/storage/v1/object/foot-scans/scans/a-sole.jpg", b"\xff\xd8jpeg",
+                            {"Content-Type": "image/jpeg"})
+        dup, _, _ = call("POST", "/storage/v1/object/foot-scans/scans/a-sole.jpg", b"x",
+                         {"Content-Type": "image/jpeg"})
+        call("POST", "/storage/v1/object/foot-scans/scans/a-sole.jpg", b"\xff\xd8v2",
+             {"Content-Type": "image/jpeg", "x-upsert": "true"})
+        got_status, got, headers = call("GET", "/storage/v1/object/public/foot-scans/scans/a-sole.jpg")
+        missing, _, _ = call("GET", "/storage/v1/object/public/foot-scans/scans/none.jpg")
+        check("storage upload / duplicate / x-upsert / public download / 404",
+              (status, dup, got_status, got, missing) == (200, 400, 200, b"\xff\xd8v2", 404)
+              and headers["Content-Type"] == "image/jpeg")
+
+        conn = http.client.HTTPSConnection(SUPABASE_HOST, timeout=10)
+        conn.request("POST", "/rest/v1/rpc/bulk_upsert_rows",
+                     body=gzip.compress(json.dumps({"p_table": "harness_prices", "p_rows": [
+                         {"retailer": "r", "product_url": "u", "price_eur": 1}], "p_conflict": [
+                         "retailer", "product_url"]}).encode()),
+                     headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        resp = conn.getresponse()
+        check("http.client keep-alive + gzip body + bulk_upsert_rows",
+              resp.status == 200 and json.loads(resp.read()) == 1 and len(sb.rows("harness_prices")) == 1)
+        conn.close()
+
+        status, err, _ = call("POST", "/rest/v1/rpc/no_such_fn", {})
+        check("unknown RPC → 404 PGRST202", status == 404 and err["code"] == "PGRST202")
+
+    print(f"  {sum(checks)}/{len(checks)} checks passed")
+    return all(checks)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", nargs="?", choices=["serve"], help="run the stand-in until Ctrl-C")
+    ap.add_argument("--port", type=int, default=54321)
+    ap.add_argument("--no-seed", action="store_true", help="start with empty tables")
+    ap.add_argument("--load", help="start from a --dump file instead of the seed files")
+    ap.add_argument("--dump", help="write all tables to this JSON file on exit")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per request")
+    ap.add_argument("--selftest", action="store_true")
+    args = ap.parse_args()
+
+    if args.selftest:
+        sys.exit(0 if _selftest() else 1)
+    if args.command != "serve":
+        ap.print_help()
+        return
+
+    sb = LocalSupabase(seed_data=not args.no_seed and not args.load, port=args.port,
+                       latency_ms=args.latency_ms)
+    if args.load:
+        sb.store.load(args.load)
+    with sb:
+        counts = {t: len(r) for t, r in sb.store.tables.items() if r}
+        print(f"  Local Supabase on {sb.url}  ({', '.join(f'{t} {n}' for t, n in sorted(counts.items()))})")
+        print("  Redirect other processes to it with:")
+        print(f"    export {ENV_URL}={sb.url} PYTHONPATH={SITE_DIR}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if args.dump:
+                sb.store.dump(args.dump)
+                print(f"  Tables written to {args.dump}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Redirects this interpreter's Supabase calls to a local stand-in.
+
+On PYTHONPATH only while scripts/local_supabase.py runs (LocalSupabase sets
+it, together with SUPABASE_LOCAL_URL, for child processes such as the
+crawlers run_all_crawlers starts).
+"""
+import os
+import sys
+
+if os.environ.get("SUPABASE_LOCAL_URL"):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from local_supabase import redirect
+
+    redirect(os.environ["SUPABASE_LOCAL_URL"])
+    sys.path.pop(0)
@@ -2,10 +2,16 @@
 """
 snapshot_prices.py — Copy current prices from live tables into history tables.
 
-Run after crawlers finish to record a daily price snapshot.
+Run after crawlers finish to record a price snapshot.
 Can be run standalone or imported and called from crawlers.
 
-History table schemas:
+Snapshots are change-only: a history row is written for a key only when its
+price (categories: also original price / stock status) differs from the last
+row recorded for it. A key that has left the live table gets one tombstone
+row (price NULL, in_stock false). Use crawlers/price_history.py
+(price_as_of / as_of) to get "price as of date X" from the sparse log.
+
+Categories, tables and history schemas come from crawlers/categories.py:
   - price_history (shoes): shoe_slug, retailer, price_eur, recorded_at
   - {category}_price_history: {category}_price_id, price_eur, original_price_eur, in_stock, recorded_at
 """
@@ -13,9 +19,16 @@ History table schemas:
 import json
 import urllib.request
 import datetime
+import os
+import sys
+
+# Shared crawler modules live in crawlers/ (same dir once deployed)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawlers"))
+from bulk_writer import BulkWriter
+from categories import with_history
+from price_history import delta_rows, load_latest, tombstone_rows
 
 SUPABASE_URL = "https://wsjsuhvpgupalwgcjatp.supabase.co"
-import os
 SERVICE_KEY = os.environ["SUPABASE_SECRET_KEY"]  # set in ~/.cgkeys, not committed
 HEADERS = {
     "apikey": SERVICE_KEY,
@@ -43,67 +56,37 @@ def supabase_get(table, select="*", params=""):
 
 
 def supabase_insert(table, rows):
-    """Insert rows into a table in batches of 200."""
-    total = 0
-    errors = 0
-    for i in range(0, len(rows), 200):
-        batch = rows[i:i+200]
-        url = f"{SUPABASE_URL}/rest/v1/{table}"
-        data = json.dumps(batch).encode()
-        req = urllib.request.Request(url, data=data, headers=HEADERS, method="POST")
-        try:
-            with urllib.request.urlopen(req) as resp:
-                resp.read()
-            total += len(batch)
-        except urllib.error.HTTPError as e:
-            body = e.read().decode() if e.fp else ""
-            print(f"    ✗ Batch {i//200+1} error ({e.code}): {body[:200]}")
-            errors += 1
-    if errors:
-        print(f"    ⚠ {errors} batch(es) failed")
+    """Insert rows into a table (adaptive gzip batches, concurrent keep-alive)."""
+    with BulkWriter(table) as writer:
+        total = writer.write(rows)
+    if writer.errors:
+        print(f"    ⚠ {writer.errors} batch(es) failed")
     return total
 
 
-def snapshot_shoes():
-    """Snapshot shoe_prices → price_history (legacy schema: shoe_slug, retailer, price_eur)."""
-    print("  Snapshotting shoes...")
-    now = datetime.datetime.utcnow().isoformat() + "+00:00"
-
-    # Get current prices — for per-size shoes, take the cheapest per slug+retailer
-    live = supabase_get("shoe_prices", select="product_slug,retailer,price_eur", params="&price_eur=not.is.null&product_slug=not.is.null")
-
-    # Deduplicate: keep cheapest price per (slug, retailer)
+def _product_rows(category, now):
+    """Cheapest price per (product_slug, retailer): shoes have one live row per size."""
+    live = supabase_get(category.live_table, select="product_slug,retailer,price_eur",
+                        params="&price_eur=not.is.null&product_slug=not.is.null")
     best = {}
     for r in live:
         key = (r["product_slug"], r["retailer"])
         if key not in best or (r["price_eur"] and r["price_eur"] < best[key]):
             best[key] = r["price_eur"]
-
-    rows = [
-        {"shoe_slug": slug, "retailer": retailer, "price_eur": price, "recorded_at": now}
+    slug_col, retailer_col = category.history_key
+    return [
+        {slug_col: slug, retailer_col: retailer, "price_eur": price, "recorded_at": now}
         for (slug, retailer), price in best.items()
         if price is not None
     ]
-    n = supabase_insert("price_history", rows)
-    print(f"    → {n} shoe price snapshots recorded")
-    return n
-
 
-def snapshot_category(category):
-    """Snapshot {category}_prices → {category}_price_history.
-
-    Schema: {category}_price_id, price_eur, original_price_eur, in_stock, recorded_at
-    """
-    live_table = f"{category}_prices"
-    hist_table = f"{category}_price_history"
-    id_col = f"{category}_price_id"
-
-    print(f"  Snapshotting {category}...")
-    now = datetime.datetime.utcnow().isoformat() + "+00:00"
-
-    live = supabase_get(live_table, select="id,price_eur,original_price_eur,in_stock", params="&price_eur=not.is.null")
 
-    rows = [
+def _row_rows(category, now):
+    """One history row per live row, keyed by {category}_price_id."""
+    live = supabase_get(category.live_table, select="id,price_eur,original_price_eur,in_stock",
+                        params="&price_eur=not.is.null")
+    id_col = category.history_key[0]
+    return [
         {
             id_col: r["id"],
             "price_eur": r["price_eur"],
@@ -114,8 +97,29 @@ def snapshot_category(category):
         for r in live
         if r["price_eur"] is not None
     ]
-    n = supabase_insert(hist_table, rows)
-    print(f"    → {n} {category} price snapshots recorded")
+
+
+def snapshot_category(category):
+    """Snapshot one registry category's live table → its history table.
+
+    Grain and key columns come from crawlers/categories.py ("product":
+    cheapest per slug + retailer, legacy price_history schema; "row": one
+    row per live row with price, original price and stock status).
+    """
+    print(f"  Snapshotting {category.name}...")
+    now = datetime.datetime.utcnow().isoformat() + "+00:00"
+    build = _product_rows if category.history_grain == "product" else _row_rows
+    rows = build(category, now)
+
+    # Only keys whose tracked fields moved since the last recorded row,
+    # plus a tombstone for every key that is no longer live
+    table, key, fields = category.history_table, category.history_key, category.history_fields
+    last = load_latest(table, key, fields)
+    changed = delta_rows(rows, last, key, fields)
+    gone = tombstone_rows(rows, last, key, fields, now)
+    n = supabase_insert(table, changed + gone)
+    print(f"    → {n} {category.name} price changes recorded ({len(gone)} removed, "
+          f"{len(rows) - len(changed)} unchanged)")
     return n
 
 
@@ -126,14 +130,13 @@ def snapshot_all():
     print(f"{'='*60}")
 
     total = 0
-    total += snapshot_shoes()
-    for cat in ["rope", "crashpad", "harness", "helmet", "belay", "quickdraw"]:
+    for category in with_history():
         try:
-            total += snapshot_category(cat)
+            total += snapshot_category(category)
         except Exception as e:
-            print(f"    ✗ Error snapshotting {cat}: {e}")
+            print(f"    ✗ Error snapshotting {category.name}: {e}")
 
-    print(f"\n  Total: {total} price snapshots recorded across all categories")
+    print(f"\n  Total: {total} price changes recorded across all categories")
     print(f"{'='*60}\n")
     return total
 
@@ -211,7 +211,7 @@ async function fetchLivePrices() {
 
 async function fetchPriceHistory() {
   try {
-    const rows = await supabaseFetch("/rest/v1/price_history?select=shoe_slug,price_eur,recorded_at&order=recorded_at");
+    const rows = await supabaseFetch("/rest/v1/price_history?select=shoe_slug,price_eur,recorded_at&price_eur=not.is.null&order=recorded_at");
     const grouped = {};
     for (const r of rows) {
       if (!grouped[r.shoe_slug]) grouped[r.shoe_slug] = [];
@@ -0,0 +1,91 @@
+-- 20261019010000_bulk_upsert_rows.sql
+--
+-- Server-side bulk writer for the crawler / snapshot pipeline.
+--
+-- crawlers/bulk_writer.py can send a whole batch as one jsonb array to
+-- POST /rest/v1/rpc/bulk_upsert_rows instead of the table endpoint. The
+-- function expands the array with jsonb_populate_recordset and writes it
+-- in a single INSERT ... ON CONFLICT DO UPDATE statement (or a plain
+-- INSERT when no conflict columns are given, e.g. history tables).
+--
+-- Column list = keys of the first array element. bulk_writer.py groups
+-- rows by key set before sending, so every element has the same keys.
+--
+-- Only price and price-history tables are accepted, and only
+-- service_role may execute it (anon/authenticated are revoked).
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.bulk_upsert_rows(
+  p_table    text,
+  p_rows     jsonb,
+  p_conflict text[] DEFAULT ARRAY[]::text[]
+)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  allowed_tables text[] := ARRAY[
+    'shoe_prices', 'rope_prices', 'belay_prices', 'crashpad_prices',
+    'quickdraw_prices', 'helmet_prices', 'harness_prices', 'jacket_prices',
+    'price_history', 'rope_price_history', 'crashpad_price_history',
+    'quickdraw_price_history', 'belay_price_history',
+    'helmet_price_history', 'harness_price_history', 'jacket_price_history'
+  ];
+  cols      text[];
+  col_list  text;
+  set_list  text;
+  n         integer;
+BEGIN
+  IF NOT (p_table = ANY (allowed_tables)) THEN
+    RAISE EXCEPTION 'bulk_upsert_rows: table % not allowed', p_table;
+  END IF;
+  IF p_rows IS NULL OR jsonb_typeof(p_rows) <> 'array' OR jsonb_array_length(p_rows) = 0 THEN
+    RETURN 0;
+  END IF;
+
+  SELECT array_agg(k ORDER BY k) INTO cols
+  FROM jsonb_object_keys(p_rows -> 0) AS k;
+
+  SELECT string_agg(format('%I', c), ', ') INTO col_list FROM unnest(cols) AS c;
+
+  IF p_conflict IS NULL OR cardinality(p_conflict) = 0 THEN
+    EXECUTE format(
+      'INSERT INTO public.%I (%s) SELECT %s FROM jsonb_populate_recordset(NULL::public.%I, $1)',
+      p_table, col_list, col_list, p_table
+    ) USING p_rows;
+  ELSE
+    SELECT string_agg(format('%I = EXCLUDED.%I', c, c), ', ') INTO set_list
+    FROM unnest(cols) AS c
+    WHERE NOT (c = ANY (p_conflict));
+
+    EXECUTE format(
+      'INSERT INTO public.%I (%s) SELECT %s FROM jsonb_populate_recordset(NULL::public.%I, $1) '
+      'ON CONFLICT (%s) DO %s',
+      p_table, col_list, col_list, p_table,
+      (SELECT string_agg(format('%I', c), ', ') FROM unnest(p_conflict) AS c),
+      CASE WHEN set_list IS NULL THEN 'NOTHING' ELSE 'UPDATE SET ' || set_list END
+    ) USING p_rows;
+  END IF;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.bulk_upsert_rows(text, jsonb, text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.bulk_upsert_rows(text, jsonb, text[]) TO service_role;
+
+COMMIT;
+
+-- ─── Verification (run as service_role) ──────────────────────────
+--
+--   SELECT public.bulk_upsert_rows(
+--     'helmet_prices',
+--     '[{"retailer": "test.example", "product_url": "https://test.example/h1",
+--        "price_eur": 49.95, "in_stock": true}]'::jsonb,
+--     ARRAY['retailer', 'product_url']
+--   );                                                  -- returns 1
+--   DELETE FROM helmet_prices WHERE retailer = 'test.example';
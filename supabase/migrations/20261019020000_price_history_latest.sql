@@ -0,0 +1,79 @@
+-- 20261019020000_price_history_latest.sql
+--
+-- Change-only price history.
+--
+-- snapshot_prices.py no longer inserts a row for every product on every
+-- run. It writes a history row only when a key's price (categories: also
+-- original price / stock status) differs from the last row recorded for
+-- that key. To diff cheaply it reads the last row per key from the
+-- *_latest views created here:
+--
+--   price_history_latest              one row per (shoe_slug, retailer)
+--   {category}_price_history_latest   one row per {category}_price_id
+--
+-- The (key, recorded_at DESC) indexes make both the DISTINCT ON views and
+-- "price as of date X" lookups (latest row per key with recorded_at <= X,
+-- see crawlers/price_history.py) index scans instead of full sorts.
+--
+-- Views are security_invoker so the history tables' RLS policies apply.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_price_history_key_recorded
+  ON public.price_history (shoe_slug, retailer, recorded_at DESC);
+
+CREATE OR REPLACE VIEW public.price_history_latest
+WITH (security_invoker = true) AS
+SELECT DISTINCT ON (shoe_slug, retailer)
+  shoe_slug, retailer, price_eur, recorded_at
+FROM public.price_history
+ORDER BY shoe_slug, retailer, recorded_at DESC;
+
+GRANT SELECT ON public.price_history_latest TO anon, authenticated, service_role;
+
+DO $$
+DECLARE
+  cat TEXT;
+  categories TEXT[] := ARRAY['rope', 'crashpad', 'harness', 'helmet', 'belay', 'quickdraw'];
+BEGIN
+  FOREACH cat IN ARRAY categories LOOP
+    IF NOT EXISTS (
+      SELECT 1 FROM pg_class c
+      JOIN pg_namespace n ON c.relnamespace = n.oid
+      WHERE n.nspname = 'public' AND c.relname = cat || '_price_history' AND c.relkind = 'r'
+    ) THEN
+      RAISE NOTICE 'skipping %_price_history (does not exist)', cat;
+      CONTINUE;
+    END IF;
+
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON public.%I (%I, recorded_at DESC)',
+      'idx_' || cat || '_price_history_key_recorded',
+      cat || '_price_history', cat || '_price_id'
+    );
+
+    EXECUTE format(
+      'CREATE OR REPLACE VIEW public.%I WITH (security_invoker = true) AS '
+      'SELECT DISTINCT ON (%I) %I, price_eur, original_price_eur, in_stock, recorded_at '
+      'FROM public.%I ORDER BY %I, recorded_at DESC',
+      cat || '_price_history_latest',
+      cat || '_price_id', cat || '_price_id',
+      cat || '_price_history', cat || '_price_id'
+    );
+
+    EXECUTE format(
+      'GRANT SELECT ON public.%I TO anon, authenticated, service_role',
+      cat || '_price_history_latest'
+    );
+  END LOOP;
+END $$;
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+--
+--   SELECT count(*) FROM price_history_latest;        -- = distinct (slug, retailer)
+--   SELECT count(*) FROM rope_price_history_latest;   -- = distinct rope_price_id
+--   EXPLAIN SELECT * FROM rope_price_history_latest;  -- Index Scan on idx_rope_...
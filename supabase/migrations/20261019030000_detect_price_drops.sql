@@ -0,0 +1,137 @@
+-- 20261019030000_detect_price_drops.sql
+--
+-- Server-side price drop detection for run_all_crawlers.py.
+--
+-- Previously the scheduler paged every history table and every live price
+-- table into Python dicts (tens of thousands of rows) to find a handful of
+-- drops. detect_price_drops() does the join in the database and returns
+-- only the rows that crossed the threshold:
+--
+--   shoes       cheapest in-stock price per (product_slug, retailer) in
+--               shoe_prices vs the last price_history row for that key
+--   categories  every in-stock row of {cat}_prices vs the last
+--               {cat}_price_history row for its id
+--
+-- "Last" = latest recorded_at, optionally only rows before p_before (the
+-- start of this run's snapshot). History is a change-only log, so that row
+-- is the price the product had before this crawl. The lookups use the
+-- (key, recorded_at DESC) indexes from 20261019020000_price_history_latest.sql.
+--
+-- Each drop carries product_slug (for price watches, see
+-- crawlers/price_watch.py) and, for shoes, sizes = {eur_size: cheapest
+-- in-stock price} of the dropped (product_slug, retailer).
+--
+-- p_tables lists the live price tables to check (run_all_crawlers.py
+-- passes its PRICE_TABLES). Tables without a matching history table are
+-- skipped.
+--
+-- Local check against a throwaway Postgres:
+--   python3 crawlers/check_drop_detection.py
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+DROP FUNCTION IF EXISTS public.detect_price_drops(numeric, timestamptz, text[]);
+
+CREATE OR REPLACE FUNCTION public.detect_price_drops(
+  p_threshold numeric   DEFAULT 0.10,
+  p_before    timestamptz DEFAULT NULL,
+  p_tables    text[]    DEFAULT ARRAY[
+    'shoe_prices', 'rope_prices', 'belay_prices', 'crashpad_prices',
+    'quickdraw_prices', 'helmet_prices', 'harness_prices', 'jacket_prices'
+  ]
+)
+RETURNS TABLE (
+  category     text,
+  product      text,
+  product_slug text,
+  retailer     text,
+  old_price    numeric,
+  new_price    numeric,
+  drop_pct     numeric,
+  sizes        jsonb
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+  live_table text;
+  cat        text;
+BEGIN
+  FOREACH live_table IN ARRAY p_tables LOOP
+    cat := regexp_replace(live_table, '_prices$', '');
+
+    IF live_table = 'shoe_prices' THEN
+      -- Legacy schema: history keyed by (shoe_slug, retailer)
+      IF to_regclass('public.price_history') IS NULL THEN
+        CONTINUE;
+      END IF;
+      RETURN QUERY
+      WITH live AS (
+        SELECT DISTINCT ON (s.product_slug, s.retailer)
+               s.product_slug, s.retailer, s.price_eur,
+               coalesce(s.product_name, s.product_slug) AS name
+        FROM public.shoe_prices s
+        WHERE s.price_eur > 0 AND s.product_slug IS NOT NULL AND s.in_stock
+        ORDER BY s.product_slug, s.retailer, s.price_eur ASC
+      )
+      SELECT 'shoes'::text, l.name, l.product_slug, l.retailer, p.price_eur, l.price_eur,
+             round((p.price_eur - l.price_eur) / p.price_eur * 100, 1), z.sizes
+      FROM live l
+      JOIN LATERAL (
+        SELECT h.price_eur
+        FROM public.price_history h
+        WHERE h.shoe_slug = l.product_slug AND h.retailer = l.retailer
+          AND (p_before IS NULL OR h.recorded_at < p_before)
+        ORDER BY h.recorded_at DESC
+        LIMIT 1
+      ) p ON true
+      LEFT JOIN LATERAL (
+        SELECT jsonb_object_agg(x.eur_size, x.price_eur) AS sizes
+        FROM (
+          SELECT s2.eur_size::text AS eur_size, min(s2.price_eur) AS price_eur
+          FROM public.shoe_prices s2
+          WHERE s2.product_slug = l.product_slug AND s2.retailer = l.retailer
+            AND s2.in_stock AND s2.price_eur > 0 AND s2.eur_size IS NOT NULL
+          GROUP BY s2.eur_size
+        ) x
+      ) z ON true
+      WHERE p.price_eur > 0
+        AND (p.price_eur - l.price_eur) / p.price_eur >= p_threshold;
+      CONTINUE;
+    END IF;
+
+    IF to_regclass(format('public.%I', live_table)) IS NULL
+       OR to_regclass(format('public.%I', cat || '_price_history')) IS NULL THEN
+      CONTINUE;
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+      'SELECT %L::text, coalesce(l.product_name, l.product_slug, l.id::text), '
+      '       l.product_slug, coalesce(l.retailer, ''?''), p.price_eur, l.price_eur, '
+      '       round((p.price_eur - l.price_eur) / p.price_eur * 100, 1), NULL::jsonb '
+      'FROM public.%I l '
+      'JOIN LATERAL ( '
+      '  SELECT h.price_eur FROM public.%I h '
+      '  WHERE h.%I = l.id AND ($2 IS NULL OR h.recorded_at < $2) '
+      '  ORDER BY h.recorded_at DESC LIMIT 1 '
+      ') p ON true '
+      'WHERE l.price_eur > 0 AND l.in_stock AND p.price_eur > 0 '
+      '  AND (p.price_eur - l.price_eur) / p.price_eur >= $1',
+      cat, live_table, cat || '_price_history', cat || '_price_id'
+    ) USING p_threshold, p_before;
+  END LOOP;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.detect_price_drops(numeric, timestamptz, text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.detect_price_drops(numeric, timestamptz, text[]) TO service_role;
+
+COMMIT;
+
+-- ─── Verification (run as service_role) ──────────────────────────
+--
+--   SELECT * FROM public.detect_price_drops(0.10);
+--   SELECT * FROM public.detect_price_drops(0.10, now() - interval '6 hours');
@@ -0,0 +1,52 @@
+-- 20261019040000_price_watches.sql
+--
+-- Price watches: "tell me when <product> (in <size>) drops to <price>".
+--
+-- After each crawl, run_all_crawlers.py gets the drops from
+-- detect_price_drops(), loads only the active watches for the dropped
+-- product slugs (partial index below), matches them in memory and sends
+-- one digest per recipient (crawlers/price_watch.py).
+--
+--   eur_size       NULL = any size (shoes only; ignored for other gear)
+--   max_price_eur  NULL = any drop past the scheduler threshold
+--   last_alert_*   set when a digest went out; a watch is not alerted
+--                  again unless the price falls below last_alert_price_eur
+--
+-- The table holds email addresses, so it is locked down like the other PII
+-- tables (20260507_lock_pii_tables.sql): RLS on, no anon/authenticated
+-- access, service_role only.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.price_watches (
+  id                   bigserial PRIMARY KEY,
+  email                text NOT NULL,
+  category             text NOT NULL DEFAULT 'shoes',
+  product_slug         text NOT NULL,
+  eur_size             numeric(4,1),
+  max_price_eur        numeric(8,2),
+  active               boolean NOT NULL DEFAULT true,
+  last_alert_price_eur numeric(8,2),
+  last_alert_at        timestamptz,
+  created_at           timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_watches_active_slug
+  ON public.price_watches (category, product_slug)
+  WHERE active;
+
+ALTER TABLE public.price_watches ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.price_watches FROM anon, authenticated;
+
+DROP POLICY IF EXISTS "service_role full access" ON public.price_watches;
+CREATE POLICY "service_role full access" ON public.price_watches
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+--
+--   SELECT count(*) FROM price_watches WHERE active;
+--   -- as anon: SELECT * FROM price_watches;  → permission denied
@@ -0,0 +1,85 @@
+-- 20261019050000_price_trends.sql
+--
+-- Precomputed per-product price trends.
+--
+-- "Lowest in 30 days", "all-time low" and sparklines used to need a scan
+-- of a product's whole history. crawlers/price_trends.py runs after each
+-- snapshot and keeps one row per (category, product_slug) up to date from
+-- the newest history rows only:
+--
+--   current_price, last_change_at     cheapest in-stock offer, last change
+--   low/high/median_30d, _90d         median = of daily closing prices
+--   all_time_low (+ _at), all_time_high
+--   sparkline                         daily closes over 90 days, ~30 points
+--   offers, series                    job state: last price per retailer /
+--                                     price row, product price change points
+--                                     of the last 90 days
+--
+-- price_trend_state holds one watermark per history table (last
+-- recorded_at already applied), so each run reads only rows after it.
+--
+-- price_trends is catalog data (anon read, like the price tables);
+-- price_trend_state is service_role only.
+--
+-- Bootstrap once after applying:
+--   python3 crawlers/price_trends.py --rebuild
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.price_trends (
+  category        text NOT NULL,
+  product_slug    text NOT NULL,
+  current_price   numeric(8,2),
+  last_change_at  timestamptz,
+  low_30d         numeric(8,2),
+  high_30d        numeric(8,2),
+  median_30d      numeric(8,2),
+  low_90d         numeric(8,2),
+  high_90d        numeric(8,2),
+  median_90d      numeric(8,2),
+  all_time_low    numeric(8,2),
+  all_time_low_at timestamptz,
+  all_time_high   numeric(8,2),
+  sparkline       jsonb NOT NULL DEFAULT '[]',
+  offers          jsonb NOT NULL DEFAULT '{}',
+  series          jsonb NOT NULL DEFAULT '[]',
+  updated_at      timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (category, product_slug)
+);
+
+-- Daily roll: rows not updated for a day get their windows recomputed
+CREATE INDEX IF NOT EXISTS idx_price_trends_updated_at
+  ON public.price_trends (updated_at);
+
+CREATE TABLE IF NOT EXISTS public.price_trend_state (
+  history_table    text PRIMARY KEY,
+  last_recorded_at timestamptz NOT NULL,
+  updated_at       timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.price_trends ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "anon select" ON public.price_trends;
+CREATE POLICY "anon select" ON public.price_trends
+  AS PERMISSIVE FOR SELECT TO anon, authenticated USING (true);
+DROP POLICY IF EXISTS "service role full" ON public.price_trends;
+CREATE POLICY "service role full" ON public.price_trends
+  AS PERMISSIVE FOR ALL TO service_role USING (true) WITH CHECK (true);
+GRANT SELECT ON public.price_trends TO anon, authenticated;
+
+ALTER TABLE public.price_trend_state ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.price_trend_state FROM anon, authenticated;
+DROP POLICY IF EXISTS "service role full" ON public.price_trend_state;
+CREATE POLICY "service role full" ON public.price_trend_state
+  AS PERMISSIVE FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+--
+--   SELECT category, count(*), max(updated_at) FROM price_trends GROUP BY 1;
+--   SELECT * FROM price_trend_state;
+--   -- products at their 90-day low right now:
+--   SELECT category, product_slug, current_price, low_90d
+--   FROM price_trends WHERE current_price <= low_90d ORDER BY category;
@@ -0,0 +1,61 @@
+-- 20261019060000_history_compaction.sql
+--
+-- Support for crawlers/compact_history.py (history retention/downsampling).
+--
+-- The compactor walks each history table one week at a time before the
+-- retention cutoff (recorded_at >= week AND recorded_at < week + 7 days),
+-- keeps the weekly min and close row per key, archives the rest to csv.gz
+-- and deletes them in small batches.
+--
+--   1. BRIN index on recorded_at per history table. History is appended in
+--      time order, so a BRIN index makes the week range scans cheap at a
+--      few pages per table (the btree (key, recorded_at) indexes don't help
+--      a range over all keys).
+--   2. history_storage(p_tables): size, live and dead row counts, for the
+--      before/after storage report. service_role only.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+DO $$
+DECLARE
+  tbl TEXT;
+  history_tables TEXT[] := ARRAY[
+    'price_history', 'rope_price_history', 'crashpad_price_history',
+    'harness_price_history', 'helmet_price_history', 'belay_price_history',
+    'quickdraw_price_history'
+  ];
+BEGIN
+  FOREACH tbl IN ARRAY history_tables LOOP
+    IF to_regclass(format('public.%I', tbl)) IS NULL THEN
+      RAISE NOTICE 'skipping % (does not exist)', tbl;
+      CONTINUE;
+    END IF;
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON public.%I USING brin (recorded_at)',
+      'idx_' || tbl || '_recorded_brin', tbl
+    );
+  END LOOP;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.history_storage(p_tables text[])
+RETURNS TABLE (table_name text, total_bytes bigint, live_rows bigint, dead_rows bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT s.relname::text, pg_total_relation_size(s.relid), s.n_live_tup, s.n_dead_tup
+  FROM pg_stat_user_tables s
+  WHERE s.schemaname = 'public' AND s.relname = ANY (p_tables);
+$$;
+
+REVOKE ALL ON FUNCTION public.history_storage(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.history_storage(text[]) TO service_role;
+
+COMMIT;
+
+-- ─── Verification (run as service_role) ──────────────────────────
+--
+--   SELECT * FROM public.history_storage(ARRAY['price_history', 'rope_price_history']);
+--   EXPLAIN SELECT * FROM rope_price_history
+--     WHERE recorded_at >= '2026-01-05' AND recorded_at < '2026-01-12';   -- Bitmap Index Scan on ..._brin
@@ -0,0 +1,145 @@
+-- 20261019070000_detect_price_drops_registry.sql
+--
+-- detect_price_drops() driven by the category registry (crawlers/categories.py).
+--
+-- The first version (20261019030000_detect_price_drops.sql) took a list of live
+-- tables and special-cased shoe_prices by name. This version takes one
+-- spec per category, as sent by run_all_crawlers.py:
+--
+--   {"category": "rope", "live_table": "rope_prices",
+--    "history_table": "rope_price_history", "grain": "row",
+--    "history_key": ["rope_price_id"]}
+--
+--   grain "row"      every in-stock live row vs the last history row for
+--                    its id (history_key[0])
+--   grain "product"  cheapest in-stock live price per (product_slug,
+--                    retailer) vs the last history row for
+--                    (history_key[0], history_key[1]); sizes = {eur_size:
+--                    cheapest price} when the live table has eur_size
+--
+-- so a new category needs a registry entry, not a new branch here. Same
+-- result columns and p_before semantics as before; specs whose tables do
+-- not exist are skipped.
+--
+-- Local check against a throwaway Postgres:
+--   python3 crawlers/check_drop_detection.py
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+DROP FUNCTION IF EXISTS public.detect_price_drops(numeric, timestamptz, text[]);
+DROP FUNCTION IF EXISTS public.detect_price_drops(numeric, timestamptz, jsonb);
+
+CREATE OR REPLACE FUNCTION public.detect_price_drops(
+  p_threshold  numeric     DEFAULT 0.10,
+  p_before     timestamptz DEFAULT NULL,
+  p_categories jsonb       DEFAULT '[]'
+)
+RETURNS TABLE (
+  category     text,
+  product      text,
+  product_slug text,
+  retailer     text,
+  old_price    numeric,
+  new_price    numeric,
+  drop_pct     numeric,
+  sizes        jsonb
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+  spec       jsonb;
+  cat        text;
+  live_table text;
+  hist_table text;
+  key1       text;
+  key2       text;
+  size_expr  text;
+BEGIN
+  FOR spec IN SELECT * FROM jsonb_array_elements(p_categories) LOOP
+    cat        := spec->>'category';
+    live_table := spec->>'live_table';
+    hist_table := spec->>'history_table';
+    key1       := spec->'history_key'->>0;
+    key2       := spec->'history_key'->>1;
+
+    IF hist_table IS NULL
+       OR to_regclass(format('public.%I', live_table)) IS NULL
+       OR to_regclass(format('public.%I', hist_table)) IS NULL THEN
+      CONTINUE;
+    END IF;
+
+    IF spec->>'grain' = 'product' THEN
+      -- Per-size live rows: sizes of the dropped (slug, retailer), if any
+      IF EXISTS (
+        SELECT 1 FROM information_schema.columns c
+        WHERE c.table_schema = 'public' AND c.table_name = live_table AND c.column_name = 'eur_size'
+      ) THEN
+        size_expr := format(
+          '(SELECT jsonb_object_agg(x.eur_size, x.price_eur) FROM ( '
+          '   SELECT s2.eur_size::text AS eur_size, min(s2.price_eur) AS price_eur '
+          '   FROM public.%I s2 '
+          '   WHERE s2.product_slug = l.product_slug AND s2.retailer = l.retailer '
+          '     AND s2.in_stock AND s2.price_eur > 0 AND s2.eur_size IS NOT NULL '
+          '   GROUP BY s2.eur_size) x)', live_table);
+      ELSE
+        size_expr := 'NULL::jsonb';
+      END IF;
+
+      RETURN QUERY EXECUTE format(
+        'WITH live AS ( '
+        '  SELECT DISTINCT ON (s.product_slug, s.retailer) '
+        '         s.product_slug, s.retailer, s.price_eur, '
+        '         coalesce(s.product_name, s.product_slug) AS name '
+        '  FROM public.%1$I s '
+        '  WHERE s.price_eur > 0 AND s.product_slug IS NOT NULL AND s.in_stock '
+        '  ORDER BY s.product_slug, s.retailer, s.price_eur ASC '
+        ') '
+        'SELECT %2$L::text, l.name, l.product_slug, l.retailer, p.price_eur, l.price_eur, '
+        '       round((p.price_eur - l.price_eur) / p.price_eur * 100, 1), %6$s '
+        'FROM live l '
+        'JOIN LATERAL ( '
+        '  SELECT h.price_eur FROM public.%3$I h '
+        '  WHERE h.%4$I = l.product_slug AND h.%5$I = l.retailer '
+        '    AND ($2 IS NULL OR h.recorded_at < $2) '
+        '  ORDER BY h.recorded_at DESC LIMIT 1 '
+        ') p ON true '
+        'WHERE p.price_eur > 0 AND (p.price_eur - l.price_eur) / p.price_eur >= $1',
+        live_table, cat, hist_table, key1, key2, size_expr
+      ) USING p_threshold, p_before;
+    ELSE
+      RETURN QUERY EXECUTE format(
+        'SELECT %1$L::text, coalesce(l.product_name, l.product_slug, l.id::text), '
+        '       l.product_slug, coalesce(l.retailer, ''?''), p.price_eur, l.price_eur, '
+        '       round((p.price_eur - l.price_eur) / p.price_eur * 100, 1), NULL::jsonb '
+        'FROM public.%2$I l '
+        'JOIN LATERAL ( '
+        '  SELECT h.price_eur FROM public.%3$I h '
+        '  WHERE h.%4$I = l.id AND ($2 IS NULL OR h.recorded_at < $2) '
+        '  ORDER BY h.recorded_at DESC LIMIT 1 '
+        ') p ON true '
+        'WHERE l.price_eur > 0 AND l.in_stock AND p.price_eur > 0 '
+        '  AND (p.price_eur - l.price_eur) / p.price_eur >= $1',
+        cat, live_table, hist_table, key1
+      ) USING p_threshold, p_before;
+    END IF;
+  END LOOP;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.detect_price_drops(numeric, timestamptz, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.detect_price_drops(numeric, timestamptz, jsonb) TO service_role;
+
+COMMIT;
+
+-- ─── Verification (run as service_role) ──────────────────────────
+--
+--   SELECT * FROM public.detect_price_drops(0.10, NULL, '[
+--     {"category": "shoes", "live_table": "shoe_prices", "history_table": "price_history",
+--      "grain": "product", "history_key": ["shoe_slug", "retailer"]},
+--     {"category": "rope", "live_table": "rope_prices", "history_table": "rope_price_history",
+--      "grain": "row", "history_key": ["rope_price_id"]}
+--   ]');
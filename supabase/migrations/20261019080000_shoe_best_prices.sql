@@ -0,0 +1,75 @@
+-- 20261019080000_shoe_best_prices.sql
+--
+-- Cheapest in-stock offer per (shoe slug, EU size), precomputed.
+--
+-- The scanner loaders (scan_recommender, benchmark/matrix_scorer, the V2
+-- check_full_v2_matrix.load_price_rows) each paged the whole
+-- shoe_prices_by_size view 1000 rows at a time and reduced it in Python
+-- to "cheapest in-stock price per slug per size". shoe_best_prices does
+-- that reduction once, after each crawl:
+--
+--   one row per (product_slug, size_eu): price_eur, retailer, product_url
+--   of the cheapest in-stock offer, offers = in-stock offers at that size
+--
+-- retailer / product_url come from shoe_prices via the view's source_id.
+-- Ties on price go to the alphabetically first retailer so refreshes are
+-- stable.
+--
+-- run_all_crawlers.py calls refresh_shoe_best_prices() after the snapshot.
+-- REFRESH ... CONCURRENTLY (needs the unique index) keeps the view
+-- readable while it refreshes. Readers: scanner/shoe_best_prices.py.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS public.shoe_best_prices;
+
+CREATE MATERIALIZED VIEW public.shoe_best_prices AS
+SELECT DISTINCT ON (v.product_slug, v.size_eu::numeric)
+  v.product_slug,
+  v.size_eu::numeric AS size_eu,
+  v.price_eur,
+  sp.retailer,
+  sp.product_url,
+  count(*) OVER (PARTITION BY v.product_slug, v.size_eu::numeric) AS offers,
+  now() AS refreshed_at
+FROM public.shoe_prices_by_size v
+JOIN public.shoe_prices sp ON sp.id = v.source_id
+WHERE v.in_stock
+  AND v.price_eur IS NOT NULL
+  AND v.product_slug IS NOT NULL
+  AND v.size_eu IS NOT NULL
+ORDER BY v.product_slug, v.size_eu::numeric, v.price_eur ASC, sp.retailer ASC;
+
+CREATE UNIQUE INDEX idx_shoe_best_prices_slug_size
+  ON public.shoe_best_prices (product_slug, size_eu);
+
+-- Catalog data, like shoe_prices (materialized views have no RLS)
+GRANT SELECT ON public.shoe_best_prices TO anon, authenticated, service_role;
+
+CREATE OR REPLACE FUNCTION public.refresh_shoe_best_prices()
+RETURNS bigint
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  n bigint;
+BEGIN
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.shoe_best_prices;
+  SELECT count(*) INTO n FROM public.shoe_best_prices;
+  RETURN n;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.refresh_shoe_best_prices() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_shoe_best_prices() TO service_role;
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+--
+--   SELECT public.refresh_shoe_best_prices();           -- rows in the view
+--   SELECT count(*) FROM shoe_prices_by_size WHERE in_stock;  -- rows it replaces
+--   SELECT * FROM shoe_best_prices WHERE product_slug = 'la-sportiva-solution' ORDER BY size_eu;
@@ -0,0 +1,34 @@
+-- Input hashes for the stored interpretation text on foot_scan_fits.
+--
+-- The V2 worker (explore_v2/v2_pipeline.build_v2_results) keys every
+-- interpretation block and every pick description on a hash of exactly the
+-- inputs that render it, and writes those hashes next to the text:
+--
+--   {"blocks":          [[input_hash, text_hash], ...],   -- one per block
+--    "recommendations": [[input_hash, text_hash], ...]}   -- one per pick
+--
+-- On a rescore the worker reuses stored text whose input hash still matches
+-- (and whose text hash proves it is the text that was hashed) instead of
+-- re-rendering it; only changed picks are regenerated.
+--
+-- Worker-internal: no anon column grant (see 20260507_lock_pii_tables.sql),
+-- so the SPA's select=* never sees it. NULL on rows written before this
+-- migration, and on V1 rows - both simply render everything.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+ALTER TABLE foot_scan_fits ADD COLUMN IF NOT EXISTS interpretation_deps jsonb;
+
+COMMENT ON COLUMN foot_scan_fits.interpretation_deps IS
+  'V2 worker: [input_hash, text_hash] per interpretation block / recommendation, for reuse on rescore';
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+-- SELECT column_name, data_type FROM information_schema.columns
+--  WHERE table_name = 'foot_scan_fits' AND column_name = 'interpretation_deps';
+-- SELECT scan_id, jsonb_array_length(interpretation_deps->'recommendations')
+--   FROM foot_scan_fits WHERE interpretation_deps IS NOT NULL
+--  ORDER BY generated_at DESC LIMIT 5;
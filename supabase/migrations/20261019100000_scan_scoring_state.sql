@@ -0,0 +1,39 @@
+-- Stored V2 scoring state on foot_scan_fits, for cheap rescores.
+--
+-- A rescore (preferences edited on the results page) changes the scoring
+-- target, not the foot. The V2 worker (explore_v2/v2_pipeline
+-- .build_v2_results) writes the part of its scoring work that no
+-- preference can change next to the results:
+--
+--   {"fingerprint": "...",                 -- scorer sources + catalog + profile
+--    "targets":     {aggressiveness: fit target, ...},
+--    "axes":        [{"axis", "key", "shoes", "scores", "notes", "note_text"}, ...]}
+--
+-- "axes" holds the toe_form / forefoot_width / heel_volume / instep_extreme
+-- scores per shoe (parallel lists over shoes-table positions). On the next
+-- run the worker reuses them while the fingerprint still matches and only
+-- scores the preference axes again; a stale state is ignored (full run).
+--
+-- Worker-internal: no anon column grant (see 20260507_lock_pii_tables.sql),
+-- so the SPA's select=* never sees it. NULL on rows written before this
+-- migration and on V1 rows.
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+ALTER TABLE foot_scan_fits ADD COLUMN IF NOT EXISTS scoring_state jsonb;
+
+COMMENT ON COLUMN foot_scan_fits.scoring_state IS
+  'V2 worker: fit targets + preference-independent axis scores, reused on rescore while the fingerprint matches';
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+-- SELECT column_name, data_type FROM information_schema.columns
+--  WHERE table_name = 'foot_scan_fits' AND column_name = 'scoring_state';
+-- SELECT scan_id, scoring_state->>'fingerprint',
+--        jsonb_array_length(scoring_state->'axes'),
+--        pg_column_size(scoring_state)
+--   FROM foot_scan_fits WHERE scoring_state IS NOT NULL
+--  ORDER BY generated_at DESC LIMIT 5;
@@ -0,0 +1,48 @@
+-- 20261019110000_price_history_tombstones.sql
+--
+-- Tombstones in the change-only price history.
+--
+-- snapshot_prices.py writes a history row only when a key's tracked fields
+-- change. A key that leaves the live table gets no further rows, so the
+-- *_latest views, "price as of" reads and price_trends would keep its last
+-- price as current forever. Examples: a rope row deleted by the sync, a
+-- bergzeit #size row removed, a retailer that stops listing a shoe.
+--
+-- The snapshot now records a tombstone for every key that is in the
+-- *_latest view but no longer live:
+--
+--   price_history              price_eur NULL
+--   {category}_price_history   price_eur NULL, original_price_eur NULL, in_stock false
+--
+-- price_history.price_eur was NOT NULL; this lets it hold the tombstone.
+-- detect_price_drops already ignores a NULL last price (price_eur > 0).
+--
+-- Apply via Supabase dashboard SQL editor.
+
+BEGIN;
+
+DO $$
+DECLARE
+  tbl TEXT;
+  history_tables TEXT[] := ARRAY[
+    'price_history', 'rope_price_history', 'crashpad_price_history',
+    'harness_price_history', 'helmet_price_history', 'belay_price_history',
+    'quickdraw_price_history'
+  ];
+BEGIN
+  FOREACH tbl IN ARRAY history_tables LOOP
+    IF to_regclass(format('public.%I', tbl)) IS NULL THEN
+      RAISE NOTICE 'skipping % (does not exist)', tbl;
+      CONTINUE;
+    END IF;
+    EXECUTE format('ALTER TABLE public.%I ALTER COLUMN price_eur DROP NOT NULL', tbl);
+  END LOOP;
+END $$;
+
+COMMIT;
+
+-- ─── Verification ──────────────────────────────────────────────
+--
+--   SELECT table_name, is_nullable FROM information_schema.columns
+--    WHERE column_name = 'price_eur' AND table_name LIKE '%price_history';
+--   SELECT count(*) FROM price_history_latest WHERE price_eur IS NULL;   -- vanished keys